@@ -18,7 +18,10 @@
 import hashlib
 import hmac
 import os
+import threading
+import weakref
 
+from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_utils import encodeutils
 from oslo_utils import strutils
@@ -33,6 +36,7 @@ from nova import context as nova_context
 from nova import exception
 from nova.i18n import _
 from nova.network import neutron as neutronapi
+from nova import utils
 
 CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
@@ -44,55 +48,152 @@ LOG = logging.getLogger(__name__)
 MAX_QUERY_NETWORKS = 160
 
 
+# The fraction of [api]metadata_cache_expiration for which the metadata found
+# in the shared cache is kept in the local cache. Its age in the shared cache
+# is unknown, so it cannot be kept locally for the full expiration time
+# without serving metadata up to twice as old as configured.
+SHARED_METADATA_LOCAL_TTL_FRACTION = 0.2
+
+
+class LocalMetadataCache(utils.LRUCache):
+    """A bounded LRU cache of the metadata of the instances in this process.
+
+    It is kept in front of the cache shared by the metadata API services, so
+    that the burst of requests made by an instance when it boots does not get
+    its InstanceMetadata from the shared cache for each path. The responses
+    rendered for each path are kept along with the metadata, until it expires
+    or is evicted.
+
+    :param ttl: The time, in seconds, to keep the metadata.
+    :param maxsize: The maximum number of instance metadata to keep.
+    """
+
+    def __init__(self, ttl, maxsize):
+        super().__init__(maxsize, ttl=ttl)
+        # The dicts of the (body, content type) tuples of the responses
+        # rendered for each path, keyed by metadata. They are dropped with the
+        # metadata once it is no longer referenced.
+        self._responses: weakref.WeakKeyDictionary = (
+            weakref.WeakKeyDictionary())
+        self._responses_lock = threading.Lock()
+
+    def set(self, key, meta_data, ttl=None):
+        with self._responses_lock:
+            self._responses.setdefault(meta_data, {})
+        super().set(key, meta_data, ttl=ttl)
+
+    def get_response(self, meta_data, path):
+        """Return the (body, content type) rendered for a path, or None.
+
+        Only the responses of the metadata cached here are kept.
+        """
+        with self._responses_lock:
+            responses = self._responses.get(meta_data)
+            if responses is None:
+                return None
+            return responses.get(path)
+
+    def set_response(self, meta_data, path, body, content_type):
+        with self._responses_lock:
+            responses = self._responses.get(meta_data)
+            if responses is not None:
+                responses[path] = (body, content_type)
+
+    def clear(self):
+        super().clear()
+        with self._responses_lock:
+            self._responses.clear()
+
+
 class MetadataRequestHandler(wsgi.Application):
     """Serve metadata."""
 
     def __init__(self):
         self._cache = cache_utils.get_client(
                 expiration_time=CONF.api.metadata_cache_expiration)
+        self._local_cache = None
+        if (CONF.api.metadata_cache_expiration > 0 and
+                CONF.api.metadata_local_cache_size > 0):
+            self._local_cache = LocalMetadataCache(
+                CONF.api.metadata_cache_expiration,
+                CONF.api.metadata_local_cache_size)
         if (CONF.neutron.service_metadata_proxy and
             not CONF.neutron.metadata_proxy_shared_secret):
             LOG.warning("metadata_proxy_shared_secret is not configured, "
                         "the metadata information returned by the proxy "
                         "cannot be trusted")
 
+    def _get_metadata(self, cache_key, build, name):
+        """Get the metadata cached for a key, or build and cache it.
+
+        The metadata is looked up in the local cache of this process first,
+        and then in the shared cache. Concurrent misses for the same key wait
+        for the first of them to build the metadata, and then use it.
+
+        :param cache_key: The key of the metadata in the caches.
+        :param build: A callable building the metadata, or returning None if
+            there is none.
+        :param name: The name of the metadata in the logs.
+        :returns: The InstanceMetadata, or None.
+        """
+        if CONF.api.metadata_cache_expiration <= 0:
+            return build()
+
+        if self._local_cache is not None:
+            data = self._local_cache.get(cache_key)
+            if data:
+                LOG.debug("Using locally cached metadata for %s", name)
+                return data
+
+        with lockutils.lock(cache_key):
+            if self._local_cache is not None:
+                # It may have been built while we were waiting for the lock
+                data = self._local_cache.get(cache_key)
+                if data:
+                    LOG.debug("Using locally cached metadata for %s", name)
+                    return data
+
+            # The metadata built here is kept locally for the full time
+            local_ttl = None
+            data = self._cache.get(cache_key)
+            if data:
+                LOG.debug("Using cached metadata for %s", name)
+                local_ttl = (CONF.api.metadata_cache_expiration *
+                             SHARED_METADATA_LOCAL_TTL_FRACTION)
+            else:
+                data = build()
+                if data is None:
+                    return None
+                self._cache.set(cache_key, data)
+
+            if self._local_cache is not None:
+                self._local_cache.set(cache_key, data, ttl=local_ttl)
+
+        return data
+
     def get_metadata_by_remote_address(self, address):
         if not address:
             raise exception.FixedIpNotFoundForAddress(address=address)
 
-        cache_key = 'metadata-%s' % address
-        data = self._cache.get(cache_key)
-        if data:
-            LOG.debug("Using cached metadata for %s", address)
-            return data
-
-        try:
-            data = base.get_metadata_by_address(address)
-        except exception.NotFound:
-            LOG.exception('Failed to get metadata for IP %s', address)
-            return None
-
-        if CONF.api.metadata_cache_expiration > 0:
-            self._cache.set(cache_key, data)
+        def build():
+            try:
+                return base.get_metadata_by_address(address)
+            except exception.NotFound:
+                LOG.exception('Failed to get metadata for IP %s', address)
+                return None
 
-        return data
+        return self._get_metadata('metadata-%s' % address, build, address)
 
     def get_metadata_by_instance_id(self, instance_id, address):
-        cache_key = 'metadata-%s' % instance_id
-        data = self._cache.get(cache_key)
-        if data:
-            LOG.debug("Using cached metadata for instance %s", instance_id)
-            return data
 
-        try:
-            data = base.get_metadata_by_instance_id(instance_id, address)
-        except exception.NotFound:
-            return None
+        def build():
+            try:
+                return base.get_metadata_by_instance_id(instance_id, address)
+            except exception.NotFound:
+                return None
 
-        if CONF.api.metadata_cache_expiration > 0:
-            self._cache.set(cache_key, data)
-
-        return data
+        return self._get_metadata(
+            'metadata-%s' % instance_id, build, 'instance %s' % instance_id)
 
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
@@ -124,6 +225,13 @@ class MetadataRequestHandler(wsgi.Application):
         if meta_data is None:
             raise webob.exc.HTTPNotFound()
 
+        path = os.path.normpath(req.path_info)
+        if self._local_cache is not None:
+            response = self._local_cache.get_response(meta_data, path)
+            if response is not None:
+                req.response.body, req.response.content_type = response
+                return req.response
+
         try:
             data = meta_data.lookup(req.path_info)
         except base.InvalidMetadataPath:
@@ -136,6 +244,9 @@ class MetadataRequestHandler(wsgi.Application):
         req.response.body = encodeutils.to_utf8(resp)
 
         req.response.content_type = meta_data.get_mimetype()
+        if self._local_cache is not None:
+            self._local_cache.set_response(
+                meta_data, path, req.response.body, meta_data.get_mimetype())
         return req.response
 
     def _handle_remote_ip_request(self, req):
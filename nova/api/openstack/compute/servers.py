@@ -337,7 +337,6 @@ class ServersController(wsgi.Controller):
 
         if is_detail:
             instance_list._context = context
-            instance_list.fill_faults()
             response = self._view_builder.detail(
                 req, instance_list, cell_down_support=cell_down_support)
         else:
@@ -14,6 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 
@@ -43,6 +45,128 @@ AZ_NOT_IN_REQUEST_SPEC = object()
 SCHED_HINTS_NOT_IN_REQUEST_SPEC = object()
 
 
+class ServerListLoader(object):
+    """Load the data needed by the views of a list of servers in batches.
+
+    Building the detailed view of each server one by one would look up its
+    fault, block device mappings and host status in its cell database
+    instance after instance. This loader is created for a request and
+    collects the instances of the listing instead. It finds their cells
+    with a single query to the API database, and then resolves each kind of
+    data with a single query per cell, run in parallel. The results are
+    kept for the duration of the request.
+    """
+
+    def __init__(self, context, instances, compute_api=None):
+        self.context = context
+        self.instances = instances
+        self.compute_api = compute_api or compute.API()
+        self._cells = None
+        self._bdms = None
+        self._host_statuses = None
+
+    def _get_cells(self):
+        """Get the instance uuids to look up in each cell.
+
+        :returns: A tuple of a dict, keyed by cell uuid, of the tuples of the
+            CellMapping and the uuids of the instances of the cell, and of the
+            list of the uuids of the instances without a cell.
+        """
+        if self._cells is None:
+            instance_uuids = [inst.uuid for inst in self.instances]
+            inst_maps = objects.InstanceMappingList.get_by_instance_uuids(
+                self.context, instance_uuids)
+            cells = {}
+            mapped = set()
+            for inst_map in inst_maps:
+                if inst_map.cell_mapping is None:
+                    continue
+                cell_mapping = inst_map.cell_mapping
+                cells.setdefault(cell_mapping.uuid, (cell_mapping, []))
+                cells[cell_mapping.uuid][1].append(inst_map.instance_uuid)
+                mapped.add(inst_map.instance_uuid)
+            unmapped = [uuid for uuid in instance_uuids if uuid not in mapped]
+            self._cells = cells, unmapped
+        return self._cells
+
+    def _scatter_gather(self, what, fn):
+        """Call fn(cctxt, instance_uuids) for the instances of each cell.
+
+        :returns: A dict, keyed by cell uuid, of the results of the cells,
+            without the cells which failed or did not respond.
+        """
+        cells, _ = self._get_cells()
+
+        def gather(cctxt):
+            return fn(cctxt, cells[cctxt.cell_uuid][1])
+
+        results = nova_context.scatter_gather_cells(
+            self.context, [cell for cell, _ in cells.values()],
+            nova_context.CELL_TIMEOUT, gather)
+        gathered = {}
+        for cell_uuid, result in results.items():
+            if isinstance(result, Exception):
+                LOG.warning('Failed to get %s for cell %s', what, cell_uuid)
+            elif result is nova_context.did_not_respond_sentinel:
+                LOG.warning('Timeout getting %s for cell %s', what, cell_uuid)
+            else:
+                gathered[cell_uuid] = result
+        return gathered
+
+    def get_bdms(self):
+        """Get the block device mappings of the instances.
+
+        :returns: A dict, keyed by instance uuid, of the lists of block device
+            mappings of the instances of the cells which responded.
+        """
+        if self._bdms is None:
+            self._bdms = {}
+            results = self._scatter_gather(
+                'block device mappings',
+                objects.BlockDeviceMappingList.bdms_by_instance_uuid)
+            for result in results.values():
+                self._bdms.update(result)
+        return self._bdms
+
+    def fill_faults(self):
+        """Set the latest fault of each instance, or None if it has none.
+
+        The instances without a cell, as in legacy environments, are looked
+        up in the database of the context. The instances of the cells which
+        failed or did not respond are set no fault, so that the views do not
+        try to lazy-load them one by one.
+        """
+        _, unmapped = self._get_cells()
+        results = self._scatter_gather(
+            'faults', objects.InstanceFaultList.get_latest_by_instance_uuids)
+        faults = list(itertools.chain(*results.values()))
+        if unmapped:
+            faults.extend(
+                objects.InstanceFaultList.get_latest_by_instance_uuids(
+                    self.context, unmapped))
+        faults_by_uuid = {fault.instance_uuid: fault for fault in faults}
+        for instance in self.instances:
+            instance.fault = faults_by_uuid.get(instance.uuid)
+            instance.obj_reset_changes(['fault'])
+
+    def get_host_statuses(self):
+        """Get the host status of the instances.
+
+        The services of the hosts are joined to the instances when they are
+        listed, so this only resolves the status of each host once.
+
+        :returns: A dict, keyed by instance uuid, of the host statuses of the
+            instances, but for the instances from down cells which do not have
+            a host field.
+        """
+        if self._host_statuses is None:
+            instances = [instance for instance in self.instances
+                         if 'host' in instance]
+            self._host_statuses = (
+                self.compute_api.get_instances_host_statuses(instances))
+        return self._host_statuses
+
+
 class ViewBuilder(common.ViewBuilder):
     """Model a server API response as a python dictionary."""
 
@@ -493,9 +617,12 @@ class ViewBuilder(common.ViewBuilder):
         show_extended_attr = context.can(
             esa_policies.BASE_POLICY_NAME, fatal=False)
 
-        instance_uuids = [inst['uuid'] for inst in instances]
-        bdms = self._get_instance_bdms_in_multiple_cells(context,
-                                                         instance_uuids)
+        # Look up the faults and the block device mappings of all the
+        # instances at once, rather than for each instance
+        loader = ServerListLoader(context, instances,
+                                  compute_api=self.compute_api)
+        loader.fill_faults()
+        bdms = loader.get_bdms()
 
         # NOTE(gmann): pass show_sec_grp=False in _list_view() because
         # security groups for detail method will be added by separate
@@ -515,7 +642,7 @@ class ViewBuilder(common.ViewBuilder):
             # If we're not allowed by policy to show host status at all, don't
             # bother requesting instance host status from the compute API.
             if unknown_only is not None:
-                self._add_host_status(list(servers_dict["servers"]), instances,
+                self._add_host_status(list(servers_dict["servers"]), loader,
                                       unknown_only=unknown_only)
 
         self._add_security_grps(request, list(servers_dict["servers"]),
@@ -723,22 +850,20 @@ class ViewBuilder(common.ViewBuilder):
 
         return fault_dict
 
-    def _add_host_status(self, servers, instances, unknown_only=False):
+    def _add_host_status(self, servers, loader, unknown_only=False):
         """Adds the ``host_status`` field to the list of servers
 
-        This method takes care to filter instances from down cells since they
+        The instances from down cells are left out by the loader since they
         do not have a host set and as such we cannot determine the host status.
 
         :param servers: list of detailed server dicts for the API response
             body; this list is modified by reference by updating the server
             dicts within the list
-        :param instances: list of Instance objects
+        :param loader: the ServerListLoader of the instances of the servers
         :param unknown_only: whether to show only UNKNOWN host status
         """
-        # Filter out instances from down cells which do not have a host field.
-        instances = [instance for instance in instances if 'host' in instance]
         # Get the dict, keyed by instance.uuid, of host status values.
-        host_statuses = self.compute_api.get_instances_host_statuses(instances)
+        host_statuses = loader.get_host_statuses()
         for server in servers:
             # Filter out anything that is not in the resulting dict because
             # we had to filter the list of instances above for down cells.
@@ -781,35 +906,6 @@ class ViewBuilder(common.ViewBuilder):
             servers[0]['security_groups'] = req_obj['server'].get(
                 'security_groups', [{'name': 'default'}])
 
-    @staticmethod
-    def _get_instance_bdms_in_multiple_cells(ctxt, instance_uuids):
-        inst_maps = objects.InstanceMappingList.get_by_instance_uuids(
-                        ctxt, instance_uuids)
-
-        cell_mappings = {}
-        for inst_map in inst_maps:
-            if (inst_map.cell_mapping is not None and
-                    inst_map.cell_mapping.uuid not in cell_mappings):
-                cell_mappings.update(
-                    {inst_map.cell_mapping.uuid: inst_map.cell_mapping})
-
-        bdms = {}
-        results = nova_context.scatter_gather_cells(
-                        ctxt, cell_mappings.values(),
-                        nova_context.CELL_TIMEOUT,
-                        objects.BlockDeviceMappingList.bdms_by_instance_uuid,
-                        instance_uuids)
-        for cell_uuid, result in results.items():
-            if isinstance(result, Exception):
-                LOG.warning('Failed to get block device mappings for cell %s',
-                            cell_uuid)
-            elif result is nova_context.did_not_respond_sentinel:
-                LOG.warning('Timeout getting block device mappings for cell '
-                            '%s', cell_uuid)
-            else:
-                bdms.update(result)
-        return bdms
-
     def _add_volumes_attachments(self, server, bdms,
                                  add_delete_on_termination):
         # server['id'] is guaranteed to be in the cache due to
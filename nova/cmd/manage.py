@@ -867,10 +867,11 @@ class CellV2Commands(object):
     def _get_and_map_instances(self, ctxt, cell_mapping, limit, marker):
         filters = {}
         with context.target_cell(ctxt, cell_mapping) as cctxt:
-            instances = objects.InstanceList.get_by_filters(
+            instances = list(objects.InstanceList.iter_by_filters(
                     cctxt.elevated(read_deleted='yes'), filters,
-                    sort_key='created_at', sort_dir='asc', limit=limit,
-                    marker=marker)
+                    ['uuid', 'project_id', 'user_id'],
+                    sort_keys=['created_at'], sort_dirs=['asc'], limit=limit,
+                    marker=marker))
 
         for instance in instances:
             try:
@@ -48,7 +48,9 @@ class InstanceLister(multi_cell_list.CrossCellLister):
     def __init__(self, sort_keys, sort_dirs, cells=None, batch_size=None):
         super(InstanceLister, self).__init__(
             InstanceSortContext(sort_keys, sort_dirs), cells=cells,
-            batch_size=batch_size)
+            batch_size=batch_size,
+            adaptive=(CONF.api.instance_list_cells_batch_strategy ==
+                      'adaptive'))
 
     @property
     def marker_identifier(self):
@@ -126,6 +128,11 @@ def get_instance_list_cells_batch_size(limit, cells):
     elif strategy == 'distributed':
         # Distributed strategy, 10% more than even partitioning
         batch_size = int((limit / len(cells)) * 1.10)
+    elif strategy == 'adaptive':
+        # Adaptive strategy, starting like the distributed one, as the
+        # batches of the cells which need more are grown by the lister. We
+        # only avoid tiny batches.
+        return min(max(int((limit / len(cells)) * 1.10), 10), limit)
 
     # We never query a larger batch than the total requested, and never
     # smaller than the lower limit of 100.
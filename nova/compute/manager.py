@@ -646,6 +646,11 @@ class ComputeManager(manager.Manager):
         self._sync_power_pool = eventlet.GreenPool(
             size=CONF.sync_power_state_pool_size)
         self._syncs_in_progress = {}
+        # The power state of the instances last recorded in the database,
+        # keyed by instance uuid, and the time of the last full sync, used to
+        # only sync the instances whose power state changed in between.
+        self._power_states = {}
+        self._power_states_synced_at = None
         self.send_instance_updates = (
             CONF.filter_scheduler.track_instance_changes)
         if CONF.max_concurrent_builds != 0:
@@ -884,6 +889,10 @@ class ComputeManager(manager.Manager):
 
             migration.status = 'completed'
             migration.save()
+
+        # The evacuated instances were not removed through the tracker
+        for migration in evacuations.values():
+            self.rt.invalidate_usage(migration.source_node)
         return evacuations
 
     def _is_instance_storage_shared(self, context, instance, host=None):
@@ -1059,8 +1068,13 @@ class ComputeManager(manager.Manager):
             instance.task_state = None
             instance.save(expected_task_state=[task_states.MIGRATING])
 
-    def _init_instance(self, context, instance):
-        """Initialize this instance during service init."""
+    def _init_instance(self, context, instance, vm_power_state=None):
+        """Initialize this instance during service init.
+
+        :param vm_power_state: The power state of the instance on the
+            hypervisor, if already known. It is retrieved from the driver
+            otherwise.
+        """
 
         # NOTE(danms): If the instance appears to not be owned by this
         # host, it may have been evacuated away, but skipped by the
@@ -1158,7 +1172,9 @@ class ComputeManager(manager.Manager):
                 self._set_instance_obj_error_state(instance)
             return
 
-        current_power_state = self._get_power_state(instance)
+        if vm_power_state is None:
+            vm_power_state = self._get_power_state(instance)
+        current_power_state = vm_power_state
         try_reboot, reboot_type = self._retry_reboot(
             instance, current_power_state)
 
@@ -1303,13 +1319,18 @@ class ComputeManager(manager.Manager):
                          instance=instance)
                 instance.task_state = None
                 instance.save()
+                # The power state of the instance may have changed
+                vm_power_state = None
         if instance.task_state == task_states.MIGRATING:
             # Live migration did not complete, but instance is on this
             # host. Abort ongoing migration if still running and reset state.
             self._reset_live_migration(context, instance)
+            vm_power_state = None
 
         db_state = instance.power_state
-        drv_state = self._get_power_state(instance)
+        drv_state = vm_power_state
+        if drv_state is None:
+            drv_state = self._get_power_state(instance)
         expect_running = (db_state == power_state.RUNNING and
                           drv_state != db_state)
 
@@ -1672,9 +1693,13 @@ class ComputeManager(manager.Manager):
                 context, nodes_by_uuid)
 
             # Initialise instances on the host that are not evacuating
-            for instance in instances:
-                if instance.uuid not in evacuated_instances:
-                    self._init_instance(context, instance)
+            instances_to_init = [instance for instance in instances
+                                 if instance.uuid not in evacuated_instances]
+            vm_power_states = self._get_power_states(instances_to_init)
+            for instance in instances_to_init:
+                self._init_instance(
+                    context, instance,
+                    vm_power_state=vm_power_states.get(instance.uuid))
 
             # NOTE(gibi): collect all the instance uuids that is in some way
             # was already handled above. Either by init_instance or by
@@ -1800,6 +1825,24 @@ class ComputeManager(manager.Manager):
         except exception.InstanceNotFound:
             return power_state.NOSTATE
 
+    def _get_power_states(self, instances):
+        """Retrieve the power state of the given instances at once.
+
+        :returns: dict of power states keyed by instance uuid, or an empty
+            dict if the driver failed to retrieve them.
+        """
+        if not instances:
+            return {}
+        try:
+            infos = self.driver.get_info_bulk(instances, use_cache=False)
+        except Exception:
+            LOG.exception('Failed to retrieve the power state of the '
+                          'instances at once, retrieving them one by one')
+            return {}
+        return {instance.uuid: infos[instance.uuid].state
+                if instance.uuid in infos else power_state.NOSTATE
+                for instance in instances}
+
     def _await_block_device_map_created(self, context, vol_id):
         # TODO(yamahata): creating volume simultaneously
         #                 reduces creation time?
@@ -10060,6 +10103,7 @@ class ComputeManager(manager.Manager):
 
         # NOTE(timello): make sure we update available resources on source
         # host even before next periodic task.
+        self.rt.invalidate_usage(source_node)
         self.update_available_resource(ctxt)
 
         self._update_scheduler_instance_info(ctxt, instance)
@@ -10186,6 +10230,9 @@ class ComputeManager(manager.Manager):
                 instance.compute_id = compute_node and compute_node.id or None
                 instance.progress = 0
                 instance.save(expected_task_state=task_states.MIGRATING)
+                if node_name:
+                    # The instance was not added through the tracker
+                    self.rt.invalidate_usage(node_name)
 
         # NOTE(tr3buchet): tear down networks on source host (nova-net)
         # NOTE(mriedem): For neutron, this will delete any inactive source
@@ -10925,11 +10972,30 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        If sync_power_state_full_interval is set, between the full syncs the
+        power states of all the instances are fetched from the hypervisor at
+        once and only the instances whose power state differs from the one
+        last recorded in the database are synced.
         """
         db_instances = objects.InstanceList.get_by_host(context, self.host,
                                                         expected_attrs=[],
                                                         use_slave=True)
 
+        interval = CONF.sync_power_state_full_interval
+        synced_at = self._power_states_synced_at
+        if (interval > 0 and synced_at is not None and
+                time.monotonic() - synced_at < interval):
+            try:
+                infos = self.driver.get_info_bulk(db_instances)
+            except exception.VirtDriverNotReady as e:
+                LOG.info('Skipping _sync_power_states periodic task due '
+                         'to: %s', e)
+                return
+            self._forget_power_states(db_instances)
+            self._sync_changed_power_states(context, db_instances, infos)
+            return
+
         try:
             num_vm_instances = self.driver.get_num_instances()
         except exception.VirtDriverNotReady as e:
@@ -10948,6 +11014,39 @@ class ComputeManager(manager.Manager):
                         {'num_db_instances': num_db_instances,
                          'num_vm_instances': num_vm_instances})
 
+        self._forget_power_states(db_instances)
+        self._spawn_power_state_syncs(context, db_instances)
+        if interval > 0:
+            self._power_states_synced_at = time.monotonic()
+
+    def _forget_power_states(self, db_instances):
+        """Forget about the instances which are no longer on this host."""
+        db_uuids = set(db_instance.uuid for db_instance in db_instances)
+        for uuid in set(self._power_states) - db_uuids:
+            self._power_states.pop(uuid, None)
+
+    def _sync_changed_power_states(self, context, db_instances, infos):
+        """Sync the instances whose power state changed on the hypervisor.
+
+        :param context: The RequestContext of the periodic task.
+        :param db_instances: The InstanceList of the instances of the host.
+        :param infos: dict of the InstanceInfo reported by the hypervisor,
+            keyed by instance uuid.
+        """
+        changed = [db_instance for db_instance in db_instances
+                   if self._power_states.get(db_instance.uuid) !=
+                   (infos[db_instance.uuid].state if db_instance.uuid in infos
+                    else power_state.NOSTATE)]
+        if not changed:
+            LOG.debug('No instance power state changed since the last sync')
+            return
+
+        LOG.debug('Synchronizing the power state of %(num)d of the '
+                  '%(total)d instances on the hypervisor',
+                  {'num': len(changed), 'total': len(infos)})
+        self._spawn_power_state_syncs(context, changed)
+
+    def _spawn_power_state_syncs(self, context, db_instances):
         def _sync(db_instance):
             # NOTE(melwitt): This must be synchronized as we query state from
             #                two separate sources, the driver and the database.
@@ -11068,6 +11167,7 @@ class ComputeManager(manager.Manager):
                      {'src': db_instance.host,
                       'dst': self.host},
                      instance=db_instance)
+            self._power_states.pop(db_instance.uuid, None)
             return
         elif db_instance.task_state is not None:
             # on the receiving end of nova-compute, it could happen
@@ -11095,6 +11195,7 @@ class ComputeManager(manager.Manager):
             db_instance.power_state = vm_power_state
             db_instance.save()
             db_power_state = vm_power_state
+        self._power_states[db_instance.uuid] = db_power_state
 
         # Note(maoy): Now resolve the discrepancy between vm_state and
         # vm_power_state. We go through all possible vm_states.
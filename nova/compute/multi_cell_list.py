@@ -13,6 +13,7 @@
 import abc
 import copy
 import heapq
+import itertools
 
 import eventlet
 from oslo_log import log as logging
@@ -124,13 +125,17 @@ class CrossCellLister(metaclass=abc.ABCMeta):
 
     """
 
-    def __init__(self, sort_ctx, cells=None, batch_size=None):
+    def __init__(self, sort_ctx, cells=None, batch_size=None,
+                 adaptive=False):
         self.sort_ctx = sort_ctx
         self.cells = cells
         self.batch_size = batch_size
+        self.adaptive = adaptive
         self._cells_responded = set()
         self._cells_failed = set()
         self._cells_timed_out = set()
+        self._cell_stats = {}
+        self._returned = 0
 
     @property
     def cells_responded(self):
@@ -153,6 +158,53 @@ class CrossCellLister(metaclass=abc.ABCMeta):
         """
         return list(self._cells_timed_out)
 
+    @property
+    def cell_stats(self):
+        """A dict, keyed by cell uuid, of the statistics of the last listing.
+
+        For each cell, this tells the number of records 'fetched' from its
+        database, the number of them 'used' in the results, and the number of
+        'batches' they were queried in.
+        """
+        return copy.deepcopy(self._cell_stats)
+
+    def _get_cell_stats(self, cell_uuid):
+        return self._cell_stats.setdefault(
+            cell_uuid, {'fetched': 0, 'used': 0, 'batches': 0})
+
+    def _log_cell_stats(self):
+        fetched = sum(stats['fetched'] for stats in self._cell_stats.values())
+        used = sum(stats['used'] for stats in self._cell_stats.values())
+        batches = sum(stats['batches'] for stats in self._cell_stats.values())
+        LOG.debug('Used %(used)i of the %(fetched)i records fetched from '
+                  '%(cells)i cells in %(batches)i batches',
+                  {'used': used, 'fetched': fetched,
+                   'cells': len(self._cell_stats), 'batches': batches})
+
+    def _get_query_size(self, last_size, limit):
+        """Get the size of the next batch to query from a cell.
+
+        :param last_size: The size of the last batch queried from the cell,
+                          or None if this is its first batch
+        :param limit: The overall limit of the listing, or None
+        :returns: The size of the batch, or None for no limit
+        """
+        if self.batch_size is None:
+            # No batching, ask for the entire $limit in a single batch
+            size = limit
+        elif self.adaptive and last_size:
+            # The cell is being consumed faster than the others, so double
+            # its batches to catch up with fewer queries
+            size = last_size * 2
+        else:
+            size = self.batch_size
+        if limit is not None:
+            # A cell never has to return more than what is left to return
+            # overall
+            remaining = limit - self._returned
+            size = remaining if size is None else min(size, remaining)
+        return size
+
     @property
     @abc.abstractmethod
     def marker_identifier(self):
@@ -230,10 +282,13 @@ class CrossCellLister(metaclass=abc.ABCMeta):
         This function is a generator of records from the database like what you
         would get from instance_get_all_by_filters_sort() in the DB API.
 
-        NOTE: Since we do these in parallel, a nonzero limit will be passed
-        to each database query, although the limit will be enforced in the
-        output of this function. Meaning, we will still query $limit from each
-        database, but only return $limit total results.
+        NOTE: The first batch of every cell is queried in parallel, before
+        any result is generated, so a nonzero limit (or the batch size) will
+        be passed to each database query. The next batches of a cell are only
+        queried once all the records of its previous batch were generated or
+        passed over, and never ask for more than what is left to generate
+        overall. The number of records fetched from and used of each cell are
+        then available from cell_stats.
 
         :param cell_down_support: True if the API (and caller) support
                                   returning a minimal instance
@@ -259,14 +314,45 @@ class CrossCellLister(metaclass=abc.ABCMeta):
             global_marker_values = [global_marker_record[key]
                                     for key in self.sort_ctx.sort_keys]
 
-        def do_query(cctx):
-            """Generate RecordWrapper(record) objects from a cell.
+        marker_id = self.marker_identifier
+
+        def query_batch(cctx, cursor):
+            """Query the next batch of records of a cell.
 
-            We do this inside the thread (created by
-            scatter_gather_all_cells()) so that we return wrappers and
-            avoid having to iterate the combined result list in the
-            caller again. This is run against each cell by the
-            scatter_gather routine.
+            The cursor tracks the local marker of the cell, the size of its
+            last batch and whether it may have more records. It is marked as
+            done up front, so that no further batch is queried after a
+            failure of this one.
+            """
+            cursor['done'] = True
+            size = self._get_query_size(cursor['size'], limit)
+            stats = self._get_cell_stats(cctx.cell_uuid)
+            records = []
+            for item in self.get_by_filters(
+                    cctx, filters, limit=size, marker=cursor['marker'],
+                    **kwargs):
+                cursor['marker'] = item[marker_id]
+                records.append(RecordWrapper(cctx, self.sort_ctx, item))
+            stats['batches'] += 1
+            stats['fetched'] += len(records)
+            cursor['size'] = size
+            # No results means we are done for this cell, and so does an
+            # unlimited query
+            cursor['done'] = size is None or not records
+            LOG.debug(('Listed batch of %(batch)i results from cell '
+                       '%(cell)s out of %(limit)s limit. Fetched %(total)i '
+                       'total so far.'),
+                      {'batch': len(records),
+                       'cell': cctx.cell_uuid,
+                       'total': stats['fetched'],
+                       'limit': limit or 'no'})
+            return records
+
+        def query_first_batch(cctx, cursor):
+            """Query the first batch of records of a cell.
+
+            This finds the local marker of the cell, prefixing the results
+            with it as needed, before querying the first batch.
             """
 
             # The local marker is an identifier of a record in a cell
@@ -282,8 +368,6 @@ class CrossCellLister(metaclass=abc.ABCMeta):
             # that had the actual marker record.
             local_marker_prefix = []
 
-            marker_id = self.marker_identifier
-
             if marker:
                 if cctx.cell_uuid == global_marker_cell:
                     local_marker = marker
@@ -312,85 +396,79 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                             # here and not include it in the output as
                             # expected.
                             local_marker_filters[marker_id] = [local_marker]
-                        local_marker_prefix = self.get_by_filters(
-                            cctx, local_marker_filters, limit=1, marker=None,
-                            **kwargs)
+                        local_marker_prefix = [
+                            RecordWrapper(cctx, self.sort_ctx, item)
+                            for item in self.get_by_filters(
+                                cctx, local_marker_filters, limit=1,
+                                marker=None, **kwargs)]
+                        self._get_cell_stats(cctx.cell_uuid)['fetched'] += (
+                            len(local_marker_prefix))
                 else:
                     # There was a global marker but everything in our
                     # cell is _before_ that marker, so we return
                     # nothing. If we didn't have this clause, we'd
                     # pass marker=None to the query below and return a
                     # full unpaginated set for our cell.
-                    return
-
-            if local_marker_prefix:
-                # Per above, if we had a matching marker object, that is
-                # the first result we should generate.
-                yield RecordWrapper(cctx, self.sort_ctx,
-                                    local_marker_prefix[0])
-
-            # If a batch size was provided, use that as the limit per
-            # batch. If not, then ask for the entire $limit in a single
-            # batch.
-            batch_size = self.batch_size or limit
-
-            # Keep track of how many we have returned in all batches
-            return_count = 0
-
-            # If limit was unlimited then keep querying batches until
-            # we run out of results. Otherwise, query until the total count
-            # we have returned exceeds the limit.
-            while limit is None or return_count < limit:
-                batch_count = 0
-
-                # Do not query a full batch if it would cause our total
-                # to exceed the limit
-                if limit:
-                    query_size = min(batch_size, limit - return_count)
-                else:
-                    query_size = batch_size
-
-                # Get one batch
-                query_result = self.get_by_filters(
-                    cctx, filters,
-                    limit=query_size or None, marker=local_marker,
-                    **kwargs)
-
-                # Yield wrapped results from the batch, counting as we go
-                # (to avoid traversing the list to count). Also, update our
-                # local_marker each time so that local_marker is the end of
-                # this batch in order to find the next batch.
-                for item in query_result:
-                    local_marker = item[self.marker_identifier]
-                    yield RecordWrapper(cctx, self.sort_ctx, item)
-                    batch_count += 1
-
-                # No results means we are done for this cell
-                if not batch_count:
-                    break
-
-                return_count += batch_count
-                LOG.debug(('Listed batch of %(batch)i results from cell '
-                           'out of %(limit)s limit. Returned %(total)i '
-                           'total so far.'),
-                          {'batch': batch_count,
-                           'total': return_count,
-                           'limit': limit or 'no'})
-
-        # NOTE(danms): The calls to do_query() will return immediately
-        # with a generator. There is no point in us checking the
-        # results for failure or timeout since we have not actually
-        # run any code in do_query() until the first iteration
-        # below. The query_wrapper() utility handles inline
-        # translation of failures and timeouts to sentinels which will
-        # be generated and consumed just like any normal result below.
+                    return []
+
+            cursor['marker'] = local_marker
+            # Per above, if we had a matching marker object, that is
+            # the first result we should generate.
+            return local_marker_prefix + query_batch(cctx, cursor)
+
+        def query_next_batches(cctx, cursor):
+            """Generate RecordWrapper(record) objects of the next batches.
+
+            A batch is only queried once the records of the previous one
+            were all consumed by the merge below, at which point the cell
+            cannot return more than what is left to return overall.
+            """
+            while not cursor['done']:
+                # NOTE: The whole batch is queried at once, so that the
+                # timeout of query_wrapper() is started and cancelled by the
+                # caller rather than by the thread of scatter_gather_cells()
+                for item in list(query_wrapper(cctx, query_batch, cursor)):
+                    yield item
+
+        def do_query(cctx):
+            """Query the first batch of records of a cell.
+
+            This is run against each cell by the scatter_gather routine,
+            so that the first batches of all the cells are queried in
+            parallel. It returns an iterator of the RecordWrapper(record)
+            objects of the cell, which queries the next batches of the cell
+            as they are needed by the merge below.
+            """
+            cursor = {'marker': None, 'size': None, 'done': True}
+            first_batch = list(
+                query_wrapper(cctx, query_first_batch, cursor))
+            return itertools.chain(
+                first_batch, query_next_batches(cctx, cursor))
+
+        self._returned = 0
+        self._cell_stats = {}
+
+        # NOTE(danms): The failures and timeouts of the queries are turned
+        # into sentinels by the query_wrapper() utility, which will be
+        # generated and consumed just like any normal result below.
         if self.cells:
-            results = context.scatter_gather_cells(ctx, self.cells,
-                                                   context.CELL_TIMEOUT,
-                                                   query_wrapper, do_query)
+            cells = self.cells
         else:
-            results = context.scatter_gather_all_cells(ctx,
-                                                       query_wrapper, do_query)
+            context.load_cells()
+            cells = context.CELLS
+        results = context.scatter_gather_cells(ctx, cells,
+                                               context.CELL_TIMEOUT,
+                                               do_query)
+        # The cells which did not return their first batch in time only have
+        # a sentinel to generate
+        cells_by_uuid = {cell.uuid: cell for cell in cells}
+        feeders = []
+        for cell_uuid, result in results.items():
+            if context.is_cell_failure_sentinel(result):
+                with context.target_cell(
+                        ctx, cells_by_uuid[cell_uuid]) as cctx:
+                    result = [RecordWrapper(cctx, None, result)]
+            feeders.append(result)
 
         # If a limit was provided, it was passed to the per-cell query
         # routines.  That means we have NUM_CELLS * limit items across
@@ -403,11 +481,12 @@ class CrossCellLister(metaclass=abc.ABCMeta):
         # Generate results from heapq so we can return the inner
         # instance instead of the wrapper. This is basically free
         # as it works as our caller iterates the results.
-        feeder = heapq.merge(*results.values())
+        feeder = heapq.merge(*feeders)
         while True:
             try:
                 item = next(feeder)
             except StopIteration:
+                self._log_cell_stats()
                 return
 
             if context.is_cell_failure_sentinel(item._db_record):
@@ -440,8 +519,11 @@ class CrossCellLister(metaclass=abc.ABCMeta):
 
             yield item._db_record
             self._cells_responded.add(item.cell_uuid)
+            self._get_cell_stats(item.cell_uuid)['used'] += 1
+            self._returned += 1
             total_limit -= 1
             if total_limit == 0:
                 # We'll only hit this if limit was nonzero and we just
                 # generated our last one
+                self._log_cell_stats()
                 return
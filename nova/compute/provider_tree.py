@@ -91,6 +91,16 @@ class _Provider(object):
             self.uuid, self.name, self.generation, self.parent_uuid,
             inventory, traits, aggregates, resources)
 
+    def content_key(self):
+        """Returns a hashable key of the inventory, traits and aggregates of
+        the provider, which are the data flushed to placement.
+        """
+        inventory = tuple(sorted(
+            (rc, tuple(sorted(record.items())))
+            for rc, record in self.inventory.items()))
+        return (inventory, frozenset(self.traits),
+                frozenset(self.aggregates))
+
     def get_provider_uuids(self):
         """Returns a list, in top-down traversal order, of UUIDs of this
         provider and all its descendants.
@@ -100,22 +110,6 @@ class _Provider(object):
             ret.extend(child.get_provider_uuids())
         return ret
 
-    def find(self, search):
-        if self.name == search or self.uuid == search:
-            return self
-        if search in self.children:
-            return self.children[search]
-        if self.children:
-            for child in self.children.values():
-                # We already searched for the child by UUID above, so here we
-                # just check for a child name match
-                if child.name == search:
-                    return child
-                subchild = child.find(search)
-                if subchild:
-                    return subchild
-        return None
-
     def add_child(self, provider):
         self.children[provider.uuid] = provider
 
@@ -252,6 +246,15 @@ class ProviderTree(object):
         self.lock = lockutils.internal_lock(_LOCK_NAME)
         self.roots_by_uuid = {}
         self.roots_by_name = {}
+        # Indexes of all the providers, roots and descendants. Nothing
+        # prevents two providers from having the same name, so the providers
+        # are listed by name, the first one being the one found by name.
+        self.providers_by_uuid = {}
+        self.providers_by_name = collections.defaultdict(list)
+        # The results of get_provider_uuids, keyed by the UUID of the root of
+        # the (sub)tree or None for the whole tree. This is reset whenever a
+        # provider is added or removed.
+        self._provider_uuids = {}
 
     @property
     def roots(self):
@@ -266,16 +269,39 @@ class ProviderTree(object):
                              specified, the method returns all UUIDs in the
                              ProviderTree.
         """
-        if name_or_uuid is not None:
-            with self.lock:
-                return self._find_with_lock(name_or_uuid).get_provider_uuids()
-
-        # If no name_or_uuid, get UUIDs for all providers recursively.
-        ret = []
         with self.lock:
-            for root in self.roots:
-                ret.extend(root.get_provider_uuids())
-        return ret
+            if name_or_uuid is not None:
+                return self._get_provider_uuids_with_lock(
+                    self._find_with_lock(name_or_uuid))
+
+            # If no name_or_uuid, get UUIDs for all providers.
+            ret = self._provider_uuids.get(None)
+            if ret is None:
+                ret = []
+                for root in self.roots:
+                    ret.extend(self._get_provider_uuids_with_lock(root))
+                self._provider_uuids[None] = ret
+            return list(ret)
+
+    def _get_provider_uuids_with_lock(self, provider):
+        ret = self._provider_uuids.get(provider.uuid)
+        if ret is None:
+            ret = provider.get_provider_uuids()
+            self._provider_uuids[provider.uuid] = ret
+        # The callers may modify the list
+        return list(ret)
+
+    def content_keys(self):
+        """Return a dict, keyed by provider UUID, of the content keys of all
+        providers.
+
+        Two providers with the same content key have the same inventory,
+        traits and aggregates, so comparing the keys of two trees tells which
+        providers differ in a single pass.
+        """
+        with self.lock:
+            return {uuid: provider.content_key()
+                    for uuid, provider in self.providers_by_uuid.items()}
 
     def get_provider_uuids_in_tree(self, name_or_uuid):
         """Returns a list, in top-down traversable order, of the UUIDs of all
@@ -286,8 +312,8 @@ class ProviderTree(object):
                              whole tree for which to return UUIDs.
         """
         with self.lock:
-            return self._find_with_lock(
-                name_or_uuid, return_root=True).get_provider_uuids()
+            return self._get_provider_uuids_with_lock(
+                self._find_with_lock(name_or_uuid, return_root=True))
 
     def populate_from_iterable(self, provider_dicts):
         """Populates this ProviderTree from an iterable of provider dicts.
@@ -319,10 +345,7 @@ class ProviderTree(object):
             # (the provider is a root), or be in the tree already, or exist as
             # a key in to_add_by_uuid (we're adding it).
             all_parents = set([None]) | set(to_add_by_uuid)
-            # NOTE(efried): Can't use get_provider_uuids directly because we're
-            # already under lock.
-            for root in self.roots:
-                all_parents |= set(root.get_provider_uuids())
+            all_parents |= set(self.providers_by_uuid)
             missing_parents = set()
             for pd in to_add_by_uuid.values():
                 parent_uuid = pd.get('parent_provider_uuid')
@@ -365,16 +388,35 @@ class ProviderTree(object):
                     pass
 
                 provider = _Provider.from_dict(pd)
-                if parent_uuid is None:
-                    self.roots_by_uuid[provider.uuid] = provider
-                    self.roots_by_name[provider.name] = provider
-                else:
+                parent = None
+                if parent_uuid is not None:
                     parent = self._find_with_lock(parent_uuid)
-                    parent.add_child(provider)
+                self._add_with_lock(provider, parent)
 
                 # Remove this entry to signify we're done with it.
                 to_add_by_uuid.pop(uuid)
 
+    def _add_with_lock(self, provider, parent=None):
+        """Add a provider to the tree, as a root if it has no parent."""
+        if parent is None:
+            self.roots_by_uuid[provider.uuid] = provider
+            self.roots_by_name[provider.name] = provider
+        else:
+            parent.add_child(provider)
+        self.providers_by_uuid[provider.uuid] = provider
+        self.providers_by_name[provider.name].append(provider)
+        self._provider_uuids.clear()
+
+    def _unindex_with_lock(self, provider):
+        """Remove a provider and its descendants from the indexes."""
+        for child in provider.children.values():
+            self._unindex_with_lock(child)
+        del self.providers_by_uuid[provider.uuid]
+        named = self.providers_by_name[provider.name]
+        named.remove(provider)
+        if not named:
+            del self.providers_by_name[provider.name]
+
     def _remove_with_lock(self, name_or_uuid):
         found = self._find_with_lock(name_or_uuid)
         if found.parent_uuid:
@@ -383,6 +425,8 @@ class ProviderTree(object):
         else:
             del self.roots_by_uuid[found.uuid]
             del self.roots_by_name[found.name]
+        self._unindex_with_lock(found)
+        self._provider_uuids.clear()
 
     def remove(self, name_or_uuid):
         """Safely removes the provider identified by the supplied name_or_uuid
@@ -418,26 +462,25 @@ class ProviderTree(object):
                 raise ValueError(err % uuid)
 
             p = _Provider(name, uuid=uuid, generation=generation)
-            self.roots_by_uuid[uuid] = p
-            self.roots_by_name[name] = p
+            self._add_with_lock(p)
             return p.uuid
 
     def _find_with_lock(self, name_or_uuid, return_root=False):
-        # Optimization for large number of roots (e.g. ironic): if name_or_uuid
-        # represents a root, this is O(1).
-        found = self.roots_by_uuid.get(name_or_uuid)
-        if found:
-            return found
-        found = self.roots_by_name.get(name_or_uuid)
-        if found:
-            return found
-
-        # Okay, it's a child; do it the hard way.
-        for root in self.roots:
-            found = root.find(name_or_uuid)
-            if found:
-                return root if return_root else found
-        raise ValueError(_("No such provider %s") % name_or_uuid)
+        # Optimization for large number of providers (e.g. ironic, or many
+        # nested providers per compute node): this is O(1), other than
+        # walking up to the root if return_root is set.
+        found = (self.providers_by_uuid.get(name_or_uuid) or
+                 self.roots_by_name.get(name_or_uuid))
+        if not found:
+            named = self.providers_by_name.get(name_or_uuid)
+            if not named:
+                raise ValueError(_("No such provider %s") % name_or_uuid)
+            found = named[0]
+
+        if return_root:
+            while found.parent_uuid:
+                found = self.providers_by_uuid[found.parent_uuid]
+        return found
 
     def data(self, name_or_uuid):
         """Return a point-in-time copy of the specified provider's data.
@@ -487,7 +530,7 @@ class ProviderTree(object):
 
             parent_node = self._find_with_lock(parent)
             p = _Provider(name, uuid, generation, parent_node.uuid)
-            parent_node.add_child(p)
+            self._add_with_lock(p, parent_node)
             return p.uuid
 
     def has_inventory(self, name_or_uuid):
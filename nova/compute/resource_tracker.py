@@ -20,6 +20,8 @@ model.
 """
 import collections
 import copy
+import math
+import time
 
 from keystoneauth1 import exceptions as ks_exc
 import os_traits
@@ -57,6 +59,15 @@ CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
+# The fields of the ComputeNode accounting for the usage of its instances and
+# migrations, which are kept between the audits of the usage. The usage of
+# the NUMA cells is also kept, but not the rest of the NUMA topology.
+_USAGE_FIELDS = ('memory_mb_used', 'local_gb_used', 'vcpus_used',
+                 'running_vms', 'current_workload')
+# The usage fields compared with their audited values
+_AUDITED_USAGE_FIELDS = ('memory_mb_used', 'local_gb_used', 'vcpus_used',
+                         'running_vms')
+
 
 def _instance_in_resize_state(instance):
     """Returns True if the instance is in one of the resizing states.
@@ -125,6 +136,9 @@ class ResourceTracker(object):
         # are not found on the provider tree. These are tracked to facilitate
         # smarter logging.
         self.absent_providers = set()
+        # The time of the last audit of the usage of each node, keyed by
+        # nodename, when [DEFAULT]/resource_usage_audit_interval is set
+        self.usage_audited_at = {}
 
     def set_service_ref(self, service_ref):
         # NOTE(danms): Neither of these should ever happen, but sanity check
@@ -888,6 +902,19 @@ class ResourceTracker(object):
         self.stats.pop(nodename, None)
         self.compute_nodes.pop(nodename, None)
         self.old_resources.pop(nodename, None)
+        self.usage_audited_at.pop(nodename, None)
+
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    def invalidate_usage(self, nodename):
+        """Have the usage of a node audited by its next update.
+
+        The usage of a node is tracked incrementally between its audits when
+        [DEFAULT]/resource_usage_audit_interval is set, which only accounts
+        for the changes made through this tracker. This is called when
+        instances are moved to or from the node without it, like at the end
+        of a live migration or by the cleanup of the evacuated instances.
+        """
+        self.usage_audited_at.pop(nodename, None)
 
     def _get_host_metrics(self, context, nodename):
         """Get the metrics from monitors and
@@ -1000,20 +1027,133 @@ class ResourceTracker(object):
                 # the instance had other pending changes
                 instance.save()
 
+    def _needs_usage_audit(self, nodename, startup):
+        """Check if the usage of a node has to be recomputed from scratch.
+
+        :returns: True if the usage is not tracked incrementally, or if it was
+            not audited yet or for longer than
+            [DEFAULT]/resource_usage_audit_interval.
+        """
+        interval = CONF.resource_usage_audit_interval
+        if not interval or startup:
+            return True
+        audited_at = self.usage_audited_at.get(nodename)
+        return audited_at is None or time.monotonic() - audited_at >= interval
+
+    def _get_tracked_usage(self, nodename):
+        """Get a copy of the usage tracked for a node since its last audit.
+
+        :returns: A dict of the usage fields of the ComputeNode and of the
+            Stats of the node, or None if its usage is not tracked.
+        """
+        if nodename not in self.usage_audited_at:
+            return None
+        cn = self.compute_nodes[nodename]
+        usage = {field: getattr(cn, field)
+                 for field in _USAGE_FIELDS if cn.obj_attr_is_set(field)}
+        usage['stats'] = copy.deepcopy(self.stats[nodename])
+        if cn.obj_attr_is_set('numa_topology'):
+            usage['numa_topology'] = cn.numa_topology
+        return usage
+
+    def _restore_tracked_usage(self, nodename, usage, resources):
+        """Restore the usage of a node once the hypervisor view is copied.
+
+        The stats reported by the hypervisor are merged into the stats of the
+        instances.
+        """
+        cn = self.compute_nodes[nodename]
+        stats = usage['stats']
+        stats.digest_stats(resources.get('stats'))
+        self.stats[nodename] = stats
+        cn.stats = stats
+        for field in _USAGE_FIELDS:
+            if field in usage:
+                setattr(cn, field, usage[field])
+        cn.free_ram_mb = cn.memory_mb - cn.memory_mb_used
+        cn.free_disk_gb = cn.local_gb - cn.local_gb_used
+        if cn.numa_topology and usage.get('numa_topology'):
+            cn.numa_topology = self._restore_numa_usage(
+                cn.numa_topology, usage['numa_topology'])
+
+    @staticmethod
+    def _restore_numa_usage(numa_topology, tracked_numa_topology):
+        """Copy the tracked usage of the NUMA cells onto a NUMA topology.
+
+        Only the usage is copied, so that the CPUs and the memory pages
+        reported by the hypervisor are kept.
+
+        :param numa_topology: The NUMA topology reported by the hypervisor,
+            as a JSON string.
+        :param tracked_numa_topology: The NUMA topology tracked since the
+            last audit, as a JSON string.
+        :returns: The NUMA topology with the tracked usage, as a JSON string.
+        """
+        host_topology = objects.NUMATopology.obj_from_db_obj(numa_topology)
+        tracked_cells = {
+            cell.id: cell for cell in objects.NUMATopology.obj_from_db_obj(
+                tracked_numa_topology).cells}
+        for cell in host_topology.cells:
+            tracked_cell = tracked_cells.get(cell.id)
+            if tracked_cell is None:
+                continue
+            cell.cpu_usage = tracked_cell.cpu_usage
+            cell.memory_usage = tracked_cell.memory_usage
+            cell.pinned_cpus = tracked_cell.pinned_cpus
+            used_pages = {pages.size_kb: pages.used
+                          for pages in tracked_cell.mempages}
+            for pages in cell.mempages:
+                pages.used = used_pages.get(pages.size_kb, 0)
+        return host_topology._to_json()
+
+    def _report_usage_drift(self, nodename, usage):
+        """Log the differences between the tracked and the audited usage."""
+        cn = self.compute_nodes[nodename]
+        drift = []
+        for field in _AUDITED_USAGE_FIELDS:
+            tracked = usage.get(field)
+            audited = getattr(cn, field)
+            if tracked is None or not math.isclose(
+                    tracked, audited, abs_tol=1e-6):
+                drift.append('%s=%s (tracked %s)' % (field, audited, tracked))
+        if drift:
+            LOG.warning('The resource usage tracked for %(host)s (node: '
+                        '%(node)s) drifted from its audit: %(drift)s',
+                        {'host': self.host, 'node': nodename,
+                         'drift': ', '.join(drift)})
+
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def _update_available_resource(self, context, resources, startup=False):
+        nodename = resources['hypervisor_hostname']
+
+        # Keep the usage tracked since the last audit, as the resources
+        # reported by the hypervisor are copied over it below
+        audit = self._needs_usage_audit(nodename, startup)
+        usage = self._get_tracked_usage(nodename)
 
         # initialize the compute node object, creating it
         # if it does not already exist.
         is_new_compute_node = self._init_compute_node(context, resources)
 
-        nodename = resources['hypervisor_hostname']
-
         # if we could not init the compute node the tracker will be
         # disabled and we should quit now
         if self.disabled(nodename):
             return
 
+        if not audit and usage is not None:
+            # The usage is kept up to date by the claims, the drops and the
+            # instance updates of this tracker, so only the hypervisor view is
+            # refreshed until the next audit
+            self._restore_tracked_usage(nodename, usage, resources)
+            self._report_final_resource_view(nodename)
+            cn = self.compute_nodes[nodename]
+            cn.metrics = jsonutils.dumps(
+                self._get_host_metrics(context, nodename))
+            self._update(context, cn, startup=startup)
+            LOG.debug('Compute_service record updated for %(host)s:%(node)s',
+                      {'host': self.host, 'node': nodename})
+            return
+
         # Grab all instances assigned to this node:
         instances = objects.InstanceList.get_by_host_and_node(
             context, self.host, nodename,
@@ -1092,6 +1232,11 @@ class ResourceTracker(object):
         # Update assigned resources to self.assigned_resources
         self._populate_assigned_resources(context, instance_by_uuid)
 
+        if CONF.resource_usage_audit_interval:
+            if usage is not None:
+                self._report_usage_drift(nodename, usage)
+            self.usage_audited_at[nodename] = time.monotonic()
+
         # update the compute_node
         self._update(context, cn, startup=startup)
         LOG.debug('Compute_service record updated for %(host)s:%(node)s',
@@ -192,6 +192,32 @@ metadata caching is disabled entirely; this is generally not recommended for
 performance reasons. Increasing this setting should improve response times
 of the metadata API when under heavy load. Higher values may increase memory
 usage, and result in longer times for host metadata changes to take effect.
+"""),
+    cfg.IntOpt("metadata_local_cache_size",
+        default=1000,
+        min=0,
+        help="""
+The maximum number of instances whose metadata is cached in the memory of
+each metadata API process.
+
+This local cache is kept in front of the cache configured in the ``[cache]``
+section, and also keeps the responses rendered for each metadata path. The
+metadata built by a process is kept for the same time as in the shared cache,
+while the metadata found in the shared cache is only kept for a fifth of that
+time. Instances fetch dozens of metadata paths in a burst when they
+boot, and they are then served without going to the shared cache, or to the
+database and the networking service on a miss. Concurrent requests for the
+metadata of an instance which is not cached only build it once.
+
+Possible values:
+
+* 0: Disables the local cache.
+* Any positive integer: The maximum number of instances to cache.
+
+Related options:
+
+* ``metadata_cache_expiration``: The local cache is disabled as well if it is
+  0.
 """),
     cfg.BoolOpt("local_metadata_per_cell",
                 default=False,
@@ -307,6 +333,13 @@ small subset of those cells, this should be True.
              "at all, setting the fixed size equal to the ``max_limit`` "
              "value will cause only one request per cell database to be "
              "issued."),
+            ("adaptive", "Start with the same batch size as the "
+             "``distributed`` strategy, without its lower threshold, and "
+             "double the batch size of a cell every time all the records of "
+             "its previous batch were consumed. This fetches little more "
+             "than what is returned when the records are spread across the "
+             "cells, and few batches when they mostly come from a few "
+             "cells."),
         ],
         help="""
 This controls the method by which the API queries cell databases in
@@ -317,8 +350,11 @@ re-request that same batch size as records are consumed (returned)
 from each cell as necessary. Larger batches mean less chattiness
 between the API and the database, but potentially more wasted effort
 processing the results from the database which will not be returned to
-the user. Any strategy will yield a batch size of at least 100 records,
-to avoid a user causing many tiny database queries in their request.
+the user. The ``distributed`` and ``fixed`` strategies will yield a batch
+size of at least 100 records, to avoid a user causing many tiny database
+queries in their request, while the ``adaptive`` one grows the batches of
+the cells which need more. Whatever the strategy, the batches following the
+first one never ask a cell for more records than what is left to return.
 
 Related options:
 
@@ -67,6 +67,27 @@ entry.
         help='''
 The total number of coroutines that can be run via nova's default
 greenthread pool concurrently, defaults to 1000, min value is 100.
+'''),
+    cfg.IntOpt(
+        'instance_extra_cache_size',
+        default=0,
+        min=0,
+        help='''
+Maximum number of deserialized instance_extra JSON blobs cached per process.
+
+The flavors, NUMA topologies and CPU models of the instances are stored as
+JSON blobs in the database, which are deserialized every time an instance is
+loaded. Many instances share the same blobs, as they use the same flavors, and
+the periodic tasks of the services load the same instances again and again, so
+when this option is set, the deserialized objects are cached by the content of
+their blob and copied for every instance using them, which is much cheaper.
+The least recently used objects are dropped once the cache is full.
+
+Possible values:
+
+* 0: Disable the cache.
+* Any positive integer, in number of blobs. Each blob takes a few kilobytes of
+  memory.
 '''),
 ]
 
@@ -1055,6 +1055,30 @@ Possible values:
 * ``True``: Packing VM's NUMA cell on most used host NUMA cell.
 * ``False``: Spreading VM's NUMA cell on host's NUMA cells with more resources
   available.
+"""),
+    cfg.StrOpt('numa_cell_fitting_strategy',
+        default='permutations',
+        choices=[
+            ('permutations', 'Try every permutation of the host NUMA cells '
+             'until one fits the instance NUMA cells.'),
+            ('pruned', 'Search the permutations of the host NUMA cells '
+             'depth-first, skipping the ones which cannot fit.'),
+        ],
+        help="""
+The algorithm used to fit the NUMA cells of an instance on the NUMA cells of a
+host.
+
+Both strategies choose the same host NUMA cells, following the order set by
+``[compute] packing_host_numa_cells_allocation_strategy``, but the number of
+permutations of the host NUMA cells grows quickly with the number of cells.
+The ``pruned`` strategy stops exploring the permutations starting with host
+NUMA cells which cannot fit the first instance NUMA cells, and skips the host
+NUMA cells identical to one which was already tried, which makes fitting
+instances with several NUMA cells on hosts with many NUMA cells much faster.
+
+Related options:
+
+* ``[compute] packing_host_numa_cells_allocation_strategy``
 """),
 ]
 
@@ -1083,6 +1107,36 @@ Related options:
   false and this option is negative, then instances that get out
   of sync between the hypervisor and the Nova database will have
   to be synchronized manually.
+"""),
+    cfg.IntOpt('sync_power_state_full_interval',
+        default=0,
+        min=0,
+        help="""
+Interval for fully synchronizing the power states of the instances.
+
+By default, the power state sync periodic task loads all the instances of the
+host from the database and queries the hypervisor for the power state of each
+of them, every time it runs. Setting this option to a positive value makes the
+periodic task get the power states of all the instances from the hypervisor at
+once, and only synchronize the instances whose power state differs from the
+one last recorded in the database, as kept up to date by the syncs and the
+lifecycle events of the hypervisor. All the instances are then synchronized on
+startup and at most once per this interval. The libvirt and ironic drivers
+report the power states of all of their instances with a single request, the
+other drivers still query each instance in turn.
+
+Possible values:
+
+* 0: All the instances are synchronized every time the periodic task runs.
+* Any positive integer in seconds.
+
+Related options:
+
+* ``sync_power_state_interval``: The instances are fully synchronized on the
+  first run of the periodic task after this interval elapsed.
+* ``handle_virt_lifecycle_events`` in the ``workarounds`` group: The lifecycle
+  events keep the recorded power states up to date between the runs of the
+  periodic task.
 """),
     cfg.IntOpt('heal_instance_info_cache_interval',
         default=-1,
@@ -1285,6 +1339,31 @@ Possible values:
 * 0: Will run at the default periodic interval.
 * Any value < 0: Disables the option.
 * Any positive integer in seconds.
+"""),
+    cfg.IntOpt('resource_usage_audit_interval',
+        default=0,
+        min=0,
+        help="""
+Interval for auditing the resource usage of the compute nodes.
+
+By default, the update_available_resource periodic task recomputes the
+resource usage of each compute node from all of its instances and in-progress
+migrations, every time it runs, while holding the lock serializing the
+resource claims of the host. Setting this option to a positive value makes
+the periodic task only refresh the resources reported by the hypervisor, and
+keep the usage totals maintained as instances are claimed, dropped and change
+state. The usage is then fully recomputed on startup and at most once per
+this interval, and the differences found with the tracked totals are logged.
+
+Possible values:
+
+* 0: The usage is recomputed every time the periodic task runs.
+* Any positive integer in seconds.
+
+Related options:
+
+* ``update_resources_interval``: The usage is audited on the first run of the
+  periodic task after this interval elapsed.
 """)
 ]
 
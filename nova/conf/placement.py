@@ -24,15 +24,54 @@ placement_group = cfg.OptGroup(
     title='Placement Service Options',
     help="Configuration options for connecting to the placement API service")
 
+placement_opts = [
+    cfg.IntOpt('connection_pool_size',
+        default=10,
+        min=1,
+        help="""
+The maximum number of HTTP connections to the placement service kept open for
+reuse.
+
+Connections are kept alive between requests, up to this number of concurrent
+requests. Additional concurrent requests open new connections, which are
+closed once the request completes.
+
+Related options:
+
+* ``[placement] max_concurrent_requests``: this option is raised to match it
+  if it is lower.
+"""),
+    cfg.IntOpt('max_concurrent_requests',
+        default=1,
+        min=1,
+        help="""
+The maximum number of concurrent requests made to the placement service for
+independent calls.
+
+Some operations make many independent calls to placement, for example
+refreshing the inventories, traits and aggregates of every resource provider
+of a compute node or retrieving the allocations of many consumers. When this
+is greater than 1, these calls are made concurrently, which can greatly reduce
+the time needed to start compute services with many nested resource
+providers. By default, all the calls are made sequentially.
+
+Related options:
+
+* ``[placement] connection_pool_size``
+"""),
+]
+
 
 def register_opts(conf):
     conf.register_group(placement_group)
+    conf.register_opts(placement_opts, group=placement_group)
     confutils.register_ksa_opts(conf, placement_group, DEFAULT_SERVICE_TYPE)
 
 
 def list_opts():
     return {
         placement_group.name: (
+            placement_opts +
             ks_loading.get_session_conf_options() +
             ks_loading.get_auth_common_conf_options() +
             ks_loading.get_auth_plugin_conf_options('password') +
@@ -82,6 +82,27 @@ Possible values:
 
 * An integer, where the integer corresponds to the number of placement results
   to return.
+"""),
+    cfg.FloatOpt("allocation_candidates_cache_ttl",
+        default=0.0,
+        min=0.0,
+        help="""
+Time, in seconds, to cache the allocation candidates returned by placement.
+
+By default, the scheduler queries placement for allocation candidates for every
+scheduling request. When this option is set, the candidates are cached by their
+query and reused by the identical requests made within this time, such as the
+requests of a boot storm of instances of the same flavor, or the retries of
+requests that failed with ``NoValidHost``. The candidates are dropped as soon
+as this scheduler claims resources against one of their providers, but not
+when other services change the usage of the providers, so the candidates may
+be stale for up to this time. Claims against stale candidates fail, and the
+instances are rescheduled to their alternate hosts.
+
+Possible values:
+
+* 0: Disable the cache.
+* Any positive number, in seconds. A value of a second or less is recommended.
 """),
     cfg.IntOpt("workers",
         min=0,
@@ -201,6 +222,69 @@ Possible values:
 Related options:
 
 - ``[compute] compute_driver``
+"""),
+    cfg.StrOpt("metrics_sink",
+        default="disabled",
+        choices=[
+            ("disabled", "Do not collect scheduling latency metrics."),
+            ("log", "Periodically log the number and the mean duration of "
+             "the timings of each phase."),
+            ("statsd", "Send each timing to a statsd server."),
+            ("prometheus_textfile", "Periodically write the metrics to a "
+             "file in the Prometheus text format, for example for the "
+             "textfile collector of the node exporter."),
+        ],
+        help="""
+Where to report the latency metrics of the scheduling decisions.
+
+When enabled, the scheduler measures the time spent in each phase of a
+``select_destinations`` request: querying placement for allocation candidates,
+loading the host states, running each filter and each weigher and claiming the
+resources in placement. The timings are aggregated in histograms.
+
+Each request made to placement is also timed, as a
+``placement.<method>.<resource>`` phase, e.g.
+``placement.GET.allocation_candidates``. This is also done by the
+``nova-compute`` service if this option is set in its configuration, which is
+mostly useful with the ``statsd`` sink.
+
+Related options:
+
+* ``[scheduler] metrics_statsd_host``
+* ``[scheduler] metrics_statsd_port``
+* ``[scheduler] metrics_textfile_path``
+* ``[scheduler] metrics_flush_interval``
+"""),
+    cfg.HostAddressOpt("metrics_statsd_host",
+        default="localhost",
+        help="""
+The statsd server to send the scheduling latency metrics to.
+
+This is only used when ``[scheduler] metrics_sink`` is ``statsd``.
+"""),
+    cfg.PortOpt("metrics_statsd_port",
+        default=8125,
+        help="""
+The port of the statsd server to send the scheduling latency metrics to.
+
+This is only used when ``[scheduler] metrics_sink`` is ``statsd``.
+"""),
+    cfg.StrOpt("metrics_textfile_path",
+        help="""
+The file to write the scheduling latency metrics to.
+
+This is only used, and is required, when ``[scheduler] metrics_sink`` is
+``prometheus_textfile``. The file is replaced atomically every
+``[scheduler] metrics_flush_interval`` seconds.
+"""),
+    cfg.IntOpt("metrics_flush_interval",
+        default=60,
+        min=1,
+        help="""
+Interval, in seconds, between writes of the scheduling latency metrics.
+
+This is only used when ``[scheduler] metrics_sink`` is
+``prometheus_textfile``.
 """),
 ]
 
@@ -770,6 +854,174 @@ are typically many baremetal nodes with identical weights returned to the
 scheduler.  In such case enabling this option will reduce contention and
 chances for rescheduling events.  At the same time it will make the instance
 packing (even in unweighed case) less dense.
+"""),
+    cfg.BoolOpt(
+        "columnar_weighing",
+        default=False,
+        help="""
+Enable the columnar weighing mode.
+
+When enabled, the host attributes used by the weighers are packed into numpy
+arrays once per request and the in-tree weighers compute, clamp, normalize
+and multiply their weights as array operations rather than looping over every
+host. Weighers that do not support this mode, including out-of-tree ones, are
+still called for each host. This reduces the weighing cost when a large number
+of hosts is returned by the filters.
+
+This mode requires the ``numpy`` library. If it is not installed, a warning is
+logged and the per-host weighing is used.
+
+Related options:
+
+* ``[filter_scheduler] weight_classes``
+"""),
+    cfg.BoolOpt(
+        "adaptive_filter_ordering",
+        default=False,
+        help="""
+Enable the adaptive filter pipeline.
+
+When enabled, each host goes through all the enabled filters in a single pass,
+stopping at the first filter rejecting it, rather than building the list of
+remaining hosts after each filter. The scheduler also records the rejection
+rate and the per-host cost of each filter and runs the filters that are safe
+to reorder by increasing cost per rejected host, so that cheap and selective
+filters run first and expensive filters like ``NUMATopologyFilter`` or
+``PciPassthroughFilter`` only run on the hosts kept by the other filters.
+
+All the in-tree filters are safe to reorder. Out-of-tree filters are run in
+the configured order unless they set the ``safe_to_reorder`` attribute.
+
+Related options:
+
+* ``[filter_scheduler] enabled_filters``
+"""),
+    cfg.BoolOpt(
+        "host_state_cache",
+        default=False,
+        help="""
+Enable the incremental host state cache.
+
+By default, the scheduler reads all the compute node and service records of
+every cell database and rebuilds the host states for each request. When this
+option is enabled, the host states are kept in memory between requests and
+only the compute node and service records which were created, updated or
+deleted since the previous request are read from the cell databases. The
+resources consumed by previous scheduling decisions are kept in the cached host
+states until the compute node reports its new usage.
+
+The instances of a host are refreshed from the updates sent by the compute
+services when ``[filter_scheduler] track_instance_changes`` is enabled, and
+otherwise only when the compute node record of the host changes.
+
+Related options:
+
+* ``[filter_scheduler] host_state_cache_full_sync_interval``
+* ``[filter_scheduler] track_instance_changes``
+"""),
+    cfg.IntOpt(
+        "host_state_cache_full_sync_interval",
+        default=300,
+        min=0,
+        help="""
+Interval, in seconds, between full reloads of the host state cache.
+
+The host state cache finds the changed records using their timestamps, so
+records written with a timestamp older than the newest one seen, for example
+because of clock skew between the services writing to the cell database, are
+only picked up by a full reload of the cache. The cache is also fully reloaded
+when the scheduler receives a ``SIGHUP`` signal.
+
+Possible values:
+
+* 0: Never fully reload the cache, except on ``SIGHUP``.
+* Any positive integer, in seconds.
+
+Related options:
+
+* ``[filter_scheduler] host_state_cache``
+"""),
+    cfg.IntOpt(
+        "batch_scheduling_threshold",
+        default=0,
+        min=0,
+        help="""
+Minimum number of instances in a request for it to be scheduled as a batch.
+
+By default, the scheduler filters and weighs all the hosts again after each
+instance of a multi-create request has been placed. When a request contains at
+least this many instances, the hosts are instead filtered and weighed once, and
+only the weight of the host selected for an instance is updated before placing
+the next one. The placement allocations of the instances are also created with
+a single API call per ``batch_claim_size`` instances. This greatly reduces the
+cost of scheduling large multi-create requests.
+
+Possible values:
+
+* 0: Disable batch scheduling.
+* Any positive integer. Requests for a single instance are never scheduled as
+  a batch.
+
+Related options:
+
+* ``[filter_scheduler] batch_claim_size``
+"""),
+    cfg.IntOpt(
+        "batch_claim_size",
+        default=50,
+        min=1,
+        help="""
+Maximum number of instances whose allocations are claimed at once.
+
+When a request is scheduled as a batch, the allocations of the instances are
+created in placement with one ``POST /allocations`` call for up to this many
+instances. If the call fails, the scheduler falls back to claiming the
+allocations of each instance separately.
+
+Related options:
+
+* ``[filter_scheduler] batch_scheduling_threshold``
+"""),
+    cfg.IntOpt(
+        "host_state_cell_timeout",
+        default=60,
+        min=1,
+        help="""
+Timeout, in seconds, for each cell when loading the state of the hosts.
+
+The compute nodes, services and, when needed, instances of the hosts are loaded
+from all the cell databases concurrently. The hosts of a cell that does not
+respond within this time are left out of the request, which is scheduled with
+the hosts of the other cells.
+
+Possible values:
+
+* Any positive integer, in seconds.
+"""),
+    cfg.IntOpt(
+        "numa_fit_cache_size",
+        default=0,
+        min=0,
+        help="""
+Maximum number of NUMA fitting results cached by the scheduler.
+
+Fitting the NUMA topology of an instance onto the NUMA topology of a host, as
+done by the ``NUMATopologyFilter`` for every host, is expensive, especially for
+instances with dedicated CPUs. The hosts of a homogeneous fleet often have the
+same NUMA topology and usage, so when this option is set, the fitting results
+are cached by their inputs and computed once for all the equivalent hosts,
+within a request and across requests. The least recently used results are
+dropped once the cache is full.
+
+Possible values:
+
+* 0: Disable the cache.
+* Any positive integer, in number of results. Each result takes a few
+  kilobytes of memory.
+
+Related options:
+
+* ``[filter_scheduler] enabled_filters``
 """),
     cfg.StrOpt(
         "image_properties_default_architecture",
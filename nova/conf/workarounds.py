@@ -470,6 +470,17 @@ when downloading from glance. This includes backing-file, data-file, and
 known-features detection *before* passing the image to qemu-img. Generally,
 this inspection should be enabled for maximum safety, but this workaround
 option allows disabling it if there is a compatibility concern.
+"""),
+    cfg.BoolOpt(
+        'disable_compiled_object_serializers',
+        default=False,
+        help="""
+This disables the serializers that nova compiles for each versioned object
+class to build the primitives of the objects sent over RPC, and to find their
+changes. The generic, per-field implementations of ``oslo.versionedobjects``
+are used instead. The compiled serializers build the same primitives, but for
+the order of the changes of the objects, so this should only be needed to rule
+them out when investigating an RPC serialization issue.
 """),
 ]
 
@@ -471,6 +471,27 @@ def service_get_all_by_binary(context, binary, include_disabled=False):
     return query.all()
 
 
+@pick_context_manager_reader
+def service_get_all_by_binary_changed_since(context, binary, since):
+    """Get services for a given binary created, updated or deleted since a
+    given time.
+
+    Includes disabled and deleted services.
+
+    :param context: The security context
+    :param binary: The binary of the services
+    :param since: A naive UTC datetime
+
+    :returns: List of service model objects
+    """
+    return model_query(context, models.Service, read_deleted="yes").\
+        filter_by(binary=binary).\
+        filter(sql.or_(models.Service.created_at >= since,
+                       models.Service.updated_at >= since,
+                       models.Service.deleted_at >= since)).\
+        all()
+
+
 @pick_context_manager_reader
 def service_get_all_computes_by_hv_type(context, hv_type,
                                         include_disabled=False):
@@ -768,6 +789,24 @@ def compute_node_get_all_by_pagination(context, limit=None, marker=None):
     return _compute_node_fetchall(context, limit=limit, marker=marker)
 
 
+@pick_context_manager_reader
+def compute_node_get_all_changed_since(context, since):
+    """Get all compute nodes created, updated or deleted since a given time.
+
+    Includes deleted compute nodes.
+
+    :param context: The security context
+    :param since: A naive UTC datetime
+
+    :returns: List of compute node model objects
+    """
+    return model_query(context, models.ComputeNode, read_deleted="yes").\
+        filter(sql.or_(models.ComputeNode.created_at >= since,
+                       models.ComputeNode.updated_at >= since,
+                       models.ComputeNode.deleted_at >= since)).\
+        all()
+
+
 @pick_context_manager_reader
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     """Get all compute nodes by hypervisor hostname.
@@ -1625,102 +1664,13 @@ def _get_query_nova_resource_by_changes_time(query, filters, model_object):
     return query
 
 
-@require_context
-@pick_context_manager_reader_allow_async
-def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
-                                     columns_to_join=None, sort_keys=None,
-                                     sort_dirs=None):
-    """Get all instances that match all filters sorted by the given keys.
-
-    Deleted instances will be returned by default, unless there's a filter that
-    says otherwise.
-
-    Depending on the name of a filter, matching for that filter is
-    performed using either exact matching or as regular expression
-    matching. Exact matching is applied for the following filters::
+def _instance_filter_query(context, query_prefix, filters):
+    """Apply the filters of instance_get_all_by_filters_sort to a query of
+    the instances table.
 
-    |   ['project_id', 'user_id', 'image_ref',
-    |    'vm_state', 'instance_type_id', 'uuid',
-    |    'metadata', 'host', 'system_metadata', 'locked', 'hidden']
-
-    Hidden instances will *not* be returned by default, unless there's a
-    filter that says otherwise.
-
-    A third type of filter (also using exact matching), filters
-    based on instance metadata tags when supplied under a special
-    key named 'filter'::
-
-    |   filters = {
-    |       'filter': [
-    |           {'name': 'tag-key', 'value': '<metakey>'},
-    |           {'name': 'tag-value', 'value': '<metaval>'},
-    |           {'name': 'tag:<metakey>', 'value': '<metaval>'}
-    |       ]
-    |   }
-
-    Special keys are used to tweak the query further::
-
-    |   'changes-since' - only return instances updated after
-    |   'changes-before' - only return instances updated before
-    |   'deleted' - only return (or exclude) deleted instances
-    |   'soft_deleted' - modify behavior of 'deleted' to either
-    |                    include or exclude instances whose
-    |                    vm_state is SOFT_DELETED.
-
-    A fourth type of filter (also using exact matching), filters
-    based on instance tags (not metadata tags). There are two types
-    of these tags:
-
-    `tags` -- One or more strings that will be used to filter results
-            in an AND expression: T1 AND T2
-
-    `tags-any` -- One or more strings that will be used to filter results in
-            an OR expression: T1 OR T2
-
-    `not-tags` -- One or more strings that will be used to filter results in
-            an NOT AND expression: NOT (T1 AND T2)
-
-    `not-tags-any` -- One or more strings that will be used to filter results
-            in an NOT OR expression: NOT (T1 OR T2)
-
-    Tags should be represented as list::
-
-    |    filters = {
-    |        'tags': [some-tag, some-another-tag],
-    |        'tags-any: [some-any-tag, some-another-any-tag],
-    |        'not-tags: [some-not-tag, some-another-not-tag],
-    |        'not-tags-any: [some-not-any-tag, some-another-not-any-tag]
-    |    }
+    :returns: The filtered query, or None if no instance can match the
+        filters.
     """
-    # NOTE(mriedem): If the limit is 0 there is no point in even going
-    # to the database since nothing is going to be returned anyway.
-    if limit == 0:
-        return []
-
-    sort_keys, sort_dirs = db_utils.process_sort_params(
-        sort_keys, sort_dirs, default_dir='desc')
-
-    if columns_to_join is None:
-        columns_to_join_new = ['info_cache', 'security_groups']
-        manual_joins = ['metadata', 'system_metadata']
-    else:
-        manual_joins, columns_to_join_new = (
-            _manual_join_columns(columns_to_join))
-
-    query_prefix = context.session.query(models.Instance)
-    for column in columns_to_join_new:
-        if 'extra.' in column:
-            column_ref = getattr(models.InstanceExtra, column.split('.')[1])
-            query_prefix = query_prefix.options(
-                orm.joinedload(models.Instance.extra).undefer(column_ref)
-            )
-        else:
-            column_ref = getattr(models.Instance, column)
-            query_prefix = query_prefix.options(orm.joinedload(column_ref))
-
-    # Note: order_by is done in the sqlalchemy.utils.py paginate_query(),
-    # no need to do it here as well
-
     # Make a copy of the filters dictionary to use going forward, as we'll
     # be modifying it and we shouldn't affect the caller's use of it.
     filters = copy.deepcopy(filters)
@@ -1827,9 +1777,109 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     # Filter the query
     query_prefix = _exact_instance_filter(query_prefix,
                                 filters, exact_match_filter_names)
+    if query_prefix is None:
+        return None
+    return _regex_instance_filter(query_prefix, filters)
+
+
+@require_context
+@pick_context_manager_reader_allow_async
+def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
+                                     columns_to_join=None, sort_keys=None,
+                                     sort_dirs=None):
+    """Get all instances that match all filters sorted by the given keys.
+
+    Deleted instances will be returned by default, unless there's a filter that
+    says otherwise.
+
+    Depending on the name of a filter, matching for that filter is
+    performed using either exact matching or as regular expression
+    matching. Exact matching is applied for the following filters::
+
+    |   ['project_id', 'user_id', 'image_ref',
+    |    'vm_state', 'instance_type_id', 'uuid',
+    |    'metadata', 'host', 'system_metadata', 'locked', 'hidden']
+
+    Hidden instances will *not* be returned by default, unless there's a
+    filter that says otherwise.
+
+    A third type of filter (also using exact matching), filters
+    based on instance metadata tags when supplied under a special
+    key named 'filter'::
+
+    |   filters = {
+    |       'filter': [
+    |           {'name': 'tag-key', 'value': '<metakey>'},
+    |           {'name': 'tag-value', 'value': '<metaval>'},
+    |           {'name': 'tag:<metakey>', 'value': '<metaval>'}
+    |       ]
+    |   }
+
+    Special keys are used to tweak the query further::
+
+    |   'changes-since' - only return instances updated after
+    |   'changes-before' - only return instances updated before
+    |   'deleted' - only return (or exclude) deleted instances
+    |   'soft_deleted' - modify behavior of 'deleted' to either
+    |                    include or exclude instances whose
+    |                    vm_state is SOFT_DELETED.
+
+    A fourth type of filter (also using exact matching), filters
+    based on instance tags (not metadata tags). There are two types
+    of these tags:
+
+    `tags` -- One or more strings that will be used to filter results
+            in an AND expression: T1 AND T2
+
+    `tags-any` -- One or more strings that will be used to filter results in
+            an OR expression: T1 OR T2
+
+    `not-tags` -- One or more strings that will be used to filter results in
+            an NOT AND expression: NOT (T1 AND T2)
+
+    `not-tags-any` -- One or more strings that will be used to filter results
+            in an NOT OR expression: NOT (T1 OR T2)
+
+    Tags should be represented as list::
+
+    |    filters = {
+    |        'tags': [some-tag, some-another-tag],
+    |        'tags-any: [some-any-tag, some-another-any-tag],
+    |        'not-tags: [some-not-tag, some-another-not-tag],
+    |        'not-tags-any: [some-not-any-tag, some-another-not-any-tag]
+    |    }
+    """
+    # NOTE(mriedem): If the limit is 0 there is no point in even going
+    # to the database since nothing is going to be returned anyway.
+    if limit == 0:
+        return []
+
+    sort_keys, sort_dirs = db_utils.process_sort_params(
+        sort_keys, sort_dirs, default_dir='desc')
+
+    if columns_to_join is None:
+        columns_to_join_new = ['info_cache', 'security_groups']
+        manual_joins = ['metadata', 'system_metadata']
+    else:
+        manual_joins, columns_to_join_new = (
+            _manual_join_columns(columns_to_join))
+
+    query_prefix = context.session.query(models.Instance)
+    for column in columns_to_join_new:
+        if 'extra.' in column:
+            column_ref = getattr(models.InstanceExtra, column.split('.')[1])
+            query_prefix = query_prefix.options(
+                orm.joinedload(models.Instance.extra).undefer(column_ref)
+            )
+        else:
+            column_ref = getattr(models.Instance, column)
+            query_prefix = query_prefix.options(orm.joinedload(column_ref))
+
+    # Note: order_by is done in the sqlalchemy.utils.py paginate_query(),
+    # no need to do it here as well
+    query_prefix = _instance_filter_query(context, query_prefix, filters)
     if query_prefix is None:
         return []
-    query_prefix = _regex_instance_filter(query_prefix, filters)
 
     # paginate query
     if marker is not None:
@@ -1856,6 +1906,91 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     return _instances_fill_metadata(context, instances, manual_joins)
 
 
+@select_db_reader_mode
+def _instance_get_columns_page(context, columns, filters, limit, marker,
+                               sort_keys, sort_dirs, use_slave=False):
+    query_prefix = context.session.query(
+        *[getattr(models.Instance, column) for column in columns])
+    query_prefix = _instance_filter_query(context, query_prefix, filters)
+    if query_prefix is None:
+        return []
+
+    if isinstance(marker, str):
+        try:
+            marker = _instance_get_by_uuid(
+                context.elevated(read_deleted='yes'), marker,
+            )
+        except exception.InstanceNotFound:
+            raise exception.MarkerNotFound(marker=marker)
+    try:
+        query_prefix = sqlalchemyutils.paginate_query(
+            query_prefix,
+            models.Instance,
+            limit,
+            sort_keys,
+            marker=marker,
+            sort_dirs=sort_dirs,
+        )
+    except db_exc.InvalidSortKey:
+        raise exception.InvalidSortKey()
+
+    return query_prefix.all()
+
+
+@require_context
+def instance_get_all_columns_by_filters_sort(
+    context, filters, columns, limit=None, marker=None, sort_keys=None,
+    sort_dirs=None, batch_size=1000, use_slave=False,
+):
+    """Yield some columns of all the instances that match all filters, sorted
+    by the given keys.
+
+    Unlike instance_get_all_by_filters_sort, only the given columns of the
+    instances table are selected, without joining any other table or building
+    any model object. The rows are fetched lazily, in pages of batch_size
+    rows, each in its own transaction, so that listing many instances only
+    needs the memory of a page at a time and that the context can be used by
+    the caller between the rows.
+
+    See instance_get_all_by_filters_sort for the filters.
+
+    :param columns: The names of the columns of the instances table to
+        return.
+    :param batch_size: The number of rows to fetch from the database at once.
+    :param use_slave: Whether to read from the asynchronous database
+        connection, if any.
+    :returns: A generator of dicts of the given columns of the instances.
+    """
+    table_columns = models.Instance.__table__.columns
+    unknown = set(columns) - set(table_columns.keys())
+    if unknown:
+        raise ValueError(
+            'Unknown instance columns: %s' % ', '.join(sorted(unknown)))
+
+    sort_keys, sort_dirs = db_utils.process_sort_params(
+        sort_keys, sort_dirs, default_dir='desc')
+    for sort_key in sort_keys:
+        if sort_key not in table_columns:
+            raise exception.InvalidSortKey()
+    # The sort keys are also selected so that the last row of a page can be
+    # the marker of the next page
+    query_columns = list(columns) + [
+        key for key in sort_keys if key not in columns]
+
+    while limit is None or limit > 0:
+        page_size = batch_size if limit is None else min(limit, batch_size)
+        rows = _instance_get_columns_page(
+            context, query_columns, filters, page_size, marker, sort_keys,
+            sort_dirs, use_slave=use_slave)
+        for row in rows:
+            yield {column: getattr(row, column) for column in columns}
+        if len(rows) < page_size:
+            return
+        marker = rows[-1]
+        if limit is not None:
+            limit -= len(rows)
+
+
 @require_context
 @pick_context_manager_reader_allow_async
 def instance_get_by_sort_filters(context, sort_keys, sort_dirs, values):
@@ -17,6 +17,9 @@
 Filter support
 """
 
+import collections
+import time
+
 from oslo_log import log as logging
 
 from nova import loadables
@@ -48,6 +51,11 @@ class BaseFilter(object):
     # for each request rather than for each instance
     run_filter_once_per_request = False
 
+    # Set to true in a subclass if the result of the filter for an object does
+    # not depend on the filters run before it, so the filter pipeline can
+    # change the order in which it is run.
+    safe_to_reorder = False
+
     def run_filter_for_index(self, index):
         """Return True if the filter needs to be run for the "index-th"
         instance in a request.  Only need to override this if a filter
@@ -59,13 +67,179 @@ class BaseFilter(object):
             return True
 
 
+class FilterStats(object):
+    """Running statistics about a filter, used to order the filters."""
+
+    # Once a filter has been evaluated this many times, its statistics are
+    # halved so that recent requests weigh more than old ones.
+    WINDOW = 10000
+
+    def __init__(self):
+        self.evaluated = 0
+        self.rejected = 0
+        self.cost = 0.0
+
+    def record(self, evaluated, rejected, cost):
+        self.evaluated += evaluated
+        self.rejected += rejected
+        self.cost += cost
+        if self.evaluated > self.WINDOW:
+            self.evaluated /= 2
+            self.rejected /= 2
+            self.cost /= 2
+
+    @property
+    def rank(self):
+        """The expected cost of the filter per rejected object.
+
+        Filters with a lower rank should run first. Filters that were never
+        evaluated have a rank of 0 so that they get measured.
+        """
+        if not self.evaluated:
+            return 0.0
+        cost_per_object = self.cost / self.evaluated
+        rejection_rate = max(self.rejected / self.evaluated, 0.001)
+        return cost_per_object / rejection_rate
+
+
+def _filters_each_object(filter_):
+    """Return True if the filter decides on each object independently."""
+    return type(filter_).filter_all is BaseFilter.filter_all
+
+
+class FilterPipeline(object):
+    """Run filters in a single pass over the objects.
+
+    Rather than building a list of the remaining objects after each filter,
+    every object goes through all the filters in turn, stopping at the first
+    filter rejecting it. The cost and rejection rate of each filter are
+    recorded, and the filters marked as ``safe_to_reorder`` are run by
+    increasing cost per rejected object, so that cheap and selective filters
+    run first and expensive ones only see the objects kept by the others.
+
+    Filters overriding :meth:`BaseFilter.filter_all` need all the objects at
+    once; they are run on the list of the objects kept so far, and are never
+    reordered.
+    """
+
+    def __init__(self, observer=None):
+        self.stats = collections.defaultdict(FilterStats)
+        # Optional callable, called with the name of each filter run and the
+        # time spent in it
+        self.observer = observer
+
+    def order_filters(self, filters):
+        """Return the filters in the order they should be run."""
+        ordered = []
+        reorderable = []
+        for filter_ in filters:
+            if filter_.safe_to_reorder and _filters_each_object(filter_):
+                reorderable.append(filter_)
+                continue
+            ordered.extend(sorted(reorderable, key=self._rank))
+            reorderable = []
+            ordered.append(filter_)
+        ordered.extend(sorted(reorderable, key=self._rank))
+        return ordered
+
+    def _rank(self, filter_):
+        return self.stats[filter_.__class__.__name__].rank
+
+    def _run_stage(self, filters, objs, spec_obj, results):
+        checks = [(filter_._filter_one, filter_.__class__.__name__, [0, 0, 0])
+                  for filter_ in filters]
+        timer = time.perf_counter
+        passed = []
+        for obj in objs:
+            for filter_one, cls_name, counters in checks:
+                start = timer()
+                ok = filter_one(obj, spec_obj)
+                counters[2] += timer() - start
+                counters[0] += 1
+                if not ok:
+                    counters[1] += 1
+                    break
+            else:
+                passed.append(obj)
+
+        for _, cls_name, (evaluated, rejected, cost) in checks:
+            self.stats[cls_name].record(evaluated, rejected, cost)
+            if self.observer:
+                self.observer(cls_name, cost)
+            results.append((cls_name, evaluated, evaluated - rejected))
+        return passed
+
+    def run(self, filters, objs, spec_obj):
+        """Return the objects passing all the filters.
+
+        :param filters: The filters to run.
+        :param objs: The objects to filter.
+        :param spec_obj: The RequestSpec of the request.
+        :returns: A tuple of the list of the objects passing all the filters
+            or None if a filter asked to stop filtering, and a list of
+            (filter name, number of objects evaluated, number of objects
+            kept) tuples in the order the filters were run.
+        """
+        list_objs = list(objs)
+        results = []
+        stage = []
+        for filter_ in self.order_filters(filters):
+            if _filters_each_object(filter_):
+                stage.append(filter_)
+                continue
+
+            if stage:
+                list_objs = self._run_stage(
+                    stage, list_objs, spec_obj, results)
+                stage = []
+            cls_name = filter_.__class__.__name__
+            start_count = len(list_objs)
+            start = time.perf_counter()
+            objs = filter_.filter_all(list_objs, spec_obj)
+            if objs is None:
+                LOG.debug("Filter %s says to stop filtering", cls_name)
+                return None, results
+            list_objs = list(objs)
+            cost = time.perf_counter() - start
+            self.stats[cls_name].record(
+                start_count, start_count - len(list_objs), cost)
+            if self.observer:
+                self.observer(cls_name, cost)
+            results.append((cls_name, start_count, len(list_objs)))
+
+        if stage:
+            list_objs = self._run_stage(stage, list_objs, spec_obj, results)
+        return list_objs, results
+
+
 class BaseFilterHandler(loadables.BaseLoader):
     """Base class to handle loading filter classes.
 
     This class should be subclassed where one needs to use filters.
     """
 
+    def __init__(self, loadable_cls_type):
+        super(BaseFilterHandler, self).__init__(loadable_cls_type)
+        self.pipeline = FilterPipeline(observer=self._observe_filter_time)
+
+    def _use_filter_pipeline(self):
+        """Whether the filters should be run through the FilterPipeline.
+
+        Override in a subclass to enable it.
+        """
+        return False
+
+    def _observe_filter_time(self, cls_name, seconds):
+        """Called with the time spent in a filter for a request.
+
+        Override in a subclass to collect the timings of the filters.
+        """
+
     def get_filtered_objects(self, filters, objs, spec_obj, index=0):
+        if self._use_filter_pipeline():
+            return self._get_filtered_objects_pipeline(
+                filters, objs, spec_obj, index)
+
         list_objs = list(objs)
         LOG.debug("Starting with %d host(s)", len(list_objs))
         # Track the hosts as they are removed. The 'full_filter_results' list
@@ -82,11 +256,14 @@ class BaseFilterHandler(loadables.BaseLoader):
             if filter_.run_filter_for_index(index):
                 cls_name = filter_.__class__.__name__
                 start_count = len(list_objs)
+                start = time.perf_counter()
                 objs = filter_.filter_all(list_objs, spec_obj)
                 if objs is None:
                     LOG.debug("Filter %s says to stop filtering", cls_name)
                     return
                 list_objs = list(objs)
+                self._observe_filter_time(
+                    cls_name, time.perf_counter() - start)
                 end_count = len(list_objs)
                 part_filter_results.append(log_msg % {"cls_name": cls_name,
                         "start": start_count, "end": end_count})
@@ -120,3 +297,23 @@ class BaseFilterHandler(loadables.BaseLoader):
                        ) % msg_dict
             LOG.info(part_msg)
         return list_objs
+
+    def _get_filtered_objects_pipeline(self, filters, objs, spec_obj, index):
+        filters = [filter_ for filter_ in filters
+                   if filter_.run_filter_for_index(index)]
+        list_objs, results = self.pipeline.run(filters, objs, spec_obj)
+        if list_objs is None:
+            return
+
+        LOG.debug("Filter pipeline results: %s",
+                  ", ".join("%s: (start: %d, end: %d)" % result
+                            for result in results))
+        if not list_objs:
+            LOG.info("Filtering removed all hosts for the request with "
+                     "instance ID '%(inst_uuid)s'. Filter results: "
+                     "%(str_results)s",
+                     {"inst_uuid": spec_obj.instance_uuid,
+                      "str_results": str(
+                          ["%s: (start: %d, end: %d)" % result
+                           for result in results])})
+        return list_objs
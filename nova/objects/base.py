@@ -18,6 +18,7 @@ import contextlib
 import datetime
 import functools
 import traceback
+import typing as ty
 
 import netaddr
 from oslo_log import log as logging
@@ -25,13 +26,16 @@ import oslo_messaging as messaging
 from oslo_utils import versionutils
 from oslo_versionedobjects import base as ovoo_base
 from oslo_versionedobjects import exception as ovoo_exc
+from oslo_versionedobjects import fields as ovoo_fields
 
+import nova.conf
 from nova import exception
 from nova import objects
 from nova.objects import fields as obj_fields
 from nova import utils
 
 
+CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 
 
@@ -178,6 +182,181 @@ class NovaObject(ovoo_base.VersionedObject):
         finally:
             self._context = original_context
 
+    def obj_what_changed(self):
+        # NOTE: This is VersionedObject.obj_what_changed(), reading the
+        # attributes of the fields directly, as it is called for every object
+        # when serializing them.
+        if CONF.workarounds.disable_compiled_object_serializers:
+            return super(NovaObject, self).obj_what_changed()
+        changes = {field for field in self._changed_fields
+                   if field in self.fields}
+        for name, attrname, kind, field in _get_serializer(
+                self.__class__).fields:
+            value = getattr(self, attrname, None)
+            if (isinstance(value, ovoo_base.VersionedObject) and
+                    value.obj_what_changed()):
+                changes.add(name)
+        return changes
+
+    def obj_to_primitive(self, target_version=None, version_manifest=None):
+        # NOTE: The primitives of the current version of the objects, as sent
+        # over RPC, are built by a serializer compiled once per class, which
+        # is much faster than the generic per-field serialization. The other
+        # versions need the compatibility routines of the objects.
+        if ((target_version is None or target_version == self.VERSION) and
+                not version_manifest and
+                not CONF.workarounds.disable_compiled_object_serializers):
+            return _serialize(self)[0]
+        return super(NovaObject, self).obj_to_primitive(
+            target_version=target_version, version_manifest=version_manifest)
+
+
+# The kinds of fields of the compiled serializers, by the way their values
+# are serialized
+_FIELD_GENERIC = 0  # with the to_primitive() method of the field
+_FIELD_VALUE = 1  # as they are
+_FIELD_LIST = 2  # as a list of values serialized as they are
+_FIELD_DICT = 3  # as a dict of values serialized as they are
+_FIELD_OBJECT = 4  # as an object
+_FIELD_OBJECTS = 5  # as a list of objects
+
+_SERIALIZERS: ty.Dict[type, '_Serializer'] = {}
+
+
+def _get_field_kind(field):
+    if type(field).to_primitive is not ovoo_fields.Field.to_primitive:
+        return _FIELD_GENERIC
+    to_primitive = type(field._type).to_primitive
+    if to_primitive is ovoo_fields.FieldType.to_primitive:
+        return _FIELD_VALUE
+    if to_primitive is ovoo_fields.Object.to_primitive:
+        return _FIELD_OBJECT
+    if to_primitive in (ovoo_fields.List.to_primitive,
+                        ovoo_fields.Dict.to_primitive):
+        element_kind = _get_field_kind(field._type._element_type)
+        if to_primitive is ovoo_fields.Dict.to_primitive:
+            if element_kind == _FIELD_VALUE:
+                return _FIELD_DICT
+        elif element_kind == _FIELD_VALUE:
+            return _FIELD_LIST
+        elif element_kind == _FIELD_OBJECT:
+            return _FIELD_OBJECTS
+    return _FIELD_GENERIC
+
+
+class _Serializer(object):
+    """The serializer of the objects of a class, compiled from its fields."""
+
+    def __init__(self, cls):
+        self.fields = [
+            (name, get_attrname(name), _get_field_kind(field), field)
+            for name, field in cls.fields.items()]
+        self.overrides_to_primitive = (
+            cls.obj_to_primitive is not NovaObject.obj_to_primitive)
+        what_changed = cls.obj_what_changed
+        if what_changed in (NovaObject.obj_what_changed,
+                            ovoo_base.VersionedObject.obj_what_changed):
+            self.changes = 'fields'
+        elif what_changed is ovoo_base.ObjectListBase.obj_what_changed:
+            self.changes = 'objects'
+        else:
+            self.changes = None
+        self.keys = [cls._obj_primitive_key(key)
+                     for key in ('name', 'namespace', 'version', 'data',
+                                 'changes')]
+
+
+def _get_serializer(cls):
+    try:
+        return _SERIALIZERS[cls]
+    except KeyError:
+        serializer = _SERIALIZERS[cls] = _Serializer(cls)
+        return serializer
+
+
+def _serialize_child(obj):
+    if (not isinstance(obj, NovaObject) or
+            _get_serializer(obj.__class__).overrides_to_primitive):
+        return obj.obj_to_primitive(), bool(obj.obj_what_changed())
+    return _serialize(obj)
+
+
+def _serialize(obj):
+    """Serialize the current version of an object.
+
+    This returns the same primitive as the generic
+    VersionedObject.obj_to_primitive(), but for the order of the changes,
+    using a serializer compiled for the class of the object. It is returned
+    along with whether the object has changes, as obj_what_changed() would
+    tell, so that the changes of the parent objects can be found without
+    walking the objects again.
+    """
+    serializer = _get_serializer(obj.__class__)
+    data = {}
+    # The fields whose object value has changes, and whether any object of
+    # the 'objects' field has changes
+    changed_fields = []
+    objects_changed = False
+    for name, attrname, kind, field in serializer.fields:
+        try:
+            value = getattr(obj, attrname)
+        except AttributeError:
+            # The field is not set
+            continue
+        if kind == _FIELD_GENERIC:
+            data[name] = field.to_primitive(obj, name, value)
+            if (isinstance(value, ovoo_base.VersionedObject) and
+                    value.obj_what_changed()):
+                changed_fields.append(name)
+        elif value is None or kind == _FIELD_VALUE:
+            data[name] = value
+        elif kind == _FIELD_OBJECT:
+            data[name], changed = _serialize_child(value)
+            if changed:
+                changed_fields.append(name)
+        elif kind == _FIELD_OBJECTS:
+            items = []
+            for item in value:
+                if item is None:
+                    items.append(None)
+                    continue
+                item, changed = _serialize_child(item)
+                items.append(item)
+                if changed and name == 'objects':
+                    objects_changed = True
+            data[name] = items
+        elif kind == _FIELD_LIST:
+            data[name] = list(value)
+        else:
+            data[name] = dict(value)
+
+    if serializer.changes == 'fields':
+        changes = {field for field in obj._changed_fields
+                   if field in obj.fields}
+        changes.update(changed_fields)
+    elif serializer.changes == 'objects':
+        changes = set(obj._changed_fields)
+        if objects_changed:
+            changes.add('objects')
+    else:
+        changes = obj.obj_what_changed()
+
+    name_key, namespace_key, version_key, data_key, changes_key = (
+        serializer.keys)
+    primitive = {
+        name_key: obj.obj_name(),
+        namespace_key: obj.OBJ_PROJECT_NAMESPACE,
+        version_key: obj.VERSION,
+        data_key: data,
+    }
+    if changes:
+        # NOTE: Unlike the generic serialization, the changes are sorted so
+        # that the primitives do not depend on the order of a set
+        primitive_changes = sorted(field for field in changes if field in data)
+        if primitive_changes:
+            primitive[changes_key] = primitive_changes
+    return primitive, bool(changes)
+
 
 class NovaPersistentObject(object):
     """Mixin class for Persistent objects.
@@ -442,3 +621,86 @@ def obj_equal_prims(obj_1, obj_2, ignore=None):
     prim_1 = _strip(obj_1.obj_to_primitive(), keys)
     prim_2 = _strip(obj_2.obj_to_primitive(), keys)
     return prim_1 == prim_2
+
+
+def obj_copy(value):
+    """Return a cheap copy of an object, or of a collection of objects.
+
+    Unlike obj_clone(), which deep copies the objects, the values of the
+    fields are neither coerced nor deep copied: the nested objects, lists,
+    dicts and sets are copied, so that they can be modified without affecting
+    the original, while the other values, which are immutable, are shared.
+    """
+    if isinstance(value, ovoo_base.VersionedObject):
+        obj = value.__class__()
+        if 'VERSION' in value.__dict__:
+            obj.VERSION = value.VERSION
+        for name in value.fields:
+            attrname = get_attrname(name)
+            if hasattr(value, attrname):
+                setattr(obj, attrname, obj_copy(getattr(value, attrname)))
+        obj._changed_fields = set(value._changed_fields)
+        return obj
+    if isinstance(value, (list, tuple)):
+        return value.__class__(obj_copy(item) for item in value)
+    if isinstance(value, dict):
+        return {key: obj_copy(item) for key, item in value.items()}
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class BlobCache(utils.LRUCache):
+    """A bounded LRU cache of the objects deserialized from JSON blobs.
+
+    The objects are cached by the kind and the content of their blob, and
+    copied with obj_copy() in and out of the cache, so that the callers are
+    free to modify the objects they get.
+
+    :param maxsize: The maximum number of objects to keep.
+    """
+
+    def get(self, kind, blob):
+        """Return a copy of the object cached for a blob, or None."""
+        value = super().get((kind, blob))
+        return obj_copy(value) if value is not None else None
+
+    def set(self, kind, blob, value):
+        super().set((kind, blob), obj_copy(value))
+
+
+_BLOB_CACHE = None
+
+
+def get_blob_cache():
+    """Return the BlobCache shared by the objects of this process.
+
+    :returns: A BlobCache, or None if ``[DEFAULT] instance_extra_cache_size``
+        is 0.
+    """
+    global _BLOB_CACHE
+    size = CONF.instance_extra_cache_size
+    if not size:
+        return None
+    if _BLOB_CACHE is None or _BLOB_CACHE.maxsize != size:
+        _BLOB_CACHE = BlobCache(size)
+    return _BLOB_CACHE
+
+
+def obj_from_blob(kind, blob, loader):
+    """Deserialize an object from a JSON blob, using the BlobCache if enabled.
+
+    :param kind: The kind of the object, to tell the blobs of different kinds
+        of objects apart.
+    :param blob: The JSON blob.
+    :param loader: A function deserializing the object from the blob.
+    :returns: The object returned by the loader, or a copy of it.
+    """
+    cache = get_blob_cache()
+    if cache is None:
+        return loader(blob)
+    value = cache.get(kind, blob)
+    if value is None:
+        value = loader(blob)
+        cache.set(kind, blob, value)
+    return value
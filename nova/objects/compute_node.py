@@ -14,6 +14,7 @@
 
 from oslo_db import exception as db_exc
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from oslo_utils import versionutils
 import sqlalchemy as sa
@@ -514,6 +515,20 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.ComputeNode,
                                   db_computes)
 
+    @classmethod
+    def get_all_changed_since(cls, context, since):
+        """Return the ComputeNodes created, updated or deleted since a time.
+
+        Deleted ComputeNodes are included, with their deleted field set.
+
+        :param context: The security context
+        :param since: A datetime, which is converted to naive UTC
+        """
+        db_computes = db.compute_node_get_all_changed_since(
+            context, timeutils.normalize_time(since))
+        return base.obj_make_list(context, cls(context), objects.ComputeNode,
+                                  db_computes)
+
 
 def _get_node_empty_ratio(context, max_count):
     """Query the DB for non-deleted compute_nodes with 0.0/None alloc ratios
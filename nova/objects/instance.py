@@ -356,22 +356,21 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             if 'is_public' not in flavor:
                 flavor.is_public = True
 
-        flavor_info = jsonutils.loads(db_flavor)
-
-        self.flavor = objects.Flavor.obj_from_primitive(flavor_info['cur'])
-        _default_flavor_values(self.flavor)
-        if flavor_info['old']:
-            self.old_flavor = objects.Flavor.obj_from_primitive(
-                flavor_info['old'])
-            _default_flavor_values(self.old_flavor)
-        else:
-            self.old_flavor = None
-        if flavor_info['new']:
-            self.new_flavor = objects.Flavor.obj_from_primitive(
-                flavor_info['new'])
-            _default_flavor_values(self.new_flavor)
-        else:
-            self.new_flavor = None
+        def _load_flavors(db_flavor):
+            flavor_info = jsonutils.loads(db_flavor)
+            flavors = []
+            for key in ('cur', 'old', 'new'):
+                if flavor_info[key]:
+                    flavor = objects.Flavor.obj_from_primitive(
+                        flavor_info[key])
+                    _default_flavor_values(flavor)
+                else:
+                    flavor = None
+                flavors.append(flavor)
+            return tuple(flavors)
+
+        self.flavor, self.old_flavor, self.new_flavor = base.obj_from_blob(
+            'flavor', db_flavor, _load_flavors)
         self.obj_reset_changes(['flavor', 'old_flavor', 'new_flavor'])
 
     @staticmethod
@@ -994,9 +993,10 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self.vcpu_model = objects.VirtCPUModel.get_by_instance_uuid(
                 self._context, self.uuid)
         else:
-            db_vcpu_model = jsonutils.loads(db_vcpu_model)
-            self.vcpu_model = objects.VirtCPUModel.obj_from_primitive(
-                db_vcpu_model)
+            self.vcpu_model = base.obj_from_blob(
+                'vcpu_model', db_vcpu_model,
+                lambda blob: objects.VirtCPUModel.obj_from_primitive(
+                    jsonutils.loads(blob)))
 
     def _load_ec2_ids(self):
         self.ec2_ids = objects.EC2Ids.get_by_instance(self._context, self)
@@ -1430,6 +1430,49 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         return _make_instance_list(context, cls(), db_inst_list,
                                    expected_attrs)
 
+    @classmethod
+    def iter_by_filters(cls, context, filters, fields, sort_keys=None,
+                        sort_dirs=None, limit=None, marker=None,
+                        use_slave=False, batch_size=1000):
+        """Yield lightweight instances matching the filters.
+
+        Only the given fields of the instances are loaded from the database,
+        and the instances are loaded lazily, in batches of batch_size
+        instances, so this is much cheaper than get_by_filters for the callers
+        which only need a few fields of many instances. The other fields are
+        left unset.
+
+        Unlike get_by_filters, this is not remotable and so can only be used
+        by the services with access to the database.
+
+        :param fields: The names of the fields to load, which cannot be any of
+            the INSTANCE_OPTIONAL_ATTRS.
+        """
+        fields = list(fields)
+        unsupported = set(fields) & set(INSTANCE_OPTIONAL_ATTRS)
+        if unsupported:
+            raise ValueError(
+                'Fields cannot be loaded without their instance: %s' %
+                ', '.join(sorted(unsupported)))
+        columns = list(fields)
+        if 'deleted' in columns and 'id' not in columns:
+            columns.append('id')
+
+        for db_inst in db.instance_get_all_columns_by_filters_sort(
+                context, filters, columns, limit=limit, marker=marker,
+                sort_keys=sort_keys, sort_dirs=sort_dirs,
+                batch_size=batch_size, use_slave=use_slave):
+            instance = objects.Instance(context)
+            for field in fields:
+                if field == 'deleted':
+                    instance.deleted = db_inst['deleted'] == db_inst['id']
+                elif field == 'cleaned':
+                    instance.cleaned = db_inst['cleaned'] == 1
+                else:
+                    instance[field] = db_inst[field]
+            instance.obj_reset_changes()
+            yield instance
+
     @staticmethod
     @db.select_db_reader_mode
     def _db_instance_get_all_by_host(context, host, columns_to_join,
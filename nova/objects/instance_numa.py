@@ -165,6 +165,12 @@ class InstanceNUMATopology(base.NovaObject,
 
     @classmethod
     def obj_from_db_obj(cls, context, instance_uuid, db_obj):
+        cache = base.get_blob_cache()
+        if cache is not None:
+            obj = cache.get('numa_topology', db_obj)
+            if obj is not None:
+                return obj
+
         primitive = jsonutils.loads(db_obj)
 
         if 'nova_object.name' in primitive:
@@ -173,6 +179,10 @@ class InstanceNUMATopology(base.NovaObject,
             if updated:
                 cls._save_migrated_cpuset_to_instance_extra(
                     context, obj, instance_uuid)
+            elif cache is not None:
+                # NOTE: Only the topologies which do not need to be migrated
+                # are cached, so that the migrated ones are saved.
+                cache.set('numa_topology', db_obj, obj)
         else:
             obj = cls._migrate_legacy_object(context, instance_uuid, primitive)
 
@@ -13,6 +13,7 @@
 #    under the License.
 
 from oslo_log import log as logging
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from oslo_utils import versionutils
 
@@ -706,6 +707,21 @@ class ServiceList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.Service,
                                   db_services)
 
+    @classmethod
+    def get_by_binary_changed_since(cls, context, binary, since):
+        """Return the Services created, updated or deleted since a time.
+
+        Disabled and deleted Services are included.
+
+        :param context: The security context
+        :param binary: The binary of the services
+        :param since: A datetime, which is converted to naive UTC
+        """
+        db_services = db.service_get_all_by_binary_changed_since(
+            context, binary, timeutils.normalize_time(since))
+        return base.obj_make_list(context, cls(context), objects.Service,
+                                  db_services)
+
     @base.remotable_classmethod
     def get_by_host(cls, context, host):
         db_services = db.service_get_all_by_host(context, host)
@@ -17,17 +17,21 @@ import collections
 import contextlib
 import copy
 import functools
+import math
 import random
 import time
 import typing as ty
 
+import eventlet
 from keystoneauth1 import exceptions as ks_exc
 import os_resource_classes as orc
 import os_traits
 from oslo_log import log as logging
 from oslo_middleware import request_id
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import versionutils
+import requests
 import retrying
 
 from nova.compute import provider_tree
@@ -37,6 +41,7 @@ from nova import exception
 from nova.i18n import _
 from nova import objects
 from nova.objects import fields
+from nova.scheduler import metrics as scheduler_metrics
 from nova import utils
 
 
@@ -211,6 +216,44 @@ def get_placement_request_id(response):
         return response.headers.get(request_id.HTTP_RESP_HEADER_REQUEST_ID)
 
 
+class AllocationCandidatesCache(utils.LRUCache):
+    """A short-lived cache of the responses of GET /allocation_candidates.
+
+    The responses are cached by their query for ``ttl`` seconds, so that the
+    identical requests of a boot storm are only sent once to placement. As the
+    candidates may not fit anymore once resources are claimed against their
+    providers, the claims of this client drop the responses involving the
+    claimed providers.
+
+    :param ttl: The time, in seconds, to keep the responses.
+    :param maxsize: The maximum number of responses to keep.
+    """
+
+    def __init__(self, ttl, maxsize=128):
+        super().__init__(maxsize, ttl=ttl)
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the response data cached for the given key, or None."""
+        # The (response body, provider UUIDs) tuple
+        entry = super().get(key)
+        if entry is None:
+            return None
+        # The body is parsed again for every hit as the callers are free to
+        # modify the data they get
+        return jsonutils.loads(entry[0])
+
+    def set(self, key, data):
+        super().set(key, (jsonutils.dumps(data),
+                          frozenset(data['provider_summaries'])))
+
+    def invalidate(self, rp_uuids):
+        """Drop the responses involving any of the given providers."""
+        rp_uuids = set(rp_uuids)
+        self.invalidations += self.discard(
+            lambda entry: not rp_uuids.isdisjoint(entry[1]))
+
+
 # TODO(mriedem): Consider making SchedulerReportClient a global singleton so
 # that things like the compute API do not have to lazy-load it. That would
 # likely require inspecting methods that use a ProviderTree cache to see if
@@ -234,6 +277,19 @@ class SchedulerReportClient(object):
         self._provider_tree: provider_tree.ProviderTree = None
         # Track the last time we updated providers' aggregates and traits
         self._association_refresh_time: ty.Dict[str, float] = {}
+        # Counters of the work avoided when syncing providers with placement:
+        # - refreshes_skipped: providers whose associations were not
+        #   refreshed because their generation did not change
+        # - calls_made: placement API calls made instead of those skipped
+        #   refreshes, to refresh the sharing providers
+        # - calls_saved: placement API calls avoided by those skipped
+        #   refreshes, at least
+        # - providers_unchanged: providers not flushed by
+        #   update_from_provider_tree because they did not change
+        self.sync_stats: ty.Counter[str] = collections.Counter()
+        # The cache of the allocation candidates, created on first use if
+        # [scheduler] allocation_candidates_cache_ttl is set
+        self._candidates_cache: ty.Optional[AllocationCandidatesCache] = None
         self._client = self._create_client()
         # NOTE(danms): Keep track of how naggy we've been
         self._warn_count = 0
@@ -282,31 +338,75 @@ class SchedulerReportClient(object):
         # Set accept header on every request to ensure we notify placement
         # service of our response body media type preferences.
         client.additional_headers = {'accept': 'application/json'}
+        self._configure_connection_pool(client)
         return client
 
+    @staticmethod
+    def _configure_connection_pool(client):
+        """Size the pools of keep-alive connections of the HTTP session."""
+        ksa_session = getattr(client, 'session', None)
+        http_session = getattr(ksa_session, 'session', None)
+        if not isinstance(http_session, requests.Session):
+            return
+        size = max(CONF.placement.connection_pool_size,
+                   CONF.placement.max_concurrent_requests)
+        # The adapters are reinitialized rather than replaced to keep their
+        # TCP keep-alive and TLS settings.
+        for adapter in set(http_session.adapters.values()):
+            adapter.init_poolmanager(size, size)
+
+    def _map(self, func, items):
+        """Call func for each item and return the list of the results.
+
+        The calls are made concurrently, up to
+        [placement] max_concurrent_requests at a time, so func must only do
+        calls which are independent of each other. If any of the calls
+        raises, the exception is raised once the calls before it in the list
+        are done.
+        """
+        items = list(items)
+        size = min(CONF.placement.max_concurrent_requests, len(items))
+        if size <= 1:
+            return [func(item) for item in items]
+        pool = eventlet.GreenPool(size)
+        return list(pool.imap(func, items))
+
+    @staticmethod
+    def _timer(method, url):
+        """Time a request with a metric named after the method and the first
+        segment of the URL, e.g. placement.GET.resource_providers.
+        """
+        resource = url.lstrip('/').split('/', 1)[0].split('?', 1)[0]
+        return scheduler_metrics.get_metrics().timer(
+            'placement.%s.%s' % (method, resource))
+
     def get(self, url, version=None, global_request_id=None):
-        return self._client.get(url, microversion=version,
-                                global_request_id=global_request_id)
+        with self._timer('GET', url):
+            return self._client.get(url, microversion=version,
+                                    global_request_id=global_request_id)
 
     def post(self, url, data, version=None, global_request_id=None):
         # NOTE(sdague): using json= instead of data= sets the
         # media type to application/json for us. Placement API is
         # more sensitive to this than other APIs in the OpenStack
         # ecosystem.
-        return self._client.post(url, json=data, microversion=version,
-                                 global_request_id=global_request_id)
+        with self._timer('POST', url):
+            return self._client.post(url, json=data, microversion=version,
+                                     global_request_id=global_request_id)
 
     def put(self, url, data, version=None, global_request_id=None):
         # NOTE(sdague): using json= instead of data= sets the
         # media type to application/json for us. Placement API is
         # more sensitive to this than other APIs in the OpenStack
         # ecosystem.
-        return self._client.put(url, json=data, microversion=version,
-                                global_request_id=global_request_id)
+        with self._timer('PUT', url):
+            return self._client.put(url, json=data, microversion=version,
+                                    global_request_id=global_request_id)
 
     def delete(self, url, version=None, global_request_id=None):
-        return self._client.delete(url, microversion=version,
-                                   global_request_id=global_request_id)
+        with self._timer('DELETE', url):
+            return self._client.delete(url, microversion=version,
+                                       global_request_id=global_request_id)
 
     @safe_connect
     def get_allocation_candidates(self, context, resources):
@@ -345,11 +445,27 @@ class SchedulerReportClient(object):
         # make allocations by `PUT /allocations/{consumer_uuid}`
         version = SAME_SUBTREE_VERSION
         qparams = resources.to_querystring()
+        cache = self.get_candidates_cache()
+        if cache is not None:
+            data = cache.get((version, qparams))
+            LOG.debug('Allocation candidates cache %(result)s for %(query)s '
+                      '(hits: %(hits)d, misses: %(misses)d, invalidations: '
+                      '%(invalidations)d)',
+                      {'result': 'miss' if data is None else 'hit',
+                       'query': qparams, 'hits': cache.hits,
+                       'misses': cache.misses,
+                       'invalidations': cache.invalidations})
+            if data is not None:
+                return (data['allocation_requests'],
+                        data['provider_summaries'], version)
+
         url = "/allocation_candidates?%s" % qparams
         resp = self.get(url, version=version,
                         global_request_id=context.global_id)
         if resp.status_code == 200:
             data = resp.json()
+            if cache is not None:
+                cache.set((version, qparams), data)
             return (data['allocation_requests'], data['provider_summaries'],
                     version)
 
@@ -364,6 +480,26 @@ class SchedulerReportClient(object):
         LOG.error(msg, args)
         return None, None, None
 
+    def get_candidates_cache(self):
+        """Return the cache of the allocation candidates.
+
+        :returns: An AllocationCandidatesCache, or None if
+            ``[scheduler] allocation_candidates_cache_ttl`` is 0.
+        """
+        ttl = CONF.scheduler.allocation_candidates_cache_ttl
+        if not ttl:
+            return None
+        if self._candidates_cache is None or self._candidates_cache.ttl != ttl:
+            self._candidates_cache = AllocationCandidatesCache(ttl)
+        return self._candidates_cache
+
+    def _invalidate_candidates(self, rp_uuids):
+        """Drop the cached allocation candidates involving the providers we
+        are about to claim resources against.
+        """
+        if self._candidates_cache is not None:
+            self._candidates_cache.invalidate(rp_uuids)
+
     @safe_connect
     def _get_provider_aggregates(self, context, rp_uuid):
         """Queries the placement API for a resource provider's aggregates.
@@ -721,18 +857,94 @@ class SchedulerReportClient(object):
                 # But do mark it as having just been "refreshed".
                 self._association_refresh_time[uuid] = time.time()
 
-            self._provider_tree.populate_from_iterable(
-                rps_to_refresh or [created_rp])
+            unchanged = self._get_unchanged_providers(rps_to_refresh)
+            if unchanged is None:
+                self._provider_tree.populate_from_iterable(
+                    rps_to_refresh or [created_rp])
+                unchanged = set()
 
-            uuids_to_refresh = [rp['uuid'] for rp in rps_to_refresh]
+            uuids_to_refresh = [rp['uuid'] for rp in rps_to_refresh
+                                if rp['uuid'] not in unchanged]
+
+            if unchanged:
+                self._refresh_unchanged_providers(context, unchanged)
 
         # At this point, the whole tree exists in the local cache.
 
-        for uuid_to_refresh in uuids_to_refresh:
-            self._refresh_associations(context, uuid_to_refresh, force=True)
+        self._map(
+            lambda uuid_to_refresh: self._refresh_associations(
+                context, uuid_to_refresh, force=True),
+            uuids_to_refresh)
 
         return uuid
 
+    def _refresh_unchanged_providers(self, context, unchanged):
+        """Refresh what may have changed for providers with the same
+        generation as in the cache.
+
+        Only the sharing providers may have changed without bumping the
+        generation of the providers. They are looked up once for the
+        aggregates of all the unchanged providers, and only refreshed if
+        stale.
+
+        :param context: The security context
+        :param unchanged: A set of the UUIDs of the unchanged providers.
+        """
+        aggs = set()
+        with_aggs = 0
+        for rp_uuid in unchanged:
+            rp_aggs = self._provider_tree.data(rp_uuid).aggregates
+            aggs |= rp_aggs
+            if rp_aggs:
+                with_aggs += 1
+        calls_made = self._refresh_sharing_providers(context, aggs)
+        now = time.time()
+        for rp_uuid in unchanged:
+            self._association_refresh_time[rp_uuid] = now
+
+        # Refreshing each unchanged provider would have retrieved its
+        # inventories, aggregates and traits, and its sharing providers if
+        # it has aggregates, before refreshing them all.
+        self.sync_stats['refreshes_skipped'] += len(unchanged)
+        self.sync_stats['calls_made'] += calls_made
+        self.sync_stats['calls_saved'] += max(
+            0, 3 * len(unchanged) + with_aggs - calls_made)
+        LOG.debug('Skipped refreshing the unchanged resource providers %s',
+                  ','.join(sorted(unchanged)))
+
+    def _get_unchanged_providers(self, rps):
+        """Returns the UUIDs of the providers whose cache is up to date.
+
+        Placement bumps the generation of a provider whenever its inventories,
+        aggregates or traits change, so a cached provider with the generation
+        returned by placement does not need to be refreshed.
+
+        :param rps: A list of dicts of resource provider information for all
+                    providers in a tree, as returned by get_providers_in_tree.
+        :returns: A set of provider UUIDs, or None if the cache does not have
+                  the same providers in the tree, in which case the whole tree
+                  must be repopulated.
+        """
+        if not rps:
+            return None
+        try:
+            cached_uuids = self._provider_tree.get_provider_uuids_in_tree(
+                rps[0]['uuid'])
+        except ValueError:
+            return None
+        if set(cached_uuids) != {rp['uuid'] for rp in rps}:
+            return None
+
+        unchanged = set()
+        for rp in rps:
+            cached = self._provider_tree.data(rp['uuid'])
+            if (cached.name != rp['name'] or
+                    cached.parent_uuid != rp.get('parent_provider_uuid')):
+                return None
+            if cached.generation == rp['generation']:
+                unchanged.add(rp['uuid'])
+        return unchanged
+
     def _delete_provider(self, rp_uuid, global_request_id=None):
         resp = self.delete('/resource_providers/%s' % rp_uuid,
                            global_request_id=global_request_id)
@@ -815,6 +1027,7 @@ class SchedulerReportClient(object):
                 - ResourceProviderRetrievalFailed
         :raise: keystoneauth1.exceptions.ClientException if placement API
                 communication fails.
+        :returns: True if the provider was refreshed, False otherwise.
         """
         if force or self._associations_stale(rp_uuid):
             # Refresh inventories
@@ -847,25 +1060,44 @@ class SchedulerReportClient(object):
                 rp_uuid, traits, generation=generation)
 
             if refresh_sharing:
-                # Refresh providers associated by aggregate
-                for rp in self._get_sharing_providers(context, aggs):
-                    if not self._provider_tree.exists(rp['uuid']):
-                        # NOTE(efried): Right now sharing providers are always
-                        # treated as roots. This is deliberate. From the
-                        # context of this compute's RP, it doesn't matter if a
-                        # sharing RP is part of a tree.
-                        self._provider_tree.new_root(
-                            rp['name'], rp['uuid'],
-                            generation=rp['generation'])
-                    # Now we have to (populate or) refresh that provider's
-                    # traits, aggregates, and inventories (but not *its*
-                    # aggregate-associated providers). No need to override
-                    # force=True for newly-added providers - the missing
-                    # timestamp will always trigger them to refresh.
-                    self._refresh_associations(context, rp['uuid'],
-                                               force=force,
-                                               refresh_sharing=False)
+                self._refresh_sharing_providers(context, aggs, force=force)
             self._association_refresh_time[rp_uuid] = time.time()
+            return True
+        return False
+
+    def _refresh_sharing_providers(self, context, aggs, force=False):
+        """Refresh the providers associated by aggregate with a provider.
+
+        :param context: The security context
+        :param aggs: The aggregate UUIDs of the provider.
+        :param force: If True, force the refresh of the sharing providers
+                      already in the cache.
+        :returns: The number of placement API calls made.
+        """
+        if not aggs:
+            return 0
+        maxuuids = CONF.compute.sharing_providers_max_uuids_per_request
+        calls = math.ceil(len(aggs) / maxuuids)
+        for rp in self._get_sharing_providers(context, aggs):
+            if not self._provider_tree.exists(rp['uuid']):
+                # NOTE(efried): Right now sharing providers are always
+                # treated as roots. This is deliberate. From the
+                # context of this compute's RP, it doesn't matter if a
+                # sharing RP is part of a tree.
+                self._provider_tree.new_root(
+                    rp['name'], rp['uuid'],
+                    generation=rp['generation'])
+            # Now we have to (populate or) refresh that provider's
+            # traits, aggregates, and inventories (but not *its*
+            # aggregate-associated providers). No need to override
+            # force=True for newly-added providers - the missing
+            # timestamp will always trigger them to refresh.
+            if self._refresh_associations(context, rp['uuid'],
+                                          force=force,
+                                          refresh_sharing=False):
+                # The inventories, aggregates and traits were retrieved
+                calls += 3
+        return calls
 
     def _associations_stale(self, uuid):
         """Respond True if aggregates and traits have not been refreshed
@@ -1038,14 +1270,17 @@ class SchedulerReportClient(object):
                         global_request_id=context.global_id)
         if resp.status_code == 200:
             traits_to_create = set(traits) - set(resp.json()['traits'])
+
             # Might be neat to have a batch create.  But creating multiple
             # traits will generally happen once, at initial startup, if at all.
-            for trait in traits_to_create:
+            def create_trait(trait):
                 resp = self.put('/traits/' + trait, None, version='1.6',
                                 global_request_id=context.global_id)
                 if not resp:
                     raise exception.TraitCreationFailed(name=trait,
                                                         error=resp.text)
+
+            self._map(create_trait, traits_to_create)
             return
 
         # The initial GET failed
@@ -1248,7 +1483,7 @@ class SchedulerReportClient(object):
         to_ensure = set(n for n in names
                         if n.startswith(orc.CUSTOM_NAMESPACE))
 
-        for name in to_ensure:
+        def ensure_resource_class(name):
             # no payload on the put request
             resp = self.put(
                 "/resource_classes/%s" % name, None, version=version,
@@ -1265,6 +1500,8 @@ class SchedulerReportClient(object):
                 LOG.error(msg, args)
                 raise exception.InvalidResourceClass(resource_class=name)
 
+        self._map(ensure_resource_class, to_ensure)
+
     def _reshape(self, context, inventories, allocations):
         """Perform atomic inventory & allocation data migration.
 
@@ -1465,13 +1702,15 @@ class SchedulerReportClient(object):
             # the cache are now stale. The inventory update below will short
             # out, but we would still bounce with a provider generation
             # conflict on the trait and aggregate updates.
-            for uuid in new_uuids:
+            def refresh_generation(uuid):
                 # TODO(efried): GET /resource_providers?uuid=in:[list] would be
                 # handy here. Meanwhile, this is an already-written, if not
                 # obvious, way to refresh provider generations in the cache.
                 with catch_all(uuid):
                     self._refresh_and_get_inventory(context, uuid)
 
+            self._map(refresh_generation, new_uuids)
+
         # Now we can do provider deletions, because we should have moved any
         # allocations off of them via reshape.
         # We have to do deletions in bottom-up order, so we don't error
@@ -1496,7 +1735,15 @@ class SchedulerReportClient(object):
         # order ensures we at least try to process all of the providers. (We
         # get the UUIDs in bottom-up order by reversing new_uuids, which was
         # given to us in top-down order per ProviderTree.get_provider_uuids().)
+        # The providers whose inventories, aggregates and traits are the same
+        # as in the cache are skipped, as there is nothing to flush for them.
+        cached_keys = self._provider_tree.content_keys()
+        new_keys = new_tree.content_keys()
+        unchanged = 0
         for uuid in reversed(new_uuids):
+            if new_keys[uuid] == cached_keys.get(uuid):
+                unchanged += 1
+                continue
             pd = new_tree.data(uuid)
             with catch_all(pd.uuid):
                 self.set_inventory_for_provider(
@@ -1504,6 +1751,9 @@ class SchedulerReportClient(object):
                 self.set_aggregates_for_provider(
                     context, pd.uuid, pd.aggregates)
                 self.set_traits_for_provider(context, pd.uuid, pd.traits)
+        self.sync_stats['providers_unchanged'] += unchanged
+        LOG.debug('Flushed %d of %d resource providers to placement',
+                  len(new_uuids) - unchanged, len(new_uuids))
 
     # TODO(efried): Cut users of this method over to get_allocs_for_consumer
     def get_allocations_for_consumer(self, context, consumer):
@@ -1619,6 +1869,7 @@ class SchedulerReportClient(object):
         # Ensure we don't change the supplied alloc request since it's used in
         # a loop within the scheduler against multiple instance claims
         ar = copy.deepcopy(alloc_request)
+        self._invalidate_candidates(ar['allocations'])
 
         url = '/allocations/%s' % consumer_uuid
 
@@ -1695,6 +1946,71 @@ class SchedulerReportClient(object):
                 raise Retry('claim_resources', reason)
         return r.status_code == 204
 
+    # NOTE: This method should not be called by the resource tracker.
+    @safe_connect
+    @retries
+    def claim_resources_bulk(self, context, claims, project_id, user_id,
+                             allocation_request_version):
+        """Creates allocation records for several new consumers at once.
+
+        All the allocations are written with a single POST /allocations call,
+        which either succeeds or fails atomically. Unlike
+        :meth:`claim_resources`, this does not handle move operations: every
+        consumer is expected to be new, so the caller should fall back to
+        :meth:`claim_resources` for each consumer if this returns False.
+
+        :param context: The security context
+        :param claims: A list of (consumer_uuid, alloc_request) tuples, where
+                       alloc_request is the JSON body that would be sent to
+                       placement's PUT /allocations/{consumer_uuid} API
+        :param project_id: The project_id associated with the allocations.
+        :param user_id: The user_id associated with the allocations.
+        :param allocation_request_version: The microversion used to request the
+                                           allocations.
+        :returns: True if the allocations were created for all the consumers,
+                  False otherwise, in which case nothing has been allocated.
+        """
+        version = versionutils.convert_version_to_tuple(
+            allocation_request_version)
+        if version < versionutils.convert_version_to_tuple(
+                POST_ALLOCATIONS_API_VERSION):
+            return False
+
+        payload = {}
+        for consumer_uuid, alloc_request in claims:
+            # Don't change the supplied alloc request since it may be used for
+            # the alternate hosts of the instances
+            ar = copy.deepcopy(alloc_request)
+            self._invalidate_candidates(ar['allocations'])
+            ar['project_id'] = project_id
+            ar['user_id'] = user_id
+            if version >= versionutils.convert_version_to_tuple(
+                    CONSUMER_GENERATION_VERSION):
+                ar['consumer_generation'] = None
+            payload[consumer_uuid] = ar
+
+        r = self.post('/allocations', payload,
+                      version=allocation_request_version,
+                      global_request_id=context.global_id)
+        if r.status_code != 204:
+            err = r.json()['errors'][0]
+            if (err['code'] == 'placement.concurrent_update' and
+                    'consumer generation conflict' not in err['detail']):
+                # this is a resource provider generation conflict, which is
+                # just a placement internal race, so we can blindly retry.
+                reason = ('another process changed the resource providers '
+                          'involved in our attempt to post allocations for '
+                          'consumers %s' % ', '.join(payload))
+                raise Retry('claim_resources_bulk', reason)
+
+            LOG.debug(
+                'Unable to post allocations for consumers %(uuids)s '
+                '(%(code)i %(text)s)',
+                {'uuids': ', '.join(payload),
+                 'code': r.status_code,
+                 'text': r.text})
+        return r.status_code == 204
+
     def add_resources_to_instance_allocation(
         self,
         context: nova_context.RequestContext,
@@ -2309,8 +2625,10 @@ class SchedulerReportClient(object):
         consumers = set()
         # TODO(efried): This could be more efficient if placement offered an
         # operation like GET /allocations?rp_uuid=in:<list>
-        for u in self._provider_tree.get_provider_uuids(name_or_uuid=nodename):
-            alloc_info = self.get_allocations_for_resource_provider(context, u)
+        for alloc_info in self._map(
+            lambda u: self.get_allocations_for_resource_provider(context, u),
+            self._provider_tree.get_provider_uuids(name_or_uuid=nodename),
+        ):
             # The allocations dict is keyed by consumer UUID
             consumers.update(alloc_info.allocations)
 
@@ -2322,8 +2640,10 @@ class SchedulerReportClient(object):
         # such allocations if they appear.
         # TODO(efried): This could be more efficient if placement offered an
         # operation like GET /allocations?consumer_uuid=in:<list>
-        return {consumer: self.get_allocs_for_consumer(context, consumer)
-                for consumer in consumers}
+        consumers = list(consumers)
+        return dict(zip(consumers, self._map(
+            lambda consumer: self.get_allocs_for_consumer(context, consumer),
+            consumers)))
 
     def _remove_allocations_for_evacuated_instances(self, context,
             compute_node):
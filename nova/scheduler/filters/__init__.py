@@ -18,8 +18,11 @@ Scheduler host filters
 """
 from oslo_log import log as logging
 
+import nova.conf
 from nova import filters
+from nova.scheduler import metrics as scheduler_metrics
 
+CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 
 
@@ -98,6 +101,13 @@ class HostFilterHandler(filters.BaseFilterHandler):
     def __init__(self):
         super(HostFilterHandler, self).__init__(BaseHostFilter)
 
+    def _use_filter_pipeline(self):
+        return CONF.filter_scheduler.adaptive_filter_ordering
+
+    def _observe_filter_time(self, cls_name, seconds):
+        scheduler_metrics.get_metrics().observe(
+            'filter.%s' % cls_name, seconds)
+
 
 def all_filters():
     """Return a list of filter classes found in this directory.
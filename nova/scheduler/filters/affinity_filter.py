@@ -30,6 +30,7 @@ class DifferentHostFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         affinity_uuids = spec_obj.get_scheduler_hint('different_host')
@@ -48,6 +49,7 @@ class SameHostFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         affinity_uuids = spec_obj.get_scheduler_hint('same_host')
@@ -64,6 +66,7 @@ class SimpleCIDRAffinityFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         affinity_cidr = spec_obj.get_scheduler_hint('cidr', '/24')
@@ -85,6 +88,7 @@ class _GroupAntiAffinityFilter(filters.BaseHostFilter):
     """
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         # Only invoke the filter if 'anti-affinity' is configured
@@ -139,6 +143,7 @@ class _GroupAffinityFilter(filters.BaseHostFilter):
     """
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         # Only invoke the filter if 'affinity' is configured
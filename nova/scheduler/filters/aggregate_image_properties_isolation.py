@@ -32,6 +32,7 @@ class AggregateImagePropertiesIsolation(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = True
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         """Checks a host in an aggregate that metadata key/value match
@@ -34,6 +34,7 @@ class AggregateInstanceExtraSpecsFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         """Return a list of hosts that can create flavor.
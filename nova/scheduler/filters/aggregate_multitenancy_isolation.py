@@ -29,6 +29,7 @@ class AggregateMultiTenancyIsolation(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         """If a host is in an aggregate that has the metadata key is prefixed
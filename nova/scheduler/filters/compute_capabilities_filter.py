@@ -30,6 +30,7 @@ class ComputeCapabilitiesFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def _get_capabilities(self, host_state, scope):
         cap = host_state
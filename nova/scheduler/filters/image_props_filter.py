@@ -37,6 +37,7 @@ class ImagePropertiesFilter(filters.BaseHostFilter):
     """
 
     RUN_ON_REBUILD = True
+    safe_to_reorder = True
 
     # Image Properties and Compute Capabilities do not change within
     # a request
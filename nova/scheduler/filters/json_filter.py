@@ -27,6 +27,7 @@ class JsonFilter(filters.BaseHostFilter):
     """
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def _op_compare(self, args, op):
         """Returns True if the specified operator can successfully
@@ -33,6 +33,7 @@ class MetricsFilter(filters.BaseHostFilter):
     """
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def __init__(self):
         super(MetricsFilter, self).__init__()
@@ -15,6 +15,7 @@ from oslo_log import log as logging
 from nova import objects
 from nova.objects import fields
 from nova.scheduler import filters
+from nova.scheduler import utils
 from nova.virt import hardware
 
 LOG = logging.getLogger(__name__)
@@ -31,6 +32,7 @@ class NUMATopologyFilter(
     # requested image would alter the NUMA constraints we reject the rebuild
     # request and therefore do not need to run this filter on rebuild.
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def _satisfies_cpu_policy(self, host_state, extra_specs, image_props):
         """Check that the host_state provided satisfies any available
@@ -70,8 +72,10 @@ class NUMATopologyFilter(
         # This is rather rude and said function should be reworked to avoid
         # doing this. That's a large, non-backportable cleanup however, so for
         # now we just duplicate spec_obj to prevent changes propagating to
-        # future filter calls.
-        spec_obj = spec_obj.obj_clone()
+        # future filter calls. The cached fitting leaves it untouched.
+        cache = utils.get_numa_fit_cache()
+        if cache is None:
+            spec_obj = spec_obj.obj_clone()
 
         ram_ratio = host_state.ram_allocation_ratio
         cpu_ratio = host_state.cpu_allocation_ratio
@@ -109,6 +113,7 @@ class NUMATopologyFilter(
                     pci_requests=pci_requests,
                     pci_stats=host_state.pci_stats,
                     provider_mapping=candidate["mappings"],
+                    cache=cache,
                 ),
             )
 
@@ -44,6 +44,7 @@ class PciPassthroughFilter(
     """
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         """Return true if the host has the required PCI devices."""
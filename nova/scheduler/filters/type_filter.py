@@ -29,6 +29,7 @@ class AggregateTypeAffinityFilter(filters.BaseHostFilter):
     run_filter_once_per_request = True
 
     RUN_ON_REBUILD = False
+    safe_to_reorder = True
 
     def host_passes(self, host_state, spec_obj):
         # TODO(stephenfin): Add support for 'flavor' key
@@ -18,6 +18,7 @@ Manage hosts in the current zone.
 """
 
 import collections
+import datetime
 import functools
 import time
 
@@ -31,6 +32,7 @@ from nova import exception
 from nova import objects
 from nova.pci import stats as pci_stats
 from nova.scheduler import filters
+from nova.scheduler import utils as scheduler_utils
 from nova.scheduler import weights
 from nova import utils
 from nova.virt import hardware
@@ -94,12 +96,104 @@ def set_update_time_on_success(function):
     return decorated_function
 
 
+class LazyValue(object):
+    """A value which is only built the first time it is used.
+
+    Assigning a LazyValue to a lazy attribute of a HostState, such as
+    ``aggregates`` or ``instances``, defers the call to ``func`` until the
+    attribute is read, so that the value is never built for the hosts which
+    are filtered out before anything needs it.
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __call__(self):
+        return self.func(*self.args)
+
+    def __repr__(self):
+        return '<LazyValue %s>' % getattr(self.func, '__name__', self.func)
+
+
+class _LazyAttribute(object):
+    """Descriptor of a HostState attribute which may be set to a LazyValue.
+
+    The value is stored in the ``slot`` attribute and the LazyValue is
+    replaced by the value it builds when the attribute is first read.
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if isinstance(value, LazyValue):
+            value = value()
+            setattr(obj, self.slot, value)
+        return value
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+
+class _LazyInstancesByHost(object):
+    """The instances of the untracked hosts, only loaded when first used.
+
+    The instances of all the untracked hosts are loaded at once the first
+    time the instances of any of them are read, so that nothing is queried
+    if no filter or weigher reads them.
+    """
+
+    __slots__ = ('load', 'instances_by_host')
+
+    def __init__(self, load):
+        self.load = load
+        self.instances_by_host = None
+
+    def get(self, host_name):
+        if self.instances_by_host is None:
+            self.instances_by_host = self.load()
+        return self.instances_by_host.get(host_name)
+
+
+# Shared by the HostStates which were not given their aggregates or instances,
+# as a new empty list or dict is only needed if the attribute is read.
+_NO_AGGREGATES = LazyValue(list)
+_NO_INSTANCES = LazyValue(dict)
+
+
 class HostState(object):
     """Mutable and immutable information tracked for a host.
     This is an attempt to remove the ad-hoc data structures
     previously used and lock down access.
     """
 
+    # A HostState is built for every compute node on every request, unless
+    # [filter_scheduler]host_state_cache is enabled, so keep them small. The
+    # __dict__ slot still allows subclasses and out of tree filters to set
+    # other attributes.
+    __slots__ = (
+        'host', 'nodename', 'uuid', '_lock_name', 'total_usable_ram_mb',
+        'total_usable_disk_gb', 'disk_mb_used', 'free_ram_mb',
+        'free_disk_mb', 'vcpus_total', 'vcpus_used', 'pci_stats',
+        'numa_topology', 'num_instances', 'num_io_ops', 'failed_builds',
+        'host_ip', 'hypervisor_type', 'hypervisor_version',
+        'hypervisor_hostname', 'cpu_info', 'supported_instances', 'limits',
+        'metrics', '_aggregates', '_instances', 'ram_allocation_ratio',
+        'cpu_allocation_ratio', 'disk_allocation_ratio', 'cell_uuid',
+        'updated', 'allocation_candidates', 'service', 'stats', '__dict__',
+    )
+
+    # List of aggregates the host belongs to
+    aggregates = _LazyAttribute('_aggregates')
+    # Instances on this host
+    instances = _LazyAttribute('_instances')
+
     def __init__(self, host, node, cell_uuid):
         self.host = host
         self.nodename = node
@@ -137,11 +231,8 @@ class HostState(object):
         # Generic metrics from compute nodes
         self.metrics = None
 
-        # List of aggregates the host belongs to
-        self.aggregates = []
-
-        # Instances on this host
-        self.instances = {}
+        self.aggregates = _NO_AGGREGATES
+        self.instances = _NO_INSTANCES
 
         # Allocation ratios for this host
         self.ram_allocation_ratio = None
@@ -157,7 +248,10 @@ class HostState(object):
 
     def update(self, compute=None, service=None, aggregates=None,
             inst_dict=None):
-        """Update all information about a host."""
+        """Update all information about a host.
+
+        The aggregates and the instances can be given as LazyValues.
+        """
 
         @utils.synchronized(self._lock_name)
         def _locked_update(self, compute, service, aggregates, inst_dict):
@@ -176,7 +270,8 @@ class HostState(object):
                 self.service = ReadOnlyDict(service)
             if inst_dict is not None:
                 LOG.debug("Update host state with instances: %s",
-                          list(inst_dict))
+                          inst_dict if isinstance(inst_dict, LazyValue)
+                          else list(inst_dict))
                 self.instances = inst_dict
 
         return _locked_update(self, compute, service, aggregates, inst_dict)
@@ -300,7 +395,8 @@ class HostState(object):
                 limits=self.limits.get('numa_topology'),
                 pci_requests=pci_requests,
                 pci_stats=self.pci_stats,
-                provider_mapping=spec_obj.get_request_group_mapping())
+                provider_mapping=spec_obj.get_request_group_mapping(),
+                cache=scheduler_utils.get_numa_fit_cache())
 
             self.numa_topology = hardware.numa_usage_from_instance_numa(
                 self.numa_topology, spec_obj.numa_topology)
@@ -339,6 +435,47 @@ class HostState(object):
         )
 
 
+class CellHostStateCache(object):
+    """The HostState objects of a cell, kept up to date with DB deltas.
+
+    Only the ComputeNode and Service records which changed since the last
+    query are read from the cell database, using the newest timestamp seen
+    as a watermark. A full reload is done periodically to catch up with rows
+    whose timestamp would have been older than the watermark.
+    """
+
+    # Rows written with a timestamp slightly older than the watermark, for
+    # example by a conductor with a skewed clock, are still caught if they are
+    # within this window.
+    WATERMARK_OVERLAP = datetime.timedelta(seconds=1)
+
+    def __init__(self):
+        # Dict of HostState objects keyed by their compute node UUID
+        self.host_states = {}
+        # Dict of nova-compute Service objects keyed by their host name
+        self.services = {}
+        self.watermark = None
+        self.synced_at = None
+        self.aggregates_generation = None
+
+    def needs_full_sync(self):
+        interval = CONF.filter_scheduler.host_state_cache_full_sync_interval
+        return (self.watermark is None or
+                (interval and time.monotonic() - self.synced_at > interval))
+
+    def changed_since(self):
+        return self.watermark - self.WATERMARK_OVERLAP
+
+    def advance_watermark(self, records):
+        """Move the watermark to the newest timestamp of the records."""
+        for record in records:
+            for field in ('created_at', 'updated_at', 'deleted_at'):
+                value = getattr(record, field)
+                if value and (self.watermark is None or
+                              value > self.watermark):
+                    self.watermark = value
+
+
 class HostManager(object):
     """Base HostManager class."""
 
@@ -363,6 +500,9 @@ class HostManager(object):
         # Dict of set of aggregate IDs keyed by the name of the host belonging
         # to those aggregates
         self.host_aggregates_map = collections.defaultdict(set)
+        # Incremented each time the aggregates change, so that cached
+        # HostStates know when to refresh their aggregates
+        self._aggregates_generation = 0
         self._init_aggregates()
         self.track_instance_changes = (
                 CONF.filter_scheduler.track_instance_changes)
@@ -384,6 +524,7 @@ class HostManager(object):
 
     def update_aggregates(self, aggregates):
         """Updates internal HostManager information about aggregates."""
+        self._aggregates_generation += 1
         if isinstance(aggregates, (list, objects.AggregateList)):
             for agg in aggregates:
                 self._update_aggregate(agg)
@@ -404,6 +545,7 @@ class HostManager(object):
     def delete_aggregate(self, aggregate):
         """Deletes internal HostManager information about a specific aggregate.
         """
+        self._aggregates_generation += 1
         if aggregate.id in self.aggs_by_id:
             del self.aggs_by_id[aggregate.id]
         for host in self.host_aggregates_map:
@@ -430,12 +572,17 @@ class HostManager(object):
             count = 0
             if not computes_by_cell:
                 computes_by_cell = {}
-                for cell in self.cells.values():
-                    with context_module.target_cell(context, cell) as cctxt:
-                        cell_cns = objects.ComputeNodeList.get_all(
-                            cctxt).objects
-                        computes_by_cell[cell] = cell_cns
-                        count += len(cell_cns)
+                results = context_module.scatter_gather_cells(
+                    context, self.cells.values(),
+                    CONF.filter_scheduler.host_state_cell_timeout,
+                    objects.ComputeNodeList.get_all)
+                for cell_uuid, result in results.items():
+                    if context_module.is_cell_failure_sentinel(result):
+                        LOG.warning('Failed to get computes for cell %s',
+                                    cell_uuid)
+                        continue
+                    computes_by_cell[self.cells[cell_uuid]] = result.objects
+                    count += len(result.objects)
 
             LOG.debug("Total number of compute nodes: %s", count)
 
@@ -622,6 +769,11 @@ class HostManager(object):
         return self.weight_handler.get_weighed_objects(self.weighers,
                 hosts, spec_obj)
 
+    def get_incrementally_weighed_hosts(self, hosts, spec_obj):
+        """Weigh the hosts once, allowing to reweigh single hosts later."""
+        return self.weight_handler.get_incremental_weighed_objects(
+            self.weighers, hosts, spec_obj)
+
     def _get_computes_for_cells(self, context, cells, compute_uuids):
         """Get a tuple of compute node and service information.
 
@@ -647,7 +799,7 @@ class HostManager(object):
                 return services, objects.ComputeNodeList.get_all_by_uuids(
                     cctxt, compute_uuids)
 
-        timeout = context_module.CELL_TIMEOUT
+        timeout = CONF.filter_scheduler.host_state_cell_timeout
         results = context_module.scatter_gather_cells(context, cells, timeout,
                                                       targeted_operation)
         compute_nodes = collections.defaultdict(list)
@@ -763,6 +915,9 @@ class HostManager(object):
         # Dict, keyed by host name, to cell UUID to be used to look up the
         # cell a particular host is in (used with self.cells).
         self.host_to_cell_uuid = {}
+        # Dict, keyed by cell UUID, of the CellHostStateCache objects used
+        # when [filter_scheduler]host_state_cache is enabled.
+        self.host_state_caches = {}
 
     def get_host_states_by_uuids(self, context, compute_uuids, spec_obj):
 
@@ -783,11 +938,231 @@ class HostManager(object):
         else:
             cells = self.enabled_cells
 
+        if CONF.filter_scheduler.host_state_cache:
+            return self._get_cached_host_states(context, cells, compute_uuids)
+
         compute_nodes, services = self._get_computes_for_cells(
             context, cells, compute_uuids=compute_uuids)
-        return self._get_host_states(context, compute_nodes, services)
+        instances_by_host = _LazyInstancesByHost(functools.partial(
+            self._get_instances_for_cells, context, cells, compute_nodes))
+        return self._get_host_states(
+            context, compute_nodes, services,
+            instances_by_host=instances_by_host)
+
+    def _get_cached_host_states(self, context, cells, compute_uuids):
+        """Returns a generator over the cached HostStates of the cells.
+
+        The caches are first refreshed with the ComputeNode and Service
+        records which changed since the last request, or fully reloaded if
+        needed.
+
+        :param context: request context
+        :param cells: list of CellMapping objects
+        :param compute_uuids: Optional list of ComputeNode UUIDs to restrict
+            the returned HostStates to.
+        """
+        caches = {}
+        for cell in cells:
+            caches[cell.uuid] = self.host_state_caches.setdefault(
+                cell.uuid, CellHostStateCache())
+
+        def targeted_operation(cctxt):
+            cache = caches[cctxt.cell_uuid]
+            if cache.needs_full_sync():
+                full_sync = True
+                services = objects.ServiceList.get_by_binary(
+                    cctxt, 'nova-compute', include_disabled=True)
+                compute_nodes = objects.ComputeNodeList.get_all(cctxt)
+            else:
+                full_sync = False
+                since = cache.changed_since()
+                services = objects.ServiceList.get_by_binary_changed_since(
+                    cctxt, 'nova-compute', since)
+                compute_nodes = objects.ComputeNodeList.get_all_changed_since(
+                    cctxt, since)
+            instances_by_host = self._get_untracked_instances(
+                cctxt, compute_nodes)
+            return full_sync, services, compute_nodes, instances_by_host
+
+        timeout = CONF.filter_scheduler.host_state_cell_timeout
+        results = context_module.scatter_gather_cells(context, cells, timeout,
+                                                      targeted_operation)
+        if compute_uuids is not None:
+            compute_uuids = set(compute_uuids)
+
+        host_states = []
+        for cell_uuid, result in results.items():
+            if isinstance(result, Exception):
+                LOG.warning('Failed to get computes for cell %s', cell_uuid)
+                continue
+            elif result is context_module.did_not_respond_sentinel:
+                LOG.warning('Timeout getting computes for cell %s', cell_uuid)
+                continue
+
+            cache = caches[cell_uuid]
+            changed = self._update_host_state_cache(
+                context, cell_uuid, cache, *result)
+            for compute_uuid, host_state in cache.host_states.items():
+                if (compute_uuids is not None and
+                        compute_uuid not in compute_uuids):
+                    continue
+                if compute_uuid not in changed:
+                    # Instance changes from the computes are applied to the
+                    # HostManager instance info, so only refresh the view of
+                    # the instances if it is up to date.
+                    host_info = self._instance_info.get(host_state.host)
+                    if host_info and host_info.get("updated"):
+                        host_state.instances = host_info["instances"]
+                if host_state.host not in cache.services:
+                    LOG.warning(
+                        "No compute service record found for host %(host)s",
+                        {'host': host_state.host})
+                    continue
+                host_states.append(host_state)
+
+        return iter(host_states)
+
+    def _update_host_state_cache(
+        self, context, cell_uuid, cache, full_sync, services, compute_nodes,
+        instances_by_host=None,
+    ):
+        """Apply ComputeNode and Service records to a CellHostStateCache.
+
+        :returns: the set of UUIDs of the compute nodes whose HostState was
+            updated from the records.
+        """
+        if full_sync:
+            LOG.debug('Reloading all the host states of cell %s', cell_uuid)
+            compute_uuids = {compute.uuid for compute in compute_nodes}
+            cache.host_states = {
+                uuid: host_state
+                for uuid, host_state in cache.host_states.items()
+                if uuid in compute_uuids
+            }
+            cache.services = {}
+            cache.synced_at = time.monotonic()
 
-    def _get_host_states(self, context, compute_nodes, services):
+        cache.advance_watermark(services)
+        cache.advance_watermark(compute_nodes)
+
+        changed_hosts = set()
+        for service in services:
+            changed_hosts.add(service.host)
+            if service.deleted:
+                cache.services.pop(service.host, None)
+            else:
+                cache.services[service.host] = service
+
+        aggregates_changed = (
+            cache.aggregates_generation != self._aggregates_generation)
+        cache.aggregates_generation = self._aggregates_generation
+
+        changed = set()
+        for compute in compute_nodes:
+            if compute.deleted:
+                cache.host_states.pop(compute.uuid, None)
+                continue
+            host_state = cache.host_states.get(compute.uuid)
+            if (not host_state or (host_state.host, host_state.nodename) !=
+                    (compute.host, compute.hypervisor_hostname)):
+                host_state = self.host_state_cls(
+                    compute.host, compute.hypervisor_hostname, cell_uuid,
+                    compute=compute)
+                cache.host_states[compute.uuid] = host_state
+            service = cache.services.get(compute.host)
+            host_state.update(compute,
+                              dict(service) if service else None,
+                              LazyValue(self._get_aggregates_info,
+                                        compute.host),
+                              self._get_instance_info(
+                                  context, compute, instances_by_host))
+            changed.add(compute.uuid)
+
+        for uuid, host_state in list(cache.host_states.items()):
+            if uuid in changed:
+                continue
+            service = (cache.services.get(host_state.host)
+                       if host_state.host in changed_hosts else None)
+            aggregates = (LazyValue(self._get_aggregates_info,
+                                    host_state.host)
+                          if aggregates_changed else None)
+            if service or aggregates is not None:
+                host_state.update(None,
+                                  dict(service) if service else None,
+                                  aggregates, None)
+
+        return changed
+
+    def _get_instances_for_cells(self, context, cells, compute_nodes):
+        """Get the instances of the hosts whose instance info is not tracked.
+
+        The instances are loaded with a single query per cell, and the cells
+        are queried concurrently.
+
+        :param context: request context
+        :param cells: list of CellMapping objects
+        :param compute_nodes: cell-uuid keyed dict of compute node lists
+        :returns: a dict, keyed by host name, of dicts of Instance objects
+            keyed by instance UUID, as returned by _get_instance_info(). Hosts
+            in cells which failed to respond are not in the dict.
+        """
+        cells = [cell for cell in cells if compute_nodes.get(cell.uuid)]
+        if not any(self._get_untracked_hosts(compute_nodes[cell.uuid])
+                   for cell in cells):
+            return {}
+
+        def targeted_operation(cctxt):
+            return self._get_untracked_instances(
+                cctxt, compute_nodes[cctxt.cell_uuid])
+
+        timeout = CONF.filter_scheduler.host_state_cell_timeout
+        results = context_module.scatter_gather_cells(context, cells, timeout,
+                                                      targeted_operation)
+        instances_by_host = {}
+        for cell_uuid, result in results.items():
+            if isinstance(result, Exception):
+                LOG.warning('Failed to get instances for cell %s', cell_uuid)
+            elif result is context_module.did_not_respond_sentinel:
+                LOG.warning('Timeout getting instances for cell %s',
+                            cell_uuid)
+            else:
+                instances_by_host.update(result)
+        return instances_by_host
+
+    def _get_untracked_hosts(self, compute_nodes):
+        """Return the names of the hosts whose instance info is not tracked."""
+        hosts = set()
+        for compute in compute_nodes:
+            host_info = self._instance_info.get(compute.host)
+            if not (host_info and host_info.get("updated")):
+                hosts.add(compute.host)
+        return hosts
+
+    def _get_untracked_instances(self, cctxt, compute_nodes):
+        """Get the instances of the hosts whose instance info is not tracked.
+
+        :param cctxt: request context targeted at the cell of the computes
+        :param compute_nodes: list of ComputeNode objects
+        :returns: a dict, keyed by host name, of dicts of Instance objects
+            keyed by instance UUID.
+        """
+        hosts = self._get_untracked_hosts(compute_nodes)
+        if not hosts:
+            return {}
+
+        uuids_by_host = objects.InstanceList.get_uuids_by_hosts(
+            cctxt, list(hosts))
+        # Putting the context in the otherwise fake Instance object at least
+        # allows out of tree filters to lazy-load fields.
+        return {
+            host: {uuid: objects.Instance(cctxt, uuid=uuid)
+                   for uuid in uuids_by_host[host]}
+            for host in hosts
+        }
+
+    def _get_host_states(
+        self, context, compute_nodes, services, instances_by_host=None,
+    ):
         """Returns a generator over HostStates given a list of computes.
 
         Also updates the HostStates internal mapping for the HostManager.
@@ -819,8 +1194,10 @@ class HostManager(object):
                 # this field for the first time
                 host_state.update(compute,
                                   dict(service),
-                                  self._get_aggregates_info(host),
-                                  self._get_instance_info(context, compute))
+                                  LazyValue(self._get_aggregates_info,
+                                            host),
+                                  self._get_instance_info(
+                                      context, compute, instances_by_host))
 
                 seen_nodes.add(state_key)
 
@@ -877,21 +1254,40 @@ class HostManager(object):
             # least allows out of tree filters to lazy-load fields.
             return {uuid: objects.Instance(cctxt, uuid=uuid) for uuid in uuids}
 
-    def _get_instance_info(self, context, compute):
+    def _get_instance_info(self, context, compute, instances_by_host=None):
         """Gets the host instance info from the compute host.
 
         Some sites may disable ``track_instance_changes`` for performance or
         isolation reasons. In either of these cases, there will either be no
         information for the host, or the 'updated' value for that host dict
         will be False. In those cases, we need to grab the current InstanceList
-        instead of relying on the version in _instance_info.
+        instead of relying on the version in _instance_info, preferably from
+        instances_by_host, which holds the instances of all the untracked
+        hosts. It is then returned as a LazyValue, so that it is only queried
+        if it is used.
+
+        :param instances_by_host: A dict, or a _LazyInstancesByHost, of the
+            instances of the untracked hosts keyed by host name.
         """
         host_name = compute.host
         host_info = self._instance_info.get(host_name)
         if host_info and host_info.get("updated"):
             inst_dict = host_info["instances"]
+        elif instances_by_host is not None:
+            inst_dict = LazyValue(self._get_untracked_instance_info,
+                                  context, host_name, instances_by_host)
         else:
             # Updates aren't flowing from nova-compute.
+            inst_dict = LazyValue(
+                self._get_instances_by_host, context, host_name)
+        return inst_dict
+
+    def _get_untracked_instance_info(
+        self, context, host_name, instances_by_host,
+    ):
+        inst_dict = instances_by_host.get(host_name)
+        if inst_dict is None:
+            # The cell of the host failed to return its instances
             inst_dict = self._get_instances_by_host(context, host_name)
         return inst_dict
 
@@ -21,6 +21,8 @@ Scheduler Service
 
 import collections
 import copy
+import heapq
+import itertools
 import random
 
 from keystoneauth1 import exceptions as ks_exc
@@ -42,6 +44,7 @@ from nova import quota
 from nova import rpc
 from nova.scheduler.client import report
 from nova.scheduler import host_manager
+from nova.scheduler import metrics as scheduler_metrics
 from nova.scheduler import request_filter
 from nova.scheduler import utils
 from nova import servicegroup
@@ -105,6 +108,10 @@ class SchedulerManager(manager.Manager):
     def placement_client(self):
         return report.report_client_singleton()
 
+    @property
+    def metrics(self):
+        return scheduler_metrics.get_metrics()
+
     @periodic_task.periodic_task(
         spacing=CONF.scheduler.discover_hosts_in_cells_interval,
         run_immediately=True)
@@ -146,6 +153,11 @@ class SchedulerManager(manager.Manager):
             else:
                 LOG.debug(msg)
 
+    @periodic_task.periodic_task(
+        spacing=CONF.scheduler.metrics_flush_interval)
+    def _flush_metrics(self, context):
+        self.metrics.flush()
+
     def reset(self):
         # NOTE(tssurya): This is a SIGHUP handler which will reset the cells
         # and enabled cells caches in the host manager. So every time an
@@ -157,6 +169,7 @@ class SchedulerManager(manager.Manager):
         self.host_manager.refresh_cells_caches()
 
     @messaging.expected_exceptions(exception.NoValidHost)
+    @scheduler_metrics.timed('select_destinations')
     def select_destinations(
         self, context, request_spec=None,
         filter_properties=None, spec_obj=_sentinel, instance_uuids=None,
@@ -204,8 +217,9 @@ class SchedulerManager(manager.Manager):
             resources = utils.resources_from_request_spec(
                 context, spec_obj, self.host_manager,
                 enable_pinning_translate=True)
-            res = self.placement_client.get_allocation_candidates(
-                context, resources)
+            with self.metrics.timer('placement.get_allocation_candidates'):
+                res = self.placement_client.get_allocation_candidates(
+                    context, resources)
             if res is None:
                 # We have to handle the case that we failed to connect to the
                 # Placement service and the safe_connect decorator on
@@ -236,8 +250,11 @@ class SchedulerManager(manager.Manager):
                 resources = utils.resources_from_request_spec(
                     context, spec_obj, self.host_manager,
                     enable_pinning_translate=False)
-                res = self.placement_client.get_allocation_candidates(
-                    context, resources)
+                with self.metrics.timer(
+                    'placement.get_allocation_candidates',
+                ):
+                    res = self.placement_client.get_allocation_candidates(
+                        context, resources)
                 if res:
                     # merge the allocation requests and provider summaries from
                     # the two requests together
@@ -406,6 +423,11 @@ class SchedulerManager(manager.Manager):
                 context, num_instances, spec_obj, hosts, num_alts,
                 instance_uuids=instance_uuids)
 
+        if self._use_batch_scheduling(num_instances):
+            return self._schedule_batch(
+                context, elevated, spec_obj, instance_uuids, hosts, num_alts,
+                alloc_reqs_by_rp_uuid, allocation_request_version)
+
         # A list of the instance UUIDs that were successfully claimed against
         # in the placement API. If we are not able to successfully claim for
         # all involved instances, we use this list to remove those allocations
@@ -458,11 +480,12 @@ class SchedulerManager(manager.Manager):
                 # information in the provider summaries, we'll just try to
                 # claim resources using the first allocation_request
                 alloc_req = host.allocation_candidates[0]
-                if utils.claim_resources(
-                    elevated, self.placement_client, spec_obj, instance_uuid,
-                    alloc_req,
-                    allocation_request_version=allocation_request_version,
-                ):
+                with self.metrics.timer('placement.claim_resources'):
+                    claimed = utils.claim_resources(
+                        elevated, self.placement_client, spec_obj,
+                        instance_uuid, alloc_req,
+                        allocation_request_version=allocation_request_version)
+                if claimed:
                     claimed_host = host
                     break
 
@@ -511,6 +534,221 @@ class SchedulerManager(manager.Manager):
             claimed_alloc_reqs,
         )
 
+    @staticmethod
+    def _use_batch_scheduling(num_instances):
+        """Whether the instances should be scheduled as a batch."""
+        threshold = CONF.filter_scheduler.batch_scheduling_threshold
+        return threshold > 0 and num_instances >= max(threshold, 2)
+
+    def _schedule_batch(
+        self, context, elevated, spec_obj, instance_uuids, hosts, num_alts,
+        alloc_reqs_by_rp_uuid, allocation_request_version,
+    ):
+        """Select and claim a host for each instance of a large request.
+
+        This does the same as the per-instance loop of :meth:`_schedule`, but
+        the hosts are only filtered and weighed once. They are then kept in a
+        heap ordered by weight and, once a host has been selected for an
+        instance, only that host is weighed again before being put back in the
+        heap. The allocations are claimed in chunks of
+        ``[filter_scheduler] batch_claim_size`` instances.
+        """
+        num_instances = len(instance_uuids)
+        host_subset_size = CONF.filter_scheduler.host_subset_size
+        batch_claim_size = CONF.filter_scheduler.batch_claim_size
+        shuffle = CONF.filter_scheduler.shuffle_best_same_weighed_hosts
+
+        spec_obj.instance_uuid = instance_uuids[0]
+        spec_obj.obj_reset_changes(['instance_uuid'])
+        filtered_hosts = self.host_manager.get_filtered_hosts(
+            hosts, spec_obj, 0) or []
+        LOG.debug("Filtered %(hosts)s", {'hosts': filtered_hosts})
+        weighing = self.host_manager.get_incrementally_weighed_hosts(
+            filtered_hosts, spec_obj)
+        LOG.debug("Weighed %(hosts)s", {'hosts': weighing.weighed_objs})
+
+        # The heap entries are (-weight, tiebreak, sequence, weighed_host).
+        # Hosts with the same weight keep their order unless
+        # shuffle_best_same_weighed_hosts is set, and the unique sequence
+        # number prevents the WeighedHost objects from ever being compared.
+        heap = []
+        sequence = itertools.count()
+
+        def push(weighed_host):
+            tiebreak = random.random() if shuffle else next(sequence)
+            heapq.heappush(
+                heap,
+                (-weighed_host.weight, tiebreak, next(sequence),
+                 weighed_host))
+
+        for weighed_host in weighing.weighed_objs:
+            push(weighed_host)
+
+        # The hosts whose claim failed during this request
+        excluded = set()
+
+        def pop(index):
+            candidates = []
+            while heap and len(candidates) < host_subset_size:
+                entry = heapq.heappop(heap)
+                host = entry[-1].obj
+                if host in excluded:
+                    continue
+
+                if not host.allocation_candidates:
+                    LOG.debug(
+                        "The nova scheduler removed every allocation "
+                        "candidate for host %s so this host was skipped.",
+                        host)
+                    continue
+
+                # NOTE: Selecting a host for an instance only ever makes the
+                # hosts less suitable for the next instances, either because
+                # resources are consumed or because the server group of the
+                # request changes, so the hosts rejected here are dropped for
+                # the rest of the request.
+                if index > 0 and not self.host_manager.get_filtered_hosts(
+                    [host], spec_obj, index,
+                ):
+                    continue
+
+                candidates.append(entry)
+
+            if not candidates:
+                return None
+
+            # We randomize the selected host amongst the best ones to
+            # alleviate congestion, like _get_sorted_hosts() does.
+            chosen = random.choice(candidates)
+            for entry in candidates:
+                if entry is not chosen:
+                    heapq.heappush(heap, entry)
+            return chosen[-1]
+
+        # The selected hosts and allocation requests, by instance UUID, of the
+        # instances that were successfully claimed against in the placement
+        # API.
+        claimed = {}
+        # The (instance_uuid, host, alloc_req) tuples yet to be claimed
+        pending = []
+        remaining = collections.deque(instance_uuids)
+
+        while remaining:
+            instance_uuid = remaining.popleft()
+            spec_obj.instance_uuid = instance_uuid
+            spec_obj.obj_reset_changes(['instance_uuid'])
+
+            weighed_host = pop(len(claimed) + len(pending))
+            if weighed_host is None:
+                remaining.appendleft(instance_uuid)
+            else:
+                host = weighed_host.obj
+                alloc_req = host.allocation_candidates[0]
+                pending.append((instance_uuid, host, alloc_req))
+
+                for request_group in spec_obj.requested_resources:
+                    request_group.provider_uuids = alloc_req[
+                        'mappings'][request_group.requester_id]
+
+                self._consume_selected_host(
+                    host, spec_obj, instance_uuid=instance_uuid)
+                weighing.reweigh(weighed_host)
+                push(weighed_host)
+
+            failed = []
+            if pending and (
+                weighed_host is None or not remaining or
+                len(pending) >= batch_claim_size
+            ):
+                failed = self._claim_batch(
+                    elevated, spec_obj, pending, allocation_request_version)
+                failed_uuids = {uuid for uuid, _, _ in failed}
+                for instance_uuid, host, alloc_req in pending:
+                    if instance_uuid not in failed_uuids:
+                        claimed[instance_uuid] = (host, alloc_req)
+                pending = []
+
+                # Place the instances again, without the hosts we were not
+                # able to claim against. Those hosts had resources consumed
+                # for the failed instances, so make sure they are refreshed
+                # from the database by the next request.
+                for instance_uuid, host, alloc_req in failed:
+                    excluded.add(host)
+                    host.updated = None
+                remaining.extendleft(
+                    reversed([uuid for uuid, _, _ in failed]))
+
+            if weighed_host is None and not failed:
+                # NOTE(jaypipes): If we get here, that means not all instances
+                # in instance_uuids were able to be matched to a selected host.
+                # Any allocations will be cleaned up in the
+                # _ensure_sufficient_hosts() call.
+                break
+
+        claimed_instance_uuids = [
+            instance_uuid for instance_uuid in instance_uuids
+            if instance_uuid in claimed]
+        claimed_hosts = [
+            claimed[instance_uuid][0]
+            for instance_uuid in claimed_instance_uuids]
+        claimed_alloc_reqs = [
+            claimed[instance_uuid][1]
+            for instance_uuid in claimed_instance_uuids]
+
+        # Check if we were able to fulfill the request. If not, this call will
+        # raise a NoValidHost exception.
+        self._ensure_sufficient_hosts(
+            context, claimed_hosts, num_instances, claimed_instance_uuids)
+
+        hosts = [
+            entry[-1].obj for entry in sorted(heap)
+            if entry[-1].obj not in excluded]
+        return self._get_alternate_hosts(
+            claimed_hosts,
+            spec_obj,
+            hosts,
+            num_instances - 1,
+            num_alts,
+            alloc_reqs_by_rp_uuid,
+            allocation_request_version,
+            claimed_alloc_reqs,
+        )
+
+    def _claim_batch(
+        self, context, spec_obj, pending, allocation_request_version,
+    ):
+        """Claim the resources of several instances in the placement API.
+
+        The resources of all the instances are first claimed at once, falling
+        back to claiming them for each instance if that fails.
+
+        :param pending: The list of (instance_uuid, host, alloc_req) tuples to
+            claim.
+        :returns: The list of the (instance_uuid, host, alloc_req) tuples for
+            which the claim failed.
+        """
+        claims = [
+            (instance_uuid, alloc_req)
+            for instance_uuid, _, alloc_req in pending]
+        if len(claims) > 1:
+            with self.metrics.timer('placement.claim_resources_bulk'):
+                claimed = utils.claim_resources_bulk(
+                    context, self.placement_client, spec_obj, claims,
+                    allocation_request_version=allocation_request_version)
+            if claimed:
+                return []
+
+        failed = []
+        for instance_uuid, host, alloc_req in pending:
+            with self.metrics.timer('placement.claim_resources'):
+                claimed = utils.claim_resources(
+                    context, self.placement_client, spec_obj, instance_uuid,
+                    alloc_req,
+                    allocation_request_version=allocation_request_version)
+            if not claimed:
+                failed.append((instance_uuid, host, alloc_req))
+        return failed
+
     def _ensure_sufficient_hosts(
         self, context, hosts, required_count, claimed_uuids=None,
     ):
@@ -766,8 +1004,9 @@ class SchedulerManager(manager.Manager):
         compute_uuids = None
         if provider_summaries is not None:
             compute_uuids = list(provider_summaries.keys())
-        return self.host_manager.get_host_states_by_uuids(
-            context, compute_uuids, spec_obj)
+        with self.metrics.timer('host_manager.get_host_states_by_uuids'):
+            return self.host_manager.get_host_states_by_uuids(
+                context, compute_uuids, spec_obj)
 
     def update_aggregates(self, ctxt, aggregates):
         """Updates HostManager internal aggregates information.
@@ -0,0 +1,254 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Latency metrics of the scheduling decisions.
+
+The time spent in each phase of a scheduling request is aggregated in
+histograms, which are reported to the sink selected with
+``[scheduler] metrics_sink``.
+"""
+
+import bisect
+import collections
+import contextlib
+import functools
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from oslo_log import log as logging
+
+import nova.conf
+from nova import exception
+from nova.i18n import _
+
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# The upper bounds, in seconds, of the histogram buckets
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+METRICS = None
+
+
+class Histogram(object):
+    """A histogram of durations, in seconds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        # The last counter is for the values above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """Return the histogram as a dict of primitives.
+
+        The buckets are cumulative, as in the Prometheus format: each bucket
+        counts the values lower or equal to its upper bound.
+        """
+        buckets = []
+        cumulative = 0
+        for upper_bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append((upper_bound, cumulative))
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class MetricsSink(object):
+    """Base class of the destinations of the scheduling metrics."""
+
+    def observe(self, phase, seconds):
+        """Called for every timing of a phase."""
+
+    def flush(self, histograms):
+        """Called periodically with the histograms of all the phases.
+
+        :param histograms: A dict, keyed by phase, of the dicts returned by
+            :meth:`Histogram.to_dict`.
+        """
+
+
+class LogSink(MetricsSink):
+    """Log the number and the mean duration of the timings of each phase."""
+
+    def flush(self, histograms):
+        if not histograms:
+            return
+        LOG.info('Scheduler metrics: %s', ', '.join(
+            '%s: %d in %.3fs on average' % (
+                phase, histogram['count'],
+                histogram['sum'] / histogram['count'])
+            for phase, histogram in sorted(histograms.items())
+            if histogram['count']))
+
+
+class StatsdSink(MetricsSink):
+    """Send each timing to a statsd server."""
+
+    prefix = 'nova.scheduler'
+
+    def __init__(self, host, port):
+        family, _, _, _, address = socket.getaddrinfo(
+            host, port, type=socket.SOCK_DGRAM)[0]
+        self._address = address
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+
+    def observe(self, phase, seconds):
+        message = '%s.%s:%.3f|ms' % (self.prefix, phase, seconds * 1000)
+        try:
+            self._socket.sendto(message.encode('utf-8'), self._address)
+        except OSError as e:
+            LOG.debug('Unable to send scheduler metrics to statsd: %s', e)
+
+
+class PrometheusTextfileSink(MetricsSink):
+    """Write the histograms to a file in the Prometheus text format."""
+
+    name = 'nova_scheduler_phase_duration_seconds'
+
+    def __init__(self, path):
+        self.path = path
+
+    def format(self, histograms):
+        lines = [
+            '# HELP %s Duration of the phases of the scheduling requests.' %
+            self.name,
+            '# TYPE %s histogram' % self.name,
+        ]
+        for phase, histogram in sorted(histograms.items()):
+            for upper_bound, count in histogram['buckets']:
+                lines.append('%s_bucket{phase="%s",le="%s"} %d' % (
+                    self.name, phase, upper_bound, count))
+            lines.append('%s_bucket{phase="%s",le="+Inf"} %d' % (
+                self.name, phase, histogram['count']))
+            lines.append('%s_sum{phase="%s"} %r' % (
+                self.name, phase, histogram['sum']))
+            lines.append('%s_count{phase="%s"} %d' % (
+                self.name, phase, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self, histograms):
+        # Write to a temporary file first so that the collector never reads a
+        # partially written file.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.scheduler')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.format(histograms))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            LOG.warning('Unable to write the scheduler metrics to %s: %s',
+                        self.path, e)
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+
+class SchedulerMetrics(object):
+    """The histograms of the durations of the scheduling phases.
+
+    :param sink: The MetricsSink to report the metrics to, or None to disable
+        the collection of the metrics.
+    """
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._histograms = collections.defaultdict(Histogram)
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def observe(self, phase, seconds):
+        """Record the duration of a phase."""
+        if self.sink is None:
+            return
+        with self._lock:
+            self._histograms[phase].observe(seconds)
+        self.sink.observe(phase, seconds)
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """Context manager recording the time spent in its block."""
+        if self.sink is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Return a dict, keyed by phase, of the histograms as primitives."""
+        with self._lock:
+            return {phase: histogram.to_dict()
+                    for phase, histogram in self._histograms.items()}
+
+    def flush(self):
+        """Report the histograms to the sink."""
+        if self.sink is not None:
+            self.sink.flush(self.snapshot())
+
+
+def _get_sink():
+    sink = CONF.scheduler.metrics_sink
+    if sink == 'disabled':
+        return None
+    if sink == 'statsd':
+        return StatsdSink(CONF.scheduler.metrics_statsd_host,
+                          CONF.scheduler.metrics_statsd_port)
+    if sink == 'prometheus_textfile':
+        if not CONF.scheduler.metrics_textfile_path:
+            raise exception.InvalidConfiguration(_(
+                '[scheduler] metrics_textfile_path is required when '
+                '[scheduler] metrics_sink is prometheus_textfile'))
+        return PrometheusTextfileSink(CONF.scheduler.metrics_textfile_path)
+    return LogSink()
+
+
+def get_metrics():
+    """Return the SchedulerMetrics singleton, configured from the options."""
+    global METRICS
+    if METRICS is None:
+        METRICS = SchedulerMetrics(_get_sink())
+    return METRICS
+
+
+def reset():
+    """Drop the SchedulerMetrics singleton, e.g. to reload its options."""
+    global METRICS
+    METRICS = None
+
+
+def timed(phase):
+    """Decorator recording the duration of the calls to a function."""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(phase):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
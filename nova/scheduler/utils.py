@@ -1110,6 +1110,7 @@ _SUPPORTS_AFFINITY = None
 _SUPPORTS_ANTI_AFFINITY = None
 _SUPPORTS_SOFT_AFFINITY = None
 _SUPPORTS_SOFT_ANTI_AFFINITY = None
+_NUMA_FIT_CACHE = None
 
 
 def reset_globals():
@@ -1121,6 +1122,23 @@ def reset_globals():
     _SUPPORTS_SOFT_AFFINITY = None
     global _SUPPORTS_SOFT_ANTI_AFFINITY
     _SUPPORTS_SOFT_ANTI_AFFINITY = None
+    global _NUMA_FIT_CACHE
+    _NUMA_FIT_CACHE = None
+
+
+def get_numa_fit_cache():
+    """Return the NUMAFitCache shared by the filters and the host states.
+
+    :returns: A nova.virt.hardware.NUMAFitCache, or None if
+        ``[filter_scheduler] numa_fit_cache_size`` is 0.
+    """
+    global _NUMA_FIT_CACHE
+    size = CONF.filter_scheduler.numa_fit_cache_size
+    if not size:
+        return None
+    if _NUMA_FIT_CACHE is None or _NUMA_FIT_CACHE.maxsize != size:
+        _NUMA_FIT_CACHE = hardware.NUMAFitCache(size)
+    return _NUMA_FIT_CACHE
 
 
 def _get_group_details(context, instance_uuid, user_group_hosts=None):
@@ -1264,6 +1282,25 @@ def request_is_rebuild(spec_obj):
     return check_type == ['rebuild']
 
 
+def _get_claim_owner(ctx, spec_obj):
+    """Return the (project_id, user_id) tuple to claim resources for."""
+    project_id = spec_obj.project_id
+
+    # We didn't start storing the user_id in the RequestSpec until Rocky so
+    # if it's not set on an old RequestSpec, use the user_id from the context.
+    if 'user_id' in spec_obj and spec_obj.user_id:
+        user_id = spec_obj.user_id
+    else:
+        # FIXME(mriedem): This would actually break accounting if we relied on
+        # the allocations for something like counting quota usage because in
+        # the case of migrating or evacuating an instance, the user here is
+        # likely the admin, not the owner of the instance, so the allocation
+        # would be tracked against the wrong user.
+        user_id = ctx.user_id
+
+    return project_id, user_id
+
+
 def claim_resources(ctx, client, spec_obj, instance_uuid, alloc_req,
         allocation_request_version=None):
     """Given an instance UUID (representing the consumer of resources) and the
@@ -1296,19 +1333,7 @@ def claim_resources(ctx, client, spec_obj, instance_uuid, alloc_req,
     LOG.debug("Attempting to claim resources in the placement API for "
               "instance %s", instance_uuid)
 
-    project_id = spec_obj.project_id
-
-    # We didn't start storing the user_id in the RequestSpec until Rocky so
-    # if it's not set on an old RequestSpec, use the user_id from the context.
-    if 'user_id' in spec_obj and spec_obj.user_id:
-        user_id = spec_obj.user_id
-    else:
-        # FIXME(mriedem): This would actually break accounting if we relied on
-        # the allocations for something like counting quota usage because in
-        # the case of migrating or evacuating an instance, the user here is
-        # likely the admin, not the owner of the instance, so the allocation
-        # would be tracked against the wrong user.
-        user_id = ctx.user_id
+    project_id, user_id = _get_claim_owner(ctx, spec_obj)
 
     # NOTE(gibi): this could raise AllocationUpdateFailed which means there is
     # a serious issue with the instance_uuid as a consumer. Every caller of
@@ -1323,6 +1348,41 @@ def claim_resources(ctx, client, spec_obj, instance_uuid, alloc_req,
             consumer_generation=None)
 
 
+def claim_resources_bulk(ctx, client, spec_obj, claims,
+        allocation_request_version=None):
+    """Given a list of (instance UUID, allocation_request) tuples, attempt to
+    claim resources for all the instances with a single placement API call.
+    Returns True if the resources were claimed for all the instances, False
+    otherwise, in which case nothing has been claimed.
+
+    This only works for new consumers, so callers should fall back to
+    :func:`claim_resources` for each instance when this returns False.
+
+    :param ctx: The RequestContext object
+    :param client: The scheduler client to use for making the claim call
+    :param spec_obj: The RequestSpec object - needed to get the project_id
+    :param claims: The list of (instance_uuid, alloc_req) tuples to claim.
+    :param allocation_request_version: The microversion used to request the
+                                       allocations.
+    """
+    if request_is_rebuild(spec_obj):
+        # NOTE(danms): This is a rebuild-only scheduling request, so we should
+        # not be doing any extra claiming
+        LOG.debug('Not claiming resources in the placement API for '
+                  'rebuild-only scheduling of instances %(uuids)s',
+                  {'uuids': [uuid for uuid, _ in claims]})
+        return True
+
+    LOG.debug("Attempting to claim resources in the placement API for "
+              "instances %s", [uuid for uuid, _ in claims])
+
+    project_id, user_id = _get_claim_owner(ctx, spec_obj)
+
+    return bool(client.claim_resources_bulk(
+        ctx, claims, project_id, user_id,
+        allocation_request_version=allocation_request_version))
+
+
 def get_weight_multiplier(host_state, multiplier_name, multiplier_config):
     """Given a HostState object, multplier_type name and multiplier_config,
     returns the weight multiplier.
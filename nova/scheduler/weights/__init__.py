@@ -17,10 +17,19 @@
 Scheduler host weights
 """
 
+from oslo_log import log as logging
+
+import nova.conf
+from nova.scheduler import metrics as scheduler_metrics
 from nova import weights
 
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
 
 class WeighedHost(weights.WeighedObject):
+    __slots__ = ()
+
     def to_dict(self):
         x = dict(weight=self.weight)
         x['host'] = self.obj.host
@@ -33,7 +42,29 @@ class WeighedHost(weights.WeighedObject):
 
 class BaseHostWeigher(weights.BaseWeigher):
     """Base class for host weights."""
-    pass
+
+    # Set in the subclasses whose weight_multiplier() only depends on the
+    # configuration and on the metadata of the host aggregates, so that it is
+    # only computed once per distinct set of aggregates.
+    multiplier_by_aggregates = False
+
+    def weight_multipliers(self, host_states):
+        """Return the weight multipliers of multiple hosts.
+
+        See multiplier_by_aggregates.
+        """
+        if not self.multiplier_by_aggregates:
+            return super(BaseHostWeigher, self).weight_multipliers(
+                host_states)
+
+        multipliers = {}
+        result = []
+        for host_state in host_states:
+            key = tuple(id(agg) for agg in host_state.aggregates)
+            if key not in multipliers:
+                multipliers[key] = self.weight_multiplier(host_state)
+            result.append(multipliers[key])
+        return result
 
 
 class HostWeightHandler(weights.BaseWeightHandler):
@@ -41,6 +72,26 @@ class HostWeightHandler(weights.BaseWeightHandler):
 
     def __init__(self):
         super(HostWeightHandler, self).__init__(BaseHostWeigher)
+        self._warned_no_numpy = False
+
+    def _use_columnar_weighing(self):
+        if not CONF.filter_scheduler.columnar_weighing:
+            return False
+
+        if weights.numpy is None:
+            if not self._warned_no_numpy:
+                LOG.warning(
+                    'The [filter_scheduler] columnar_weighing option is '
+                    'enabled but numpy is not installed; falling back to '
+                    'per-host weighing.')
+                self._warned_no_numpy = True
+            return False
+
+        return True
+
+    def _observe_weigher_time(self, cls_name, seconds):
+        scheduler_metrics.get_metrics().observe(
+            'weigher.%s' % cls_name, seconds)
 
 
 def all_weighers():
@@ -34,6 +34,7 @@ LOG = logging.getLogger(__name__)
 
 
 class _SoftAffinityWeigherBase(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
     policy_name = None
 
     def _weigh_object(self, host_state, request_spec):
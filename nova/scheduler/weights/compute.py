@@ -23,6 +23,8 @@ CONF = nova.conf.CONF
 
 
 class BuildFailureWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
+
     def weight_multiplier(self, host_state):
         """Override the weight multiplier. Note this is negated."""
         return -1 * utils.get_weight_multiplier(
@@ -34,3 +36,6 @@ class BuildFailureWeigher(weights.BaseHostWeigher):
            weight by number of failed builds.
         """
         return host_state.failed_builds
+
+    def weigh_columns(self, columns, weight_properties):
+        return columns.get('failed_builds')
@@ -30,6 +30,7 @@ CONF = nova.conf.CONF
 
 
 class CPUWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
     minval = 0
 
     def weight_multiplier(self, host_state):
@@ -44,3 +45,8 @@ class CPUWeigher(weights.BaseHostWeigher):
             host_state.vcpus_total * host_state.cpu_allocation_ratio -
             host_state.vcpus_used)
         return vcpus_free
+
+    def weigh_columns(self, columns, weight_properties):
+        return (
+            columns.get('vcpus_total') * columns.get('cpu_allocation_ratio') -
+            columns.get('vcpus_used'))
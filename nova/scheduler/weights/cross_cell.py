@@ -24,6 +24,7 @@ CONF = conf.CONF
 
 
 class CrossCellWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
 
     def weight_multiplier(self, host_state):
         """How weighted this weigher should be."""
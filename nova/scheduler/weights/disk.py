@@ -29,6 +29,7 @@ CONF = nova.conf.CONF
 
 
 class DiskWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
     minval = 0
 
     def weight_multiplier(self, host_state):
@@ -40,3 +41,6 @@ class DiskWeigher(weights.BaseHostWeigher):
     def _weigh_object(self, host_state, weight_properties):
         """Higher weights win.  We want spreading to be the default."""
         return host_state.free_disk_mb
+
+    def weigh_columns(self, columns, weight_properties):
+        return columns.get('free_disk_mb')
@@ -26,6 +26,7 @@ CONF = nova.conf.CONF
 
 
 class HypervisorVersionWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
 
     def weight_multiplier(self, host_state):
         """Override the weight multiplier."""
@@ -37,3 +38,6 @@ class HypervisorVersionWeigher(weights.BaseHostWeigher):
         """Higher weights win.  We want newer hosts by default."""
         # convert None to 0
         return host_state.hypervisor_version or 0
+
+    def weigh_columns(self, columns, weight_properties):
+        return columns.get('hypervisor_version')
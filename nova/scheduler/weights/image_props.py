@@ -30,6 +30,8 @@ CONF = nova.conf.CONF
 
 
 class ImagePropertiesWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
+
     def __init__(self):
         self._parse_setting()
 
@@ -29,6 +29,7 @@ CONF = nova.conf.CONF
 
 
 class IoOpsWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
     minval = 0
 
     def weight_multiplier(self, host_state):
@@ -42,3 +43,6 @@ class IoOpsWeigher(weights.BaseHostWeigher):
         to be the default.
         """
         return host_state.num_io_ops
+
+    def weigh_columns(self, columns, weight_properties):
+        return columns.get('num_io_ops')
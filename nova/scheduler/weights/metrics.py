@@ -36,6 +36,8 @@ CONF = nova.conf.CONF
 
 
 class MetricsWeigher(weights.BaseHostWeigher):
+    multiplier_by_aggregates = True
+
     def __init__(self):
         self._parse_setting()
 
@@ -27,6 +27,7 @@ from .neutron import NeutronFixture  # noqa: F401, H304
 from .notifications import NotificationFixture  # noqa: F401, H304
 from .nova import *  # noqa: F401, F403, H303, H304
 from .os_brick import OSBrickFixture  # noqa: F401, H304
+from .placement import LocalPlacementFixture  # noqa: F401, H304
 from .policy import OverridePolicyFixture  # noqa: F401, H304
 from .policy import PolicyFixture  # noqa: F401, H304
 from .policy import RealPolicyFixture  # noqa: F401, H304
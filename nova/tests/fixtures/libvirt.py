@@ -184,6 +184,11 @@ VIR_DOMAIN_BLOCK_COMMIT_RELATIVE = 4
 VIR_CONNECT_LIST_DOMAINS_ACTIVE = 1
 VIR_CONNECT_LIST_DOMAINS_INACTIVE = 2
 
+# virConnectGetAllDomainStats stats and flags
+VIR_DOMAIN_STATS_STATE = 1
+VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE = 1
+VIR_CONNECT_GET_ALL_DOMAINS_STATS_INACTIVE = 2
+
 # virConnectListAllNodeDevices flags
 VIR_CONNECT_LIST_NODE_DEVICES_CAP_PCI_DEV = 2
 VIR_CONNECT_LIST_NODE_DEVICES_CAP_NET = 1 << 4
@@ -1984,6 +1989,28 @@ class Connection(object):
                     vms.append(vm)
         return vms
 
+    def getAllDomainStats(self, stats=0, flags=0):
+        # Both the active and inactive domains are returned if neither flag
+        # is set
+        states = flags & (VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE |
+                          VIR_CONNECT_GET_ALL_DOMAINS_STATS_INACTIVE)
+        if not states:
+            states = (VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE |
+                      VIR_CONNECT_GET_ALL_DOMAINS_STATS_INACTIVE)
+        records = []
+        for vm in self._vms.values():
+            if vm._state != VIR_DOMAIN_SHUTOFF:
+                if not states & VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE:
+                    continue
+            elif not states & VIR_CONNECT_GET_ALL_DOMAINS_STATS_INACTIVE:
+                continue
+            record = {}
+            if stats & VIR_DOMAIN_STATS_STATE:
+                record['state.state'] = vm._state
+                record['state.reason'] = 0
+            records.append((vm, record))
+        return records
+
     def _emit_lifecycle(self, dom, event, detail):
         if VIR_DOMAIN_EVENT_ID_LIFECYCLE not in self._event_callbacks:
             return
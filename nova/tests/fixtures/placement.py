@@ -0,0 +1,162 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+
+import fixtures
+
+
+class LocalPlacementFixture(fixtures.Fixture):
+    """A fixture faking the placement service in memory.
+
+    Unlike the functional PlacementFixture, which runs the real placement
+    application, this only models root resource providers with flat
+    inventories, which is enough to drive the scheduler at a large scale
+    without any database or HTTP round trip.
+
+    Providers are registered with :meth:`add_provider`. The
+    ``SchedulerReportClient`` methods used by the scheduler to get allocation
+    candidates and to claim or delete allocations are stubbed to work against
+    those providers.
+    """
+
+    version = '1.36'
+
+    def __init__(self):
+        super().__init__()
+        # Dict, keyed by provider UUID, of dicts of inventories keyed by
+        # resource class
+        self.inventories = {}
+        # Dict, keyed by provider UUID, of dicts of used amounts keyed by
+        # resource class
+        self.usages = {}
+        # Dict, keyed by consumer UUID, of the allocations of the consumer
+        self.allocations = {}
+        self.generations = {}
+        self.calls = collections.Counter()
+
+    def setUp(self):
+        super().setUp()
+
+        # Building the client would otherwise require a keystone auth plugin
+        self.useFixture(fixtures.MockPatch(
+            'nova.scheduler.client.report.SchedulerReportClient.'
+            '_create_client'))
+        for name in (
+            'get_allocation_candidates', 'claim_resources',
+            'claim_resources_bulk', 'delete_allocation_for_instance',
+        ):
+            self.useFixture(fixtures.MonkeyPatch(
+                'nova.scheduler.client.report.SchedulerReportClient.' + name,
+                getattr(self, '_fake_' + name)))
+
+    def add_provider(self, rp_uuid, inventories):
+        """Register a root resource provider.
+
+        :param rp_uuid: The UUID of the provider, which is also the UUID of
+            the compute node.
+        :param inventories: A dict, keyed by resource class, of dicts with
+            the ``total``, ``reserved`` and ``allocation_ratio`` keys.
+        """
+        self.inventories[rp_uuid] = copy.deepcopy(inventories)
+        self.usages[rp_uuid] = collections.Counter()
+        self.generations[rp_uuid] = 0
+
+    def _capacity(self, rp_uuid, rc):
+        inventory = self.inventories[rp_uuid][rc]
+        return int(
+            (inventory['total'] - inventory.get('reserved', 0)) *
+            inventory.get('allocation_ratio', 1.0))
+
+    def _fits(self, rp_uuid, resources):
+        inventories = self.inventories[rp_uuid]
+        for rc, amount in resources.items():
+            if rc not in inventories:
+                return False
+            if self.usages[rp_uuid][rc] + amount > self._capacity(rp_uuid, rc):
+                return False
+        return True
+
+    def _fake_get_allocation_candidates(self, client, context, resources):
+        self.calls['get_allocation_candidates'] += 1
+        requested = {
+            rc: amount for rc, amount in resources.merged_resources().items()
+            if amount}
+        alloc_reqs = []
+        provider_summaries = {}
+        for rp_uuid in self.inventories:
+            if not self._fits(rp_uuid, requested):
+                continue
+            alloc_reqs.append({
+                'allocations': {rp_uuid: {'resources': dict(requested)}},
+                'mappings': {'': [rp_uuid]},
+            })
+            provider_summaries[rp_uuid] = {
+                'resources': {
+                    rc: {
+                        'capacity': self._capacity(rp_uuid, rc),
+                        'used': self.usages[rp_uuid][rc],
+                    } for rc in self.inventories[rp_uuid]
+                },
+                'traits': [],
+                'parent_provider_uuid': None,
+                'root_provider_uuid': rp_uuid,
+            }
+        return alloc_reqs, provider_summaries, self.version
+
+    def _claim(self, consumer_uuid, allocations):
+        if consumer_uuid in self.allocations:
+            return False
+        for rp_uuid, alloc in allocations.items():
+            if not self._fits(rp_uuid, alloc['resources']):
+                return False
+        for rp_uuid, alloc in allocations.items():
+            self.usages[rp_uuid].update(alloc['resources'])
+            self.generations[rp_uuid] += 1
+        self.allocations[consumer_uuid] = copy.deepcopy(allocations)
+        return True
+
+    def _fake_claim_resources(
+        self, client, context, consumer_uuid, alloc_request, project_id,
+        user_id, allocation_request_version, consumer_generation=None,
+    ):
+        self.calls['claim_resources'] += 1
+        return self._claim(consumer_uuid, alloc_request['allocations'])
+
+    def _fake_claim_resources_bulk(
+        self, client, context, claims, project_id, user_id,
+        allocation_request_version,
+    ):
+        self.calls['claim_resources_bulk'] += 1
+        claimed = []
+        for consumer_uuid, alloc_request in claims:
+            if not self._claim(consumer_uuid, alloc_request['allocations']):
+                # The real API is all or nothing
+                for uuid in claimed:
+                    self._delete(uuid)
+                return False
+            claimed.append(consumer_uuid)
+        return True
+
+    def _delete(self, consumer_uuid):
+        allocations = self.allocations.pop(consumer_uuid, {})
+        for rp_uuid, alloc in allocations.items():
+            self.usages[rp_uuid].subtract(alloc['resources'])
+            self.generations[rp_uuid] += 1
+        return bool(allocations)
+
+    def _fake_delete_allocation_for_instance(
+        self, client, context, uuid, consumer_type='instance', force=False,
+    ):
+        self.calls['delete_allocation_for_instance'] += 1
+        return self._delete(uuid)
@@ -0,0 +1,492 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Offline replay benchmark of the scheduler.
+
+A stream of RequestSpecs, either generated or recorded in a JSON file, is
+replayed through ``SchedulerManager._schedule`` against a set of synthetic
+hosts, with NUMA topologies, PCI device pools and aggregates, backed by an
+in-memory placement. The throughput, the latency percentiles and the memory
+usage of the replay are then reported, along with the time spent in each
+scheduling phase, filter and weigher.
+
+It can be run with::
+
+    tox -e scheduler-replay -- --hosts 1000 --requests 500
+
+Use ``--record`` to save the generated RequestSpecs so that the very same
+stream can be replayed with ``--specs`` after changing the code or the
+configuration, e.g. ``[filter_scheduler] host_subset_size``, given with
+``--config-file``.
+"""
+
+import argparse
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import fixtures
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+import nova.conf
+from nova import context as nova_context
+from nova import exception
+from nova import objects
+from nova.scheduler import manager
+from nova.scheduler import metrics as scheduler_metrics
+from nova.scheduler import utils as scheduler_utils
+from nova.tests import fixtures as nova_fixtures
+from nova.virt import hardware
+
+CONF = nova.conf.CONF
+
+# The filters enabled by default in the replay, which on top of the default
+# filters include the ones using the NUMA topologies, PCI pools and
+# aggregates of the synthetic hosts.
+DEFAULT_FILTERS = [
+    'ComputeFilter',
+    'ComputeCapabilitiesFilter',
+    'ImagePropertiesFilter',
+    'ServerGroupAntiAffinityFilter',
+    'ServerGroupAffinityFilter',
+    'AggregateInstanceExtraSpecsFilter',
+    'NUMATopologyFilter',
+    'PciPassthroughFilter',
+]
+
+PCI_VENDOR_ID = '8086'
+PCI_PRODUCT_ID = '154d'
+
+# The flavors of the generated RequestSpecs, with their relative frequency
+FLAVORS = [
+    (50, dict(name='small', vcpus=1, memory_mb=2048, root_gb=20,
+              extra_specs={})),
+    (20, dict(name='numa', vcpus=4, memory_mb=8192, root_gb=40,
+              extra_specs={'hw:numa_nodes': '2'})),
+    (15, dict(name='pinned', vcpus=4, memory_mb=4096, root_gb=40,
+              extra_specs={'hw:cpu_policy': 'dedicated'})),
+    (10, dict(name='pci', vcpus=2, memory_mb=4096, root_gb=20,
+              extra_specs={'hw:numa_nodes': '1'})),
+    (5, dict(name='ssd', vcpus=2, memory_mb=4096, root_gb=80,
+             extra_specs={'aggregate_instance_extra_specs:ssd': 'true'})),
+]
+
+
+def _numa_topology(shared_cpus, dedicated_cpus, memory_mb, num_cells=2):
+    cells = []
+    cpus_per_cell = (shared_cpus + dedicated_cpus) // num_cells
+    for cell_id in range(num_cells):
+        first = cell_id * cpus_per_cell
+        cpus = list(range(first, first + cpus_per_cell))
+        pcpus = cpus[:dedicated_cpus // num_cells]
+        cells.append(objects.NUMACell(
+            id=cell_id,
+            cpuset=set(cpus) - set(pcpus),
+            pcpuset=set(pcpus),
+            memory=memory_mb // num_cells,
+            cpu_usage=0,
+            memory_usage=0,
+            socket=cell_id,
+            pinned_cpus=set(),
+            siblings=[{cpu} for cpu in cpus],
+            mempages=[objects.NUMAPagesTopology(
+                size_kb=4, total=memory_mb // num_cells * 256, used=0)],
+            network_metadata=objects.NetworkMetadata(
+                physnets=set(), tunneled=False)))
+    return objects.NUMATopology(cells=cells)
+
+
+def build_hosts(placement, num_hosts, seed=None, num_aggregates=10):
+    """Build the ComputeNodes, Services and Aggregates of synthetic hosts.
+
+    The hosts are also registered as resource providers in the placement
+    fixture.
+
+    :param placement: The LocalPlacementFixture backing the hosts.
+    :param num_hosts: The number of hosts to build.
+    :param seed: The seed of the random generator, for reproducible hosts.
+    :param num_aggregates: The number of aggregates the hosts belong to.
+    :returns: A tuple of the lists of the ComputeNodes, Services and
+        Aggregates.
+    """
+    rand = random.Random(seed)
+    now = timeutils.utcnow(with_timezone=True)
+    aggregates = [
+        objects.Aggregate(
+            id=agg_id, uuid=uuidutils.generate_uuid(),
+            name='agg%d' % agg_id, hosts=[],
+            metadata={'ssd': 'true'} if agg_id % 2 else {})
+        for agg_id in range(1, num_aggregates + 1)]
+    computes = []
+    services = []
+    for index in range(num_hosts):
+        host = 'host%05d' % index
+        shared_cpus, dedicated_cpus = rand.choice([(32, 16), (48, 16)])
+        memory_mb = rand.choice([131072, 262144])
+        disk_gb = 2000
+        numa_topology = _numa_topology(shared_cpus, dedicated_cpus, memory_mb)
+        pools = [
+            objects.PciDevicePool(
+                vendor_id=PCI_VENDOR_ID, product_id=PCI_PRODUCT_ID,
+                numa_node=cell.id, count=rand.randint(0, 4),
+                tags={'dev_type': 'type-PCI'})
+            for cell in numa_topology.cells]
+        compute = objects.ComputeNode(
+            id=index + 1, uuid=uuidutils.generate_uuid(), host=host,
+            hypervisor_hostname=host, hypervisor_type='QEMU',
+            hypervisor_version=8000000, host_ip='192.168.0.%d' % (index % 250),
+            cpu_info='{}', vcpus=shared_cpus, vcpus_used=0,
+            memory_mb=memory_mb, memory_mb_used=0, free_ram_mb=memory_mb,
+            local_gb=disk_gb, local_gb_used=0, free_disk_gb=disk_gb,
+            disk_available_least=disk_gb, running_vms=0,
+            current_workload=0, stats={}, metrics='[]',
+            supported_hv_specs=[objects.HVSpec(
+                arch='x86_64', hv_type='kvm', vm_mode='hvm')],
+            numa_topology=numa_topology._to_json(),
+            pci_device_pools=objects.PciDevicePoolList(objects=pools),
+            cpu_allocation_ratio=4.0, ram_allocation_ratio=1.0,
+            disk_allocation_ratio=1.0, updated_at=now)
+        computes.append(compute)
+        services.append(objects.Service(
+            id=index + 1, host=host, binary='nova-compute',
+            topic='compute', disabled=False, forced_down=False,
+            updated_at=now, last_seen_up=now))
+        for aggregate in rand.sample(aggregates, min(2, num_aggregates)):
+            aggregate.hosts.append(host)
+        placement.add_provider(compute.uuid, {
+            'VCPU': {'total': shared_cpus, 'allocation_ratio': 4.0},
+            'PCPU': {'total': dedicated_cpus},
+            'MEMORY_MB': {'total': memory_mb},
+            'DISK_GB': {'total': disk_gb},
+        })
+    return computes, services, aggregates
+
+
+def generate_request_specs(context, num_requests, seed=None):
+    """Generate a stream of RequestSpecs mixing the FLAVORS."""
+    rand = random.Random(seed)
+    weights = [weight for weight, _ in FLAVORS]
+    flavors = [
+        objects.Flavor(id=flavor_id, flavorid=str(flavor_id), swap=0,
+                       ephemeral_gb=0, rxtx_factor=1.0, disabled=False,
+                       is_public=True, **dict(kwargs))
+        for flavor_id, (_, kwargs) in enumerate(FLAVORS, 1)]
+    specs = []
+    for _ in range(num_requests):
+        flavor = rand.choices(flavors, weights)[0]
+        instance_uuid = uuidutils.generate_uuid()
+        image = objects.ImageMeta.from_dict({
+            'id': uuidutils.generate_uuid(), 'properties': {}})
+        pci_requests = None
+        if flavor.name == 'pci':
+            pci_requests = objects.InstancePCIRequests(
+                instance_uuid=instance_uuid,
+                requests=[objects.InstancePCIRequest(
+                    count=1, request_id=uuidutils.generate_uuid(),
+                    spec=[{'vendor_id': PCI_VENDOR_ID,
+                           'product_id': PCI_PRODUCT_ID}])])
+        spec = objects.RequestSpec.from_components(
+            context, instance_uuid, image, flavor,
+            hardware.numa_get_constraints(flavor, image), pci_requests,
+            {}, None, None)
+        spec.requested_resources = []
+        spec.num_instances = rand.choices([1, 2, 5], [90, 8, 2])[0]
+        specs.append(spec)
+    return specs
+
+
+def dump_request_specs(path, specs):
+    """Record a stream of RequestSpecs to a JSON file."""
+    with open(path, 'w') as f:
+        jsonutils.dump([spec.obj_to_primitive() for spec in specs], f)
+
+
+def load_request_specs(path):
+    """Load a stream of RequestSpecs recorded with dump_request_specs."""
+    with open(path, 'rb') as f:
+        return [objects.RequestSpec.obj_from_primitive(primitive)
+                for primitive in jsonutils.load(f)]
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a sorted list of values."""
+    if not values:
+        return None
+    rank = max(int(round(percent / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class ReplayResult(object):
+    """The measures of a replay."""
+
+    def __init__(self, latencies, failures, elapsed, max_rss_kb,
+                 traced_peak=None, phases=None):
+        self.latencies = sorted(latencies)
+        self.failures = failures
+        self.elapsed = elapsed
+        self.max_rss_kb = max_rss_kb
+        self.traced_peak = traced_peak
+        self.phases = phases or {}
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        """The number of scheduling requests handled per second."""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'p50': percentile(self.latencies, 50),
+            'p99': percentile(self.latencies, 99),
+            'max_rss_kb': self.max_rss_kb,
+            'traced_peak': self.traced_peak,
+            'phases': {
+                phase: {'count': histogram['count'],
+                        'mean': histogram['sum'] / histogram['count']}
+                for phase, histogram in self.phases.items()
+                if histogram['count']
+            },
+        }
+
+    def format(self):
+        result = self.to_dict()
+        lines = [
+            'requests:   %d (%d failed)' % (
+                result['requests'], result['failures']),
+            'throughput: %.1f req/s' % result['throughput'],
+            'latency:    p50 %.2f ms, p99 %.2f ms' % (
+                (result['p50'] or 0) * 1000, (result['p99'] or 0) * 1000),
+            'max RSS:    %.1f MiB' % (result['max_rss_kb'] / 1024.0),
+        ]
+        if result['traced_peak'] is not None:
+            lines.append('traced peak: %.1f MiB' % (
+                result['traced_peak'] / 1024.0 / 1024.0))
+        for phase, stats in sorted(result['phases'].items()):
+            lines.append('  %-60s %8d x %.3f ms' % (
+                phase, stats['count'], stats['mean'] * 1000))
+        return '\n'.join(lines)
+
+
+class SchedulerReplayFixture(fixtures.Fixture):
+    """Run a SchedulerManager against synthetic hosts.
+
+    The HostStates are built once from the given ComputeNodes, through the
+    regular HostManager code, and are then kept for the whole replay so that
+    the resources consumed by each request are seen by the next ones, as with
+    ``[filter_scheduler] host_state_cache``. The hosts are never reported
+    down, whatever the duration of the replay.
+
+    :param placement: The LocalPlacementFixture backing the hosts.
+    :param computes: The ComputeNodes returned by :func:`build_hosts`.
+    :param services: The Services returned by :func:`build_hosts`.
+    :param aggregates: The Aggregates returned by :func:`build_hosts`.
+    :param enabled_filters: The list of filters to enable, defaulting to
+        DEFAULT_FILTERS, or None to use ``[filter_scheduler]
+        enabled_filters``.
+    """
+
+    def __init__(self, placement, computes, services, aggregates,
+                 enabled_filters=DEFAULT_FILTERS):
+        super().__init__()
+        self.placement = placement
+        self.computes = computes
+        self.services = services
+        self.aggregates = aggregates
+        self.enabled_filters = enabled_filters
+
+    def setUp(self):
+        super().setUp()
+        self.context = nova_context.get_admin_context()
+        if self.enabled_filters is not None:
+            CONF.set_override(
+                'enabled_filters', self.enabled_filters,
+                group='filter_scheduler')
+            self.addCleanup(
+                CONF.clear_override, 'enabled_filters',
+                group='filter_scheduler')
+        CONF.set_override('metrics_sink', 'log', group='scheduler')
+        self.addCleanup(
+            CONF.clear_override, 'metrics_sink', group='scheduler')
+        scheduler_metrics.reset()
+        self.addCleanup(scheduler_metrics.reset)
+
+        cell_uuid = uuidutils.generate_uuid()
+        for name in (
+            'refresh_cells_caches', '_init_aggregates', '_init_instance_info',
+        ):
+            self.useFixture(fixtures.MockPatch(
+                'nova.scheduler.host_manager.HostManager.' + name))
+        self.useFixture(fixtures.MockPatch(
+            'nova.rpc.get_notifier'))
+        self.useFixture(fixtures.MockPatch(
+            'nova.servicegroup.API.service_is_up', return_value=True))
+
+        self.manager = manager.SchedulerManager()
+        host_manager = self.manager.host_manager
+        host_manager.update_aggregates(self.aggregates)
+        # The hosts start empty, as reported by their nova-compute services
+        host_manager._instance_info = {
+            compute.host: {'instances': {}, 'updated': True}
+            for compute in self.computes}
+        self.host_states = {
+            host_state.uuid: host_state
+            for host_state in host_manager._get_host_states(
+                self.context, {cell_uuid: self.computes},
+                {service.host: service for service in self.services})
+        }
+
+        def get_host_states_by_uuids(context, compute_uuids, spec_obj):
+            if compute_uuids is None:
+                return iter(self.host_states.values())
+            return (self.host_states[uuid] for uuid in compute_uuids
+                    if uuid in self.host_states)
+
+        host_manager.get_host_states_by_uuids = get_host_states_by_uuids
+
+    def schedule(self, spec_obj):
+        """Schedule a RequestSpec like select_destinations does.
+
+        :returns: The number of seconds spent in ``_schedule``.
+        :raises: NoValidHost if the request could not be scheduled.
+        """
+        instance_uuids = [
+            uuidutils.generate_uuid() for _ in range(spec_obj.num_instances)]
+        resources = scheduler_utils.resources_from_request_spec(
+            self.context, spec_obj, self.manager.host_manager,
+            enable_pinning_translate=True)
+        alloc_reqs, provider_summaries, version = (
+            self.manager.placement_client.get_allocation_candidates(
+                self.context, resources))
+        if not alloc_reqs:
+            raise exception.NoValidHost(reason='')
+        alloc_reqs_by_rp_uuid = {}
+        for alloc_req in alloc_reqs:
+            for rp_uuid in alloc_req['allocations']:
+                alloc_reqs_by_rp_uuid.setdefault(rp_uuid, []).append(
+                    alloc_req)
+
+        start = time.perf_counter()
+        try:
+            self.manager._schedule(
+                self.context, spec_obj, instance_uuids,
+                alloc_reqs_by_rp_uuid, provider_summaries, version,
+                return_alternates=True)
+        finally:
+            elapsed = time.perf_counter() - start
+        return elapsed
+
+    def replay(self, specs, trace_memory=False):
+        """Replay a stream of RequestSpecs.
+
+        :param specs: The RequestSpecs to schedule, which are not modified.
+        :param trace_memory: Whether to trace the peak of the memory allocated
+            by the replay, which slows it down noticeably.
+        :returns: A ReplayResult.
+        """
+        latencies = []
+        failures = 0
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for spec in specs:
+                spec = spec.obj_clone()
+                try:
+                    latencies.append(self.schedule(spec))
+                except exception.NoValidHost:
+                    failures += 1
+            elapsed = time.perf_counter() - start
+            traced_peak = None
+            if trace_memory:
+                traced_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        return ReplayResult(
+            latencies, failures, elapsed,
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            traced_peak=traced_peak,
+            phases=self.manager.metrics.snapshot())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=1000,
+                        help='The number of synthetic hosts.')
+    parser.add_argument('--aggregates', type=int, default=10,
+                        help='The number of aggregates.')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='The number of RequestSpecs to generate, '
+                             'unless --specs is given.')
+    parser.add_argument('--specs',
+                        help='A JSON file of recorded RequestSpecs to '
+                             'replay.')
+    parser.add_argument('--record',
+                        help='Record the replayed RequestSpecs to this JSON '
+                             'file.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='The seed of the synthetic hosts and requests.')
+    parser.add_argument('--config-file', action='append', default=[],
+                        help='A nova configuration file to load, e.g. to '
+                             'tune the filters and weighers.')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Report the peak of the memory allocated by '
+                             'the replay, using tracemalloc.')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results as JSON.')
+    args = parser.parse_args(argv)
+
+    objects.register_all()
+    config_args = []
+    for config_file in args.config_file:
+        config_args.extend(['--config-file', config_file])
+    CONF(config_args, project='nova', default_config_files=[])
+
+    with nova_fixtures.LocalPlacementFixture() as placement:
+        computes, services, aggregates = build_hosts(
+            placement, args.hosts, seed=args.seed,
+            num_aggregates=args.aggregates)
+        # The filters of a configuration file prevail over ours
+        enabled_filters = None if args.config_file else DEFAULT_FILTERS
+        with SchedulerReplayFixture(
+            placement, computes, services, aggregates,
+            enabled_filters=enabled_filters,
+        ) as replay:
+            if args.specs:
+                specs = load_request_specs(args.specs)
+            else:
+                specs = generate_request_specs(
+                    replay.context, args.requests, seed=args.seed)
+            if args.record:
+                dump_request_specs(args.record, specs)
+            result = replay.replay(specs, trace_memory=args.trace_memory)
+
+    if args.json:
+        print(jsonutils.dumps(result.to_dict(), indent=2))
+    else:
+        print(result.format())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the serialization of the objects sent over RPC.
+
+Large ``InstanceList`` and ``ComputeNodeList`` payloads are serialized by
+``NovaObjectSerializer.serialize_entity``, as when they are sent over RPC,
+both with the serializers compiled per class by ``nova.objects.base`` and with
+the generic per-field serialization of oslo.versionedobjects. The mean
+duration of both is reported, after checking that they build the very same
+primitives.
+
+It can be run with::
+
+    tox -e serialization-benchmark -- --instances 1000 --computes 1000
+"""
+
+import argparse
+import sys
+import time
+
+import fixtures
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from oslo_versionedobjects import base as ovoo_base
+from oslo_versionedobjects import fixture as ovoo_fixture
+
+from nova import context as nova_context
+from nova.network import model as network_model
+from nova import objects
+from nova.objects import base as obj_base
+from nova.objects import fields
+
+
+def build_instances(context, num_instances):
+    """Build an InstanceList with the fields usually loaded by the API.
+
+    :param context: The RequestContext of the instances.
+    :param num_instances: The number of instances to build.
+    :returns: The InstanceList.
+    """
+    now = timeutils.utcnow(with_timezone=True)
+    flavor = objects.Flavor(
+        id=1, flavorid='1', name='m1.small', memory_mb=2048, vcpus=2,
+        root_gb=20, ephemeral_gb=0, swap=0, rxtx_factor=1.0,
+        vcpu_weight=0, disabled=False, is_public=True,
+        extra_specs={'hw:cpu_policy': 'shared'}, description=None)
+    instances = []
+    for index in range(num_instances):
+        instance_uuid = uuidutils.generate_uuid()
+        instances.append(objects.Instance(
+            context=context, id=index + 1, uuid=instance_uuid,
+            project_id='fake-project', user_id='fake-user',
+            display_name='server%05d' % index, hostname='server%05d' % index,
+            host='host%05d' % (index % 100), node='host%05d' % (index % 100),
+            vm_state='active', task_state=None, power_state=1,
+            image_ref=uuidutils.generate_uuid(), launched_at=now,
+            created_at=now, updated_at=now, deleted_at=None, deleted=False,
+            memory_mb=flavor.memory_mb, vcpus=flavor.vcpus,
+            root_gb=flavor.root_gb, ephemeral_gb=flavor.ephemeral_gb,
+            instance_type_id=flavor.id, availability_zone='nova',
+            locked=False, config_drive='', key_name=None,
+            flavor=flavor.obj_clone(), old_flavor=None, new_flavor=None,
+            metadata={'key': 'value'},
+            system_metadata={'image_base_image_ref': 'fake'},
+            info_cache=objects.InstanceInfoCache(
+                instance_uuid=instance_uuid,
+                network_info=network_model.NetworkInfo()),
+            security_groups=objects.SecurityGroupList(objects=[
+                objects.SecurityGroup(name='default')]),
+            tags=objects.TagList(objects=[
+                objects.Tag(resource_id=instance_uuid, tag='web')]),
+            numa_topology=objects.InstanceNUMATopology(
+                instance_uuid=instance_uuid,
+                cells=[objects.InstanceNUMACell(
+                    id=0, cpuset=set([0, 1]), pcpuset=set(), memory=2048,
+                    cpu_policy=fields.CPUAllocationPolicy.SHARED)])))
+    return objects.InstanceList(context, objects=instances)
+
+
+def build_compute_nodes(context, num_computes):
+    """Build a ComputeNodeList with the fields reported by the computes.
+
+    :param context: The RequestContext of the compute nodes.
+    :param num_computes: The number of compute nodes to build.
+    :returns: The ComputeNodeList.
+    """
+    now = timeutils.utcnow(with_timezone=True)
+    computes = []
+    for index in range(num_computes):
+        host = 'host%05d' % index
+        pools = [
+            objects.PciDevicePool(
+                vendor_id='8086', product_id='1520', numa_node=cell,
+                count=4, tags={'dev_type': 'type-PCI'})
+            for cell in (0, 1)]
+        computes.append(objects.ComputeNode(
+            context=context, id=index + 1, uuid=uuidutils.generate_uuid(),
+            host=host, hypervisor_hostname=host, hypervisor_type='QEMU',
+            hypervisor_version=8000000, host_ip='192.168.0.%d' % (index % 250),
+            cpu_info='{}', vcpus=64, vcpus_used=8, memory_mb=262144,
+            memory_mb_used=16384, free_ram_mb=245760, local_gb=2000,
+            local_gb_used=100, free_disk_gb=1900, disk_available_least=1900,
+            running_vms=4, current_workload=0,
+            stats={'num_instances': '4'}, metrics='[]',
+            supported_hv_specs=[objects.HVSpec(
+                arch='x86_64', hv_type='kvm', vm_mode='hvm')],
+            pci_device_pools=objects.PciDevicePoolList(objects=pools),
+            cpu_allocation_ratio=4.0, ram_allocation_ratio=1.0,
+            disk_allocation_ratio=1.0, created_at=now, updated_at=now,
+            deleted_at=None, deleted=False))
+    return objects.ComputeNodeList(context, objects=computes)
+
+
+class GenericSerializationFixture(fixtures.Fixture):
+    """Serialize the objects with the generic oslo.versionedobjects code."""
+
+    def setUp(self):
+        super().setUp()
+        # The changes are sorted by the compiled serializers, so sort them here
+        # too in order to compare the primitives
+        self.useFixture(ovoo_fixture.StableObjectJsonFixture())
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.objects.base.NovaObject.obj_to_primitive',
+            ovoo_base.VersionedObject.obj_to_primitive))
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.objects.base.NovaObject.obj_what_changed',
+            ovoo_base.VersionedObject.obj_what_changed))
+
+
+def _time(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def benchmark(context, payload, iterations=10):
+    """Compare the compiled and the generic serialization of a payload.
+
+    :param context: The RequestContext of the serializer.
+    :param payload: The object to serialize.
+    :param iterations: The number of serializations to time.
+    :returns: A dict of the mean durations of both serializations, in
+        seconds, and of the speedup of the compiled one.
+    :raises: AssertionError if both serializations differ.
+    """
+    serializer = obj_base.NovaObjectSerializer()
+
+    def serialize():
+        return serializer.serialize_entity(context, payload)
+
+    compiled = _time(serialize, iterations)
+    primitive = serialize()
+    with GenericSerializationFixture():
+        generic = _time(serialize, iterations)
+        generic_primitive = serialize()
+    if primitive != generic_primitive:
+        raise AssertionError(
+            'The compiled serialization of %s differs from the generic one' %
+            payload.obj_name())
+    return {
+        'compiled': compiled,
+        'generic': generic,
+        'speedup': generic / compiled,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=1000,
+                        help='The number of instances of the InstanceList.')
+    parser.add_argument('--computes', type=int, default=1000,
+                        help='The number of compute nodes of the '
+                             'ComputeNodeList.')
+    parser.add_argument('--iterations', type=int, default=10,
+                        help='The number of serializations to time.')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results as JSON.')
+    args = parser.parse_args(argv)
+
+    objects.register_all()
+    context = nova_context.get_admin_context()
+    instances = build_instances(context, args.instances)
+    computes = build_compute_nodes(context, args.computes)
+
+    results = {}
+    # The payloads are serialized both with their changes, as when they were
+    # just built, and without them, as when they were loaded from the
+    # database
+    for name, payload in (('InstanceList', instances),
+                          ('ComputeNodeList', computes)):
+        results[name] = benchmark(context, payload, args.iterations)
+        payload.obj_reset_changes(recursive=True)
+        results[name + ' (unchanged)'] = benchmark(
+            context, payload, args.iterations)
+
+    if args.json:
+        print(jsonutils.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print('%-30s compiled %8.2f ms  generic %8.2f ms  speedup %.1fx' %
+                  (name, result['compiled'] * 1000, result['generic'] * 1000,
+                   result['speedup']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+
+from nova import test
+from nova.tests import fixtures as nova_fixtures
+from nova.tests.functional import scheduler_replay
+
+
+class SchedulerReplayTestCase(test.NoDBTestCase):
+    """Make sure the scheduler replay harness keeps working."""
+
+    def setUp(self):
+        super().setUp()
+        self.placement = self.useFixture(
+            nova_fixtures.LocalPlacementFixture())
+        computes, services, aggregates = scheduler_replay.build_hosts(
+            self.placement, 10, seed=42, num_aggregates=4)
+        self.replay = self.useFixture(scheduler_replay.SchedulerReplayFixture(
+            self.placement, computes, services, aggregates))
+
+    def test_replay(self):
+        specs = scheduler_replay.generate_request_specs(
+            self.replay.context, 20, seed=42)
+
+        result = self.replay.replay(specs, trace_memory=True)
+
+        self.assertEqual(20, result.requests)
+        self.assertEqual(0, result.failures)
+        self.assertGreater(result.throughput, 0)
+        self.assertIsNotNone(result.traced_peak)
+        # Every scheduled instance has its allocation in placement, and the
+        # filters and weighers were timed
+        self.assertEqual(
+            sum(spec.num_instances for spec in specs),
+            len(self.placement.allocations))
+        self.assertIn('filter.NUMATopologyFilter', result.phases)
+        self.assertIn('weigher.RAMWeigher', result.phases)
+        self.assertIn('p99', result.to_dict())
+        self.assertIn('throughput', result.format())
+
+    def test_replay_recorded_specs(self):
+        specs = scheduler_replay.generate_request_specs(
+            self.replay.context, 5, seed=42)
+        path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'specs.json')
+
+        scheduler_replay.dump_request_specs(path, specs)
+        loaded = scheduler_replay.load_request_specs(path)
+
+        self.assertEqual(
+            [spec.instance_uuid for spec in specs],
+            [spec.instance_uuid for spec in loaded])
+        self.assertEqual(
+            [spec.flavor.name for spec in specs],
+            [spec.flavor.name for spec in loaded])
+        self.assertEqual(5, self.replay.replay(loaded).requests)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, scheduler_replay.percentile(values, 50))
+        self.assertEqual(99, scheduler_replay.percentile(values, 99))
+        self.assertEqual(1, scheduler_replay.percentile([1], 99))
+        self.assertIsNone(scheduler_replay.percentile([], 50))
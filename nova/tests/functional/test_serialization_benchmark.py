@@ -0,0 +1,44 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from nova import context as nova_context
+from nova import test
+from nova.tests.functional import serialization_benchmark
+
+
+class SerializationBenchmarkTestCase(test.NoDBTestCase):
+    """Make sure the serialization benchmark keeps working."""
+
+    def setUp(self):
+        super().setUp()
+        self.context = nova_context.get_admin_context()
+
+    def test_benchmark_instances(self):
+        instances = serialization_benchmark.build_instances(self.context, 5)
+
+        # The benchmark fails if the serializations differ
+        result = serialization_benchmark.benchmark(
+            self.context, instances, iterations=1)
+        self.assertGreater(result['compiled'], 0)
+        self.assertGreater(result['generic'], 0)
+
+        instances.obj_reset_changes(recursive=True)
+        serialization_benchmark.benchmark(
+            self.context, instances, iterations=1)
+
+    def test_benchmark_compute_nodes(self):
+        computes = serialization_benchmark.build_compute_nodes(
+            self.context, 5)
+
+        result = serialization_benchmark.benchmark(
+            self.context, computes, iterations=1)
+        self.assertIn('speedup', result)
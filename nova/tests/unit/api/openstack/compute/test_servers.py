@@ -7574,12 +7574,78 @@ class ServersViewBuilderTest(_ServersViewBuilderTest):
             uuids.cell2: exception.BDMNotFound(id='fake')
         }
         ctxt = context.RequestContext('fake', fakes.FAKE_PROJECT_ID)
-        result = self.view_builder._get_instance_bdms_in_multiple_cells(
-            ctxt, [self.instance.uuid])
+        loader = views.servers.ServerListLoader(ctxt, [self.instance])
+        result = loader.get_bdms()
         # will get the result from cell1
         self.assertEqual(result, bdms[0])
         mock_sg.assert_called_once()
 
+    @mock.patch('nova.objects.InstanceFaultList.get_latest_by_instance_uuids')
+    @mock.patch('nova.objects.InstanceMappingList.get_by_instance_uuids')
+    def test_server_list_loader_fill_faults(self, mock_get_maps,
+                                            mock_get_faults):
+        cell1 = self.cell_mappings['cell1']
+        mock_get_maps.return_value = objects.InstanceMappingList(objects=[
+            objects.InstanceMapping(instance_uuid=uuids.inst1,
+                                    cell_mapping=cell1),
+            objects.InstanceMapping(instance_uuid=uuids.inst2,
+                                    cell_mapping=cell1)])
+        fault = objects.InstanceFault(instance_uuid=uuids.inst1, code=500)
+        legacy_fault = objects.InstanceFault(instance_uuid=uuids.inst3,
+                                             code=404)
+        fault.obj_reset_changes()
+        legacy_fault.obj_reset_changes()
+        mock_get_faults.side_effect = [
+            objects.InstanceFaultList(objects=[fault]),
+            objects.InstanceFaultList(objects=[legacy_fault])]
+        ctxt = context.RequestContext('fake', fakes.FAKE_PROJECT_ID)
+        instances = [objects.Instance(uuid=uuid)
+                     for uuid in (uuids.inst1, uuids.inst2, uuids.inst3)]
+
+        views.servers.ServerListLoader(ctxt, instances).fill_faults()
+
+        # the instances of the cell are looked up with a single query, and the
+        # unmapped instance in the database of the context
+        mock_get_maps.assert_called_once_with(
+            ctxt, [uuids.inst1, uuids.inst2, uuids.inst3])
+        mock_get_faults.assert_has_calls([
+            mock.call(test.MatchType(context.RequestContext),
+                      [uuids.inst1, uuids.inst2]),
+            mock.call(ctxt, [uuids.inst3])])
+        self.assertEqual(fault, instances[0].fault)
+        self.assertIsNone(instances[1].fault)
+        self.assertEqual(legacy_fault, instances[2].fault)
+        for instance in instances:
+            self.assertNotIn('fault', instance.obj_what_changed())
+
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_server_list_loader_fill_faults_faily_cells(self, mock_sg):
+        mock_sg.return_value = {
+            uuids.cell1: exception.InstanceNotFound(instance_id='fake')}
+        ctxt = context.RequestContext('fake', fakes.FAKE_PROJECT_ID)
+        loader = views.servers.ServerListLoader(ctxt, [self.instance])
+        with mock.patch.object(loader, '_get_cells', return_value=(
+                {uuids.cell1: (mock.sentinel.cell1, [self.instance.uuid])},
+                [])):
+            loader.fill_faults()
+        # the fault is not lazy-loaded from the failed cell
+        self.assertIsNone(self.instance.fault)
+
+    def test_server_list_loader_host_statuses(self):
+        compute_api = mock.Mock()
+        compute_api.get_instances_host_statuses.return_value = {
+            self.instance.uuid: 'UP'}
+        down_instance = objects.Instance(uuid=uuids.down)
+        loader = views.servers.ServerListLoader(
+            self.request.context, [self.instance, down_instance],
+            compute_api=compute_api)
+        for _ in range(2):
+            self.assertEqual({self.instance.uuid: 'UP'},
+                             loader.get_host_statuses())
+        # the host statuses are resolved once for the instances with a host
+        compute_api.get_instances_host_statuses.assert_called_once_with(
+            [self.instance])
+
     def test_build_server(self):
         expected_server = {
             "server": {
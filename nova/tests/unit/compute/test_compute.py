@@ -7037,11 +7037,13 @@ class ComputeTestCase(BaseTestCase,
             mock.patch.object(self.compute, 'update_available_resource'),
             mock.patch.object(migration_obj, 'save'),
             mock.patch.object(instance, 'get_network_info'),
+            mock.patch.object(self.compute.rt, 'invalidate_usage'),
         ) as (
             post_live_migration,
             migrate_instance_start, post_live_migration_at_destination,
             post_live_migration_at_source, setup_networks_on_host,
             clear_events, update_available_resource, mig_save, get_nw_info,
+            invalidate_usage,
         ):
             nw_info = network_model.NetworkInfo.hydrate([])
             get_nw_info.return_value = nw_info
@@ -7067,6 +7069,8 @@ class ComputeTestCase(BaseTestCase,
             post_live_migration_at_source.assert_has_calls(
                 [mock.call(c, instance, nw_info)])
             clear_events.assert_called_once_with(instance)
+            # the usage of the source node is audited again right away
+            invalidate_usage.assert_called_once_with(instance.node)
             update_available_resource.assert_has_calls([mock.call(c)])
             self.assertEqual('completed', migration_obj.status)
             mig_save.assert_called_once_with()
@@ -1064,10 +1064,14 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             mock_validate_vtpm.assert_called_once_with(inst_list)
             mock_destroy.assert_called_once_with(
                 self.context, {uuids.our_node_uuid: our_node})
+            # The fake driver knows none of the instances
             mock_inst_init.assert_has_calls(
-                [mock.call(self.context, inst_list[0]),
-                 mock.call(self.context, inst_list[1]),
-                 mock.call(self.context, inst_list[2])])
+                [mock.call(self.context, inst_list[0],
+                           vm_power_state=power_state.NOSTATE),
+                 mock.call(self.context, inst_list[1],
+                           vm_power_state=power_state.NOSTATE),
+                 mock.call(self.context, inst_list[2],
+                           vm_power_state=power_state.NOSTATE)])
 
             mock_init_host.assert_called_once_with(host=our_host)
             mock_host_get.assert_called_once_with(self.context, our_host,
@@ -1287,7 +1291,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
         self.compute.init_host(None)
 
         mock_init_instance.assert_called_once_with(
-            self.context, active_instance)
+            self.context, active_instance, vm_power_state=power_state.NOSTATE)
         mock_error_interrupted.assert_called_once_with(
             self.context, {active_instance.uuid, evacuating_instance.uuid},
             mock_get_nodes.return_value.keys())
@@ -1775,16 +1779,15 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
                 expected_attrs=['info_cache'])
 
         self.flags(resume_guests_state_on_host_boot=True)
-        mock_get_power.side_effect = (power_state.SHUTDOWN,
-                                      power_state.SHUTDOWN)
+        mock_get_power.return_value = power_state.SHUTDOWN
         mock_get_inst.return_value = 'fake-bdm'
         mock_resume.side_effect = test.TestingException
         share_info = objects.ShareMappingList()
         mock_get_share_info.return_value = share_info
 
         self.compute._init_instance('fake-context', instance)
-        mock_get_power.assert_has_calls([mock.call(instance),
-                                         mock.call(instance)])
+        # The power state is only retrieved once as nothing changed it
+        mock_get_power.assert_called_once_with(instance)
         mock_plug.assert_called_once_with(instance, mock.ANY)
         mock_get_inst.assert_called_once_with(mock.ANY, instance)
         mock_resume.assert_called_once_with(mock.ANY, instance, mock.ANY,
@@ -1999,6 +2002,51 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
                  mock.call(instance, use_cache=False)])
         self.assertIsNone(instance.task_state)
 
+    def test_init_instance_with_vm_power_state(self):
+        instance = fake_instance.fake_instance_obj(
+                self.context,
+                uuid=uuids.instance,
+                vm_state=vm_states.ACTIVE,
+                task_state=None,
+                power_state=power_state.RUNNING,
+                host=self.compute.host)
+
+        with test.nested(
+            mock.patch.object(objects.Instance, 'get_network_info',
+                              return_value=network_model.NetworkInfo()),
+            mock.patch.object(self.compute.driver, 'plug_vifs'),
+            mock.patch.object(self.compute.driver, 'get_info',
+                              new_callable=mock.NonCallableMock),
+            mock.patch.object(self.compute, '_retry_reboot',
+                              return_value=(False, None)),
+            mock.patch.object(self.compute, '_resume_guests_state'),
+        ) as (mock_get_nw, mock_plug, mock_get_info, mock_retry,
+              mock_resume):
+            self.compute._init_instance(self.context, instance,
+                                        vm_power_state=power_state.RUNNING)
+
+        mock_retry.assert_called_once_with(instance, power_state.RUNNING)
+        mock_resume.assert_not_called()
+
+    @mock.patch.object(fake_driver.FakeDriver, 'get_info_bulk')
+    def test_get_power_states(self, mock_get_info_bulk):
+        instances = [objects.Instance(uuid=uuids.running),
+                     objects.Instance(uuid=uuids.missing)]
+        mock_get_info_bulk.return_value = {
+            uuids.running: hardware.InstanceInfo(state=power_state.RUNNING)}
+
+        self.assertEqual({uuids.running: power_state.RUNNING,
+                          uuids.missing: power_state.NOSTATE},
+                         self.compute._get_power_states(instances))
+        mock_get_info_bulk.assert_called_once_with(instances, use_cache=False)
+
+    @mock.patch.object(fake_driver.FakeDriver, 'get_info_bulk',
+                       side_effect=exception.VirtDriverNotReady)
+    def test_get_power_states_failed(self, mock_get_info_bulk):
+        instances = [objects.Instance(uuid=uuids.instance)]
+        self.assertEqual({}, self.compute._get_power_states(instances))
+        mock_get_info_bulk.assert_called_once_with(instances, use_cache=False)
+
     def test_init_instance_reverts_crashed_migration_from_active(self):
         self._test_init_instance_reverts_crashed_migrations(
                                                 old_vm_state=vm_states.ACTIVE)
@@ -4091,6 +4139,83 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             self.compute._sync_power_states(mock.sentinel.context)
         gni.assert_called_once_with()
 
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_changed_only(self, mock_get):
+        self.flags(sync_power_state_full_interval=3600)
+        self.compute._power_states_synced_at = time.monotonic()
+        self.compute._power_states = {
+            uuids.unchanged: power_state.RUNNING,
+            uuids.stopped: power_state.RUNNING,
+            uuids.vanished: power_state.SHUTDOWN,
+            uuids.gone: power_state.NOSTATE,
+        }
+        unchanged = objects.Instance(uuid=uuids.unchanged)
+        stopped = objects.Instance(uuid=uuids.stopped)
+        vanished = objects.Instance(uuid=uuids.vanished)
+        new = objects.Instance(uuid=uuids.new)
+        mock_get.return_value = [unchanged, stopped, vanished, new]
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_info_bulk',
+                              return_value={
+                                  uuids.unchanged: hardware.InstanceInfo(
+                                      state=power_state.RUNNING),
+                                  uuids.stopped: hardware.InstanceInfo(
+                                      state=power_state.SHUTDOWN),
+                                  uuids.new: hardware.InstanceInfo(
+                                      state=power_state.RUNNING)}),
+            mock.patch.object(self.compute.driver, 'get_num_instances'),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+        ) as (mock_get_infos, mock_num, mock_spawn):
+            self.compute._sync_power_states(mock.sentinel.context)
+
+        mock_get.assert_called_once_with(
+            mock.sentinel.context, self.compute.host, expected_attrs=[],
+            use_slave=True)
+        mock_get_infos.assert_called_once_with(mock_get.return_value)
+        mock_num.assert_not_called()
+        mock_spawn.assert_has_calls([mock.call(mock.ANY, stopped),
+                                     mock.call(mock.ANY, vanished),
+                                     mock.call(mock.ANY, new)])
+        self.assertEqual(3, mock_spawn.call_count)
+        # The gone instance is no longer on this host
+        self.assertNotIn(uuids.gone, self.compute._power_states)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_changed_only_driver_not_ready(self, mock_get):
+        self.flags(sync_power_state_full_interval=3600)
+        self.compute._power_states_synced_at = time.monotonic()
+        mock_get.return_value = [objects.Instance(uuid=uuids.instance)]
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_info_bulk',
+                              side_effect=exception.VirtDriverNotReady),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+        ) as (mock_get_infos, mock_spawn):
+            self.compute._sync_power_states(mock.sentinel.context)
+
+        mock_get_infos.assert_called_once_with(mock_get.return_value)
+        mock_spawn.assert_not_called()
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_full_after_interval(self, mock_get):
+        self.flags(sync_power_state_full_interval=3600)
+        self.compute._power_states_synced_at = time.monotonic() - 3600
+        self.compute._power_states = {uuids.instance: power_state.RUNNING,
+                                      uuids.deleted: power_state.RUNNING}
+        instance = objects.Instance(uuid=uuids.instance)
+        mock_get.return_value = [instance]
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_info_bulk'),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+        ) as (mock_get_infos, mock_spawn):
+            self.compute._sync_power_states(mock.sentinel.context)
+
+        mock_get_infos.assert_not_called()
+        mock_spawn.assert_called_once_with(mock.ANY, instance)
+        self.assertEqual({uuids.instance: power_state.RUNNING},
+                         self.compute._power_states)
+        self.assertGreater(self.compute._power_states_synced_at,
+                           time.monotonic() - 3600)
+
     def _get_sync_instance(self, power_state, vm_state, task_state=None,
                            shutdown_terminate=False):
         instance = objects.Instance()
@@ -4123,6 +4248,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
         self.compute._sync_instance_power_state(self.context, instance,
                                                 power_state.SHUTDOWN)
         self.assertEqual(instance.power_state, power_state.SHUTDOWN)
+        self.assertEqual(power_state.SHUTDOWN,
+                         self.compute._power_states[instance.uuid])
         mock_refresh.assert_called_once_with(use_slave=False)
         self.assertTrue(mock_save.called)
         mock_get_info.assert_called_once_with(instance, use_cache=False)
@@ -6750,11 +6877,12 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             mock.patch('nova.objects.Migration.save'),
             mock.patch('nova.scheduler.utils.resources_from_flavor'),
             mock.patch.object(self.compute.reportclient,
-                              'remove_provider_tree_from_instance_allocation')
+                              'remove_provider_tree_from_instance_allocation'),
+            mock.patch.object(self.compute.rt, 'invalidate_usage'),
         ) as (_get_instances_on_driver, get_instance_nw_info,
               _get_instance_block_device_info, _is_instance_storage_shared,
               destroy, migration_list, migration_save, get_resources,
-              remove_allocation):
+              remove_allocation, invalidate_usage):
             migration_list.return_value = [migration]
             get_resources.return_value = mock.sentinel.resources
 
@@ -6766,6 +6894,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
 
             remove_allocation.assert_called_once_with(
                 self.context, instance_2.uuid, uuids.our_node_uuid)
+            # and the usage of the source node is audited again
+            invalidate_usage.assert_called_once_with('fake-node')
 
     def test_destroy_evacuated_instances_node_deleted(self):
         our_host = self.compute.host
@@ -12264,6 +12394,7 @@ class ComputeManagerMigrationTestCase(test.NoDBTestCase,
                                                       self.compute.host)
             rt_mock.allocate_pci_devices_for_instance.assert_called_once_with(
                 self.context, self.instance)
+            rt_mock.invalidate_usage.assert_called_once_with('test_host')
 
             self.assertEqual(self.compute.host, self.instance.host)
             self.assertEqual('test_host', self.instance.node)
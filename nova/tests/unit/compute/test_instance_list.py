@@ -320,6 +320,29 @@ class TestInstanceList(test.NoDBTestCase):
         ret = instance_list.get_instance_list_cells_batch_size(1000, [])
         self.assertEqual(1000, ret)
 
+    def test_batch_size_adaptive(self):
+        self.flags(instance_list_cells_batch_strategy='adaptive',
+                   group='api')
+
+        # One cell, so batch at $limit
+        ret = instance_list.get_instance_list_cells_batch_size(1000, [1])
+        self.assertEqual(1000, ret)
+
+        # Thirty cells so batch at ($limit/30)+10%
+        ret = instance_list.get_instance_list_cells_batch_size(
+            1000, list(range(30)))
+        self.assertEqual(36, ret)
+
+        # Three cells, tiny limit, so batch at lower threshold
+        ret = instance_list.get_instance_list_cells_batch_size(20, [1, 2, 3])
+        self.assertEqual(10, ret)
+
+        # Three cells, tinier limit, so batch at limit
+        ret = instance_list.get_instance_list_cells_batch_size(5, [1, 2, 3])
+        self.assertEqual(5, ret)
+
+        self.assertTrue(instance_list.InstanceLister(None, None).adaptive)
+
 
 class TestInstanceListBig(test.NoDBTestCase):
     def setUp(self):
@@ -362,8 +385,10 @@ class TestInstanceListBig(test.NoDBTestCase):
         self.assertEqual(50, len(insts))
 
         # Since the instances are all uniform, we should have a
-        # predictable number of queries to the database. 5 queries
-        # would get us 50 results, plus one more gets triggered by the
-        # sort to fill the buffer for the first cell feeder that runs
-        # dry.
-        self.assertEqual(6, mock_inst.call_count)
+        # predictable number of queries to the database. The first
+        # batches of the cells get the 30 first results, in turn, and
+        # each cell feeder is refilled once it runs dry. 5 queries
+        # would get us 50 results, plus two more get triggered by the
+        # sort to fill the buffers of the cell feeders which run dry
+        # first.
+        self.assertEqual(7, mock_inst.call_count)
@@ -311,6 +311,56 @@ class TestBatching(test.NoDBTestCase):
                           [[10 for i in range(0, 500 // 10)]])
         self.assertEqual(limit_expected, summary['limit_by_cell'])
 
+    def test_batches_adaptive(self):
+        lister = TestLister(self._data, [], [],
+                            cells=self._cells, batch_size=10)
+        lister.adaptive = True
+        ctx = context.RequestContext()
+        res = list(lister.get_records_sorted(ctx, {}, 500, None))
+        self.assertEqual(500, len(res))
+        summary = lister.call_summary('get_by_filters')
+
+        # The batches of the cell serving all the results are doubled each
+        # time, but never ask for more than what is left to return
+        limit_expected = ([[10] for cell in self._cells[1:]] +
+                          [[10, 20, 40, 80, 160, 190]])
+        self.assertEqual(limit_expected, summary['limit_by_cell'])
+
+    def test_cell_stats(self):
+        lister = TestLister(self._data, [], [],
+                            cells=self._cells, batch_size=10)
+        ctx = context.RequestContext()
+        res = list(lister.get_records_sorted(ctx, {}, 25, None))
+        self.assertEqual(25, len(res))
+
+        stats = lister.cell_stats
+        self.assertEqual(len(self._cells), len(stats))
+        self.assertEqual(
+            [{'fetched': 10, 'used': 0, 'batches': 1}] * 9 +
+            [{'fetched': 25, 'used': 25, 'batches': 3}],
+            sorted(stats.values(), key=lambda s: s['used']))
+
+    def test_first_batches_queried_in_parallel(self):
+        lister = TestLister(self._data, [], [],
+                            cells=self._cells, batch_size=10)
+        ctx = context.RequestContext()
+        real_scatter_gather = context.scatter_gather_cells
+
+        def fake_scatter_gather(*args, **kwargs):
+            results = real_scatter_gather(*args, **kwargs)
+            # The first batch of every cell was queried by the threads of
+            # the cells, before any result is generated
+            summary = lister.call_summary('get_by_filters')
+            self.assertEqual([1 for cell in self._cells],
+                             summary['count_by_cell'])
+            return results
+
+        with mock.patch('nova.context.scatter_gather_cells',
+                        side_effect=fake_scatter_gather) as mock_sg:
+            res = list(lister.get_records_sorted(ctx, {}, 5, None))
+        self.assertEqual(5, len(res))
+        mock_sg.assert_called_once()
+
     def test_no_batches(self):
         lister = TestLister(self._data, [], [],
                             cells=self._cells)
@@ -414,6 +464,29 @@ class TestBaseClass(test.NoDBTestCase):
         self.assertEqual(1, len(lister.cells_failed))
         self.assertEqual(1, len(lister.cells_timed_out))
 
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_with_cells_not_responding(self, mock_sg):
+        cells = [objects.CellMapping(uuid=getattr(uuids, 'cell%i' % i),
+                                     name='cell%i' % i)
+                 for i in range(0, 3)]
+        lister = TestLister([], [], [], cells=cells)
+        ctx = context.RequestContext()
+        records = [multi_cell_list.RecordWrapper(
+            mock.Mock(cell_uuid=uuids.cell2), lister.sort_ctx, {'id': 'foo'})]
+        # The first batches of two of the cells were not gathered at all
+        mock_sg.return_value = {
+            uuids.cell0: context.did_not_respond_sentinel,
+            uuids.cell1: test.TestingException(),
+            uuids.cell2: records,
+        }
+
+        result = list(lister.get_records_sorted(ctx, {}, 10, None))
+
+        self.assertEqual([{'id': 'foo'}], result)
+        self.assertEqual([uuids.cell0], lister.cells_timed_out)
+        self.assertEqual([uuids.cell1], lister.cells_failed)
+        self.assertEqual([uuids.cell2], lister.cells_responded)
+
     def test_marker_cell_not_requeried(self):
         data = [{'id': 'foo-%i' % i} for i in range(0, 100)]
         cells = [objects.CellMapping(uuid=getattr(uuids, 'cell%i' % i),
@@ -162,6 +162,70 @@ class TestProviderTree(test.NoDBTestCase):
         self.assertFalse(pt.exists(numa_cell0_uuid))
         self.assertFalse(pt.exists(uuids.cn1))
 
+    def test_indexes(self):
+        pt = self._pt_with_cns()
+        pt.new_child('numa_cell0', uuids.cn1, uuid=uuids.numa_cell0)
+        pt.new_child('pf1', uuids.numa_cell0, uuid=uuids.pf1)
+        # Nothing prevents two providers from having the same name
+        pt.new_child('pf1', uuids.cn2, uuid=uuids.pf1_cn2)
+
+        self.assertEqual(
+            {uuids.cn1, uuids.cn2, uuids.numa_cell0, uuids.pf1,
+             uuids.pf1_cn2},
+            set(pt.providers_by_uuid))
+        self.assertEqual(uuids.pf1, pt.data('pf1').uuid)
+        self.assertEqual(
+            [uuids.cn1, uuids.numa_cell0, uuids.pf1],
+            pt.get_provider_uuids_in_tree(uuids.pf1))
+        self.assertEqual(
+            [uuids.cn2, uuids.pf1_cn2],
+            pt.get_provider_uuids_in_tree(uuids.pf1_cn2))
+
+        # The cached lists can't be modified by the callers, and are updated
+        # when the tree changes
+        pt.get_provider_uuids(uuids.numa_cell0).append(uuids.foo)
+        self.assertEqual(
+            [uuids.numa_cell0, uuids.pf1],
+            pt.get_provider_uuids(uuids.numa_cell0))
+        pt.new_child('pf2', uuids.numa_cell0, uuid=uuids.pf2)
+        self.assertEqual(
+            [uuids.numa_cell0, uuids.pf1, uuids.pf2],
+            pt.get_provider_uuids(uuids.numa_cell0))
+        self.assertEqual(6, len(pt.get_provider_uuids()))
+
+        pt.remove(uuids.numa_cell0)
+        self.assertEqual(
+            {uuids.cn1, uuids.cn2, uuids.pf1_cn2}, set(pt.providers_by_uuid))
+        self.assertEqual(uuids.pf1_cn2, pt.data('pf1').uuid)
+        self.assertEqual([uuids.cn1], pt.get_provider_uuids(uuids.cn1))
+        self.assertNotIn('pf2', pt.providers_by_name)
+
+        # Replacing a provider drops its descendants from the indexes
+        pt.populate_from_iterable([
+            {'uuid': uuids.cn2, 'name': 'compute-node-2', 'generation': 1},
+        ])
+        self.assertFalse(pt.exists('pf1'))
+        self.assertEqual(
+            {uuids.cn1, uuids.cn2}, set(pt.providers_by_uuid))
+
+    def test_content_keys(self):
+        pt = self._pt_with_cns()
+        pt.update_inventory(uuids.cn1, {'VCPU': {'total': 8, 'reserved': 0}})
+        other = self._pt_with_cns()
+        other.update_inventory(
+            uuids.cn1, {'VCPU': {'reserved': 0, 'total': 8}}, generation=1)
+
+        keys = pt.content_keys()
+        self.assertEqual({uuids.cn1, uuids.cn2}, set(keys))
+        # The generations do not matter
+        self.assertEqual(keys, other.content_keys())
+
+        other.update_traits(uuids.cn2, ['CUSTOM_FOO'])
+        other.update_aggregates(uuids.cn1, [uuids.agg])
+        other_keys = other.content_keys()
+        self.assertNotEqual(keys[uuids.cn1], other_keys[uuids.cn1])
+        self.assertNotEqual(keys[uuids.cn2], other_keys[uuids.cn2])
+
     def test_populate_from_iterable_empty(self):
         pt = provider_tree.ProviderTree()
         # Empty list is a no-op
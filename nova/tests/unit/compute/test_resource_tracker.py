@@ -833,6 +833,147 @@ class TestUpdateAvailableResources(BaseTestCase):
                                                  actual_resources))
         update_mock.assert_called_once()
 
+    @mock.patch('time.monotonic')
+    @mock.patch('nova.compute.utils.is_volume_backed_instance',
+                return_value=False)
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
+                return_value=objects.PciDeviceList())
+    @mock.patch('nova.objects.ComputeNode.get_by_uuid')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_and_error')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_incremental_usage(self, get_mock, migr_mock, get_cn_mock,
+                               pci_mock, instance_pci_mock, bfv_check_mock,
+                               mock_time):
+        self.flags(resource_usage_audit_interval=600)
+        self._setup_rt()
+        get_mock.return_value = _INSTANCE_FIXTURES
+        migr_mock.return_value = []
+        get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
+        mock_time.return_value = 1000
+
+        # the usage is audited on the first run
+        self._update_available_resources()
+        get_mock.assert_called_once()
+        self.assertEqual({_NODENAME: 1000}, self.rt.usage_audited_at)
+
+        # and then only tracked, while the hypervisor reports no usage
+        mock_time.return_value = 1599
+        update_mock = self._update_available_resources()
+        get_mock.assert_called_once()
+        migr_mock.assert_called_once()
+        actual_resources = update_mock.call_args[0][1]
+        self.assertEqual(128, actual_resources.memory_mb_used)
+        self.assertEqual(384, actual_resources.free_ram_mb)
+        self.assertEqual(1, actual_resources.vcpus_used)
+        self.assertEqual(1, actual_resources.local_gb_used)
+        self.assertEqual(1, actual_resources.running_vms)
+        self.assertEqual('1', actual_resources.stats['num_instances'])
+
+        # until the next audit
+        mock_time.return_value = 1600
+        with mock.patch.object(resource_tracker.LOG, 'warning') as mock_warn:
+            self._update_available_resources()
+        self.assertEqual(2, get_mock.call_count)
+        self.assertEqual({_NODENAME: 1600}, self.rt.usage_audited_at)
+        mock_warn.assert_not_called()
+
+    @mock.patch('nova.compute.utils.is_volume_backed_instance',
+                return_value=False)
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
+                return_value=objects.PciDeviceList())
+    @mock.patch('nova.objects.ComputeNode.get_by_uuid')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_and_error')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_incremental_usage_live_migrated_away(
+            self, get_mock, migr_mock, get_cn_mock, pci_mock,
+            instance_pci_mock, bfv_check_mock):
+        self.flags(resource_usage_audit_interval=600)
+        self._setup_rt()
+        get_mock.return_value = _INSTANCE_FIXTURES
+        migr_mock.return_value = []
+        get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
+        self._update_available_resources()
+        self.assertIn(_NODENAME, self.rt.usage_audited_at)
+
+        # the instance is live migrated away between two audits, without
+        # going through the tracker
+        get_mock.return_value = []
+        self.rt.invalidate_usage(_NODENAME)
+        self.assertNotIn(_NODENAME, self.rt.usage_audited_at)
+
+        # so the next update audits the usage again
+        update_mock = self._update_available_resources()
+        self.assertEqual(2, get_mock.call_count)
+        self.assertIn(_NODENAME, self.rt.usage_audited_at)
+        actual_resources = update_mock.call_args[0][1]
+        self.assertEqual(0, actual_resources.memory_mb_used)
+        self.assertEqual(0, actual_resources.vcpus_used)
+        self.assertEqual(0, actual_resources.running_vms)
+
+    def test_incremental_usage_restores_numa_usage(self):
+        tracked = _NUMA_HOST_TOPOLOGIES['2mb'].obj_clone()
+        tracked.cells[0].cpu_usage = 1
+        tracked.cells[0].memory_usage = 512
+        tracked.cells[0].pinned_cpus = set([2])
+        tracked.cells[0].mempages[0].used = 256
+        # the hypervisor now reports a CPU of the first cell offline and more
+        # huge pages
+        reported = _NUMA_HOST_TOPOLOGIES['2mb'].obj_clone()
+        reported.cells[0].cpuset = set([2])
+        reported.cells[0].mempages[0].total = 2048
+
+        restored = objects.NUMATopology.obj_from_db_obj(
+            resource_tracker.ResourceTracker._restore_numa_usage(
+                reported._to_json(), tracked._to_json()))
+
+        # the usage is the tracked one
+        cell = restored.cells[0]
+        self.assertEqual(1, cell.cpu_usage)
+        self.assertEqual(512, cell.memory_usage)
+        self.assertEqual(set([2]), cell.pinned_cpus)
+        self.assertEqual(256, cell.mempages[0].used)
+        self.assertEqual(0, restored.cells[1].cpu_usage)
+        # while the rest of the topology is the reported one
+        self.assertEqual(set([2]), cell.cpuset)
+        self.assertEqual(2048, cell.mempages[0].total)
+
+    @mock.patch('nova.compute.utils.is_volume_backed_instance',
+                return_value=False)
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
+                return_value=objects.PciDeviceList())
+    @mock.patch('nova.objects.ComputeNode.get_by_uuid')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_and_error')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_incremental_usage_audit_reports_drift(
+            self, get_mock, migr_mock, get_cn_mock, pci_mock,
+            instance_pci_mock, bfv_check_mock):
+        self.flags(resource_usage_audit_interval=600)
+        self._setup_rt()
+        get_mock.return_value = _INSTANCE_FIXTURES
+        migr_mock.return_value = []
+        get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
+        self._update_available_resources()
+
+        # the usage of an instance was not dropped
+        cn = self.rt.compute_nodes[_NODENAME]
+        cn.memory_mb_used += 256
+        # and the next audit is due
+        self.rt.usage_audited_at[_NODENAME] -= 600
+
+        with mock.patch.object(resource_tracker.LOG, 'warning') as mock_warn:
+            update_mock = self._update_available_resources()
+        self.assertEqual(2, get_mock.call_count)
+        self.assertEqual(128, update_mock.call_args[0][1].memory_mb_used)
+        mock_warn.assert_called_once_with(
+            mock.ANY, {'host': _HOSTNAME, 'node': _NODENAME,
+                       'drift': 'memory_mb_used=128 (tracked 384)'})
+
     @mock.patch('nova.compute.utils.is_volume_backed_instance',
                 return_value=False)
     @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
@@ -992,6 +992,49 @@ class SqlAlchemyDbApiTestCase(DbTestCase):
             self.context, filters={'hidden': True}, limit=10)
         self.assertEqual(1, len(instances))
 
+    def test_instance_get_all_columns_by_filters_sort(self):
+        insts = [
+            self.create_instance_with_args(display_name='test%d' % i)
+            for i in range(5)]
+        self.create_instance_with_args(
+            display_name='other', vm_state=vm_states.ERROR)
+        filters = {'vm_state': 'fake'}
+        sort_keys = ['display_name']
+        sort_dirs = ['desc']
+
+        # The rows are fetched in several pages, with only the given columns
+        with mock.patch.object(
+            sqlalchemyutils, 'paginate_query',
+            wraps=sqlalchemyutils.paginate_query,
+        ) as mock_paginate:
+            rows = db.instance_get_all_columns_by_filters_sort(
+                self.context, filters, ['uuid', 'host'], sort_keys=sort_keys,
+                sort_dirs=sort_dirs, batch_size=2)
+            self.assertEqual(
+                [{'uuid': inst['uuid'], 'host': 'host1'}
+                 for inst in reversed(insts)],
+                list(rows))
+        self.assertEqual(3, mock_paginate.call_count)
+
+        # With a limit and a marker
+        rows = db.instance_get_all_columns_by_filters_sort(
+            self.context, filters, ['uuid'], limit=3,
+            marker=insts[4]['uuid'], sort_keys=sort_keys,
+            sort_dirs=sort_dirs, batch_size=2)
+        self.assertEqual(
+            [insts[3]['uuid'], insts[2]['uuid'], insts[1]['uuid']],
+            [row['uuid'] for row in rows])
+
+        rows = db.instance_get_all_columns_by_filters_sort(
+            self.context, filters, ['uuid'], marker=uuidsentinel.marker)
+        self.assertRaises(exception.MarkerNotFound, list, rows)
+        rows = db.instance_get_all_columns_by_filters_sort(
+            self.context, filters, ['uuid', 'metadata'])
+        self.assertRaises(ValueError, list, rows)
+        rows = db.instance_get_all_columns_by_filters_sort(
+            self.context, filters, ['uuid'], sort_keys=['foo'])
+        self.assertRaises(exception.InvalidSortKey, list, rows)
+
 
 class MigrationTestCase(test.TestCase):
 
@@ -3096,6 +3139,29 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
                                             include_disabled=True)
         self._assertEqualListsOfObjects(expected, real)
 
+    def test_service_get_all_by_binary_changed_since(self):
+        t1 = datetime.datetime(2020, 1, 1, 0, 0, 0)
+        t2 = t1 + datetime.timedelta(minutes=1)
+        self.useFixture(utils_fixture.TimeFixture(t1))
+        services = [
+            self._create_service({'host': 'host%s' % x, 'binary': 'b1'})
+            for x in range(1, 5)]
+        self._create_service({'host': 'host5', 'binary': 'b2'})
+
+        with utils_fixture.TimeFixture(t2):
+            db.service_update(self.ctxt, services[0]['id'], {'disabled': True})
+            db.service_destroy(self.ctxt, services[1]['id'])
+            new = self._create_service({'host': 'host6', 'binary': 'b1'})
+            self._create_service({'host': 'host7', 'binary': 'b2'})
+
+        real = db.service_get_all_by_binary_changed_since(self.ctxt, 'b1', t2)
+        self.assertEqual(
+            {services[0]['id'], services[1]['id'], new['id']},
+            {service['id'] for service in real})
+        self.assertEqual(
+            5, len(db.service_get_all_by_binary_changed_since(
+                self.ctxt, 'b1', t1)))
+
     def test_service_get_all_computes_by_hv_type(self):
         values = [
             {'host': 'host1', 'binary': 'nova-compute'},
@@ -5304,6 +5370,24 @@ class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
         new_stats = jsonutils.loads(node['stats'])
         self.assertEqual(self.stats, new_stats)
 
+    def test_compute_node_get_all_changed_since(self):
+        t1 = timeutils.utcnow() + datetime.timedelta(minutes=1)
+        self.assertEqual(
+            [], db.compute_node_get_all_changed_since(self.ctxt, t1))
+
+        with utils_fixture.TimeFixture(t1):
+            db.compute_node_update(
+                self.ctxt, self.item['id'], {'vcpus_used': 1})
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, t1)
+        self.assertEqual([self.item['id']], [node['id'] for node in nodes])
+
+        t2 = t1 + datetime.timedelta(minutes=1)
+        with utils_fixture.TimeFixture(t2):
+            db.compute_node_delete(self.ctxt, self.item['id'])
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, t2)
+        self.assertEqual([self.item['id']], [node['id'] for node in nodes])
+        self.assertTrue(nodes[0]['deleted'])
+
     def test_compute_node_get_all_mapped_less_than(self):
         cn = dict(self.compute_node_dict,
                   hostname='foo',
@@ -32,6 +32,7 @@ from nova import exception
 from nova.network import model as network_model
 from nova import notifications
 from nova import objects
+from nova.objects import base
 from nova.objects import fields
 from nova.objects import instance
 from nova.objects import instance_info_cache
@@ -221,6 +222,49 @@ class _TestInstanceObject(object):
             [fake_instance['uuid']])
         self.assertFalse(mock_extra_get.called)
 
+    @mock.patch.object(base, '_BLOB_CACHE', None)
+    @mock.patch.object(db, 'instance_get_by_uuid')
+    def test_get_with_cached_extra(self, mock_get):
+        self.flags(instance_extra_cache_size=10)
+        fake_flavor = objects.Flavor(
+            name='foo', extra_specs={'hw:cpu_policy': 'dedicated'})
+        fake_instance = dict(self.fake_instance, extra={
+            'numa_topology': test_instance_numa.fake_db_topology[
+                'numa_topology'],
+            'flavor': jsonutils.dumps(
+                {'cur': fake_flavor.obj_to_primitive(), 'old': None,
+                 'new': fake_flavor.obj_to_primitive()}),
+            'vcpu_model': jsonutils.dumps(
+                test_vcpu_model.fake_vcpumodel.obj_to_primitive()),
+        })
+        mock_get.return_value = fake_instance
+        expected_attrs = ['flavor', 'numa_topology', 'vcpu_model']
+
+        inst1 = objects.Instance.get_by_uuid(
+            self.context, 'uuid', expected_attrs=expected_attrs)
+        with mock.patch.object(jsonutils, 'loads') as mock_loads:
+            inst2 = objects.Instance.get_by_uuid(
+                self.context, 'uuid', expected_attrs=expected_attrs)
+        # The blobs are not deserialized again
+        mock_loads.assert_not_called()
+        self.assertEqual(3, len(base.get_blob_cache()))
+
+        for attr in ('flavor', 'new_flavor', 'numa_topology', 'vcpu_model'):
+            self.assertIsNot(getattr(inst1, attr), getattr(inst2, attr))
+            self.assertTrue(base.obj_equal_prims(
+                getattr(inst1, attr), getattr(inst2, attr)))
+        self.assertIsNone(inst2.old_flavor)
+        self.assertEqual(inst1.obj_what_changed(), inst2.obj_what_changed())
+        # The objects can be modified without affecting the cache
+        inst2.flavor.extra_specs['hw:cpu_policy'] = 'shared'
+        inst2.numa_topology.cells[0].memory = 1
+        inst3 = objects.Instance.get_by_uuid(
+            self.context, 'uuid', expected_attrs=expected_attrs)
+        self.assertEqual(
+            'dedicated', inst3.flavor.extra_specs['hw:cpu_policy'])
+        self.assertEqual(inst1.numa_topology.cells[0].memory,
+                         inst3.numa_topology.cells[0].memory)
+
     def test_lazy_load_services_on_deleted_instance(self):
         # We should avoid trying to hit the database to reload the instance
         # and just set the services attribute to an empty list.
@@ -1786,6 +1830,42 @@ class _TestInstanceListObject(object):
             sort_keys=['key1', 'key2'], sort_dirs=['dir1', 'dir2'])
         self.assertEqual(0, mock_get_by_filters.call_count)
 
+    @mock.patch.object(db, 'instance_get_all_columns_by_filters_sort')
+    def test_iter_by_filters(self, mock_get_columns):
+        mock_get_columns.return_value = iter([
+            {'uuid': uuids.inst1, 'host': 'foo', 'deleted': 0, 'id': 1},
+            {'uuid': uuids.inst2, 'host': None, 'deleted': 2, 'id': 2},
+        ])
+
+        insts = objects.InstanceList.iter_by_filters(
+            self.context, {'foo': 'bar'}, ['uuid', 'host', 'deleted'],
+            sort_keys=['uuid'], sort_dirs=['asc'], limit=100,
+            marker=uuids.marker, use_slave=True, batch_size=10)
+
+        # The instances are loaded lazily
+        mock_get_columns.assert_not_called()
+        inst = next(insts)
+        self.assertIsInstance(inst, objects.Instance)
+        self.assertEqual((uuids.inst1, 'foo', False),
+                         (inst.uuid, inst.host, inst.deleted))
+        self.assertEqual({'uuid', 'host', 'deleted'},
+                         {field for field in inst.fields
+                          if inst.obj_attr_is_set(field)})
+        self.assertEqual({}, inst.obj_get_changes())
+        inst = next(insts)
+        self.assertEqual((uuids.inst2, None, True),
+                         (inst.uuid, inst.host, inst.deleted))
+        self.assertRaises(StopIteration, next, insts)
+        mock_get_columns.assert_called_once_with(
+            self.context, {'foo': 'bar'}, ['uuid', 'host', 'deleted', 'id'],
+            limit=100, marker=uuids.marker, sort_keys=['uuid'],
+            sort_dirs=['asc'], batch_size=10, use_slave=True)
+
+    def test_iter_by_filters_optional_attrs(self):
+        insts = objects.InstanceList.iter_by_filters(
+            self.context, {}, ['uuid', 'flavor'])
+        self.assertRaises(ValueError, next, insts)
+
     @mock.patch.object(db, 'instance_get_all_by_filters')
     def test_get_all_by_filters_works_for_cleaned(self, mock_get_all):
         fakes = [self.fake_instance(1),
@@ -1348,6 +1348,163 @@ class TestObjEqualPrims(_BaseTestCase):
                         "should be equal")
 
 
+class TestObjCopy(_BaseTestCase):
+
+    def test_obj_copy(self):
+        obj = MyObj(foo=1, bar='goodbye', rel_object=MyOwnedObject(baz=2),
+                    rel_objects=[MyOwnedObject(baz=3)])
+        obj.obj_reset_changes(['foo'])
+
+        clone = base.obj_copy((obj, None))[0]
+
+        self.assertIsInstance(clone, MyObj)
+        self.assertTrue(base.obj_equal_prims(obj, clone))
+        self.assertEqual(obj.obj_what_changed(), clone.obj_what_changed())
+        self.assertFalse(clone.obj_attr_is_set('missing'))
+        # The copy can be modified without affecting the original
+        self.assertIsNot(obj.rel_object, clone.rel_object)
+        self.assertIsNot(obj.rel_objects, clone.rel_objects)
+        clone.rel_objects[0].baz = 4
+        clone.obj_reset_changes()
+        self.assertEqual(3, obj.rel_objects[0].baz)
+        self.assertEqual({'bar', 'rel_object', 'rel_objects'},
+                         obj.obj_what_changed())
+
+    @mock.patch.object(base, '_BLOB_CACHE', None)
+    def test_obj_from_blob(self):
+        loader = mock.Mock(side_effect=lambda blob: MyObj(bar=blob))
+
+        # The cache is disabled by default
+        self.assertIsNone(base.get_blob_cache())
+        self.assertEqual('foo', base.obj_from_blob('kind', 'foo', loader).bar)
+        self.assertEqual(1, loader.call_count)
+
+        self.flags(instance_extra_cache_size=2)
+        obj1 = base.obj_from_blob('kind', 'foo', loader)
+        obj2 = base.obj_from_blob('kind', 'foo', loader)
+        self.assertEqual(2, loader.call_count)
+        self.assertEqual('foo', obj2.bar)
+        self.assertIsNot(obj1, obj2)
+        obj1.bar = 'bar'
+        self.assertEqual('foo', base.obj_from_blob('kind', 'foo', loader).bar)
+        # The kinds of objects are told apart
+        base.obj_from_blob('other', 'foo', loader)
+        self.assertEqual(3, loader.call_count)
+        # The least recently used objects are dropped
+        base.obj_from_blob('kind', 'foo', loader)
+        base.obj_from_blob('kind', 'bar', loader)
+        base.obj_from_blob('kind', 'foo', loader)
+        self.assertEqual(4, loader.call_count)
+        base.obj_from_blob('other', 'foo', loader)
+        self.assertEqual(5, loader.call_count)
+
+        cache = base.get_blob_cache()
+        self.assertEqual((4, 4), (cache.hits, cache.misses))
+        self.assertEqual(2, len(cache))
+
+
+class TestCompiledSerializer(_BaseTestCase):
+
+    def _generic_primitive(self, obj, *args, **kwargs):
+        with test.nested(
+            mock.patch.object(base.NovaObject, 'obj_to_primitive',
+                              ovo_base.VersionedObject.obj_to_primitive),
+            mock.patch.object(base.NovaObject, 'obj_what_changed',
+                              ovo_base.VersionedObject.obj_what_changed),
+        ):
+            return obj.obj_to_primitive(*args, **kwargs)
+
+    def test_obj_to_primitive(self):
+        obj = MyObj(foo=1, bar='goodbye', rel_object=MyOwnedObject(baz=2),
+                    rel_objects=[MyOwnedObject(baz=3)])
+
+        primitive = obj.obj_to_primitive()
+
+        self.assertEqual(self._generic_primitive(obj), primitive)
+        # The unset fields are skipped
+        self.assertNotIn('missing', primitive['nova_object.data'])
+        self.assertEqual(
+            {'foo': 1, 'bar': 'goodbye'},
+            {k: v for k, v in primitive['nova_object.data'].items()
+             if k in ('foo', 'bar')})
+
+        # Only the nested objects have changes
+        obj.obj_reset_changes(['foo', 'bar', 'rel_object', 'rel_objects'])
+        obj.rel_object.baz = 4
+        primitive = obj.obj_to_primitive()
+        self.assertEqual(self._generic_primitive(obj), primitive)
+        self.assertEqual(['rel_object'], primitive['nova_object.changes'])
+
+        obj.obj_reset_changes(recursive=True)
+        primitive = obj.obj_to_primitive()
+        self.assertEqual(self._generic_primitive(obj), primitive)
+        self.assertNotIn('nova_object.changes', primitive)
+
+    def test_obj_to_primitive_list(self):
+        @base.NovaObjectRegistry.register_if(False)
+        class MyList(base.ObjectListBase, base.NovaObject):
+            fields = {'objects': fields.ListOfObjectsField('MyOwnedObject')}
+
+        objs = MyList(objects=[MyOwnedObject(baz=1), MyOwnedObject(baz=2)])
+        self.assertEqual(self._generic_primitive(objs),
+                         objs.obj_to_primitive())
+
+        objs.obj_reset_changes(recursive=True)
+        objs[1].baz = 3
+        primitive = objs.obj_to_primitive()
+        self.assertEqual(self._generic_primitive(objs), primitive)
+        self.assertEqual(['objects'], primitive['nova_object.changes'])
+
+    def test_obj_to_primitive_instance(self):
+        inst = objects.Instance(
+            uuid=uuids.instance, host='fake-host',
+            flavor=objects.Flavor(id=1, name='m1.small',
+                                  extra_specs={'foo': 'bar'}),
+            numa_topology=objects.InstanceNUMATopology(cells=[
+                objects.InstanceNUMACell(
+                    id=0, cpuset=set([0, 1]), pcpuset=set(), memory=512)]),
+            info_cache=objects.InstanceInfoCache(instance_uuid=uuids.instance),
+            tags=objects.TagList(objects=[objects.Tag(tag='foo')]))
+        insts = objects.InstanceList(objects=[inst])
+
+        self.assertEqual(self._generic_primitive(insts),
+                         insts.obj_to_primitive())
+        insts.obj_reset_changes(recursive=True)
+        inst.flavor.extra_specs['foo'] = 'baz'
+        self.assertEqual(self._generic_primitive(insts),
+                         insts.obj_to_primitive())
+
+    @mock.patch.object(base, '_serialize')
+    def test_obj_to_primitive_target_version(self, mock_serialize):
+        obj = MyObj(foo=1, bar='goodbye')
+
+        # Older versions go through the compatibility routines
+        primitive = obj.obj_to_primitive(target_version='1.5')
+        self.assertEqual('1.5', primitive['nova_object.version'])
+        obj.obj_to_primitive(
+            version_manifest={'MyObj': '1.6', 'MyOwnedObject': '1.0'})
+        mock_serialize.assert_not_called()
+
+        obj.obj_to_primitive(target_version='1.6')
+        mock_serialize.assert_called_once_with(obj)
+
+    @mock.patch.object(base, '_get_serializer')
+    @mock.patch.object(base, '_serialize')
+    def test_obj_to_primitive_disabled(self, mock_serialize,
+                                       mock_get_serializer):
+        self.flags(disable_compiled_object_serializers=True,
+                   group='workarounds')
+        obj = MyObj(foo=1, bar='goodbye', rel_object=MyOwnedObject(baz=2))
+        obj.obj_reset_changes(['foo', 'bar', 'rel_object'])
+        obj.rel_object.baz = 3
+
+        self.assertEqual(self._generic_primitive(obj),
+                         obj.obj_to_primitive())
+        self.assertEqual({'rel_object'}, obj.obj_what_changed())
+        mock_serialize.assert_not_called()
+        mock_get_serializer.assert_not_called()
+
+
 class TestObjMethodOverrides(test.NoDBTestCase):
     def test_obj_reset_changes(self):
         args = inspect.getfullargspec(base.NovaObject.obj_reset_changes)
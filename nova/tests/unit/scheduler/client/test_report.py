@@ -18,6 +18,7 @@ from urllib import parse
 
 import fixtures
 from keystoneauth1 import exceptions as ks_exc
+from keystoneauth1 import session as ks_session
 import os_resource_classes as orc
 from oslo_serialization import jsonutils
 from oslo_utils.fixture import uuidsentinel as uuids
@@ -27,6 +28,7 @@ from nova import context
 from nova import exception
 from nova import objects
 from nova.scheduler.client import report
+from nova.scheduler import metrics as scheduler_metrics
 from nova.scheduler import utils as scheduler_utils
 from nova import test
 from nova.tests import fixtures as nova_fixtures
@@ -319,6 +321,62 @@ class SchedulerReportClientTestCase(test.NoDBTestCase):
                           (name_or_uuid, attr, expected))
 
 
+class TestPlacementRequests(SchedulerReportClientTestCase):
+
+    def test_configure_connection_pool(self):
+        self.flags(connection_pool_size=4, max_concurrent_requests=8,
+                   group='placement')
+        sess = ks_session.Session()
+        self.ks_adap_mock.session = sess
+        adapter = sess.session.adapters['https://']
+
+        self.client._create_client()
+
+        # The adapters are kept, with a pool large enough for the concurrent
+        # requests
+        self.assertIs(adapter, sess.session.adapters['https://'])
+        self.assertEqual(
+            8, adapter.poolmanager.connection_pool_kw['maxsize'])
+
+    def test_map(self):
+        self.assertEqual([2, 4], self.client._map(lambda x: x * 2, [1, 2]))
+
+    def test_map_concurrent(self):
+        self.flags(max_concurrent_requests=3, group='placement')
+        running = []
+        max_running = []
+
+        def func(item):
+            running.append(item)
+            max_running.append(len(running))
+            time.sleep(0.01)
+            running.remove(item)
+            if item == 4:
+                raise exception.TraitCreationFailed(name='foo', error='bar')
+            return item
+
+        self.assertEqual(
+            [0, 1, 2, 3], self.client._map(func, range(4)))
+        self.assertEqual(3, max(max_running))
+        self.assertRaises(
+            exception.TraitCreationFailed, self.client._map, func, range(5))
+
+    def test_request_metrics(self):
+        self.flags(metrics_sink='log', group='scheduler')
+        scheduler_metrics.reset()
+        self.addCleanup(scheduler_metrics.reset)
+
+        self.client.get('/resource_providers?in_tree=%s' % uuids.rp)
+        self.client.put('/resource_providers/%s/traits' % uuids.rp, {})
+
+        snapshot = scheduler_metrics.get_metrics().snapshot()
+        self.assertEqual(
+            {'placement.GET.resource_providers',
+             'placement.PUT.resource_providers'}, set(snapshot))
+        self.assertEqual(
+            1, snapshot['placement.GET.resource_providers']['count'])
+
+
 class TestPutAllocations(SchedulerReportClientTestCase):
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.put')
     def test_put_allocations(self, mock_put):
@@ -1593,6 +1651,86 @@ class TestPutAllocations(SchedulerReportClientTestCase):
         self.assertTrue(res)
 
 
+class TestClaimResourcesBulk(SchedulerReportClientTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.alloc_reqs = {
+            uuid: {
+                'allocations': {
+                    uuid: {'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                },
+                'mappings': {},
+            }
+            for uuid in (uuids.cn1, uuids.cn2)
+        }
+        self.claims = [
+            (uuids.instance1, self.alloc_reqs[uuids.cn1]),
+            (uuids.instance2, self.alloc_reqs[uuids.cn2]),
+        ]
+
+    def test_claim_resources_bulk(self):
+        self.ks_adap_mock.post.return_value = fake_requests.FakeResponse(204)
+
+        res = self.client.claim_resources_bulk(
+            self.context, self.claims, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.36')
+
+        self.assertTrue(res)
+        expected_payload = {
+            uuids.instance1: dict(
+                self.alloc_reqs[uuids.cn1], project_id=uuids.project_id,
+                user_id=uuids.user_id, consumer_generation=None),
+            uuids.instance2: dict(
+                self.alloc_reqs[uuids.cn2], project_id=uuids.project_id,
+                user_id=uuids.user_id, consumer_generation=None),
+        }
+        self.ks_adap_mock.post.assert_called_once_with(
+            '/allocations', microversion='1.36', json=expected_payload,
+            global_request_id=self.context.global_id)
+        # the allocation requests are not modified
+        self.assertNotIn('project_id', self.alloc_reqs[uuids.cn1])
+
+    def test_claim_resources_bulk_old_version(self):
+        res = self.client.claim_resources_bulk(
+            self.context, self.claims, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.12')
+
+        self.assertFalse(res)
+        self.ks_adap_mock.post.assert_not_called()
+
+    def test_claim_resources_bulk_consumer_conflict(self):
+        self.ks_adap_mock.post.return_value = fake_requests.FakeResponse(
+            409, content=jsonutils.dumps(
+                {'errors': [{'code': 'placement.concurrent_update',
+                             'detail': 'consumer generation conflict'}]}))
+
+        res = self.client.claim_resources_bulk(
+            self.context, self.claims, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.36')
+
+        self.assertFalse(res)
+        self.ks_adap_mock.post.assert_called_once()
+
+    @mock.patch('time.sleep', new=mock.Mock())
+    def test_claim_resources_bulk_provider_conflict(self):
+        self.ks_adap_mock.post.side_effect = [
+            fake_requests.FakeResponse(
+                409, content=jsonutils.dumps(
+                    {'errors': [{'code': 'placement.concurrent_update',
+                                 'detail': 'resource provider generation '
+                                           'conflict'}]})),
+            fake_requests.FakeResponse(204),
+        ]
+
+        res = self.client.claim_resources_bulk(
+            self.context, self.claims, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.36')
+
+        self.assertTrue(res)
+        self.assertEqual(2, self.ks_adap_mock.post.call_count)
+
+
 class TestMoveAllocations(SchedulerReportClientTestCase):
 
     def setUp(self):
@@ -2096,6 +2234,129 @@ class TestProviderOperations(SchedulerReportClientTestCase):
         self.assertEqual(tree_uuids,
                          set(self.client._provider_tree.get_provider_uuids()))
 
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_get_sharing_providers', return_value=[])
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'get_providers_in_tree')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_refresh_associations')
+    def test_ensure_resource_provider_refresh_unchanged(
+            self, mock_ref_assoc, mock_gpit, mock_shr):
+        """Make sure only the providers whose generation changed are
+        refreshed when the cached tree is stale.
+        """
+        pt = self.client._provider_tree
+        pt.new_root('root', uuids.root, generation=42)
+        pt.new_child('one', uuids.root, uuid=uuids.one, generation=42)
+        pt.update_aggregates(uuids.root, [uuids.agg])
+        mock_gpit.return_value = [
+            {'uuid': uuids.root, 'name': 'root', 'generation': 42,
+             'parent_provider_uuid': None},
+            {'uuid': uuids.one, 'name': 'one', 'generation': 43,
+             'parent_provider_uuid': uuids.root},
+        ]
+
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        mock_ref_assoc.assert_called_once_with(
+            self.context, uuids.one, force=True)
+        # The sharing providers of the unchanged provider are refreshed
+        mock_shr.assert_called_once_with(self.context, set([uuids.agg]))
+        self.assertFalse(self.client._associations_stale(uuids.root))
+        self.assertEqual(
+            {'refreshes_skipped': 1, 'calls_made': 1, 'calls_saved': 3},
+            self.client.sync_stats)
+        # The cached data of the unchanged provider was kept
+        self.assertEqual(set([uuids.agg]), pt.data(uuids.root).aggregates)
+
+        # If the tree changed, it is refreshed entirely
+        mock_ref_assoc.reset_mock()
+        self.client._association_refresh_time = {}
+        mock_gpit.return_value.append(
+            {'uuid': uuids.two, 'name': 'two', 'generation': 1,
+             'parent_provider_uuid': uuids.root})
+
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        self.assertEqual(3, mock_ref_assoc.call_count)
+        self.assertEqual(1, self.client.sync_stats['refreshes_skipped'])
+
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_get_sharing_providers')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'get_providers_in_tree')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_refresh_associations')
+    def test_ensure_resource_provider_refresh_unchanged_sharing(
+            self, mock_ref_assoc, mock_gpit, mock_shr):
+        """Make sure the sharing providers of the unchanged providers are
+        looked up once, and only refreshed if stale.
+        """
+        pt = self.client._provider_tree
+        pt.new_root('root', uuids.root, generation=42)
+        pt.new_child('one', uuids.root, uuid=uuids.one, generation=42)
+        pt.new_child('two', uuids.root, uuid=uuids.two, generation=42)
+        pt.update_aggregates(uuids.root, [uuids.agg1])
+        pt.update_aggregates(uuids.one, [uuids.agg1, uuids.agg2])
+        pt.update_aggregates(uuids.two, [uuids.agg2])
+        pt.new_root('fresh', uuids.fresh, generation=1)
+        pt.new_root('stale', uuids.stale, generation=1)
+        self.client._association_refresh_time[uuids.fresh] = time.time()
+        mock_gpit.return_value = [
+            {'uuid': uuid, 'name': name, 'generation': 42,
+             'parent_provider_uuid': parent}
+            for uuid, name, parent in (
+                (uuids.root, 'root', None),
+                (uuids.one, 'one', uuids.root),
+                (uuids.two, 'two', uuids.root))]
+        mock_shr.return_value = [
+            {'uuid': uuids.fresh, 'name': 'fresh', 'generation': 1},
+            {'uuid': uuids.stale, 'name': 'stale', 'generation': 1}]
+        mock_ref_assoc.side_effect = (
+            lambda context, rp_uuid, force, refresh_sharing:
+                rp_uuid == uuids.stale)
+
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        mock_shr.assert_called_once_with(
+            self.context, set([uuids.agg1, uuids.agg2]))
+        mock_ref_assoc.assert_has_calls([
+            mock.call(self.context, uuids.fresh, force=False,
+                      refresh_sharing=False),
+            mock.call(self.context, uuids.stale, force=False,
+                      refresh_sharing=False)])
+        self.assertEqual(2, mock_ref_assoc.call_count)
+        # 3 providers with aggregates would have made 4 calls each, while
+        # the sharing providers were looked up once and one was refreshed
+        self.assertEqual(
+            {'refreshes_skipped': 3, 'calls_made': 4, 'calls_saved': 8},
+            self.client.sync_stats)
+
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'set_traits_for_provider')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'set_aggregates_for_provider')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'set_inventory_for_provider')
+    def test_update_from_provider_tree_unchanged(
+            self, mock_set_inv, mock_set_aggs, mock_set_traits):
+        pt = self.client._provider_tree
+        pt.new_root('root', uuids.root, generation=1)
+        pt.new_child('one', uuids.root, uuid=uuids.one, generation=1)
+        pt.update_inventory(uuids.root, {'VCPU': {'total': 8}})
+        new_tree = copy.deepcopy(pt)
+        new_tree.update_traits(uuids.one, ['CUSTOM_FOO'])
+
+        self.client.update_from_provider_tree(self.context, new_tree)
+
+        # Only the changed provider is flushed
+        mock_set_inv.assert_called_once_with(self.context, uuids.one, {})
+        mock_set_aggs.assert_called_once_with(
+            self.context, uuids.one, set())
+        mock_set_traits.assert_called_once_with(
+            self.context, uuids.one, set(['CUSTOM_FOO']))
+        self.assertEqual(1, self.client.sync_stats['providers_unchanged'])
+
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
                 'get_providers_in_tree')
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
@@ -2265,6 +2526,81 @@ class TestProviderOperations(SchedulerReportClientTestCase):
         self.assertEqual(expected_query, query)
         self.assertIsNone(res[0])
 
+    def _get_allocation_candidates(self, vcpus=1):
+        flavor = objects.Flavor(
+            vcpus=vcpus, memory_mb=1024, root_gb=10, ephemeral_gb=5, swap=0)
+        req_spec = objects.RequestSpec(flavor=flavor, is_bfv=False)
+        resources = scheduler_utils.ResourceRequest.from_request_spec(req_spec)
+        return self.client.get_allocation_candidates(self.context, resources)
+
+    def test_get_allocation_candidates_cached(self):
+        self.flags(allocation_candidates_cache_ttl=10, group='scheduler')
+        alloc_req = {
+            'allocations': {
+                uuids.cn1: {'resources': {'VCPU': 1}},
+                uuids.shared: {'resources': {'DISK_GB': 15}},
+            },
+        }
+        data = {
+            'allocation_requests': [alloc_req],
+            'provider_summaries': {uuids.cn1: {}, uuids.shared: {}},
+        }
+        self.ks_adap_mock.get.return_value = fake_requests.FakeResponse(
+            200, content=jsonutils.dumps(data))
+
+        self.assertEqual(
+            ([alloc_req], data['provider_summaries'], '1.36'),
+            self._get_allocation_candidates())
+        alloc_reqs, p_sums, _ = self._get_allocation_candidates()
+
+        # The second request is served from the cache, with a copy of the
+        # data
+        self.assertEqual([alloc_req], alloc_reqs)
+        self.assertIsNot(alloc_req, alloc_reqs[0])
+        self.assertEqual(1, self.ks_adap_mock.get.call_count)
+        # but not a different one
+        self._get_allocation_candidates(vcpus=2)
+        self.assertEqual(2, self.ks_adap_mock.get.call_count)
+        cache = self.client.get_candidates_cache()
+        self.assertEqual((1, 2, 0), (cache.hits, cache.misses,
+                                     cache.invalidations))
+
+        # Claiming resources against a shared provider of the candidates
+        # drops them
+        self.ks_adap_mock.post.return_value = fake_requests.FakeResponse(204)
+        self.client.claim_resources_bulk(
+            self.context,
+            [(uuids.instance, {'allocations': {
+                uuids.shared: {'resources': {'DISK_GB': 15}}}})],
+            uuids.project_id, uuids.user_id,
+            allocation_request_version='1.36')
+        self.assertEqual(2, cache.invalidations)
+        self._get_allocation_candidates()
+        self.assertEqual(3, self.ks_adap_mock.get.call_count)
+
+    def test_get_allocation_candidates_cache_expired(self):
+        self.flags(allocation_candidates_cache_ttl=0.5, group='scheduler')
+        self.ks_adap_mock.get.return_value = fake_requests.FakeResponse(
+            200, content=jsonutils.dumps(
+                {'allocation_requests': [], 'provider_summaries': {}}))
+
+        with mock.patch('time.monotonic', return_value=100):
+            self._get_allocation_candidates()
+            self._get_allocation_candidates()
+        self.assertEqual(1, self.ks_adap_mock.get.call_count)
+        with mock.patch('time.monotonic', return_value=100.5):
+            self._get_allocation_candidates()
+        self.assertEqual(2, self.ks_adap_mock.get.call_count)
+
+    def test_get_allocation_candidates_cache_disabled(self):
+        self.ks_adap_mock.get.return_value = mock.Mock(status_code=404)
+
+        self._get_allocation_candidates()
+        self._get_allocation_candidates()
+
+        self.assertEqual(2, self.ks_adap_mock.get.call_count)
+        self.assertIsNone(self.client.get_candidates_cache())
+
     def test_get_resource_provider_found(self):
         # Ensure _get_resource_provider() returns a dict of resource provider
         # if it finds a resource provider record from the placement API
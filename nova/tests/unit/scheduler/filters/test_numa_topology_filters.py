@@ -14,10 +14,12 @@ import itertools
 from unittest import mock
 
 from oslo_utils.fixture import uuidsentinel as uuids
+from oslo_utils import uuidutils
 
 from nova import objects
 from nova.objects import fields
 from nova.scheduler.filters import numa_topology_filter
+from nova.scheduler import utils as scheduler_utils
 from nova import test
 from nova.tests.unit.scheduler import fakes
 
@@ -416,3 +418,32 @@ class TestNUMATopologyFilter(test.NoDBTestCase):
         self.assertEqual(1, len(mock_numa_fit.mock_calls))
         # and also it made the candidates list empty in the host state
         self.assertEqual(0, len(host.allocation_candidates))
+
+    def test_numa_topology_filter_cached(self):
+        self.flags(numa_fit_cache_size=16, group='filter_scheduler')
+        self.addCleanup(scheduler_utils.reset_globals)
+        instance_topology = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(
+                id=0, cpuset=set(), pcpuset=set([0, 1]), memory=512,
+                cpu_policy=fields.CPUAllocationPolicy.DEDICATED),
+        ])
+        spec_obj = self._get_spec_obj(numa_topology=instance_topology)
+        hosts = [
+            fakes.FakeHostState(
+                'host%d' % i, 'node%d' % i,
+                {'numa_topology': fakes.NUMA_TOPOLOGY.obj_clone(),
+                 'pci_stats': None,
+                 'cpu_allocation_ratio': 16.0,
+                 'ram_allocation_ratio': 1.5,
+                 # Each host has its own compute node resource provider
+                 'allocation_candidates': [
+                     {"mappings": {"": [uuidutils.generate_uuid()]}}]})
+            for i in range(3)]
+
+        for host in hosts:
+            self.assertTrue(self.filt_cls.host_passes(host, spec_obj))
+
+        cache = scheduler_utils.get_numa_fit_cache()
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+        # The request spec was not modified by the fitting
+        self.assertIsNone(spec_obj.numa_topology.cells[0].cpu_pinning_raw)
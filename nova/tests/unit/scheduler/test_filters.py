@@ -233,3 +233,198 @@ class FiltersTestCase(test.NoDBTestCase):
             cargs = mock_log.call_args[0][0]
             self.assertIn("with instance ID '%s'" % fake_uuid, cargs)
             self.assertIn(exp_output, cargs)
+
+
+class _ModFilter(filters.BaseFilter):
+    """Keep the objects which are not a multiple of ``divisor``."""
+
+    safe_to_reorder = True
+    divisor = None
+
+    def __init__(self):
+        self.calls = []
+
+    def _filter_one(self, obj, spec_obj):
+        self.calls.append(obj)
+        return obj % self.divisor != 0
+
+
+class _Mod2Filter(_ModFilter):
+    divisor = 2
+
+
+class _Mod3Filter(_ModFilter):
+    divisor = 3
+
+
+class _Mod5Filter(_ModFilter):
+    divisor = 5
+
+
+class FilterPipelineTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(FilterPipelineTestCase, self).setUp()
+        self.pipeline = filters.FilterPipeline()
+        self.spec_obj = objects.RequestSpec(instance_uuid=uuids.instance)
+
+    def test_run_single_pass(self):
+        mod2, mod3 = _Mod2Filter(), _Mod3Filter()
+
+        result, results = self.pipeline.run(
+            [mod2, mod3], range(1, 13), self.spec_obj)
+
+        self.assertEqual([1, 5, 7, 11], result)
+        # objects rejected by the first filter are not seen by the second one
+        self.assertEqual(list(range(1, 13)), mod2.calls)
+        self.assertEqual([1, 3, 5, 7, 9, 11], mod3.calls)
+        self.assertEqual(
+            [('_Mod2Filter', 12, 6), ('_Mod3Filter', 6, 4)], results)
+
+    def test_order_filters_by_rank(self):
+        mod2, mod3, mod5 = _Mod2Filter(), _Mod3Filter(), _Mod5Filter()
+        # _Mod5Filter rejects more objects for the same cost
+        self.pipeline.stats['_Mod2Filter'].record(100, 10, 1.0)
+        self.pipeline.stats['_Mod3Filter'].record(100, 50, 1.0)
+        self.pipeline.stats['_Mod5Filter'].record(100, 90, 1.0)
+
+        self.assertEqual(
+            [mod5, mod3, mod2],
+            self.pipeline.order_filters([mod2, mod3, mod5]))
+
+    def test_order_filters_keeps_unsafe_filters_in_place(self):
+        mod2, mod3, mod5 = _Mod2Filter(), _Mod3Filter(), _Mod5Filter()
+        mod3.safe_to_reorder = False
+        self.pipeline.stats['_Mod2Filter'].record(100, 10, 1.0)
+        self.pipeline.stats['_Mod5Filter'].record(100, 90, 1.0)
+
+        self.assertEqual(
+            [mod2, mod3, mod5],
+            self.pipeline.order_filters([mod2, mod3, mod5]))
+        self.assertEqual(
+            [mod5, mod2, mod3],
+            self.pipeline.order_filters([mod2, mod5, mod3]))
+
+    def test_reorders_after_measuring(self):
+        mod2, mod5 = _Mod2Filter(), _Mod5Filter()
+        self.pipeline.stats['_Mod2Filter'].record(100, 50, 1.0)
+        self.pipeline.stats['_Mod5Filter'].record(100, 90, 1.0)
+
+        result, results = self.pipeline.run(
+            [mod2, mod5], range(1, 11), self.spec_obj)
+
+        self.assertEqual([1, 3, 7, 9], result)
+        self.assertEqual('_Mod5Filter', results[0][0])
+        self.assertEqual(list(range(1, 11)), mod5.calls)
+        self.assertEqual(110, self.pipeline.stats['_Mod5Filter'].evaluated)
+        self.assertEqual(92, self.pipeline.stats['_Mod5Filter'].rejected)
+
+    def test_filter_all_override_is_a_barrier(self):
+        mod2, mod3 = _Mod2Filter(), _Mod3Filter()
+
+        class KeepFirstTwo(filters.BaseFilter):
+            safe_to_reorder = True
+
+            def filter_all(self, list_objs, spec_obj):
+                return list_objs[:2]
+
+        keep = KeepFirstTwo()
+
+        result, results = self.pipeline.run(
+            [mod2, keep, mod3], range(1, 13), self.spec_obj)
+
+        self.assertEqual([1], result)
+        self.assertEqual(
+            [('_Mod2Filter', 12, 6), ('KeepFirstTwo', 6, 2),
+             ('_Mod3Filter', 2, 1)], results)
+
+    def test_filter_all_none_response(self):
+        class Stop(filters.BaseFilter):
+            def filter_all(self, list_objs, spec_obj):
+                return None
+
+        result, results = self.pipeline.run(
+            [Stop(), _Mod2Filter()], range(1, 4), self.spec_obj)
+
+        self.assertIsNone(result)
+
+    def test_stats_window(self):
+        stats = filters.FilterStats()
+        stats.record(filters.FilterStats.WINDOW, 10, 4.0)
+        stats.record(2, 0, 0.0)
+
+        self.assertEqual((filters.FilterStats.WINDOW + 2) / 2, stats.evaluated)
+        self.assertEqual(5, stats.rejected)
+        self.assertEqual(2.0, stats.cost)
+
+    def test_handler_uses_pipeline(self):
+        self.stub_out('nova.loadables.BaseLoader.__init__',
+                      lambda *args, **kwargs: None)
+        handler = filters.BaseFilterHandler(filters.BaseFilter)
+        mod2, mod3 = _Mod2Filter(), _Mod3Filter()
+        mod3.run_filter_once_per_request = True
+
+        with mock.patch.object(
+            handler, '_use_filter_pipeline', return_value=True,
+        ):
+            self.assertEqual(
+                [1, 5, 7, 11],
+                handler.get_filtered_objects(
+                    [mod2, mod3], range(1, 13), self.spec_obj))
+            # filters are skipped according to run_filter_for_index()
+            self.assertEqual(
+                [1, 3, 5, 7, 9, 11],
+                handler.get_filtered_objects(
+                    [mod2, mod3], range(1, 13), self.spec_obj, index=1))
+
+    @mock.patch.object(filters.LOG, 'info')
+    def test_handler_pipeline_logs_no_hosts(self, mock_log):
+        self.stub_out('nova.loadables.BaseLoader.__init__',
+                      lambda *args, **kwargs: None)
+        handler = filters.BaseFilterHandler(filters.BaseFilter)
+
+        with mock.patch.object(
+            handler, '_use_filter_pipeline', return_value=True,
+        ):
+            result = handler.get_filtered_objects(
+                [_Mod2Filter()], [2, 4], self.spec_obj)
+
+        self.assertEqual([], result)
+        self.assertEqual(
+            "['_Mod2Filter: (start: 2, end: 0)']",
+            mock_log.call_args[0][1]['str_results'])
+
+    def test_observer(self):
+        observer = mock.Mock()
+        pipeline = filters.FilterPipeline(observer=observer)
+
+        class KeepFirstTwo(filters.BaseFilter):
+            def filter_all(self, list_objs, spec_obj):
+                return list_objs[:2]
+
+        pipeline.run(
+            [_Mod2Filter(), KeepFirstTwo()], range(1, 13), self.spec_obj)
+
+        self.assertEqual(
+            ['_Mod2Filter', 'KeepFirstTwo'],
+            [call[0][0] for call in observer.call_args_list])
+
+    def test_handler_observes_filter_time(self):
+        self.stub_out('nova.loadables.BaseLoader.__init__',
+                      lambda *args, **kwargs: None)
+        handler = filters.BaseFilterHandler(filters.BaseFilter)
+
+        for use_pipeline in (False, True):
+            mock_observe = mock.Mock()
+            handler._observe_filter_time = mock_observe
+            handler.pipeline.observer = mock_observe
+            with mock.patch.object(
+                handler, '_use_filter_pipeline', return_value=use_pipeline,
+            ):
+                handler.get_filtered_objects(
+                    [_Mod2Filter(), _Mod3Filter()], range(1, 13),
+                    self.spec_obj)
+
+            self.assertEqual(
+                ['_Mod2Filter', '_Mod3Filter'],
+                [call[0][0] for call in mock_observe.call_args_list])
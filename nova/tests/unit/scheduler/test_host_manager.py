@@ -21,6 +21,7 @@ import contextlib
 import datetime
 from unittest import mock
 
+import iso8601
 from oslo_serialization import jsonutils
 from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import versionutils
@@ -581,6 +582,95 @@ class HostManagerTestCase(test.NoDBTestCase):
                 fake_properties)
         self._verify_result(info, result, False)
 
+    @mock.patch('nova.objects.ServiceList.get_by_binary')
+    @mock.patch('nova.objects.ComputeNodeList.get_all_by_uuids')
+    @mock.patch('nova.objects.InstanceList.get_uuids_by_hosts')
+    @mock.patch('nova.objects.InstanceList.get_uuids_by_host')
+    def test_get_host_states_by_uuids_untracked_instances(
+        self, mock_get_by_host, mock_get_by_hosts, mock_get_all,
+        mock_get_by_binary,
+    ):
+        mock_get_all.return_value = fakes.COMPUTE_NODES[:2]
+        mock_get_by_binary.return_value = fakes.SERVICES
+        mock_get_by_hosts.return_value = collections.defaultdict(
+            list, {'host2': [uuids.instance]})
+        self.host_manager._instance_info = {
+            'host1': {'instances': {}, 'updated': True}}
+        cell = self.host_manager.enabled_cells[0]
+        self.host_manager.enabled_cells = [cell]
+        context = nova_context.get_admin_context()
+
+        host_states = {
+            state.host: state
+            for state in self.host_manager.get_host_states_by_uuids(
+                context, [cn.uuid for cn in fakes.COMPUTE_NODES[:2]],
+                objects.RequestSpec())}
+
+        # the instances are only loaded once they are used
+        mock_get_by_hosts.assert_not_called()
+        self.assertEqual({}, host_states['host1'].instances)
+        mock_get_by_hosts.assert_not_called()
+        # and then the instances of the untracked hosts of the cell are loaded
+        # with a single query
+        self.assertEqual(
+            [uuids.instance], list(host_states['host2'].instances))
+        mock_get_by_hosts.assert_called_once_with(mock.ANY, ['host2'])
+        mock_get_by_host.assert_not_called()
+
+    @mock.patch.object(host_manager.HostManager, '_get_instances_by_host')
+    def test_get_instance_info_untracked_cell_failed(self, mock_get_by_host):
+        compute = objects.ComputeNode(host='host1')
+        instances_by_host = host_manager._LazyInstancesByHost(dict)
+
+        inst_dict = self.host_manager._get_instance_info(
+            mock.sentinel.context, compute, instances_by_host)
+
+        # the host is not in the instances loaded for the cells, so its
+        # instances are queried on their own once they are used
+        self.assertIsInstance(inst_dict, host_manager.LazyValue)
+        mock_get_by_host.assert_not_called()
+        self.assertEqual(mock_get_by_host.return_value, inst_dict())
+        mock_get_by_host.assert_called_once_with(
+            mock.sentinel.context, 'host1')
+
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_get_instances_for_cells_partial_results(self, mock_sg):
+        cell1 = objects.CellMapping(uuid=uuids.cell1)
+        cell2 = objects.CellMapping(uuid=uuids.cell2)
+        cell3 = objects.CellMapping(uuid=uuids.cell3)
+        compute_nodes = {
+            uuids.cell1: [objects.ComputeNode(host='host1')],
+            uuids.cell2: [objects.ComputeNode(host='host2')],
+            uuids.cell3: [objects.ComputeNode(host='host3')],
+        }
+        instances = {uuids.instance: mock.sentinel.instance}
+        mock_sg.return_value = {
+            uuids.cell1: nova_context.did_not_respond_sentinel,
+            uuids.cell2: exception.NovaException(),
+            uuids.cell3: {'host3': instances},
+        }
+        self.flags(host_state_cell_timeout=5, group='filter_scheduler')
+
+        result = self.host_manager._get_instances_for_cells(
+            mock.sentinel.context, [cell1, cell2, cell3], compute_nodes)
+
+        self.assertEqual({'host3': instances}, result)
+        mock_sg.assert_called_once_with(
+            mock.sentinel.context, [cell1, cell2, cell3], 5, mock.ANY)
+
+    def test_get_instances_for_cells_all_tracked(self):
+        self.host_manager._instance_info = {
+            'host1': {'instances': {}, 'updated': True}}
+        compute_nodes = {uuids.cell1: [objects.ComputeNode(host='host1')]}
+
+        with mock.patch('nova.context.scatter_gather_cells') as mock_sg:
+            self.assertEqual(
+                {}, self.host_manager._get_instances_for_cells(
+                    mock.sentinel.context,
+                    [objects.CellMapping(uuid=uuids.cell1)], compute_nodes))
+
+        mock_sg.assert_not_called()
+
     @mock.patch('nova.scheduler.host_manager.LOG')
     @mock.patch('nova.objects.ServiceList.get_by_binary')
     @mock.patch('nova.objects.ComputeNodeList.get_all_by_uuids')
@@ -826,8 +916,10 @@ class HostManagerTestCase(test.NoDBTestCase):
         mock_get_by_host.return_value = [uuids.instance]
         host_state.update(
                 inst_dict=hm._get_instance_info(context, cn1))
-        mock_get_by_host.assert_called_once_with(context, cn1.host)
+        # The instances are only queried when they are used
+        mock_get_by_host.assert_not_called()
         self.assertTrue(host_state.instances)
+        mock_get_by_host.assert_called_once_with(context, cn1.host)
         self.assertIn(uuids.instance, host_state.instances)
         inst = host_state.instances[uuids.instance]
         self.assertEqual(uuids.instance, inst.uuid)
@@ -1389,9 +1481,13 @@ class HostManagerChangedNodesTestCase(test.NoDBTestCase):
                 '_get_computes_for_cells',
                 return_value=(mock.sentinel.compute_nodes,
                               mock.sentinel.services))
+    @mock.patch('nova.scheduler.host_manager.HostManager.'
+                '_get_instances_for_cells',
+                return_value=mock.sentinel.instances_by_host)
     @mock.patch('nova.scheduler.host_manager.HostManager._get_host_states')
     def test_get_host_states_by_uuids_allow_cross_cell_move(
-            self, mock_get_host_states, mock_get_computes):
+            self, mock_get_host_states, mock_get_instances,
+            mock_get_computes):
         """Tests that get_host_states_by_uuids will not restrict to a given
         cell if allow_cross_cell_move=True in the request spec.
         """
@@ -1406,7 +1502,194 @@ class HostManagerChangedNodesTestCase(test.NoDBTestCase):
         mock_get_computes.assert_called_once_with(
             ctxt, self.host_manager.enabled_cells, compute_uuids=compute_uuids)
         mock_get_host_states.assert_called_once_with(
-            ctxt, mock.sentinel.compute_nodes, mock.sentinel.services)
+            ctxt, mock.sentinel.compute_nodes, mock.sentinel.services,
+            instances_by_host=test.MatchType(
+                host_manager._LazyInstancesByHost))
+        # the instances are only loaded once they are used
+        mock_get_instances.assert_not_called()
+        instances_by_host = mock_get_host_states.call_args[1][
+            'instances_by_host']
+        instances_by_host.load()
+        mock_get_instances.assert_called_once_with(
+            ctxt, self.host_manager.enabled_cells,
+            mock.sentinel.compute_nodes)
+
+
+class HostManagerCachedHostStatesTestCase(test.NoDBTestCase):
+    """Test case for the HostManager host state cache."""
+
+    @mock.patch.object(host_manager.HostManager, '_init_instance_info')
+    @mock.patch.object(host_manager.HostManager, '_init_aggregates')
+    def setUp(self, mock_init_agg, mock_init_inst):
+        super(HostManagerCachedHostStatesTestCase, self).setUp()
+        self.flags(host_state_cache=True, group='filter_scheduler')
+        self.host_manager = host_manager.HostManager()
+        self.ctxt = nova_context.get_admin_context()
+        self.updated_at = datetime.datetime(
+            2015, 11, 11, 11, 0, 0, tzinfo=iso8601.UTC)
+
+        self.useFixture(fixtures.SpawnIsSynchronousFixture())
+        self.mock_uuids_by_hosts = self.useFixture(
+            fixtures.fixtures.MockPatch(
+                'nova.objects.InstanceList.get_uuids_by_hosts',
+                return_value=collections.defaultdict(list))).mock
+        self.mock_get_by_binary = self.useFixture(fixtures.fixtures.MockPatch(
+            'nova.objects.ServiceList.get_by_binary')).mock
+        self.mock_get_all = self.useFixture(fixtures.fixtures.MockPatch(
+            'nova.objects.ComputeNodeList.get_all')).mock
+        self.mock_services_since = self.useFixture(fixtures.fixtures.MockPatch(
+            'nova.objects.ServiceList.get_by_binary_changed_since',
+            return_value=[])).mock
+        self.mock_computes_since = self.useFixture(fixtures.fixtures.MockPatch(
+            'nova.objects.ComputeNodeList.get_all_changed_since',
+            return_value=[])).mock
+
+    def _service(self, host, **kwargs):
+        values = dict(host=host, disabled=False, deleted=False,
+                      created_at=self.updated_at, updated_at=self.updated_at,
+                      deleted_at=None)
+        values.update(kwargs)
+        return objects.Service(**values)
+
+    def _compute(self, compute, **kwargs):
+        compute = compute.obj_clone()
+        compute.created_at = self.updated_at
+        compute.deleted = False
+        compute.deleted_at = None
+        for key, value in kwargs.items():
+            setattr(compute, key, value)
+        return compute
+
+    def _get_host_states(self, compute_uuids=None):
+        return {
+            state.nodename: state
+            for state in self.host_manager.get_host_states_by_uuids(
+                self.ctxt, compute_uuids, objects.RequestSpec())}
+
+    def _full_sync(self):
+        self.mock_get_by_binary.return_value = [
+            self._service('host%s' % x) for x in range(1, 4)]
+        self.mock_get_all.return_value = [
+            self._compute(cn) for cn in fakes.COMPUTE_NODES[:3]]
+        return self._get_host_states()
+
+    def test_first_request_loads_everything(self):
+        host_states = self._full_sync()
+
+        self.assertEqual({'node1', 'node2', 'node3'}, set(host_states))
+        self.mock_get_all.assert_called_once()
+        self.mock_computes_since.assert_not_called()
+        cache = self.host_manager.host_state_caches[
+            self.host_manager.enabled_cells[0].uuid]
+        self.assertEqual(self.updated_at, cache.watermark)
+
+    def test_next_requests_only_load_changes(self):
+        first = self._full_sync()
+        updated_at = self.updated_at + datetime.timedelta(minutes=1)
+        self.mock_computes_since.return_value = [
+            self._compute(fakes.COMPUTE_NODES[0], free_ram_mb=128,
+                          updated_at=updated_at)]
+
+        second = self._get_host_states()
+
+        self.mock_get_all.assert_called_once()
+        self.mock_computes_since.assert_called_once_with(
+            mock.ANY,
+            self.updated_at - host_manager.CellHostStateCache.
+            WATERMARK_OVERLAP)
+        # HostState objects are reused between requests
+        for node in ('node1', 'node2', 'node3'):
+            self.assertIs(first[node], second[node])
+        self.assertEqual(128, second['node1'].free_ram_mb)
+        # only the changed host reloaded its instances
+        self.assertEqual(2, self.mock_uuids_by_hosts.call_count)
+        self.mock_uuids_by_hosts.assert_called_with(mock.ANY, ['host1'])
+
+    def test_consumed_resources_are_kept(self):
+        host_states = self._full_sync()
+        host_states['node1'].consume_from_request(objects.RequestSpec(
+            flavor=objects.Flavor(root_gb=0, ephemeral_gb=0, memory_mb=256,
+                                  vcpus=1),
+            pci_requests=None, numa_topology=None))
+
+        host_states = self._get_host_states()
+
+        self.assertEqual(256, host_states['node1'].free_ram_mb)
+
+    def test_restrict_to_compute_uuids(self):
+        self._full_sync()
+
+        host_states = self._get_host_states(
+            [uuids.cn1, uuids.cn3, uuids.unknown])
+
+        self.assertEqual({'node1', 'node3'}, set(host_states))
+
+    def test_deleted_records(self):
+        self._full_sync()
+        deleted_at = self.updated_at + datetime.timedelta(minutes=1)
+        self.mock_computes_since.return_value = [
+            self._compute(fakes.COMPUTE_NODES[0], deleted=True,
+                          deleted_at=deleted_at)]
+        self.mock_services_since.return_value = [
+            self._service('host2', deleted=True, deleted_at=deleted_at)]
+
+        host_states = self._get_host_states()
+
+        self.assertEqual({'node3'}, set(host_states))
+
+    def test_service_changes_are_applied(self):
+        self._full_sync()
+        self.mock_services_since.return_value = [
+            self._service('host2', disabled=True)]
+
+        host_states = self._get_host_states()
+
+        self.assertTrue(host_states['node2'].service['disabled'])
+        self.assertFalse(host_states['node1'].service['disabled'])
+
+    def test_aggregate_changes_are_applied(self):
+        self._full_sync()
+        agg = objects.Aggregate(id=1, name='agg1', hosts=['host1'],
+                                metadata={})
+
+        self.host_manager.update_aggregates([agg])
+        host_states = self._get_host_states()
+
+        self.assertEqual([agg], host_states['node1'].aggregates)
+        self.assertEqual([], host_states['node2'].aggregates)
+
+    def test_full_sync_interval(self):
+        self.flags(host_state_cache_full_sync_interval=10,
+                   group='filter_scheduler')
+        with mock.patch('time.monotonic', return_value=100):
+            self._full_sync()
+        with mock.patch('time.monotonic', return_value=105):
+            self._get_host_states()
+        self.assertEqual(1, self.mock_get_all.call_count)
+        self.mock_get_all.return_value = [
+            self._compute(cn) for cn in fakes.COMPUTE_NODES[:2]]
+
+        with mock.patch('time.monotonic', return_value=111):
+            host_states = self._get_host_states()
+
+        self.assertEqual(2, self.mock_get_all.call_count)
+        self.assertEqual({'node1', 'node2'}, set(host_states))
+
+    def test_refresh_cells_caches_resets_cache(self):
+        self._full_sync()
+
+        self.host_manager.refresh_cells_caches()
+        self._get_host_states()
+
+        self.assertEqual(2, self.mock_get_all.call_count)
+
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_failed_cell(self, mock_sgc):
+        mock_sgc.return_value = {
+            self.host_manager.enabled_cells[0].uuid:
+                nova_context.did_not_respond_sentinel}
+
+        self.assertEqual({}, self._get_host_states())
 
 
 class HostStateTestCase(test.NoDBTestCase):
@@ -1569,6 +1852,7 @@ class HostStateTestCase(test.NoDBTestCase):
             pci_requests=None,
             pci_stats=None,
             provider_mapping=None,
+            cache=None,
         )
         numa_usage_mock.assert_called_once_with(fake_host_numa_topology,
                                                 fake_numa_topology)
@@ -1709,3 +1993,28 @@ class HostStateTestCase(test.NoDBTestCase):
         self.assertEqual(0, host.free_ram_mb)
         # same with failed_builds
         self.assertEqual(0, host.failed_builds)
+
+    def test_lazy_attributes(self):
+        host = host_manager.HostState("fakehost", "fakenode", uuids.cell)
+        # All the attributes are slots
+        self.assertEqual({}, vars(host))
+        # The default values are new objects
+        self.assertEqual([], host.aggregates)
+        self.assertEqual({}, host.instances)
+        self.assertIsNot(
+            host.aggregates,
+            host_manager.HostState("fakehost", "fakenode2", None).aggregates)
+
+        load_aggregates = mock.Mock(return_value=['agg1'])
+        host.update(aggregates=host_manager.LazyValue(
+            load_aggregates, 'fakehost'))
+        load_aggregates.assert_not_called()
+
+        self.assertEqual(['agg1'], host.aggregates)
+        self.assertEqual(['agg1'], host.aggregates)
+        load_aggregates.assert_called_once_with('fakehost')
+
+    def test_extra_attributes(self):
+        host = host_manager.HostState("fakehost", "fakenode", uuids.cell)
+        host.extra = 'foo'
+        self.assertEqual('foo', host.extra)
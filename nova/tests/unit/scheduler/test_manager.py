@@ -19,6 +19,7 @@ Tests For Scheduler
 
 from unittest import mock
 
+import fixtures
 from keystoneauth1 import exceptions as ks_exc
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
@@ -33,6 +34,7 @@ from nova.objects import service
 from nova.scheduler import filters
 from nova.scheduler import host_manager
 from nova.scheduler import manager
+from nova.scheduler import metrics
 from nova.scheduler import utils as scheduler_utils
 from nova.scheduler import weights
 from nova import servicegroup
@@ -120,6 +122,43 @@ class SchedulerManagerTestCase(test.NoDBTestCase):
                 [fake_spec.instance_uuid], expected_alloc_reqs_by_rp_uuid,
                 mock_p_sums, fake_version, True)
 
+    @mock.patch('nova.scheduler.request_filter.process_reqspec')
+    @mock.patch('nova.scheduler.utils.resources_from_request_spec')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'get_allocation_candidates')
+    def test_select_destination_metrics(
+        self, mock_get_ac, mock_rfrs, mock_process,
+    ):
+        self.flags(metrics_sink='log', group='scheduler')
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        fake_spec = objects.RequestSpec()
+        fake_spec.instance_uuid = uuids.instance
+        mock_get_ac.return_value = (
+            fakes.get_fake_alloc_reqs(), mock.Mock(), '9.42')
+        mock_rfrs.return_value.cpu_pinning_requested = False
+
+        with mock.patch.object(self.manager, '_select_destinations'):
+            self.manager.select_destinations(
+                self.context, spec_obj=fake_spec,
+                instance_uuids=[fake_spec.instance_uuid])
+
+        histograms = self.manager.metrics.snapshot()
+        self.assertEqual(
+            {'placement.get_allocation_candidates', 'select_destinations'},
+            set(histograms))
+        self.assertEqual(1, histograms['select_destinations']['count'])
+
+    def test_metrics_disabled(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.assertEqual({}, self.manager.metrics.snapshot())
+
+    @mock.patch.object(metrics.SchedulerMetrics, 'flush')
+    def test_flush_metrics(self, mock_flush):
+        self.manager._flush_metrics(self.context)
+        mock_flush.assert_called_once_with()
+
     @mock.patch('nova.scheduler.request_filter.process_reqspec')
     @mock.patch('nova.scheduler.utils.resources_from_request_spec')
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
@@ -2277,3 +2316,166 @@ class SchedulerManagerAllocationCandidateTestCase(test.NoDBTestCase):
                 uuids.group_req1
             ],
         )
+
+
+class SchedulerManagerBatchTestCase(test.NoDBTestCase):
+    """Test case for the batch scheduling of multi-create requests."""
+
+    @mock.patch.object(
+        host_manager.HostManager, '_init_instance_info', new=mock.Mock())
+    @mock.patch.object(
+        host_manager.HostManager, '_init_aggregates', new=mock.Mock())
+    def setUp(self):
+        super().setUp()
+        self.flags(batch_scheduling_threshold=2, group='filter_scheduler')
+        self.context = context.RequestContext('fake_user', 'fake_project')
+        self.manager = manager.SchedulerManager()
+        self.manager.host_manager.weighers = [
+            weights.ram.RAMWeigher()]
+        self.hosts = [
+            fakes.FakeHostState(
+                'host%d' % i, 'node%d' % i,
+                {'uuid': getattr(uuids, 'cn%d' % i),
+                 'cell_uuid': uuids.cell, 'free_ram_mb': free_ram_mb,
+                 'free_disk_mb': 10240, 'limits': {}})
+            for i, free_ram_mb in enumerate((4096, 2048, 1024))]
+        self.alloc_reqs_by_rp_uuid = {
+            host.uuid: [{
+                'allocations': {
+                    host.uuid: {'resources': {'MEMORY_MB': 1024}}},
+                'mappings': {},
+            }]
+            for host in self.hosts}
+        self.spec_obj = objects.RequestSpec(
+            num_instances=3,
+            flavor=objects.Flavor(
+                memory_mb=1024, root_gb=0, ephemeral_gb=0, vcpus=1),
+            project_id=uuids.project_id,
+            user_id=uuids.user_id,
+            instance_group=None,
+            numa_topology=None,
+            pci_requests=None,
+            requested_resources=[],
+        )
+        self.instance_uuids = [
+            uuids.instance0, uuids.instance1, uuids.instance2]
+
+        self.mock_get_all_states = self.useFixture(
+            fixtures.MockPatchObject(
+                self.manager, '_get_all_host_states',
+                return_value=self.hosts)).mock
+        self.mock_filter = self.useFixture(
+            fixtures.MockPatchObject(
+                self.manager.host_manager, 'get_filtered_hosts',
+                side_effect=lambda hosts, spec_obj, index: list(hosts))).mock
+        self.mock_claim_bulk = self.useFixture(
+            fixtures.MockPatch(
+                'nova.scheduler.utils.claim_resources_bulk',
+                return_value=True)).mock
+        self.mock_claim = self.useFixture(
+            fixtures.MockPatch(
+                'nova.scheduler.utils.claim_resources',
+                return_value=True)).mock
+
+    def _schedule(self):
+        return self.manager._schedule(
+            self.context, self.spec_obj, self.instance_uuids,
+            self.alloc_reqs_by_rp_uuid, mock.sentinel.provider_summaries,
+            allocation_request_version='1.36')
+
+    def _selected_hosts(self, selections):
+        return [selection[0].service_host for selection in selections]
+
+    def test_use_batch_scheduling(self):
+        self.assertTrue(self.manager._use_batch_scheduling(2))
+        self.assertTrue(self.manager._use_batch_scheduling(10))
+
+        self.flags(batch_scheduling_threshold=3, group='filter_scheduler')
+        self.assertFalse(self.manager._use_batch_scheduling(2))
+
+        self.flags(batch_scheduling_threshold=1, group='filter_scheduler')
+        self.assertFalse(self.manager._use_batch_scheduling(1))
+
+        self.flags(batch_scheduling_threshold=0, group='filter_scheduler')
+        self.assertFalse(self.manager._use_batch_scheduling(10))
+
+    @mock.patch('nova.scheduler.manager.SchedulerManager._get_sorted_hosts')
+    def test_schedule_batch(self, mock_get_sorted_hosts):
+        selections = self._schedule()
+
+        # host0 is consumed twice, after which host1 has the same weight and
+        # is picked first
+        self.assertEqual(
+            ['host0', 'host0', 'host1'], self._selected_hosts(selections))
+        self.assertEqual(2048, self.hosts[0].free_ram_mb)
+        self.assertEqual(1024, self.hosts[1].free_ram_mb)
+        self.assertEqual(3, len(selections))
+
+        # the hosts are filtered once, then only the selected hosts are
+        # checked again
+        mock_get_sorted_hosts.assert_not_called()
+        self.assertEqual(3, self.mock_filter.call_count)
+        self.assertEqual(0, self.mock_filter.call_args_list[0][0][2])
+        self.assertEqual(
+            ([self.hosts[0]], self.spec_obj, 1),
+            self.mock_filter.call_args_list[1][0])
+
+        self.mock_claim_bulk.assert_called_once_with(
+            mock.ANY, self.manager.placement_client, self.spec_obj,
+            [(uuids.instance0, self.alloc_reqs_by_rp_uuid[uuids.cn0][0]),
+             (uuids.instance1, self.alloc_reqs_by_rp_uuid[uuids.cn0][0]),
+             (uuids.instance2, self.alloc_reqs_by_rp_uuid[uuids.cn1][0])],
+            allocation_request_version='1.36')
+        self.mock_claim.assert_not_called()
+
+    def test_schedule_batch_claim_size(self):
+        self.flags(batch_claim_size=2, group='filter_scheduler')
+
+        selections = self._schedule()
+
+        self.assertEqual(3, len(selections))
+        # the second chunk only has one instance, which is claimed on its own
+        self.mock_claim_bulk.assert_called_once()
+        self.assertEqual(2, len(self.mock_claim_bulk.call_args[0][3]))
+        self.mock_claim.assert_called_once_with(
+            mock.ANY, self.manager.placement_client, self.spec_obj,
+            uuids.instance2, self.alloc_reqs_by_rp_uuid[uuids.cn1][0],
+            allocation_request_version='1.36')
+
+    def test_schedule_batch_bulk_claim_fails(self):
+        self.mock_claim_bulk.return_value = False
+
+        selections = self._schedule()
+
+        self.assertEqual(
+            ['host0', 'host0', 'host1'], self._selected_hosts(selections))
+        self.assertEqual(3, self.mock_claim.call_count)
+
+    def test_schedule_batch_claim_fails_on_host(self):
+        self.mock_claim_bulk.return_value = False
+
+        def fake_claim(ctx, client, spec_obj, instance_uuid, alloc_req,
+                       allocation_request_version=None):
+            return uuids.cn0 not in alloc_req['allocations']
+
+        self.mock_claim.side_effect = fake_claim
+
+        selections = self._schedule()
+
+        # the instances could not be claimed on host0 so they were placed
+        # again on the other hosts
+        self.assertEqual(
+            ['host2', 'host1', 'host1'], self._selected_hosts(selections))
+        self.assertIsNone(self.hosts[0].updated)
+
+    @mock.patch.object(manager.SchedulerManager, '_cleanup_allocations')
+    def test_schedule_batch_not_enough_hosts(self, mock_cleanup):
+        def fake_filter(hosts, spec_obj, index):
+            # no host is left after the first instance
+            return [] if index else list(hosts)
+
+        self.mock_filter.side_effect = fake_filter
+
+        self.assertRaises(exception.NoValidHost, self._schedule)
+
+        mock_cleanup.assert_called_once_with(self.context, [uuids.instance0])
@@ -0,0 +1,170 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+from unittest import mock
+
+import fixtures
+
+from nova import exception
+from nova.scheduler import metrics
+from nova import test
+
+
+class HistogramTestCase(test.NoDBTestCase):
+
+    def test_observe(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(
+            {'count': 4, 'sum': 2.65, 'buckets': [(0.1, 2), (1.0, 3)]},
+            histogram.to_dict())
+
+
+class SchedulerMetricsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(metrics.reset)
+        metrics.reset()
+
+    def test_disabled(self):
+        scheduler_metrics = metrics.SchedulerMetrics()
+        with scheduler_metrics.timer('phase'):
+            pass
+        scheduler_metrics.observe('phase', 1.0)
+        scheduler_metrics.flush()
+
+        self.assertFalse(scheduler_metrics.enabled)
+        self.assertEqual({}, scheduler_metrics.snapshot())
+
+    @mock.patch('time.perf_counter', side_effect=[1.0, 1.5])
+    def test_timer(self, mock_perf_counter):
+        sink = mock.Mock(spec=metrics.MetricsSink)
+        scheduler_metrics = metrics.SchedulerMetrics(sink)
+
+        with scheduler_metrics.timer('phase'):
+            pass
+        scheduler_metrics.flush()
+
+        sink.observe.assert_called_once_with('phase', 0.5)
+        snapshot = scheduler_metrics.snapshot()
+        self.assertEqual(1, snapshot['phase']['count'])
+        self.assertEqual(0.5, snapshot['phase']['sum'])
+        sink.flush.assert_called_once_with(snapshot)
+
+    def test_timer_exception(self):
+        scheduler_metrics = metrics.SchedulerMetrics(metrics.MetricsSink())
+
+        def fail():
+            with scheduler_metrics.timer('phase'):
+                raise test.TestingException()
+
+        self.assertRaises(test.TestingException, fail)
+        self.assertEqual(1, scheduler_metrics.snapshot()['phase']['count'])
+
+    def test_timed(self):
+        self.flags(metrics_sink='log', group='scheduler')
+
+        @metrics.timed('phase')
+        def f(value):
+            return value
+
+        self.assertEqual(mock.sentinel.value, f(mock.sentinel.value))
+        self.assertEqual(
+            1, metrics.get_metrics().snapshot()['phase']['count'])
+
+    def test_get_metrics(self):
+        self.assertFalse(metrics.get_metrics().enabled)
+        # the metrics are a singleton
+        self.flags(metrics_sink='log', group='scheduler')
+        self.assertFalse(metrics.get_metrics().enabled)
+
+        metrics.reset()
+        self.assertTrue(metrics.get_metrics().enabled)
+        self.assertIs(metrics.get_metrics(), metrics.get_metrics())
+
+        metrics.reset()
+        self.flags(metrics_sink='statsd', group='scheduler')
+        self.assertIsInstance(
+            metrics.get_metrics().sink, metrics.StatsdSink)
+
+        metrics.reset()
+        self.flags(metrics_sink='prometheus_textfile', group='scheduler')
+        self.assertRaises(exception.InvalidConfiguration, metrics.get_metrics)
+
+
+class LogSinkTestCase(test.NoDBTestCase):
+
+    @mock.patch.object(metrics.LOG, 'info')
+    def test_flush(self, mock_info):
+        sink = metrics.LogSink()
+        sink.flush({})
+        mock_info.assert_not_called()
+
+        histogram = metrics.Histogram()
+        histogram.observe(0.25)
+        histogram.observe(0.75)
+        sink.flush({'phase': histogram.to_dict()})
+        mock_info.assert_called_once_with(
+            'Scheduler metrics: %s', 'phase: 2 in 0.500s on average')
+
+
+class StatsdSinkTestCase(test.NoDBTestCase):
+
+    @mock.patch('socket.socket')
+    def test_observe(self, mock_socket):
+        sink = metrics.StatsdSink('127.0.0.1', 8125)
+
+        sink.observe('filter.RamFilter', 0.0125)
+
+        mock_socket.return_value.sendto.assert_called_once_with(
+            b'nova.scheduler.filter.RamFilter:12.500|ms', ('127.0.0.1', 8125))
+
+    @mock.patch('socket.socket')
+    def test_observe_error(self, mock_socket):
+        mock_socket.return_value.sendto.side_effect = OSError
+        sink = metrics.StatsdSink('127.0.0.1', 8125)
+
+        # errors are not raised
+        sink.observe('phase', 1.0)
+
+
+class PrometheusTextfileSinkTestCase(test.NoDBTestCase):
+
+    def test_flush(self):
+        tempdir = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(tempdir, 'nova_scheduler.prom')
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        histogram.observe(0.5)
+        sink = metrics.PrometheusTextfileSink(path)
+
+        sink.flush({'select_destinations': histogram.to_dict()})
+
+        with open(path) as f:
+            content = f.read()
+        name = 'nova_scheduler_phase_duration_seconds'
+        self.assertEqual(
+            '# HELP %(name)s Duration of the phases of the scheduling '
+            'requests.\n'
+            '# TYPE %(name)s histogram\n'
+            '%(name)s_bucket{phase="select_destinations",le="0.1"} 0\n'
+            '%(name)s_bucket{phase="select_destinations",le="1.0"} 1\n'
+            '%(name)s_bucket{phase="select_destinations",le="+Inf"} 1\n'
+            '%(name)s_sum{phase="select_destinations"} 0.5\n'
+            '%(name)s_count{phase="select_destinations"} 1\n' % {
+                'name': name},
+            content)
+        # the temporary file was renamed
+        self.assertEqual(['nova_scheduler.prom'], os.listdir(tempdir))
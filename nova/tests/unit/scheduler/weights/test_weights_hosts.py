@@ -16,14 +16,23 @@
 Tests For Scheduler weights.
 """
 
+from unittest import mock
+
+from nova import objects
 from nova.scheduler import weights
 from nova.scheduler.weights import affinity
+from nova.scheduler.weights import compute
+from nova.scheduler.weights import cpu
+from nova.scheduler.weights import disk
+from nova.scheduler.weights import hypervisor_version
 from nova.scheduler.weights import io_ops
 from nova.scheduler.weights import metrics
+from nova.scheduler.weights import num_instances
 from nova.scheduler.weights import ram
 from nova import test
 from nova.tests.unit import matchers
 from nova.tests.unit.scheduler import fakes
+from nova import weights as nova_weights
 
 
 class TestWeighedHost(test.NoDBTestCase):
@@ -41,3 +50,100 @@ class TestWeighedHost(test.NoDBTestCase):
         self.assertIn(io_ops.IoOpsWeigher, classes)
         self.assertIn(affinity.ServerGroupSoftAffinityWeigher, classes)
         self.assertIn(affinity.ServerGroupSoftAntiAffinityWeigher, classes)
+
+
+class TestColumnarWeighing(test.NoDBTestCase):
+    def setUp(self):
+        super(TestColumnarWeighing, self).setUp()
+        self.weight_handler = weights.HostWeightHandler()
+        self.weighers = [
+            cpu.CPUWeigher(), disk.DiskWeigher(), ram.RAMWeigher(),
+            io_ops.IoOpsWeigher(), num_instances.NumInstancesWeigher(),
+            compute.BuildFailureWeigher(),
+            hypervisor_version.HypervisorVersionWeigher(),
+            affinity.ServerGroupSoftAffinityWeigher(),
+        ]
+        self.spec_obj = objects.RequestSpec(instance_group=None)
+
+    def _get_all_hosts(self):
+        host_values = [
+            ('host1', 'node1', {'free_ram_mb': 512, 'free_disk_mb': 1024,
+                                'vcpus_total': 8, 'vcpus_used': 4,
+                                'cpu_allocation_ratio': 1.0,
+                                'num_io_ops': 2, 'num_instances': 3,
+                                'failed_builds': 0,
+                                'hypervisor_version': 1000}),
+            ('host2', 'node2', {'free_ram_mb': 8192, 'free_disk_mb': 512,
+                                'vcpus_total': 16, 'vcpus_used': 1,
+                                'cpu_allocation_ratio': 4.0,
+                                'num_io_ops': 0, 'num_instances': 1,
+                                'failed_builds': 2,
+                                'hypervisor_version': None}),
+            ('host3', 'node3', {'free_ram_mb': 2048, 'free_disk_mb': 4096,
+                                'vcpus_total': 4, 'vcpus_used': 4,
+                                'cpu_allocation_ratio': 16.0,
+                                'num_io_ops': 8, 'num_instances': 10,
+                                'failed_builds': 1,
+                                'hypervisor_version': 2000}),
+        ]
+        hosts = [fakes.FakeHostState(host, node, values)
+                 for host, node, values in host_values]
+        hosts[2].aggregates = [
+            objects.Aggregate(
+                id=1, name='foo', hosts=['host3'],
+                metadata={'ram_weight_multiplier': '-5.0'})]
+        return hosts
+
+    def _weigh(self, columnar):
+        self.flags(columnar_weighing=columnar, group='filter_scheduler')
+        return self.weight_handler.get_weighed_objects(
+            self.weighers, self._get_all_hosts(), self.spec_obj)
+
+    def test_same_result_as_per_object_weighing(self):
+        expected = [(h.obj.host, h.weight) for h in self._weigh(False)]
+        result = [(h.obj.host, h.weight) for h in self._weigh(True)]
+
+        self.assertEqual(expected, result)
+
+    @mock.patch.object(ram.RAMWeigher, 'weigh_objects')
+    def test_columnar_weigher_skips_per_object_path(self, mock_weigh):
+        self._weigh(True)
+
+        mock_weigh.assert_not_called()
+
+    @mock.patch.object(ram.RAMWeigher, 'weight_multiplier', return_value=1.0)
+    def test_multiplier_computed_once_per_aggregates(self, mock_multiplier):
+        self.weighers = [ram.RAMWeigher()]
+
+        self._weigh(True)
+
+        # host1 and host2 have no aggregates while host3 has one
+        self.assertEqual(2, mock_multiplier.call_count)
+
+    def test_multiplier_computed_per_host_without_opt_in(self):
+        class HostWeigher(weights.BaseHostWeigher):
+            def weight_multiplier(self, host_state):
+                return 2.0 if host_state.host == 'host1' else 1.0
+
+            def _weigh_object(self, host_state, weight_properties):
+                return host_state.free_ram_mb
+
+        # host1 and host2 have the same aggregates but not the same multiplier
+        self.assertEqual(
+            [2.0, 1.0, 1.0],
+            HostWeigher().weight_multipliers(self._get_all_hosts()))
+
+    @mock.patch.object(nova_weights, 'numpy', new=None)
+    @mock.patch.object(weights.LOG, 'warning')
+    def test_no_numpy_falls_back_to_per_object(self, mock_warning):
+        self.flags(columnar_weighing=True, group='filter_scheduler')
+
+        with mock.patch.object(
+            nova_weights.BaseWeightHandler, '_get_weighed_objects_columnar',
+        ) as mock_columnar:
+            for _ in range(2):
+                self.weight_handler.get_weighed_objects(
+                    self.weighers, self._get_all_hosts(), self.spec_obj)
+
+        mock_columnar.assert_not_called()
+        mock_warning.assert_called_once()
@@ -22,10 +22,12 @@ import hmac
 import os
 import pickle
 import re
+import time
 from unittest import mock
 
 from keystoneauth1 import exceptions as ks_exceptions
 from keystoneauth1 import session
+from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_serialization import base64
 from oslo_serialization import jsonutils
@@ -1405,6 +1407,100 @@ class MetadataHandlerTestCase(test.TestCase):
         self._metadata_handler_with_remote_address(hnd)
         self.assertEqual(2, get_by_uuid.call_count)
 
+    @mock.patch.object(base, 'get_metadata_by_address')
+    def test_metadata_handler_local_cache(self, get_by_address):
+        get_by_address.return_value = self.mdinst
+        self.flags(metadata_cache_expiration=15, group='api')
+        hnd = handler.MetadataRequestHandler()
+        self.assertIsNotNone(hnd._local_cache)
+        with test.nested(
+            mock.patch.object(hnd._cache, 'get', wraps=hnd._cache.get),
+            mock.patch.object(self.mdinst, 'lookup', wraps=self.mdinst.lookup),
+        ) as (mock_cache_get, mock_lookup):
+            self._metadata_handler_with_remote_address(hnd)
+            self._metadata_handler_with_remote_address(hnd)
+        # the metadata and its response are only looked up once, and then
+        # served from the local cache
+        self.assertEqual(1, get_by_address.call_count)
+        mock_cache_get.assert_called_once_with('metadata-192.192.192.2')
+        mock_lookup.assert_called_once_with('/2009-04-04/user-data')
+        self.assertEqual(1, hnd._local_cache.hits)
+
+    @mock.patch.object(base, 'get_metadata_by_address')
+    def test_metadata_handler_local_cache_disabled(self, get_by_address):
+        get_by_address.return_value = self.mdinst
+        self.flags(metadata_cache_expiration=15, group='api')
+        self.flags(metadata_local_cache_size=0, group='api')
+        hnd = handler.MetadataRequestHandler()
+        self.assertIsNone(hnd._local_cache)
+        with mock.patch.object(
+            self.mdinst, 'lookup', wraps=self.mdinst.lookup,
+        ) as mock_lookup:
+            self._metadata_handler_with_remote_address(hnd)
+            self._metadata_handler_with_remote_address(hnd)
+        # the metadata is still cached in the shared cache
+        self.assertEqual(1, get_by_address.call_count)
+        self.assertEqual(2, mock_lookup.call_count)
+
+    @mock.patch.object(base, 'get_metadata_by_instance_id')
+    def test_metadata_handler_coalesces_misses(self, get_by_uuid):
+        self.flags(metadata_cache_expiration=15, group='api')
+        hnd = handler.MetadataRequestHandler()
+        real_lock = lockutils.lock
+
+        def lock(name):
+            # another request built the metadata while this one was waiting
+            # for the lock
+            hnd._local_cache.set(name, self.mdinst)
+            return real_lock(name)
+
+        with mock.patch.object(lockutils, 'lock', side_effect=lock):
+            self.assertEqual(
+                self.mdinst,
+                hnd.get_metadata_by_instance_id('a-b-c-d', '192.192.192.2'))
+        get_by_uuid.assert_not_called()
+
+    @mock.patch.object(base, 'get_metadata_by_instance_id')
+    def test_metadata_handler_local_cache_ttl(self, get_by_uuid):
+        self.flags(metadata_cache_expiration=15, group='api')
+        get_by_uuid.return_value = self.mdinst
+        hnd = handler.MetadataRequestHandler()
+        with mock.patch.object(hnd._local_cache, 'set') as mock_set:
+            hnd.get_metadata_by_instance_id('a-b-c-d', '192.192.192.2')
+            # the metadata built here is kept for the full expiration time
+            mock_set.assert_called_once_with(
+                'metadata-a-b-c-d', self.mdinst, ttl=None)
+            mock_set.reset_mock()
+
+            hnd.get_metadata_by_instance_id('a-b-c-d', '192.192.192.2')
+            # the metadata found in the shared cache is kept for less, as it
+            # may already be about to expire there
+            mock_set.assert_called_once_with(
+                'metadata-a-b-c-d', self.mdinst, ttl=3.0)
+        get_by_uuid.assert_called_once_with('a-b-c-d', '192.192.192.2')
+
+    def test_local_metadata_cache(self):
+        cache = handler.LocalMetadataCache(ttl=15, maxsize=2)
+        mdinst2 = mock.sentinel.mdinst2
+        cache.set('metadata-1', self.mdinst)
+        cache.set_response(self.mdinst, '/latest', b'body', 'text/plain')
+        cache.set('metadata-2', self.mdinst)
+        cache.set('metadata-3', mdinst2)
+        # the least recently used entry is evicted
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('metadata-1'))
+        self.assertEqual(self.mdinst, cache.get('metadata-2'))
+        self.assertEqual((b'body', 'text/plain'),
+                         cache.get_response(self.mdinst, '/latest'))
+        self.assertIsNone(cache.get_response(self.mdinst, '/other'))
+        # only the responses of the cached metadata are kept
+        cache.set_response(self.instance, '/latest', b'body', 'text/plain')
+        self.assertIsNone(cache.get_response(self.instance, '/latest'))
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 16):
+            self.assertIsNone(cache.get('metadata-2'))
+        self.assertEqual(1, len(cache))
+
     @mock.patch.object(neutronapi, 'get_client', return_value=mock.Mock())
     def test_metadata_lb_proxy(self, mock_get_client):
 
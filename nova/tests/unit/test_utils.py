@@ -283,6 +283,60 @@ class TestCachedFile(test.NoDBTestCase):
         self.assertNotIn(filename, utils._FILE_CACHE)
 
 
+class LRUCacheTestCase(test.NoDBTestCase):
+
+    def test_get_set(self):
+        cache = utils.LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual('x', cache.get('a', 'x'))
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+    def test_evict_least_recently_used(self):
+        cache = utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # Use 'a' so that 'b' is evicted instead
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    @mock.patch('time.monotonic')
+    def test_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = utils.LRUCache(2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=5)
+        mock_monotonic.return_value = 105
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        mock_monotonic.return_value = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+    def test_discard(self):
+        cache = utils.LRUCache(3)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        self.assertEqual(2, cache.discard(lambda value: value > 1))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(1, cache.get('a'))
+
+    def test_clear(self):
+        cache = utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(cache.get('a'))
+
+
 class AuditPeriodTest(test.NoDBTestCase):
 
     def setUp(self):
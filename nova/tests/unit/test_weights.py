@@ -18,6 +18,8 @@ Tests For weights.
 
 from unittest import mock
 
+import numpy
+
 from nova.scheduler import weights as scheduler_weights
 from nova.scheduler.weights import ram
 from nova import test
@@ -72,3 +74,55 @@ class TestWeigher(test.NoDBTestCase):
         self.assertEqual(1, len(weighed_host))
         self.assertEqual('host1', weighed_host[0].obj.host)
         self.assertFalse(mock_weigh.called)
+
+    def test_normalization_array(self):
+        # weight_list, expected_result, minval, maxval
+        map_ = (
+            ((), (), None, None),
+            ((0.0, 0.0), (0.0, 0.0), None, None),
+            ((1.0, 1.0), (0.0, 0.0), None, None),
+
+            ((20.0, 50.0), (0.0, 1.0), None, None),
+            ((20.0, 50.0), (0.0, 0.375), None, 100.0),
+            ((20.0, 50.0), (0.4, 1.0), 0.0, None),
+            ((20.0, 50.0), (0.2, 0.5), 0.0, 100.0),
+        )
+        for seq, result, minval, maxval in map_:
+            ret = weights.normalize_array(
+                numpy.array(seq, dtype=float), minval=minval, maxval=maxval)
+            self.assertEqual(result, tuple(ret.tolist()))
+
+    def test_object_columns(self):
+        objs = [fakes.FakeHostState('host1', 'node1', {'free_ram_mb': 512}),
+                fakes.FakeHostState('host2', 'node2', {'free_ram_mb': 1024})]
+        columns = weights.ObjectColumns(objs)
+
+        self.assertEqual(2, len(columns))
+        self.assertEqual([512.0, 1024.0], columns.get('free_ram_mb').tolist())
+        # None values are converted to 0
+        self.assertEqual(
+            [0.0, 0.0], columns.get('hypervisor_version').tolist())
+        # columns are only built once
+        self.assertIs(
+            columns.get('free_ram_mb'), columns.get('free_ram_mb'))
+
+    def test_incremental_weighed_objects(self):
+        hostinfo = [
+            fakes.FakeHostState('host1', 'node1', {'free_ram_mb': 512}),
+            fakes.FakeHostState('host2', 'node2', {'free_ram_mb': 1024}),
+            fakes.FakeHostState('host3', 'node3', {'free_ram_mb': 2048}),
+        ]
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighed = weight_handler.get_incremental_weighed_objects(
+            [ram.RAMWeigher()], hostinfo, {})
+
+        self.assertEqual(
+            [0.25, 0.5, 1.0], [w.weight for w in weighed.weighed_objs])
+
+        # the range of the initial weights is used to weigh single objects
+        hostinfo[2].free_ram_mb = 1024
+        weighed.reweigh(weighed.weighed_objs[2])
+        self.assertEqual(0.5, weighed.weighed_objs[2].weight)
+        hostinfo[2].free_ram_mb = 4096
+        weighed.reweigh(weighed.weighed_objs[2])
+        self.assertEqual(2.0, weighed.weighed_objs[2].weight)
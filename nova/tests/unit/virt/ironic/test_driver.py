@@ -1229,6 +1229,56 @@ class IronicDriverTestCase(test.NoDBTestCase):
             instance_id=instance.uuid,
             fields=ironic_driver._NODE_FIELDS)
 
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host')
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test_get_info_bulk(self, mock_svc_by_hv, mock_uuids_by_host,
+                           mock_get_node_list):
+        cached = _get_cached_node(
+            instance_id=uuids.cached, power_state=ironic_states.POWER_ON)
+        uncached = _get_cached_node(
+            id=uuidutils.generate_uuid(), instance_id=uuids.uncached,
+            power_state=ironic_states.POWER_OFF)
+        mock_svc_by_hv.return_value = []
+        mock_uuids_by_host.return_value = []
+        # The node cache is refreshed, then the missing nodes are listed
+        mock_get_node_list.side_effect = [[cached], iter([cached, uncached])]
+
+        instances = [
+            fake_instance.fake_instance_obj(self.ctx, uuid=uuid)
+            for uuid in (uuids.cached, uuids.uncached, uuids.unknown)]
+        result = self.driver.get_info_bulk(instances)
+
+        self.assertEqual(
+            {uuids.cached: hardware.InstanceInfo(state=nova_states.RUNNING),
+             uuids.uncached: hardware.InstanceInfo(
+                 state=nova_states.SHUTDOWN)},
+            result)
+        self.assertEqual(2, mock_get_node_list.call_count)
+        mock_get_node_list.assert_called_with(
+            associated=True, fields=ironic_driver._NODE_FIELDS,
+            return_generator=True)
+        self.mock_conn.nodes.assert_not_called()
+
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    def test_get_info_bulk_skip_cache(self, mock_get_node_list):
+        node = _get_cached_node(
+            instance_id=self.instance_uuid,
+            power_state=ironic_states.POWER_ON)
+        mock_get_node_list.return_value = iter([node])
+
+        instance = fake_instance.fake_instance_obj(self.ctx,
+                                                   uuid=self.instance_uuid)
+        result = self.driver.get_info_bulk([instance], use_cache=False)
+
+        self.assertEqual(
+            {instance.uuid: hardware.InstanceInfo(state=nova_states.RUNNING)},
+            result)
+        # verify we hit the ironic API once for fresh data
+        mock_get_node_list.assert_called_once_with(
+            associated=True, fields=ironic_driver._NODE_FIELDS,
+            return_generator=True)
+
     @mock.patch.object(ironic_driver.LOG, 'error')
     def test__get_node_list_bad_response(self, mock_error):
         fake_nodes = [_get_cached_node(),
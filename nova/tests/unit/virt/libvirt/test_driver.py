@@ -9585,6 +9585,22 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_running=False)
 
+    @mock.patch.object(host.Host, "get_instance_infos")
+    def test_get_info_bulk(self, mock_get_infos):
+        running = hardware.InstanceInfo(state=power_state.RUNNING,
+                                        internal_id=3)
+        mock_get_infos.return_value = {
+            uuids.running: running,
+            uuids.other: hardware.InstanceInfo(state=power_state.SHUTDOWN),
+        }
+        instances = [objects.Instance(uuid=uuids.running),
+                     objects.Instance(uuid=uuids.missing)]
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+
+        self.assertEqual({uuids.running: running},
+                         drvr.get_info_bulk(instances))
+        mock_get_infos.assert_called_once_with()
+
     @mock.patch('nova.virt.libvirt.host.Host.get_online_cpus',
                 return_value=set([0, 1, 2, 3]))
     def test_get_pcpu_available(self, get_online_cpus):
@@ -18879,7 +18895,8 @@ class LibvirtConnTestCase(test.NoDBTestCase,
             self.assertEqual(2, mock_info.call_count)
 
         filters = {'uuid': instance_uuids}
-        mock_get.assert_called_once_with(mock.ANY, filters, use_slave=True)
+        mock_get.assert_called_once_with(mock.ANY, filters, expected_attrs=[],
+                                         use_slave=True)
         mock_bdms.assert_called_with(mock.ANY, instance_uuids)
 
     @mock.patch.object(host.Host, "list_instance_domains")
@@ -18989,7 +19006,8 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         mock_list.assert_called_once_with(only_running=False)
         self.assertEqual(5, get_disk_info.call_count)
         filters = {'uuid': instance_uuids}
-        mock_get.assert_called_once_with(mock.ANY, filters, use_slave=True)
+        mock_get.assert_called_once_with(mock.ANY, filters, expected_attrs=[],
+                                         use_slave=True)
         mock_bdms.assert_called_with(mock.ANY, instance_uuids)
 
     @mock.patch.object(host.Host, "list_instance_domains")
@@ -22645,7 +22663,7 @@ class HostStateTestCase(test.NoDBTestCase):
             def _get_memory_mb_total():
                 return 497
 
-            def _get_memory_mb_used():
+            def _get_memory_mb_used(guests=None):
                 return 88
 
             self._host.get_memory_mb_total = _get_memory_mb_total
@@ -22657,13 +22675,13 @@ class HostStateTestCase(test.NoDBTestCase):
         def _get_vcpu_available(self):
             return set([1])
 
-        def _get_vcpu_used(self):
+        def _get_vcpu_used(self, guests=None):
             return 0
 
         def _get_cpu_info(self):
             return HostStateTestCase.cpu_info
 
-        def _get_disk_over_committed_size_total(self):
+        def _get_disk_over_committed_size_total(self, guests=None):
             return 0
 
         def _get_local_gb_info(self):
@@ -22729,6 +22747,41 @@ class HostStateTestCase(test.NoDBTestCase):
                             stats['numa_topology']),
                          HostStateTestCase.numa_topology)
 
+    @mock.patch.object(fakelibvirt, "openAuth")
+    def test_update_status_lists_guests_once(self, mock_open):
+        mock_open.return_value = fakelibvirt.Connection("qemu:///system")
+        drvr = HostStateTestCase.FakeConnection()
+        running = mock.Mock(spec=libvirt_guest.Guest)
+        running.is_active.return_value = True
+        shutoff = mock.Mock(spec=libvirt_guest.Guest)
+        shutoff.is_active.return_value = False
+        # the guest was undefined since the guests were listed
+        undefined = mock.Mock(spec=libvirt_guest.Guest)
+        undefined.is_active.side_effect = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, 'Domain not found',
+            error_code=fakelibvirt.VIR_ERR_NO_DOMAIN)
+        all_guests = [running, shutoff, undefined]
+
+        with test.nested(
+            mock.patch.object(drvr._host, 'list_guests',
+                              return_value=all_guests),
+            mock.patch.object(drvr, '_get_vcpu_used', return_value=0),
+            mock.patch.object(drvr._host, 'get_memory_mb_used',
+                              return_value=88),
+            mock.patch.object(drvr, '_get_disk_over_committed_size_total',
+                              return_value=0),
+            mock.patch.object(drvr._host, 'prune_guest_configs'),
+        ) as (mock_list, mock_vcpus, mock_memory, mock_disk, mock_prune):
+            drvr.get_available_resource("compute1")
+
+        # the domains are listed once, and the running ones split out
+        mock_list.assert_called_once_with(only_running=False)
+        mock_vcpus.assert_called_once_with([running])
+        mock_memory.assert_called_once_with([running])
+        mock_disk.assert_called_once_with(all_guests)
+        # the cached configs of the domains which no longer exist are dropped
+        mock_prune.assert_called_once_with(all_guests)
+
 
 class TestUpdateProviderTree(test.NoDBTestCase):
     vcpus = 24
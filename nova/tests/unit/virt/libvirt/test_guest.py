@@ -18,6 +18,7 @@ from unittest import mock
 
 from oslo_service import fixture as service_fixture
 from oslo_utils import encodeutils
+from oslo_utils.fixture import uuidsentinel as uuids
 
 from nova import context
 from nova import test
@@ -255,6 +256,121 @@ class GuestTestCase(test.NoDBTestCase):
         self.assertEqual('kvm', result.virt_type)
         self.assertEqual('fake', result.name)
 
+    def test_get_config_cached(self):
+        xml = "<domain type='kvm'><name>fake</name></domain>"
+        self.domain.XMLDesc.return_value = xml
+        self.domain.UUIDString.return_value = uuids.domain
+        cache = libvirt_guest.GuestConfigCache()
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+
+        config = guest.get_config()
+        self.assertEqual('fake', config.name)
+        # the XML is fetched again but not parsed again while it is the same
+        self.assertIs(config, guest.get_config())
+        self.assertEqual(2, self.domain.XMLDesc.call_count)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+        # the XML changed
+        self.domain.XMLDesc.return_value = (
+            "<domain type='kvm'><name>renamed</name></domain>")
+        self.assertEqual('renamed', guest.get_config().name)
+        self.assertEqual(2, cache.misses)
+
+        # the domain still exists
+        cache.prune([uuids.domain, uuids.other])
+        self.assertEqual(1, len(cache))
+        # the domain no longer exists
+        cache.prune([uuids.other])
+        self.assertEqual(0, len(cache))
+        self.assertIsNot(config, guest.get_config())
+        self.assertEqual(3, cache.misses)
+
+    def test_get_config_cached_events(self):
+        xml = "<domain type='kvm'><name>fake</name></domain>"
+        self.domain.XMLDesc.return_value = xml
+        self.domain.UUIDString.return_value = uuids.domain
+        cache = libvirt_guest.GuestConfigCache()
+        cache.track_events = True
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+
+        config = guest.get_config()
+        # the XML is not fetched again until the domain changed
+        self.assertIs(config, guest.get_config())
+        self.assertEqual(1, self.domain.XMLDesc.call_count)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+        # an event for another domain
+        cache.invalidate(uuids.other)
+        self.assertIs(config, guest.get_config())
+        self.assertEqual(1, self.domain.XMLDesc.call_count)
+
+        # an event for the domain, which did not change its XML
+        cache.invalidate(uuids.domain)
+        self.assertIs(config, guest.get_config())
+        self.assertEqual(2, self.domain.XMLDesc.call_count)
+        self.assertIs(config, guest.get_config())
+        self.assertEqual(2, self.domain.XMLDesc.call_count)
+
+        # a change made through the guest
+        self.domain.XMLDesc.return_value = (
+            "<domain type='kvm'><name>renamed</name></domain>")
+        guest.attach_device(mock.Mock(), live=True)
+        self.assertEqual('renamed', guest.get_config().name)
+        self.assertEqual(3, self.domain.XMLDesc.call_count)
+        self.assertEqual((4, 2), (cache.hits, cache.misses))
+
+    def test_get_config_cached_event_while_fetched(self):
+        cache = libvirt_guest.GuestConfigCache()
+        cache.track_events = True
+
+        def get_xml():
+            cache.invalidate(uuids.domain)
+            return "<domain type='kvm'><name>fake</name></domain>"
+
+        cache.get_config(uuids.domain, 0, get_xml)
+        # the domain changed while its XML was fetched
+        get_xml = mock.Mock(
+            return_value="<domain type='kvm'><name>renamed</name></domain>")
+        config = cache.get_config(uuids.domain, 0, get_xml)
+        self.assertEqual('renamed', config.name)
+        get_xml.assert_called_once_with()
+
+    def test_block_device_invalidates_config(self):
+        cache = mock.Mock(spec=libvirt_guest.GuestConfigCache)
+        self.domain.UUIDString.return_value = uuids.domain
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+        dev = guest.get_block_device('vda')
+
+        self.domain.blockJobAbort.side_effect = test.TestingException
+        self.assertRaises(test.TestingException, dev.abort_job, pivot=True)
+        cache.invalidate.assert_not_called()
+
+        self.domain.blockJobAbort.side_effect = None
+        dev.abort_job(pivot=True)
+        cache.invalidate.assert_called_once_with(uuids.domain)
+
+    def test_get_all_devices_cached(self):
+        xml = """
+<domain type='kvm'>
+  <devices>
+    <disk type='file' device='disk'>
+      <source file='/tmp/disk'/>
+      <target dev='vda' bus='virtio'/>
+    </disk>
+  </devices>
+</domain>"""
+        self.domain.XMLDesc.return_value = xml
+        self.domain.UUIDString.return_value = uuids.domain
+        cache = libvirt_guest.GuestConfigCache()
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+
+        self.assertEqual('vda', guest.get_all_disks()[0].target_dev)
+        guest.get_all_devices(from_persistent_config=True)
+        guest.get_all_disks()
+        # the live and the persistent configs are cached separately
+        self.assertEqual(2, len(cache))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
     def test_get_device_by_alias(self):
         xml = """
 <domain type='qemu'>
@@ -26,6 +26,7 @@ from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import uuidutils
 import testtools
 
+from nova.compute import power_state
 from nova.compute import vm_states
 from nova import exception
 from nova import objects
@@ -37,6 +38,7 @@ from nova.tests.fixtures import libvirt as fakelibvirt
 from nova.tests.fixtures import libvirt_data as fake_libvirt_data
 from nova import utils
 from nova.virt import event
+from nova.virt import hardware
 from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import event as libvirtevent
 from nova.virt.libvirt import guest as libvirt_guest
@@ -199,6 +201,23 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(got_events[0].transition,
                          event.EVENT_LIFECYCLE_STOPPED)
 
+    def test_event_callbacks_invalidate_guest_configs(self):
+        hostimpl = mock.MagicMock()
+        dom = mock.Mock(spec=fakelibvirt.virDomain)
+        dom.UUIDString.return_value = uuids.domain
+
+        host.Host._event_lifecycle_callback(
+            None, dom, fakelibvirt.VIR_DOMAIN_EVENT_STARTED, 0, hostimpl)
+        host.Host._event_device_removed_callback(
+            None, dom, 'virtio-1', hostimpl)
+        host.Host._event_device_removal_failed_callback(
+            None, dom, 'virtio-1', hostimpl)
+        # the arguments depend on the event, the opaque is always the last
+        host.Host._event_config_changed_callback(
+            None, dom, 'vda', 'copy', 'ready', hostimpl)
+        hostimpl._guest_configs.invalidate.assert_has_calls(
+            [mock.call(uuids.domain)] * 4)
+
     def test_event_lifecycle_callback_suspended_postcopy(self):
         """Tests the suspended lifecycle event with libvirt with post-copy"""
         hostimpl = mock.MagicMock()
@@ -371,6 +390,40 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(self.connect_calls, 1)
         self.assertEqual(self.register_calls, 3)
 
+    def test_get_connection_tracks_guest_config_events(self):
+        # the events are not dispatched before the host is initialized
+        self.host.get_connection()
+        self.assertFalse(self.host._guest_configs.track_events)
+
+        self.host._initialized = True
+        with mock.patch.object(
+                self.host, '_test_connection', return_value=False):
+            self.host.get_connection()
+        self.assertTrue(self.host._guest_configs.track_events)
+
+    @mock.patch.object(fakelibvirt.virConnect, "domainEventRegisterAny",
+                       side_effect=fakelibvirt.libvirtError('unsupported'))
+    def test_get_connection_no_events_untracked_guest_configs(
+            self, mock_register):
+        self.host._initialized = True
+        self.host.get_connection()
+        self.assertFalse(self.host._guest_configs.track_events)
+
+    def test_get_connection_clears_guest_configs(self):
+        xml = "<domain type='kvm'><name>fake</name></domain>"
+        self.host.get_connection()
+        self.host._guest_configs.get_config(uuids.domain, 0, lambda: xml)
+
+        # the cached configs are kept while the connection is up
+        self.host.get_connection()
+        self.assertEqual(1, len(self.host._guest_configs))
+
+        # and dropped once it is lost and a new one is opened
+        with mock.patch.object(
+                self.host, '_test_connection', return_value=False):
+            self.host.get_connection()
+        self.assertEqual(0, len(self.host._guest_configs))
+
     @mock.patch.object(fakelibvirt.virConnect, "domainEventRegisterAny")
     @mock.patch.object(host.Host, "_connect")
     def test_get_connection_concurrency(self, mock_conn, mock_event):
@@ -552,6 +605,7 @@ class HostTestCase(test.NoDBTestCase):
         guest = self.host.get_guest(instance)
         self.assertEqual(dom, guest._domain)
         self.assertIsInstance(guest, libvirt_guest.Guest)
+        self.assertIs(self.host._guest_configs, guest._config_cache)
 
         fake_lookup.assert_called_once_with(uuid)
 
@@ -595,6 +649,27 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(doms[2].name(), vm3.name())
         self.assertEqual(doms[3].name(), vm4.name())
 
+    @mock.patch.object(fakelibvirt.Connection, "getAllDomainStats")
+    def test_get_instance_infos(self, mock_get_stats):
+        vm1 = FakeVirtDomain(id=3, name="instance00000001")
+        vm2 = FakeVirtDomain(name="instance00000002")
+        mock_get_stats.return_value = [
+            (vm1, {'state.state': fakelibvirt.VIR_DOMAIN_PAUSED,
+                   'state.reason': 1}),
+            (vm2, {'state.state': fakelibvirt.VIR_DOMAIN_SHUTOFF,
+                   'state.reason': 1}),
+        ]
+
+        infos = self.host.get_instance_infos()
+
+        self.assertEqual(1, mock_get_stats.call_count)
+        self.assertEqual(
+            {vm1.UUIDString(): hardware.InstanceInfo(
+                 state=power_state.PAUSED, internal_id=3),
+             vm2.UUIDString(): hardware.InstanceInfo(
+                 state=power_state.SHUTDOWN, internal_id=-1)},
+            infos)
+
     @mock.patch.object(host.Host, "list_instance_domains")
     def test_list_guests(self, mock_list_domains):
         dom0 = mock.Mock(spec=fakelibvirt.virDomain)
@@ -605,6 +680,18 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(dom0, result[0]._domain)
         self.assertEqual(dom1, result[1]._domain)
 
+    def test_prune_guest_configs(self):
+        xml = "<domain type='kvm'><name>fake</name></domain>"
+        for uuid in (uuids.dom0, uuids.dom1):
+            self.host._guest_configs.get_config(uuid, 0, lambda: xml)
+        guest = mock.Mock(spec=libvirt_guest.Guest, uuid=uuids.dom0)
+
+        self.host.prune_guest_configs([guest])
+        self.assertEqual(1, len(self.host._guest_configs))
+        # the config of the remaining domain is still cached
+        self.host._guest_configs.get_config(uuids.dom0, 0, lambda: xml)
+        self.assertEqual(1, self.host._guest_configs.hits)
+
     def test_cpu_features_bug_1217630(self):
         self.host.get_connection()
 
@@ -1122,7 +1209,7 @@ Active:          8381604 kB
         ) as mock_sumDomainMemory:
             mock_sumDomainMemory.return_value = 8192
             self.assertEqual(8192, self.host.get_memory_mb_used())
-            mock_sumDomainMemory.assert_called_once_with()
+            mock_sumDomainMemory.assert_called_once_with(None)
 
     def test_get_cpu_stats(self):
         stats = self.host.get_cpu_stats()
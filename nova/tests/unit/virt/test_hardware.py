@@ -17,6 +17,7 @@ import copy
 from unittest import mock
 
 import ddt
+from oslo_utils.fixture import uuidsentinel as uuids
 import testtools
 
 import nova.conf
@@ -2867,6 +2868,247 @@ class VirtNUMAHostTopologyTestCase(test.NoDBTestCase):
         self.assertEqual(1, instance_topology.cells[0].id)
 
 
+class NUMAFitCacheTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.host = objects.NUMATopology(cells=[
+            objects.NUMACell(
+                id=cell_id,
+                cpuset=set(),
+                pcpuset=set(cpus),
+                memory=2048,
+                cpu_usage=0,
+                memory_usage=0,
+                socket=0,
+                pinned_cpus=set(),
+                mempages=[objects.NUMAPagesTopology(
+                    size_kb=4, total=524288, used=0)],
+                siblings=[set([cpu]) for cpu in cpus])
+            for cell_id, cpus in ((0, [0, 1]), (1, [2, 3]))])
+        self.instance = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(
+                id=0, cpuset=set(), pcpuset=set([0, 1]), memory=1024,
+                cpu_policy=fields.CPUAllocationPolicy.DEDICATED),
+        ])
+        self.limits = objects.NUMATopologyLimits(
+            cpu_allocation_ratio=2, ram_allocation_ratio=2)
+        self.cache = hw.NUMAFitCache(2)
+
+    def _fit(self, host=None, instance=None, **kwargs):
+        return hw.numa_fit_instance_to_host(
+            host or self.host, instance or self.instance, {},
+            limits=self.limits, cache=self.cache, **kwargs)
+
+    def test_fit_cached(self):
+        with mock.patch.object(
+            hw, '_numa_fit_instance_to_host',
+            wraps=hw._numa_fit_instance_to_host,
+        ) as mock_fit:
+            fitted1 = self._fit()
+            # An equivalent host, built from scratch
+            fitted2 = self._fit(host=self.host.obj_clone())
+
+        mock_fit.assert_called_once()
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(0, fitted1.cells[0].id)
+        self.assertEqual({0: 0, 1: 1}, fitted1.cells[0].cpu_pinning)
+        self.assertEqual(
+            fitted1.obj_to_primitive(), fitted2.obj_to_primitive())
+        # The callers get their own copies, and the request is not modified
+        self.assertIsNot(fitted1, fitted2)
+        self.assertIsNone(self.instance.cells[0].cpu_pinning_raw)
+
+    def test_fit_cached_failure(self):
+        instance = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(
+                id=0, cpuset=set(), pcpuset=set([0, 1, 2]), memory=1024,
+                cpu_policy=fields.CPUAllocationPolicy.DEDICATED),
+        ])
+
+        self.assertIsNone(self._fit(instance=instance))
+        self.assertIsNone(self._fit(instance=instance))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_fit_different_usage(self):
+        self._fit()
+        host = hw.numa_usage_from_instance_numa(self.host, self._fit())
+        fitted = self._fit(host=host)
+
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+        self.assertEqual(1, fitted.cells[0].id)
+
+    def test_fit_different_pci_stats(self):
+        pci_stats = stats.PciDeviceStats(objects.NUMATopology(), [
+            objects.PciDevicePool(
+                vendor_id='8086', product_id='154d', numa_node=1, count=1)])
+
+        self.assertEqual(0, self._fit().cells[0].id)
+        self.assertEqual(0, self._fit(pci_stats=pci_stats).cells[0].id)
+
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def _host_pci_stats(self, compute_node_id, rp_uuid):
+        pci_stats = stats.PciDeviceStats(objects.NUMATopology(), [
+            objects.PciDevicePool(
+                vendor_id='8086', product_id='154d', numa_node=1, count=1)])
+        # The pools of each host hold its own devices
+        pci_stats.pools[0]['rp_uuid'] = rp_uuid
+        pci_stats.pools[0]['devices'] = [objects.PciDevice(
+            compute_node_id=compute_node_id,
+            address='0000:81:00.%d' % compute_node_id)]
+        return pci_stats
+
+    def _fit_hosts(self, pci_requests):
+        # Two equivalent hosts, with their own resource provider and devices
+        for compute_node_id, rp_uuid in (
+            (1, uuids.host1_rp), (2, uuids.host2_rp),
+        ):
+            hw.numa_fit_instance_to_host(
+                self.host.obj_clone(), self.instance, {'': [rp_uuid]},
+                limits=self.limits, pci_requests=pci_requests,
+                pci_stats=self._host_pci_stats(compute_node_id, rp_uuid),
+                cache=self.cache)
+
+    def test_fit_cached_across_hosts(self):
+        self._fit_hosts([])
+
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(1, len(self.cache))
+
+    def test_fit_pci_requests_not_cached_across_hosts(self):
+        self._fit_hosts([
+            objects.InstancePCIRequest(
+                count=1, request_id=uuids.pci_request,
+                spec=[{'vendor_id': '8086', 'product_id': '154d'}])])
+
+        # The PCI requests are fitted with the resource providers of each
+        # host
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_fit_packing_strategy(self):
+        self._fit()
+        self.flags(
+            packing_host_numa_cells_allocation_strategy=True,
+            group='compute')
+        self._fit()
+
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_lru_eviction(self):
+        self.cache.set('a', None)
+        self.cache.set('b', None)
+        self.assertEqual((True, None), self.cache.get('a'))
+        self.cache.set('c', None)
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual((False, None), self.cache.get('b'))
+        self.assertEqual((True, None), self.cache.get('a'))
+        self.assertEqual((True, None), self.cache.get('c'))
+
+    def test_no_topology(self):
+        self.assertIsNone(hw.numa_fit_instance_to_host(
+            self.host, None, {}, cache=self.cache))
+        self.assertEqual(0, len(self.cache))
+
+
+class NUMAFitPrunedTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super().setUp()
+        # Eight identical host cells with two dedicated CPUs each, the CPUs
+        # of the cells 1 and 2 being pinned
+        self.host = objects.NUMATopology(cells=[
+            objects.NUMACell(
+                id=cell_id,
+                cpuset=set(),
+                pcpuset=set([cell_id * 2, cell_id * 2 + 1]),
+                memory=2048,
+                cpu_usage=0,
+                memory_usage=0,
+                socket=0,
+                pinned_cpus=(
+                    set([cell_id * 2, cell_id * 2 + 1])
+                    if cell_id in (1, 2) else set()),
+                mempages=[objects.NUMAPagesTopology(
+                    size_kb=4, total=524288, used=0)],
+                siblings=[set([cell_id * 2]), set([cell_id * 2 + 1])])
+            for cell_id in range(8)])
+        self.limits = objects.NUMATopologyLimits(
+            cpu_allocation_ratio=2, ram_allocation_ratio=2)
+
+    def _instance(self, num_cells, num_cpus=2):
+        return objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(
+                id=cell_id,
+                cpuset=set(),
+                pcpuset=set(range(
+                    cell_id * num_cpus, (cell_id + 1) * num_cpus)),
+                memory=1024,
+                cpu_policy=fields.CPUAllocationPolicy.DEDICATED)
+            for cell_id in range(num_cells)])
+
+    def _fit(self, strategy, instance, **kwargs):
+        self.flags(numa_cell_fitting_strategy=strategy, group='compute')
+        with mock.patch.object(
+            hw, '_numa_fit_instance_cell',
+            wraps=hw._numa_fit_instance_cell,
+        ) as mock_fit_cell:
+            fitted = hw.numa_fit_instance_to_host(
+                self.host, instance.obj_clone(), {}, limits=self.limits,
+                **kwargs)
+        return fitted, mock_fit_cell.call_count
+
+    def test_same_result(self):
+        for num_cells in (1, 3, 6):
+            for packing in (False, True):
+                self.flags(
+                    packing_host_numa_cells_allocation_strategy=packing,
+                    group='compute')
+                instance = self._instance(num_cells)
+
+                expected, _ = self._fit('permutations', instance)
+                fitted, _ = self._fit('pruned', instance)
+
+                self.assertEqual(
+                    expected.obj_to_primitive(), fitted.obj_to_primitive())
+
+    def test_same_result_pci(self):
+        # Only the host cell 6 can provide the requested device
+        pci_stats = stats.PciDeviceStats(objects.NUMATopology(), [
+            objects.PciDevicePool(
+                vendor_id='8086', product_id='154d', numa_node=6, count=1)])
+        pci_requests = [objects.InstancePCIRequest(
+            count=1, spec=[{'vendor_id': '8086', 'product_id': '154d'}],
+            numa_policy=fields.PCINUMAAffinityPolicy.REQUIRED)]
+        instance = self._instance(2)
+
+        expected, _ = self._fit(
+            'permutations', instance, pci_requests=pci_requests,
+            pci_stats=pci_stats)
+        fitted, _ = self._fit(
+            'pruned', instance, pci_requests=pci_requests,
+            pci_stats=pci_stats)
+
+        self.assertIn(6, [cell.id for cell in fitted.cells])
+        self.assertEqual(
+            expected.obj_to_primitive(), fitted.obj_to_primitive())
+
+    def test_fewer_fittings(self):
+        # The first instance cell fits on most host cells but the second one
+        # does not fit anywhere, so all the permutations fail
+        instance = self._instance(2)
+        instance.cells[1].pcpuset = set([2, 3, 4])
+
+        expected, permutation_calls = self._fit('permutations', instance)
+        fitted, pruned_calls = self._fit('pruned', instance)
+
+        self.assertIsNone(expected)
+        self.assertIsNone(fitted)
+        # The fittings of each pair of cells are cached in both cases, but
+        # the identical host cells are only tried once by the pruned search
+        self.assertEqual(21, permutation_calls)
+        self.assertEqual(4, pruned_calls)
+
+
 class NumberOfSerialPortsTest(test.NoDBTestCase):
     def test_flavor(self):
         flavor = objects.Flavor(vcpus=8, memory_mb=2048,
@@ -516,6 +516,16 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
                           self.connection.get_info,
                           fake_instance)
 
+    @catch_notimplementederror
+    def test_get_info_bulk(self):
+        instance_ref, network_info = self._get_running_instance()
+        unknown = test_utils.get_test_instance(obj=True)
+        unknown.uuid = '1d8b2d3c-7a5e-4f69-9c2a-4b0e6f3a8d51'
+        infos = self.connection.get_info_bulk([instance_ref, unknown])
+        self.assertEqual([instance_ref.uuid], list(infos))
+        self.assertEqual(self.connection.get_info(instance_ref),
+                         infos[instance_ref.uuid])
+
     @catch_notimplementederror
     def test_get_diagnostics(self):
         instance_ref, network_info = self._get_running_instance(obj=True)
@@ -17,6 +17,7 @@
 
 """Utilities and helper functions."""
 
+import collections
 import contextlib
 import datetime
 import functools
@@ -27,6 +28,7 @@ import random
 import re
 import shutil
 import tempfile
+import threading
 import time
 
 import eventlet
@@ -881,6 +883,74 @@ def delete_cached_file(filename):
         del _FILE_CACHE[filename]
 
 
+class LRUCache(object):
+    """A bounded and thread safe LRU cache, whose entries may expire.
+
+    The least recently used entries are evicted once there are more than
+    ``maxsize`` of them. The numbers of hits and misses are counted.
+
+    :param maxsize: The maximum number of entries to keep.
+    :param ttl: The default time, in seconds, to keep the entries, or None
+        to keep them until they are evicted.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # The (expiry time or None, value) tuples, keyed by cache key
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the value cached for the given key, or the default."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= now):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Cache a value for the given key.
+
+        :param ttl: The time, in seconds, to keep this entry, instead of the
+            default time of the cache.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        expiry = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate):
+        """Drop the entries whose value matches a predicate.
+
+        :returns: The number of entries dropped.
+        """
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if predicate(entry[1])]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 def isotime(at=None):
     """Current time as ISO string,
     as timeutils.isotime() is deprecated
@@ -36,6 +36,7 @@ import nova.conf
 import nova.virt.node
 
 from nova import context as nova_context
+from nova import exception
 from nova.i18n import _
 from nova.network import model as network_model
 from nova import objects
@@ -352,6 +353,32 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def get_info_bulk(self, instances, use_cache=True):
+        """Get the current status of several instances.
+
+        .. note::
+
+            This implementation works for all drivers, but it is not
+            particularly efficient, as it calls get_info for each instance.
+            Maintainers of the virt drivers are encouraged to override this
+            method with something more efficient.
+
+        :param instances: list of nova.objects.instance.Instance objects
+        :param use_cache: boolean to indicate if the driver should be allowed
+                          to use cached data to return instance status.
+                          See get_info.
+        :returns: dict of InstanceInfo objects, keyed by instance uuid. The
+                  instances which are not found are left out.
+        """
+        infos = {}
+        for instance in instances:
+            try:
+                infos[instance.uuid] = self.get_info(
+                    instance, use_cache=use_cache)
+            except exception.InstanceNotFound:
+                pass
+        return infos
+
     @classmethod
     def get_instance_driver_metadata(
         cls, instance: 'nova.objects.instance.Instance',
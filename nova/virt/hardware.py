@@ -13,6 +13,7 @@
 # under the License.
 
 import collections
+import functools
 import itertools
 import re
 import typing as ty
@@ -28,11 +29,13 @@ import nova.conf
 from nova import exception
 from nova.i18n import _
 from nova import objects
+from nova.objects import base as obj_base
 from nova.objects import compute_node
 from nova.objects import fields
 from nova.objects import service
 from nova.pci import stats
 from nova.scheduler.client import report
+from nova import utils
 
 
 CONF = nova.conf.CONF
@@ -2432,6 +2435,101 @@ def _numa_cells_support_network_metadata(
     return True
 
 
+_NOT_CACHED = object()
+
+
+class NUMAFitCache(utils.LRUCache):
+    """A bounded LRU cache of the results of numa_fit_instance_to_host.
+
+    The hosts of a homogeneous fleet often have the same NUMA topology and
+    usage, so fitting an instance on them gives the same result. The results
+    are cached by a canonical key of all the inputs of the fitting, so that
+    they are computed once for all the equivalent hosts.
+
+    :param maxsize: The maximum number of results to keep.
+    """
+
+    def get(self, key):
+        """Return a (found, result) tuple for the given key."""
+        result = super().get(key, _NOT_CACHED)
+        if result is _NOT_CACHED:
+            return False, None
+        # The callers are free to modify the topology they get
+        return True, result.obj_clone() if result is not None else None
+
+    def set(self, key, result):
+        if result is not None:
+            result = result.obj_clone()
+        super().set(key, result)
+
+
+def _freeze_field(obj, name):
+    if obj.obj_attr_is_set(name):
+        return _freeze(getattr(obj, name))
+    # Reading a field with a default value sets it, so an unset field must
+    # be frozen the same as its default value.
+    default = obj.fields[name].default
+    if default is fields.UnspecifiedDefault:
+        return fields.UnspecifiedDefault
+    return _freeze(default)
+
+
+def _freeze(value):
+    """Return a hashable and canonical representation of a value."""
+    if isinstance(value, obj_base.NovaObject):
+        return (value.obj_name(),) + tuple(
+            (name, _freeze_field(value, name))
+            for name in sorted(value.fields))
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _numa_fit_pci_cache_key(provider_mapping, pci_requests, pci_stats):
+    if pci_requests:
+        # The provider mapping and the pools are only used to fit the PCI
+        # requests. The devices of the pools are specific to each host, and
+        # are summarized by the count of the pools.
+        pools = None
+        if pci_stats:
+            pools = tuple(
+                _freeze({key: value for key, value in pool.items()
+                         if key != 'devices'})
+                for pool in pci_stats.pools)
+        return (_freeze(provider_mapping), _freeze(pci_requests), pools)
+
+    # Without PCI request, the host cells are only sorted by their number of
+    # free PCI devices.
+    counts: ty.Dict[ty.Optional[int], int] = {}
+    if pci_stats:
+        for pool in pci_stats.pools:
+            counts[pool['numa_node']] = (
+                counts.get(pool['numa_node'], 0) + pool['count'])
+    return tuple(sorted(counts.items(), key=repr))
+
+
+def _numa_fit_cache_key(
+    host_topology, instance_topology, provider_mapping, limits,
+    pci_requests, pci_stats,
+):
+    # NOTE: The key must not hold anything specific to a host, like the
+    # UUID of its resource provider or its PCI devices, otherwise the
+    # results cannot be shared by equivalent hosts.
+    return (
+        CONF.compute.packing_host_numa_cells_allocation_strategy,
+        CONF.compute.numa_cell_fitting_strategy,
+        _freeze(host_topology),
+        _freeze(instance_topology),
+        _freeze(limits),
+        _numa_fit_pci_cache_key(provider_mapping, pci_requests, pci_stats),
+    )
+
+
 def numa_fit_instance_to_host(
     host_topology: 'objects.NUMATopology',
     instance_topology: 'objects.InstanceNUMATopology',
@@ -2439,6 +2537,40 @@ def numa_fit_instance_to_host(
     limits: ty.Optional['objects.NUMATopologyLimit'] = None,
     pci_requests: ty.Optional['objects.InstancePCIRequests'] = None,
     pci_stats: ty.Optional[stats.PciDeviceStats] = None,
+    cache: ty.Optional[NUMAFitCache] = None,
+):
+    """Fit the instance topology onto the host topology.
+
+    This is :func:`_numa_fit_instance_to_host`, with the result looked up in
+    the given NUMAFitCache first, if any. Unlike the uncached fitting, the
+    cached fitting never modifies the cells of ``instance_topology``.
+
+    :param cache: An optional NUMAFitCache.
+    """
+    if cache is None or not (host_topology and instance_topology):
+        return _numa_fit_instance_to_host(
+            host_topology, instance_topology, provider_mapping,
+            limits=limits, pci_requests=pci_requests, pci_stats=pci_stats)
+
+    key = _numa_fit_cache_key(
+        host_topology, instance_topology, provider_mapping, limits,
+        pci_requests, pci_stats)
+    found, result = cache.get(key)
+    if not found:
+        result = _numa_fit_instance_to_host(
+            host_topology, instance_topology.obj_clone(), provider_mapping,
+            limits=limits, pci_requests=pci_requests, pci_stats=pci_stats)
+        cache.set(key, result)
+    return result
+
+
+def _numa_fit_instance_to_host(
+    host_topology: 'objects.NUMATopology',
+    instance_topology: 'objects.InstanceNUMATopology',
+    provider_mapping: ty.Optional[ty.Dict[str, ty.List[str]]],
+    limits: ty.Optional['objects.NUMATopologyLimit'] = None,
+    pci_requests: ty.Optional['objects.InstancePCIRequests'] = None,
+    pci_stats: ty.Optional[stats.PciDeviceStats] = None,
 ):
     """Fit the instance topology onto the host topology.
 
@@ -2548,6 +2680,54 @@ def numa_fit_instance_to_host(
                     host_cells,
                     key=lambda cell: total_pci_in_cell.get(cell.id, 0))
 
+    if CONF.compute.numa_cell_fitting_strategy == 'pruned':
+        fit_cells = _numa_fit_cells_pruned
+    else:
+        fit_cells = _numa_fit_cells_permutations
+
+    chosen_instance_cells = fit_cells(
+        host_topology, host_cells, instance_topology, limits,
+        functools.partial(
+            _numa_cells_support_requests, host_topology, provider_mapping,
+            network_metadata, pci_requests, pci_stats),
+        pci_stats)
+    if chosen_instance_cells is None:
+        return
+
+    return objects.InstanceNUMATopology(
+        cells=chosen_instance_cells,
+        emulator_threads_policy=emulator_threads_policy)
+
+
+def _numa_cells_support_requests(
+    host_topology, provider_mapping, network_metadata, pci_requests,
+    pci_stats, chosen_host_cells, chosen_instance_cells,
+):
+    """Check the PCI and network requests of fitted instance cells.
+
+    :returns: True if the PCI devices and networks requested by the instance
+        are available from the chosen host cells.
+    """
+    if pci_requests and pci_stats and not pci_stats.support_requests(
+            pci_requests, provider_mapping, chosen_instance_cells):
+        return False
+
+    if network_metadata and not _numa_cells_support_network_metadata(
+            host_topology, chosen_host_cells, network_metadata):
+        return False
+
+    return True
+
+
+def _numa_fit_cells_permutations(
+    host_topology, host_cells, instance_topology, limits, supports_requests,
+    pci_stats,
+):
+    """Fit the instance cells by trying all the permutations of host cells.
+
+    :returns: The list of the fitted instance cells of the first permutation
+        of ``host_cells`` which fits, or None.
+    """
     # a set of host_cell.id, instance_cell.id pairs where we already checked
     # that the instance cell does not fit
     not_fit_cache = set()
@@ -2611,17 +2791,125 @@ def numa_fit_instance_to_host(
         if len(chosen_instance_cells) != len(host_cell_perm):
             continue
 
-        if pci_requests and pci_stats and not pci_stats.support_requests(
-                pci_requests, provider_mapping, chosen_instance_cells):
+        if not supports_requests(chosen_host_cells, chosen_instance_cells):
             continue
 
-        if network_metadata and not _numa_cells_support_network_metadata(
-                host_topology, chosen_host_cells, network_metadata):
-            continue
+        return chosen_instance_cells
+
+
+def _numa_cell_symmetry_key(host_cell, pci_stats):
+    """Return a key identifying the host cells which are interchangeable.
+
+    Two host cells with the same key only differ by their ID and the IDs of
+    their CPUs, so an instance cell fits on one if and only if it fits on the
+    other.
+    """
+    cpus = set(host_cell.cpuset) | host_cell.pcpuset | host_cell.pinned_cpus
+    for siblings in host_cell.siblings:
+        cpus |= siblings
+    ranks = {cpu: rank for rank, cpu in enumerate(sorted(cpus))}
+
+    def relabel(cpuset):
+        return tuple(sorted(ranks[cpu] for cpu in cpuset))
+
+    pools = []
+    if pci_stats:
+        for pool in pci_stats.pools:
+            if pool.get('numa_node') == host_cell.id:
+                pools.append(_freeze({
+                    key: value for key, value in pool.items()
+                    if key not in ('numa_node', 'devices')}))
+
+    return (
+        relabel(host_cell.cpuset),
+        relabel(host_cell.pcpuset),
+        relabel(host_cell.pinned_cpus),
+        tuple(sorted(relabel(siblings) for siblings in host_cell.siblings)),
+        host_cell.memory,
+        host_cell.cpu_usage,
+        host_cell.memory_usage,
+        _freeze_field(host_cell, 'socket'),
+        _freeze_field(host_cell, 'mempages'),
+        _freeze_field(host_cell, 'network_metadata'),
+        tuple(sorted(pools)),
+    )
+
+
+def _numa_fit_cells_pruned(
+    host_topology, host_cells, instance_topology, limits, supports_requests,
+    pci_stats,
+):
+    """Fit the instance cells with a pruned depth-first search.
+
+    The permutations of host cells are explored in the same order as
+    :func:`_numa_fit_cells_permutations`, so the same permutation is chosen,
+    but without enumerating them all:
+
+    * once an instance cell does not fit on a host cell, none of the
+      permutations starting with the same host cells is considered;
+    * once no permutation starting with some host cells is suitable, none of
+      the permutations where the last of those host cells is replaced by an
+      interchangeable one is considered, as it is not suitable either.
+
+    :returns: The list of the fitted instance cells of the first permutation
+        of ``host_cells`` which fits, or None.
+    """
+    instance_cells = instance_topology.cells
+    symmetry_keys = [
+        _numa_cell_symmetry_key(host_cell, pci_stats)
+        for host_cell in host_cells]
+    # The fitted instance cells keyed by (host cell index, instance cell
+    # index), None if the instance cell does not fit on the host cell
+    fitted_cells = {}
+
+    def fit_cell(host_index, instance_index):
+        pair = (host_index, instance_index)
+        if pair not in fitted_cells:
+            cpuset_reserved = 0
+            if (instance_topology.emulator_threads_isolated and
+                    instance_index == 0):
+                # See _numa_fit_cells_permutations
+                cpuset_reserved = 1
+            # The fitting modifies the instance cell, so keep a copy of the
+            # result for each pair.
+            instance_cell = instance_cells[instance_index].obj_clone()
+            try:
+                got_cell = _numa_fit_instance_cell(
+                    host_cells[host_index], instance_cell, limits,
+                    cpuset_reserved)
+            except exception.MemoryPageSizeNotSupported:
+                got_cell = None
+            fitted_cells[pair] = got_cell
+        return fitted_cells[pair]
+
+    chosen = []
+
+    def search(instance_index):
+        if instance_index == len(instance_cells):
+            return supports_requests(
+                [host_cells[index] for index in chosen],
+                [fitted_cells[(index, position)]
+                 for position, index in enumerate(chosen)])
+
+        failed_keys = set()
+        for host_index in range(len(host_cells)):
+            if host_index in chosen:
+                continue
+            if symmetry_keys[host_index] in failed_keys:
+                continue
+            if fit_cell(host_index, instance_index) is not None:
+                chosen.append(host_index)
+                if search(instance_index + 1):
+                    return True
+                chosen.pop()
+            failed_keys.add(symmetry_keys[host_index])
+        return False
+
+    if not search(0):
+        return None
 
-        return objects.InstanceNUMATopology(
-            cells=chosen_instance_cells,
-            emulator_threads_policy=emulator_threads_policy)
+    return [fitted_cells[(index, position)]
+            for position, index in enumerate(chosen)]
 
 
 def numa_get_reserved_huge_pages():
@@ -1042,6 +1042,45 @@ class IronicDriver(virt_driver.ComputeDriver):
 
         return hardware.InstanceInfo(state=map_power_state(node.power_state))
 
+    def get_info_bulk(self, instances, use_cache=True):
+        """Get the current state of several instances.
+
+        The nodes of the instances are looked up in the node cache, if
+        allowed, and the nodes missing from it are retrieved from ironic with
+        a single node list call.
+
+        :param instances: the instance objects.
+        :param use_cache: boolean to indicate if the driver should be allowed
+                          to use cached data to return instance status.
+                          If false, pull fresh data from ironic.
+        :returns: a dict of InstanceInfo objects, keyed by instance uuid. The
+                  instances without node are left out.
+        :raises: VirtDriverNotReady
+        """
+        uuids = set(instance.uuid for instance in instances)
+        infos = {}
+
+        if use_cache:
+            # we should already have a cache for our nodes, refreshed on
+            # every RT loop. but if we don't have a cache, generate it.
+            if not self.node_cache:
+                self._refresh_cache()
+            for node in self.node_cache.values():
+                if node.instance_id in uuids:
+                    infos[node.instance_id] = hardware.InstanceInfo(
+                        state=map_power_state(node.power_state))
+
+        if uuids.difference(infos):
+            nodes = self._get_node_list(associated=True,
+                                        fields=_NODE_FIELDS,
+                                        return_generator=True)
+            for node in nodes:
+                if node.instance_id in uuids and node.instance_id not in infos:
+                    infos[node.instance_id] = hardware.InstanceInfo(
+                        state=map_power_state(node.power_state))
+
+        return infos
+
     def _get_network_metadata(self, node, network_info):
         """Gets a more complete representation of the instance network info.
 
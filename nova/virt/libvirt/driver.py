@@ -8071,6 +8071,19 @@ class LibvirtDriver(driver.ComputeDriver):
         # workaround, see libvirt/compat.py
         return guest.get_info(self._host)
 
+    def get_info_bulk(self, instances, use_cache=True):
+        """Retrieve information from libvirt for several instances.
+
+        The state of all the domains is retrieved with a single libvirt call.
+
+        :param instances: list of nova.objects.instance.Instance objects
+        :param use_cache: unused in this driver
+        :returns: dict of InstanceInfo objects, keyed by instance uuid
+        """
+        infos = self._host.get_instance_infos()
+        return {instance.uuid: infos[instance.uuid]
+                for instance in instances if instance.uuid in infos}
+
     def _create_domain_setup_lxc(self, context, instance, image_meta,
                                  block_device_info):
         inst_path = libvirt_utils.get_instance_path(instance)
@@ -8367,9 +8380,10 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return info
 
-    def _get_vcpu_used(self):
+    def _get_vcpu_used(self, guests=None):
         """Get vcpu usage number of physical computer.
 
+        :param guests: The running guests of the host, listed if None.
         :returns: The total number of vcpu(s) that are currently being used.
 
         """
@@ -8400,7 +8414,9 @@ class LibvirtDriver(driver.ComputeDriver):
         #
         # Thus when getting an exception we always report 1 as the
         # vCPU count, as the least worst value.
-        for guest in self._host.list_guests():
+        if guests is None:
+            guests = self._host.list_guests()
+        for guest in guests:
             try:
                 vcpus = guest.get_vcpus_info()
                 total += len(list(vcpus))
@@ -10124,30 +10140,52 @@ class LibvirtDriver(driver.ComputeDriver):
                 resources['PCPU'] = resources['VCPU']
                 del resources[orc.VCPU]
 
+    @staticmethod
+    @contextlib.contextmanager
+    def _time_step(timings, step):
+        """Record the time spent in a step of a task into a dict."""
+        with timeutils.StopWatch() as timer:
+            yield
+        timings[step] = timer.elapsed()
+
     def get_available_resource(self, nodename):
         """Retrieve resource information.
 
         This method is called when nova-compute launches, and
         as part of a periodic task that records the results in the DB.
 
+        The guests of the host are listed once and shared by the helpers
+        reporting their usage, and the time spent in each step is logged.
+
         :param nodename: unused in this driver
         :returns: dictionary containing resource info
         """
+        timings = {}
+        with self._time_step(timings, 'list_guests'):
+            all_guests = self._host.list_guests(only_running=False)
+            running_guests = [guest for guest in all_guests
+                              if self._is_guest_active(guest)]
+            self._host.prune_guest_configs(all_guests)
 
-        disk_info_dict = self._get_local_gb_info()
+        with self._time_step(timings, 'local_gb'):
+            disk_info_dict = self._get_local_gb_info()
         data = {}
 
         # NOTE(dprince): calling capabilities before getVersion works around
         # an initialization issue with some versions of Libvirt (1.0.5.5).
         # See: https://bugzilla.redhat.com/show_bug.cgi?id=1000116
         # See: https://bugs.launchpad.net/nova/+bug/1215593
-        data["supported_instances"] = self._get_instance_capabilities()
+        with self._time_step(timings, 'capabilities'):
+            data["supported_instances"] = self._get_instance_capabilities()
 
         data["vcpus"] = len(self._get_vcpu_available())
         data["memory_mb"] = self._host.get_memory_mb_total()
         data["local_gb"] = disk_info_dict['total']
-        data["vcpus_used"] = self._get_vcpu_used()
-        data["memory_mb_used"] = self._host.get_memory_mb_used()
+        with self._time_step(timings, 'vcpus_used'):
+            data["vcpus_used"] = self._get_vcpu_used(running_guests)
+        with self._time_step(timings, 'memory_mb_used'):
+            data["memory_mb_used"] = self._host.get_memory_mb_used(
+                running_guests)
         data["local_gb_used"] = disk_info_dict['used']
         data["hypervisor_type"] = self._host.get_driver_type()
         data["hypervisor_version"] = self._host.get_version()
@@ -10165,20 +10203,41 @@ class LibvirtDriver(driver.ComputeDriver):
         data["cpu_info"] = jsonutils.dumps(self._get_cpu_info())
 
         disk_free_gb = disk_info_dict['free']
-        disk_over_committed = self._get_disk_over_committed_size_total()
+        with self._time_step(timings, 'disk_over_committed'):
+            disk_over_committed = self._get_disk_over_committed_size_total(
+                all_guests)
         available_least = disk_free_gb * units.Gi - disk_over_committed
         data['disk_available_least'] = available_least / units.Gi
 
-        data['pci_passthrough_devices'] = self._get_pci_passthrough_devices()
+        with self._time_step(timings, 'pci_passthrough_devices'):
+            data['pci_passthrough_devices'] = (
+                self._get_pci_passthrough_devices())
 
-        numa_topology = self._get_host_numa_topology()
+        with self._time_step(timings, 'numa_topology'):
+            numa_topology = self._get_host_numa_topology()
         if numa_topology:
             data['numa_topology'] = numa_topology._to_json()
         else:
             data['numa_topology'] = None
 
+        LOG.debug('Collected the available resources of %(guests)d guests '
+                  'in %(total).3f seconds (%(steps)s)',
+                  {'guests': len(all_guests),
+                   'total': sum(timings.values()),
+                   'steps': ', '.join('%s: %.3fs' % step
+                                      for step in timings.items())})
         return data
 
+    @staticmethod
+    def _is_guest_active(guest):
+        try:
+            return guest.is_active()
+        except libvirt.libvirtError as ex:
+            # The guest was undefined since the guests were listed
+            if ex.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+                return False
+            raise
+
     def check_instance_shared_storage_local(self, context, instance):
         """Check if instance files located on shared storage.
 
@@ -12015,16 +12074,20 @@ class LibvirtDriver(driver.ComputeDriver):
         return jsonutils.dumps(
             self._get_instance_disk_info(instance, block_device_info))
 
-    def _get_disk_over_committed_size_total(self):
-        """Return total over committed disk size for all instances."""
+    def _get_disk_over_committed_size_total(self, guests=None):
+        """Return total over committed disk size for all instances.
+
+        :param guests: All the guests of the host, listed if None.
+        """
         # Disk size that all instance uses : virtual_size - disk_size
         disk_over_committed_size = 0
-        instance_domains = self._host.list_instance_domains(only_running=False)
-        if not instance_domains:
+        if guests is None:
+            guests = self._host.list_guests(only_running=False)
+        if not guests:
             return disk_over_committed_size
 
         # Get all instance uuids
-        instance_uuids = [dom.UUIDString() for dom in instance_domains]
+        instance_uuids = [guest.uuid for guest in guests]
         ctx = nova_context.get_admin_context()
         # Get instance object list by uuid filter
         filters = {'uuid': instance_uuids}
@@ -12037,7 +12100,7 @@ class LibvirtDriver(driver.ComputeDriver):
         # in _update_available_resource method for calculating usages based
         # on instance utilization.
         local_instance_list = objects.InstanceList.get_by_filters(
-            ctx, filters, use_slave=True)
+            ctx, filters, expected_attrs=[], use_slave=True)
         # Convert instance list to dictionary with instance uuid as key.
         local_instances = {inst.uuid: inst for inst in local_instance_list}
 
@@ -12045,9 +12108,8 @@ class LibvirtDriver(driver.ComputeDriver):
         bdms = objects.BlockDeviceMappingList.bdms_by_instance_uuid(
             ctx, instance_uuids)
 
-        for dom in instance_domains:
+        for guest in guests:
             try:
-                guest = libvirt_guest.Guest(dom)
                 config = guest.get_config()
 
                 block_device_info = None
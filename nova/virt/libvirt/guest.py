@@ -27,6 +27,9 @@ higher level APIs around the raw libvirt API. These APIs are
 then used by all the other libvirt related classes
 """
 
+import functools
+import hashlib
+import itertools
 import time
 import typing as ty
 
@@ -103,15 +106,121 @@ LIBVIRT_BLOCK_JOB_TYPE = {
 }
 
 
+class GuestConfigCache(object):
+    """A cache of the parsed XML configs of the domains of a host.
+
+    The configs are kept per domain and XML flags, along with the digest of
+    the XML they were parsed from and the generation of the domain they were
+    fetched at. The generation of a domain is bumped by the libvirt events of
+    the host and by the Guest calls which change the domain, so a config is
+    returned without fetching the XML again until then. Without events, or
+    once the domain changed, the XML is fetched but only parsed again when
+    its digest changed. The host drops the configs of the domains which no
+    longer exist when it lists its guests.
+
+    The configs are shared by all the callers, which must not modify them.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # Whether the host receives the domain events, in which case the
+        # configs of the domains without any event are known to be current
+        self.track_events = False
+        # The (XML digest, config, generation) tuples, keyed by
+        # (domain UUID, XML flags)
+        self._configs: ty.Dict[ty.Tuple[str, int], ty.Tuple[
+            bytes, vconfig.LibvirtConfigGuest, int]] = {}
+        # The generations of the domains, keyed by domain UUID. The domains
+        # without any are at generation 0.
+        self._generations: ty.Dict[str, int] = {}
+        self._counter = itertools.count(1)
+
+    def __len__(self):
+        return len(self._configs)
+
+    def invalidate(self, uuid):
+        """Mark the configs of a domain as outdated.
+
+        This is called from the native libvirt event thread, so it must
+        neither block nor log.
+        """
+        self._generations[uuid] = next(self._counter)
+
+    def get_config(self, uuid, flags, get_xml):
+        """Return the config parsed from the XML of a domain.
+
+        :param uuid: The UUID of the domain.
+        :param flags: The flags the XML is fetched with.
+        :param get_xml: The callable returning the XML of the domain.
+        :returns: The LibvirtConfigGuest of the domain.
+        """
+        key = (uuid, flags)
+        # Read the generation first, so a change while the XML is fetched
+        # leaves the stored config outdated
+        generation = self._generations.get(uuid, 0)
+        entry = self._configs.get(key)
+        if (self.track_events and entry is not None and
+                entry[2] == generation):
+            self.hits += 1
+            return entry[1]
+        xml = get_xml()
+        digest = hashlib.sha256(encodeutils.safe_encode(xml)).digest()
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            config = entry[1]
+        else:
+            self.misses += 1
+            config = vconfig.LibvirtConfigGuest()
+            config.parse_str(xml)
+        self._configs[key] = (digest, config, generation)
+        return config
+
+    def prune(self, uuids):
+        """Drop the configs of the domains not in the given UUIDs."""
+        uuids = set(uuids)
+        keys = [key for key in list(self._configs) if key[0] not in uuids]
+        for key in keys:
+            self._configs.pop(key, None)
+        for uuid in [uuid for uuid in list(self._generations)
+                     if uuid not in uuids]:
+            self._generations.pop(uuid, None)
+
+    def clear(self):
+        self._configs.clear()
+        self._generations.clear()
+
+
+def _invalidates_config(function):
+    """Mark the cached configs of the guest as outdated after the call.
+
+    The libvirt calls which failed did not change the domain.
+    """
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        result = function(self, *args, **kwargs)
+        self._invalidate_config()
+        return result
+    return wrapper
+
+
 class Guest(object):
 
-    def __init__(self, domain):
+    def __init__(self, domain, config_cache=None):
+        """Create a Guest for a domain.
+
+        :param domain: The libvirt.virDomain of the guest.
+        :param config_cache: The GuestConfigCache of the host of the domain,
+            if its parsed XML configs are to be cached.
+        """
 
         global libvirt
         if libvirt is None:
             libvirt = importutils.import_module('libvirt')
 
         self._domain = domain
+        self._config_cache = config_cache
 
     def __repr__(self):
         return "<Guest %(id)d %(name)s %(uuid)s>" % {
@@ -155,6 +264,7 @@ class Guest(object):
                           encodeutils.safe_decode(xml))
         return guest
 
+    @_invalidates_config
     def launch(self, pause=False):
         """Starts a created guest.
 
@@ -168,6 +278,7 @@ class Guest(object):
                 LOG.exception('Error launching a defined domain with XML: %s',
                               self._encoded_xml, errors='ignore')
 
+    @_invalidates_config
     def poweroff(self):
         """Stops a running guest."""
         self._domain.destroy()
@@ -216,6 +327,7 @@ class Guest(object):
         """Injects an NMI to a guest."""
         self._domain.injectNMI()
 
+    @_invalidates_config
     def resume(self):
         """Resumes a paused guest."""
         self._domain.resume()
@@ -295,6 +407,7 @@ class Guest(object):
             yield VCPUInfo(
                 id=vcpu[0], cpu=vcpu[3], state=vcpu[1], time=vcpu[2])
 
+    @_invalidates_config
     def delete_configuration(self):
         """Undefines a domain from hypervisor."""
         try:
@@ -319,6 +432,7 @@ class Guest(object):
         """Whether domain config is persistently stored on the host."""
         return self._domain.isPersistent()
 
+    @_invalidates_config
     def attach_device(self, conf, persistent=False, live=False):
         """Attaches device to the guest.
 
@@ -336,6 +450,7 @@ class Guest(object):
         LOG.debug("attach device xml: %s", device_xml)
         self._domain.attachDeviceFlags(device_xml, flags=flags)
 
+    @_invalidates_config
     def set_metadata(self, metadata, persistent=False, live=False):
         """Set metadata to the guest.
 
@@ -358,14 +473,27 @@ class Guest(object):
                                  metadata_xml, "instance",
                                  vconfig.NOVA_NS, flags=flags)
 
+    def _get_config(self, flags):
+        if self._config_cache is not None:
+            return self._config_cache.get_config(
+                self.uuid, flags, lambda: self._domain.XMLDesc(flags))
+        config = vconfig.LibvirtConfigGuest()
+        config.parse_str(self._domain.XMLDesc(flags))
+        return config
+
+    def _invalidate_config(self):
+        if self._config_cache is not None:
+            self._config_cache.invalidate(self.uuid)
+
     def get_config(self):
         """Returns the config instance for a guest
 
+        The config may be shared with the other callers if the guest was
+        created with a GuestConfigCache, so it must not be modified.
+
         :returns: LibvirtConfigGuest instance
         """
-        config = vconfig.LibvirtConfigGuest()
-        config.parse_str(self._domain.XMLDesc(0))
-        return config
+        return self._get_config(0)
 
     def get_disk(
         self,
@@ -436,9 +564,7 @@ class Guest(object):
             flags |= libvirt.VIR_DOMAIN_XML_INACTIVE
 
         try:
-            config = vconfig.LibvirtConfigGuest()
-            config.parse_str(
-                self._domain.XMLDesc(flags))
+            config = self._get_config(flags)
         except Exception:
             return []
 
@@ -449,6 +575,7 @@ class Guest(object):
                 devs.append(dev)
         return devs
 
+    @_invalidates_config
     def detach_device(self, conf, persistent=False, live=False):
         """Detaches device to the guest.
 
@@ -545,6 +672,7 @@ class Guest(object):
         """Thaw filesystems within guest."""
         self._domain.fsThaw()
 
+    @_invalidates_config
     def snapshot(self, conf, no_metadata=False,
                  disk_only=False, reuse_ext=False, quiesce=False):
         """Creates a guest snapshot.
@@ -567,10 +695,12 @@ class Guest(object):
 
         self._domain.snapshotCreateXML(device_xml, flags=flags)
 
+    @_invalidates_config
     def shutdown(self):
         """Shutdown guest"""
         self._domain.shutdown()
 
+    @_invalidates_config
     def pause(self):
         """Suspends an active guest
 
@@ -582,6 +712,7 @@ class Guest(object):
         """
         self._domain.suspend()
 
+    @_invalidates_config
     def migrate(self, destination, migrate_uri=None, migrate_disks=None,
                 destination_xml=None, flags=0, bandwidth=0):
         """Migrate guest object from its current host to the destination
@@ -641,6 +772,7 @@ class Guest(object):
         self._domain.migrateToURI3(
             destination, params=params, flags=flags)
 
+    @_invalidates_config
     def abort_job(self):
         """Requests to abort current background job"""
         self._domain.abortJob()
@@ -714,6 +846,10 @@ class BlockDevice(object):
         self._guest = guest
         self._disk = disk
 
+    def _invalidate_config(self):
+        self._guest._invalidate_config()
+
+    @_invalidates_config
     def abort_job(self, async_=False, pivot=False):
         """Request to cancel a live block device job
 
@@ -751,6 +887,7 @@ class BlockDevice(object):
             cur=status['cur'],
             end=status['end'])
 
+    @_invalidates_config
     def copy(self, dest_xml, shallow=False, reuse_ext=False, transient=False):
         """Copy the guest-visible contents into a new disk
 
@@ -767,6 +904,7 @@ class BlockDevice(object):
         flags |= transient and libvirt.VIR_DOMAIN_BLOCK_COPY_TRANSIENT_JOB or 0
         return self._guest._domain.blockCopy(self._disk, dest_xml, flags=flags)
 
+    @_invalidates_config
     def rebase(self, base, shallow=False, reuse_ext=False,
                copy=False, relative=False, copy_dev=False):
         """Copy data from backing chain into a new disk
@@ -791,6 +929,7 @@ class BlockDevice(object):
         return self._guest._domain.blockRebase(
             self._disk, base, self.REBASE_DEFAULT_BANDWIDTH, flags=flags)
 
+    @_invalidates_config
     def commit(self, base, top, relative=False):
         """Merge data from overlays into backing file
 
@@ -803,6 +942,7 @@ class BlockDevice(object):
         return self._guest._domain.blockCommit(
             self._disk, base, top, self.COMMIT_DEFAULT_BANDWIDTH, flags=flags)
 
+    @_invalidates_config
     def resize(self, size):
         """Resize block device to the given size in bytes.
 
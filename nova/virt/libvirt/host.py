@@ -60,6 +60,7 @@ from nova.pci import utils as pci_utils
 from nova import rpc
 from nova import utils
 from nova.virt import event as virtevent
+from nova.virt import hardware
 from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import driver
 from nova.virt.libvirt import event as libvirtevent
@@ -88,6 +89,17 @@ HV_DRIVER_QEMU = "QEMU"
 
 SEV_KERNEL_PARAM_FILE = '/sys/module/kvm_amd/parameters/sev'
 
+# The domain events, besides the lifecycle and device removal ones, which
+# change the XML of the domains and so the cached guest configs
+CONFIG_CHANGED_EVENT_IDS = (
+    'VIR_DOMAIN_EVENT_ID_DEVICE_ADDED',
+    'VIR_DOMAIN_EVENT_ID_BLOCK_JOB_2',
+    'VIR_DOMAIN_EVENT_ID_DISK_CHANGE',
+    'VIR_DOMAIN_EVENT_ID_TRAY_CHANGE',
+    'VIR_DOMAIN_EVENT_ID_BALLOON_CHANGE',
+    'VIR_DOMAIN_EVENT_ID_METADATA_CHANGE',
+)
+
 # These are taken from the spec
 # https://github.com/qemu/qemu/blob/v5.2.0/docs/interop/firmware.json
 QEMU_FIRMWARE_DESCRIPTOR_PATHS = [
@@ -169,6 +181,10 @@ class Host(object):
 
         self._has_hyperthreading: ty.Optional[bool] = None
 
+        # The parsed XML configs of the guests, shared by the Guest objects
+        # returned by this host
+        self._guest_configs = libvirt_guest.GuestConfigCache()
+
     @staticmethod
     def _get_libvirt_proxy_classes(libvirt_module):
         """Return a tuple for tpool.Proxy's autowrap argument containing all
@@ -252,6 +268,7 @@ class Host(object):
         """
         self = opaque
         uuid = dom.UUIDString()
+        self._guest_configs.invalidate(uuid)
         self._queue_event(libvirtevent.DeviceRemovedEvent(uuid, dev))
 
     @staticmethod
@@ -265,8 +282,22 @@ class Host(object):
         """
         self = opaque
         uuid = dom.UUIDString()
+        self._guest_configs.invalidate(uuid)
         self._queue_event(libvirtevent.DeviceRemovalFailedEvent(uuid, dev))
 
+    @staticmethod
+    def _event_config_changed_callback(conn, dom, *args):
+        """Receives the events of the changes of the domain configs.
+
+        The arguments depend on the event, the last one is always the
+        opaque. NB: this method is executing in a native thread, not
+        an eventlet coroutine. It can only invoke other libvirt
+        APIs, or use self._queue_event(). Any use of logging APIs
+        in particular is forbidden.
+        """
+        self = args[-1]
+        self._guest_configs.invalidate(dom.UUIDString())
+
     @staticmethod
     def _event_lifecycle_callback(conn, dom, event, detail, opaque):
         """Receives lifecycle events from libvirt.
@@ -280,6 +311,7 @@ class Host(object):
         self = opaque
 
         uuid = dom.UUIDString()
+        self._guest_configs.invalidate(uuid)
         transition = None
         if event == libvirt.VIR_DOMAIN_EVENT_STOPPED:
             transition = virtevent.EVENT_LIFECYCLE_STOPPED
@@ -497,6 +529,10 @@ class Host(object):
         # This will raise an exception on failure
         wrapped_conn = self._connect(self._uri, self._read_only)
 
+        # The cached guest configs are only trusted while all the events
+        # changing the domain configs are received
+        self._guest_configs.track_events = False
+        events_registered = False
         try:
             LOG.debug("Registering for lifecycle events %s", self)
             wrapped_conn.domainEventRegisterAny(
@@ -514,10 +550,26 @@ class Host(object):
                 libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_REMOVAL_FAILED,
                 self._event_device_removal_failed_callback,
                 self)
+            events_registered = True
         except Exception as e:
             LOG.warning("URI %(uri)s does not support events: %(error)s",
                         {'uri': self._uri, 'error': e})
 
+        if events_registered and self._initialized:
+            try:
+                for event_id in CONFIG_CHANGED_EVENT_IDS:
+                    event_id = getattr(libvirt, event_id, None)
+                    if event_id is not None:
+                        wrapped_conn.domainEventRegisterAny(
+                            None, event_id,
+                            self._event_config_changed_callback, self)
+                self._guest_configs.track_events = True
+            except Exception as e:
+                LOG.debug("URI %(uri)s does not support the domain config "
+                          "events, the guest XML will be fetched on each "
+                          "lookup: %(error)s",
+                          {'uri': self._uri, 'error': e})
+
         try:
             LOG.debug("Registering for connection events: %s", str(self))
             wrapped_conn.registerCloseCallback(self._close_callback, None)
@@ -566,6 +618,8 @@ class Host(object):
                 finally:
                     self._initial_connection = False
 
+                # The domains may have changed while we were not connected
+                self._guest_configs.clear()
                 self._queue_conn_event_handler(True, None)
 
         return self._wrapped_conn
@@ -660,7 +714,8 @@ class Host(object):
         :raises exception.InstanceNotFound: The domain was not found
         :raises exception.InternalError: A libvirt error occurred
         """
-        return libvirt_guest.Guest(self._get_domain(instance))
+        return libvirt_guest.Guest(
+            self._get_domain(instance), config_cache=self._guest_configs)
 
     def _get_domain(self, instance):
         """Retrieve libvirt domain object for an instance.
@@ -699,7 +754,15 @@ class Host(object):
         :returns: list of Guest objects
         """
         domains = self.list_instance_domains(only_running=only_running)
-        return [libvirt_guest.Guest(dom) for dom in domains]
+        return [libvirt_guest.Guest(dom, config_cache=self._guest_configs)
+                for dom in domains]
+
+    def prune_guest_configs(self, guests):
+        """Drop the cached configs of the domains which no longer exist.
+
+        :param guests: The list of all the Guest objects of this host.
+        """
+        self._guest_configs.prune(guest.uuid for guest in guests)
 
     def list_instance_domains(self, only_running=True):
         """Get a list of libvirt.Domain objects for nova instances
@@ -729,6 +792,27 @@ class Host(object):
 
         return doms
 
+    def get_instance_infos(self):
+        """Get the state of all the nova instances
+
+        Query libvirt for the state of all the active and inactive domains
+        with a single getAllDomainStats() call, rather than calling info() on
+        each of them.
+
+        :returns: dict of hardware.InstanceInfo objects, keyed by instance
+            uuid
+        """
+        flags = (libvirt.VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE |
+                 libvirt.VIR_CONNECT_GET_ALL_DOMAINS_STATS_INACTIVE)
+        records = self.get_connection().getAllDomainStats(
+            libvirt.VIR_DOMAIN_STATS_STATE, flags)
+        return {
+            dom.UUIDString(): hardware.InstanceInfo(
+                state=libvirt_guest.LIBVIRT_POWER_STATE[stats['state.state']],
+                internal_id=dom.ID())
+            for dom, stats in records
+        }
+
     def get_available_cpus(self):
         """Get the set of CPUs that exist on the host.
 
@@ -1154,10 +1238,15 @@ class Host(object):
         else:
             return self._get_hardware_info()[1]
 
-    def _sum_domain_memory_mb(self):
-        """Get the total memory consumed by guest domains."""
+    def _sum_domain_memory_mb(self, guests=None):
+        """Get the total memory consumed by guest domains.
+
+        :param guests: The running guests, listed if None.
+        """
         used = 0
-        for guest in self.list_guests():
+        if guests is None:
+            guests = self.list_guests()
+        for guest in guests:
             try:
                 # TODO(sahid): Use get_info...
                 dom_mem = int(guest._get_domain_info()[2])
@@ -1182,15 +1271,16 @@ class Host(object):
 
         return avail
 
-    def get_memory_mb_used(self):
+    def get_memory_mb_used(self, guests=None):
         """Get the used memory size(MB) of physical computer.
 
+        :param guests: The running guests, listed if None and needed.
         :returns: the total usage of memory(MB).
         """
         if CONF.libvirt.file_backed_memory > 0:
             # For file_backed_memory, report the total usage of guests,
             # ignoring host memory
-            return self._sum_domain_memory_mb()
+            return self._sum_domain_memory_mb(guests)
         else:
             return (self.get_memory_mb_total() -
                    (self._get_avail_memory_kb() // units.Ki))
@@ -18,11 +18,15 @@ Pluggable Weighing support
 """
 
 import abc
+import logging as py_logging
+import time
 
 from oslo_log import log as logging
+from oslo_utils import importutils
 
 from nova import loadables
 
+numpy = importutils.try_import('numpy')
 
 LOG = logging.getLogger(__name__)
 
@@ -56,9 +60,57 @@ def normalize(weight_list, minval=None, maxval=None):
     return ((i - minval) / range_ for i in weight_list)
 
 
+def normalize_array(weights, minval=None, maxval=None):
+    """Normalize the values in a numpy array between 0 and 1.0.
+
+    This is the columnar counterpart of :func:`normalize` and follows the
+    exact same rules.
+    """
+    if not len(weights):
+        return weights
+
+    maxval = float(weights.max() if maxval is None else maxval)
+    minval = float(weights.min() if minval is None else minval)
+
+    if minval == maxval:
+        return numpy.zeros(len(weights))
+
+    return (weights - minval) / (maxval - minval)
+
+
+class ObjectColumns(object):
+    """Attributes of a list of objects, packed into numpy arrays.
+
+    Columns are built lazily the first time they are requested and are then
+    shared by all the weighers run for the same request, so that each
+    attribute is read only once per object.
+    """
+
+    def __init__(self, objs):
+        self.objs = objs
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.objs)
+
+    def get(self, name):
+        """Return the float column for the ``name`` attribute.
+
+        ``None`` values are converted to 0.
+        """
+        if name not in self._columns:
+            self._columns[name] = numpy.fromiter(
+                (getattr(obj, name) or 0 for obj in self.objs),
+                dtype=float, count=len(self.objs))
+        return self._columns[name]
+
+
 class WeighedObject(object):
     """Object with weight information."""
 
+    # One is created for each weighed object of every request
+    __slots__ = ('obj', 'weight')
+
     def __init__(self, obj, weight):
         self.obj = obj
         self.weight = weight
@@ -119,10 +171,101 @@ class BaseWeigher(metaclass=abc.ABCMeta):
 
         return weights
 
+    def weigh_columns(self, columns, weight_properties):
+        """Weigh multiple objects at once from their packed attributes.
+
+        Override in a subclass to support the columnar weighing mode. The
+        returned value is a numpy array of raw weights, in the same order as
+        ``columns.objs``; it will be clamped, normalized and multiplied by the
+        caller. Returning None, which is the default, makes the caller fall
+        back to :meth:`weigh_objects`.
+
+        :param columns: The ObjectColumns object for the weighed objects.
+        :param weight_properties: The weighing properties of the request.
+        """
+        return None
+
+    def weight_multipliers(self, objs):
+        """Return the weight multipliers of multiple objects.
+
+        Override in a subclass if the multiplier of many objects can be
+        computed at once.
+
+        :param objs: The list of weighed objects.
+        """
+        return [self.weight_multiplier(obj) for obj in objs]
+
+
+class IncrementalWeighedObjects(object):
+    """Weigh objects once, then update the weights of single objects.
+
+    The raw weights of each weigher are normalized with the range of the
+    values found when weighing all the objects at first, so that the weight
+    of a single object can be updated without weighing all the others again.
+
+    :param object_class: The WeighedObject class to wrap the objects with.
+    :param weighers: The weighers to use.
+    :param obj_list: The objects to weigh.
+    :param weighing_properties: The weighing properties of the request.
+    """
+
+    def __init__(self, object_class, weighers, obj_list, weighing_properties):
+        self.weighers = weighers
+        self.weighing_properties = weighing_properties
+        self.weighed_objs = [object_class(obj, 0.0) for obj in obj_list]
+        # The (minval, maxval) normalization range of each weigher
+        self.ranges = []
+
+        for weigher in weighers:
+            weights = weigher.weigh_objects(
+                self.weighed_objs, weighing_properties)
+            minval = weigher.minval
+            if minval is None:
+                minval = min(weights, default=0)
+            maxval = weigher.maxval
+            if maxval is None:
+                maxval = max(weights, default=0)
+            self.ranges.append((minval, maxval))
+
+            for obj, weight in zip(
+                self.weighed_objs, normalize(weights, minval, maxval),
+            ):
+                obj.weight += weigher.weight_multiplier(obj.obj) * weight
+
+    def reweigh(self, weighed_obj):
+        """Update the weight of a single WeighedObject."""
+        weighed_obj.weight = 0.0
+        for weigher, (minval, maxval) in zip(self.weighers, self.ranges):
+            weights = weigher.weigh_objects(
+                [weighed_obj], self.weighing_properties)
+            weight = next(iter(normalize(weights, minval, maxval)))
+            weighed_obj.weight += (
+                weigher.weight_multiplier(weighed_obj.obj) * weight)
+
 
 class BaseWeightHandler(loadables.BaseLoader):
     object_class = WeighedObject
 
+    def get_incremental_weighed_objects(
+        self, weighers, obj_list, weighing_properties,
+    ):
+        """Return an IncrementalWeighedObjects for the objects."""
+        return IncrementalWeighedObjects(
+            self.object_class, weighers, obj_list, weighing_properties)
+
+    def _use_columnar_weighing(self):
+        """Whether the columnar weighing mode should be used.
+
+        Override in a subclass to enable the mode.
+        """
+        return False
+
+    def _observe_weigher_time(self, cls_name, seconds):
+        """Called with the time spent in a weigher for a request.
+
+        Override in a subclass to collect the timings of the weighers.
+        """
+
     def get_weighed_objects(self, weighers, obj_list, weighing_properties):
         """Return a sorted (descending), normalized list of WeighedObjects."""
         weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
@@ -130,7 +273,12 @@ class BaseWeightHandler(loadables.BaseLoader):
         if len(weighed_objs) <= 1:
             return weighed_objs
 
+        if self._use_columnar_weighing():
+            return self._get_weighed_objects_columnar(
+                weighers, weighed_objs, weighing_properties)
+
         for weigher in weighers:
+            start = time.perf_counter()
             weights = weigher.weigh_objects(weighed_objs, weighing_properties)
 
             LOG.debug(
@@ -168,5 +316,54 @@ class BaseWeightHandler(loadables.BaseLoader):
                 weigher.__class__.__name__,
                 {name: log for name, log in log_data.items()}
             )
+            self._observe_weigher_time(
+                weigher.__class__.__name__, time.perf_counter() - start)
+
+        return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
+
+    def _get_weighed_objects_columnar(
+        self, weighers, weighed_objs, weighing_properties,
+    ):
+        """Weigh objects using numpy arrays rather than per-object loops.
+
+        Weighers implementing :meth:`BaseWeigher.weigh_columns` compute their
+        raw weights from the shared :class:`ObjectColumns`; the others are
+        called through :meth:`BaseWeigher.weigh_objects`. Clamping,
+        normalization and multiplication are then done on whole arrays.
+        """
+        objs = [obj.obj for obj in weighed_objs]
+        columns = ObjectColumns(objs)
+        totals = numpy.zeros(len(objs))
+        debug = LOG.isEnabledFor(py_logging.DEBUG)
+
+        for weigher in weighers:
+            start = time.perf_counter()
+            weights = weigher.weigh_columns(columns, weighing_properties)
+            if weights is None:
+                weights = numpy.array(
+                    weigher.weigh_objects(weighed_objs, weighing_properties),
+                    dtype=float)
+            elif weigher.minval is not None or weigher.maxval is not None:
+                weights = numpy.clip(weights, weigher.minval, weigher.maxval)
+
+            weights = normalize_array(
+                weights, minval=weigher.minval, maxval=weigher.maxval)
+            multipliers = numpy.array(
+                weigher.weight_multipliers(objs), dtype=float)
+            totals += multipliers * weights
+
+            if debug:
+                LOG.debug(
+                    "%s: score (multiplier * weight) %s",
+                    weigher.__class__.__name__,
+                    {(obj.host, obj.nodename): f"{multiplier} * {weight}"
+                     for obj, multiplier, weight in zip(
+                         objs, multipliers, weights)}
+                )
+            self._observe_weigher_time(
+                weigher.__class__.__name__, time.perf_counter() - start)
+
+        for obj, total in zip(weighed_objs, totals.tolist()):
+            obj.weight = total
 
         return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)